@@ -0,0 +1,12 @@
+"""
+Spectral Analysis
+Vectorized processing of measured spectra, independent of the hardware modules
+"""
+
+from .axis import UNITS, SpectralAxis, normalize_unit
+from .baseline import BASELINES, als_baseline, baseline, polynomial_baseline
+from .peaks import SHAPES, PeakFit, fit_peaks, peak_model
+from .batch import BatchFitter, FitSettings, fit_batch
+from .noise import NoiseAnalyzer, WelchEstimator
+from .svd import SVDResult, grid_matrix, truncated_svd
+from .kinetics import GlobalFitter, exponential_basis, fit_kinetics
@@ -0,0 +1,114 @@
+"""
+Spectral Axis
+Unit-tagged wavenumber / wavelength arrays with cached vectorized conversion
+"""
+
+import logging
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Unit names as used by ``[system] default_units``
+UNITS = ("cm1", "microns")
+
+_ALIASES = {
+    "cm1": "cm1", "cm-1": "cm1", "wavenumber": "cm1", "wavenumbers": "cm1",
+    "microns": "microns", "micron": "microns", "um": "microns", "µm": "microns",
+}
+
+
+def normalize_unit(unit: str) -> str:
+    """Canonical unit name; raises ValueError for unknown units"""
+    try:
+        return _ALIASES[unit.strip().lower()]
+    except (KeyError, AttributeError):
+        raise ValueError(f"Unknown spectral unit '{unit}', expected one of {UNITS}")
+
+
+class SpectralAxis:
+    """
+    Read-only array of spectral positions tagged with its unit
+
+    Conversions between cm-1 and microns (``1e4 / x`` both ways) are done
+    for the whole array at once and cached on the axis, so a scan's axis is
+    converted at most once per unit however often it is asked for.
+    """
+
+    def __init__(self, values: Union[Iterable[float], np.ndarray], unit: str = "cm1"):
+        self.unit = normalize_unit(unit)
+        array = np.array(values, dtype=np.float64, ndmin=1)
+        if array.ndim != 1:
+            raise ValueError("A spectral axis must be one-dimensional")
+        if not np.all(np.isfinite(array)) or np.any(array <= 0):
+            raise ValueError(f"Spectral positions must be positive and finite ({self.unit})")
+        array.setflags(write=False)
+        self.values = array
+        self._converted: Dict[str, np.ndarray] = {self.unit: array}
+
+    @classmethod
+    def linspace(cls, start: float, stop: float, num: int, unit: str = "cm1") -> "SpectralAxis":
+        return cls(np.linspace(start, stop, num), unit)
+
+    def __len__(self) -> int:
+        return self.values.size
+
+    def __repr__(self) -> str:
+        return f"SpectralAxis({self.values.size} points, {self.unit})"
+
+    def in_units(self, unit: str) -> np.ndarray:
+        """The positions in ``unit`` (read-only, cached)"""
+        unit = normalize_unit(unit)
+        converted = self._converted.get(unit)
+        if converted is None:
+            # cm-1 <-> microns is its own inverse
+            converted = 1e4 / self.values
+            converted.setflags(write=False)
+            self._converted[unit] = converted
+        return converted
+
+    def to(self, unit: str) -> "SpectralAxis":
+        """The same positions as an axis in ``unit``, sharing the conversion cache"""
+        unit = normalize_unit(unit)
+        if unit == self.unit:
+            return self
+        axis = SpectralAxis.__new__(SpectralAxis)
+        axis.unit = unit
+        axis.values = self.in_units(unit)
+        axis._converted = self._converted
+        return axis
+
+    @property
+    def wavenumbers(self) -> np.ndarray:
+        return self.in_units("cm1")
+
+    @property
+    def microns(self) -> np.ndarray:
+        return self.in_units("microns")
+
+    def span(self, unit: Optional[str] = None) -> Tuple[float, float]:
+        """(low, high) in ``unit`` (default: the axis unit)"""
+        values = self.in_units(unit or self.unit)
+        return float(values.min()), float(values.max())
+
+    def outside(self, ranges) -> np.ndarray:
+        """
+        Mask of positions covered by none of the (low, high) wavenumber
+        ``ranges``, evaluated for all points and ranges in one operation
+        """
+        bounds = np.asarray(ranges, dtype=np.float64).reshape(-1, 2)
+        low, high = bounds.min(axis=1), bounds.max(axis=1)
+        wavenumbers = self.wavenumbers[:, None]
+        return ~np.any((wavenumbers >= low) & (wavenumbers <= high), axis=1)
+
+    def check_range(self, ranges, device: str = "MIRcat") -> None:
+        """Raise ValueError naming the offending positions if any lies outside ``ranges`` (cm-1)"""
+        mask = self.outside(ranges)
+        if not mask.any():
+            return
+        bad = self.values[mask]
+        shown = ", ".join(f"{v:g}" for v in bad[:5]) + (", ..." if bad.size > 5 else "")
+        limits = ", ".join(f"{min(r):g}-{max(r):g}" for r in np.asarray(ranges).reshape(-1, 2))
+        raise ValueError(f"{bad.size} point(s) outside the {device} range {limits} cm-1: "
+                         f"{shown} {'cm-1' if self.unit == 'cm1' else self.unit}")
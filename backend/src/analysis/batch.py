@@ -0,0 +1,210 @@
+"""
+Batch Spectrum Fitting
+Baseline correction and peak fitting of many spectra, warm-started and spread over a process pool
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+from .baseline import BASELINES, baseline as fit_baseline
+from .peaks import PARAMS_PER_PEAK, SHAPES, PeakFit, fit_peaks
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FitSettings:
+    """
+    What to fit to each spectrum
+
+    The baseline is subtracted first; ``num_peaks`` peaks of ``shape`` plus
+    a constant offset are then fitted to the corrected spectrum (no peaks:
+    baseline only).
+    """
+    baseline: str = "als"  # "none", "polynomial" or "als"
+    poly_order: int = 3
+    poly_iterations: int = 0
+    als_lambda: float = 1e5
+    als_p: float = 0.01
+    als_iterations: int = 10
+    num_peaks: int = 1
+    shape: str = "lorentzian"
+    max_iterations: int = 100
+    tolerance: float = 1e-8
+
+    def validate(self) -> None:
+        if self.baseline not in BASELINES:
+            raise ValueError(f"Unknown baseline '{self.baseline}', expected one of {BASELINES}")
+        if self.shape not in SHAPES:
+            raise ValueError(f"Unknown peak shape '{self.shape}', expected one of {SHAPES}")
+        if self.num_peaks < 0 or self.poly_order < 0 or self.max_iterations < 1:
+            raise ValueError("Require num_peaks >= 0, poly_order >= 0 and max_iterations >= 1")
+        if not 0 < self.als_p < 1 or self.als_lambda <= 0:
+            raise ValueError("Require 0 < als_p < 1 and als_lambda > 0")
+
+    def baseline_options(self) -> Dict[str, Any]:
+        if self.baseline == "polynomial":
+            return {"order": self.poly_order, "iterations": self.poly_iterations}
+        if self.baseline == "als":
+            return {"lam": self.als_lambda, "p": self.als_p, "iterations": self.als_iterations}
+        return {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def fit_batch(x: np.ndarray, spectra: np.ndarray, settings: FitSettings,
+              initial: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    Baseline and peaks of a (spectra, points) batch in one pass
+
+    Module level so that process-pool workers can run it. Returns arrays:
+    ``baseline``, ``params``/``stderr``/``chi2``/``iterations``/``converged``
+    (peaks only).
+    """
+    base = fit_baseline(x, spectra, settings.baseline, **settings.baseline_options())
+    result: Dict[str, Any] = {"baseline": base}
+    if settings.num_peaks:
+        fit = fit_peaks(x, spectra - base, settings.num_peaks, settings.shape, initial,
+                        settings.max_iterations, settings.tolerance)
+        result.update(params=fit.params, stderr=fit.stderr, chi2=fit.chi2,
+                      iterations=fit.iterations, converged=fit.converged)
+    return result
+
+
+class BatchFitter:
+    """
+    Fits batches of spectra, warm-starting from earlier fits
+
+    The fitted parameters of every spectrum are kept under its key (e.g.
+    MUX position), so refitting a growing spectrum starts from the previous
+    point's fit, and a new key starts from the most recent fit of another
+    sample. Batches larger than ``chunk_size`` are split over a process
+    pool of ``workers`` (default: CPU count) when more than one is
+    available; smaller batches are fitted in the calling thread, already
+    vectorized.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = 64, history: int = 100):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._warm: Dict[Hashable, np.ndarray] = {}
+        self._last: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self.total_fits = 0
+        self.total_time = 0.0
+        self._recent: deque = deque(maxlen=history)  # (fits, seconds) per batch
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def _initial(self, keys: Sequence[Hashable], num_params: int) -> Optional[np.ndarray]:
+        """Warm-start parameters per spectrum, or None if nothing matches"""
+        def usable(params):
+            return params is not None and params.shape == (num_params,)
+
+        fallback = self._last if usable(self._last) else None
+        rows = [self._warm.get(key) if usable(self._warm.get(key)) else fallback for key in keys]
+        if all(row is None for row in rows):
+            return None
+        if any(row is None for row in rows):
+            # Mixed: one cold spectrum would need its own guess; start all from a warm one
+            known = next(row for row in rows if row is not None)
+            rows = [known if row is None else row for row in rows]
+        return np.stack(rows)
+
+    def fit(self, x, spectra, settings: FitSettings, keys: Optional[Sequence[Hashable]] = None,
+            warm_start: bool = True) -> Dict[str, Any]:
+        """
+        Fit every spectrum; returns per-spectrum results and throughput
+
+        ``spectra`` is (spectra, points) with NaN for missing points.
+        """
+        settings.validate()
+        x = np.asarray(x, dtype=np.float64)
+        spectra = np.array(spectra, dtype=np.float64, ndmin=2)
+        if spectra.shape[1] != x.size:
+            raise ValueError("Every spectrum needs one value per x")
+        count = spectra.shape[0]
+        keys = list(keys) if keys is not None else list(range(count))
+        num_params = 1 + PARAMS_PER_PEAK * settings.num_peaks
+        with self._lock:
+            initial = self._initial(keys, num_params) if warm_start and settings.num_peaks else None
+
+        start = time.perf_counter()
+        chunks = [slice(i, i + self.chunk_size) for i in range(0, count, self.chunk_size)]
+        if len(chunks) > 1 and self.workers > 1:
+            futures = [
+                self._executor().submit(fit_batch, x, spectra[chunk], settings,
+                                        initial[chunk] if initial is not None else None)
+                for chunk in chunks
+            ]
+            parts = [future.result() for future in futures]
+            arrays = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+            mode = "process_pool"
+        else:
+            arrays = fit_batch(x, spectra, settings, initial)
+            mode = "in_process"
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            if settings.num_peaks:
+                for key, params in zip(keys, arrays["params"]):
+                    self._warm[key] = params
+                self._last = arrays["params"][-1]
+            self.total_fits += count
+            self.total_time += elapsed
+            self._recent.append((count, elapsed))
+
+        fits: List[Dict[str, Any]] = [{"key": key} for key in keys]
+        if settings.num_peaks:
+            peak_fit = PeakFit(arrays["params"], arrays["stderr"], arrays["chi2"],
+                               arrays["iterations"], arrays["converged"], settings.shape)
+            for fit, peaks in zip(fits, peak_fit.to_dicts()):
+                fit.update(peaks)
+        for fit, base in zip(fits, arrays["baseline"]):
+            fit["baseline"] = [None if not np.isfinite(v) else float(v) for v in base]
+        return {
+            "fits": fits,
+            "settings": settings.to_dict(),
+            "warm_start": initial is not None,
+            "mode": mode,
+            "elapsed": elapsed,
+            "fits_per_second": count / elapsed if elapsed > 0 else None
+        }
+
+    def reset(self) -> None:
+        """Forget warm-start parameters"""
+        with self._lock:
+            self._warm.clear()
+            self._last = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            recent_fits = sum(fits for fits, _ in self._recent)
+            recent_time = sum(seconds for _, seconds in self._recent)
+            return {
+                "workers": self.workers,
+                "chunk_size": self.chunk_size,
+                "total_fits": self.total_fits,
+                "total_time": self.total_time,
+                "fits_per_second": self.total_fits / self.total_time if self.total_time else None,
+                "recent_fits_per_second": recent_fits / recent_time if recent_time else None,
+                "warm_keys": len(self._warm)
+            }
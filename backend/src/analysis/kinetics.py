@@ -0,0 +1,228 @@
+"""
+Global Kinetic Fitting
+Multi-exponential decays with time constants shared across all wavenumbers, fitted by variable projection
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+from .svd import SVDResult, truncated_svd
+
+logger = logging.getLogger(__name__)
+
+
+def exponential_basis(delays: np.ndarray, taus: np.ndarray, offset: bool = False, t0: float = 0.0) -> np.ndarray:
+    """
+    (delays, components) kinetic traces: ``exp(-(t - t0) / tau)`` after
+    time zero, 0 before; with ``offset`` a final step column for a
+    component that outlives the delay range
+    """
+    t = delays[:, None] - t0
+    traces = np.where(t >= 0, np.exp(-np.clip(t, 0, None) / taus[None, :]), 0.0)
+    if offset:
+        traces = np.concatenate([traces, (t >= 0).astype(np.float64)], axis=1)
+    return traces
+
+
+@dataclass
+class KineticFit:
+    """Global fit of one starting point, in the SVD subspace"""
+    taus: np.ndarray  # seconds, ascending
+    tau_stderr: np.ndarray
+    amplitudes: np.ndarray  # (components, rank): coefficients of the kinetic traces per singular vector
+    cost: float  # squared residual in the subspace
+    iterations: int
+    converged: bool
+    initial_taus: np.ndarray
+
+
+def fit_kinetics(delays, data, initial_taus, offset: bool = False, t0: float = 0.0,
+                 max_iterations: int = 100, tolerance: float = 1e-10) -> KineticFit:
+    """
+    Variable-projection Levenberg-Marquardt fit of shared time constants
+
+    ``data`` is (delays, n): the kinetic traces of every wavenumber or,
+    much smaller and equivalent, the scaled left singular vectors
+    ``u * s`` of the matrix. For given time constants the amplitudes of
+    every column follow by one linear least-squares solve, so only the
+    log time constants are iterated (finite-difference Jacobian). Module
+    level so that process-pool workers can run it.
+    """
+    delays = np.asarray(delays, dtype=np.float64)
+    data = np.asarray(data, dtype=np.float64)
+    theta = np.log(np.asarray(initial_taus, dtype=np.float64))
+    positive = delays[delays > t0] - t0
+    span = positive.max() if positive.size else 1.0
+    low, high = np.log(span * 1e-4), np.log(span * 1e3)
+    theta = np.clip(theta, low, high)
+
+    def residual(params):
+        basis = exponential_basis(delays, np.exp(params), offset, t0)
+        amplitudes = np.linalg.lstsq(basis, data, rcond=None)[0]
+        return (data - basis @ amplitudes).ravel(), amplitudes
+
+    r, amplitudes = residual(theta)
+    cost = float(r @ r)
+    damping = 1e-3
+    step_size = 1e-6
+    converged = False
+    iterations = 0
+    jacobian = None
+    for iterations in range(1, max_iterations + 1):
+        jacobian = np.empty((r.size, theta.size))
+        for k in range(theta.size):
+            shifted = theta.copy()
+            shifted[k] += step_size
+            jacobian[:, k] = (residual(shifted)[0] - r) / step_size
+        normal = jacobian.T @ jacobian
+        gradient = jacobian.T @ r
+        while True:
+            damped = normal + damping * np.diag(np.diag(normal) + 1e-12 * (np.trace(normal) + 1e-300))
+            trial = np.clip(theta - np.linalg.lstsq(damped, gradient, rcond=None)[0], low, high)
+            trial_r, trial_amplitudes = residual(trial)
+            trial_cost = float(trial_r @ trial_r)
+            if trial_cost <= cost:
+                break
+            damping *= 10.0
+            if damping > 1e12:
+                break
+        if trial_cost > cost:
+            converged = True  # no downhill step left
+            break
+        improvement = (cost - trial_cost) / max(cost, 1e-300)
+        theta, r, amplitudes, cost = trial, trial_r, trial_amplitudes, trial_cost
+        damping = max(damping / 10.0, 1e-12)
+        if improvement < tolerance:
+            converged = True
+            break
+
+    # Standard errors of tau from the Gauss-Newton covariance of log tau
+    dof = max(r.size - theta.size - amplitudes.size, 1)
+    try:
+        covariance = np.linalg.inv(jacobian.T @ jacobian) * (cost / dof) if jacobian is not None else None
+        theta_err = np.sqrt(np.abs(np.diag(covariance))) if covariance is not None else np.full(theta.size, np.nan)
+    except np.linalg.LinAlgError:
+        theta_err = np.full(theta.size, np.nan)
+    taus = np.exp(theta)
+    order = np.argsort(taus)
+    rows = np.concatenate([order, np.arange(taus.size, amplitudes.shape[0])])  # offset row stays last
+    return KineticFit(taus[order], (taus * theta_err)[order], amplitudes[rows], cost, iterations,
+                      converged, np.asarray(initial_taus, dtype=np.float64))
+
+
+def starting_taus(delays: np.ndarray, num_exponentials: int, starts: int, t0: float = 0.0,
+                  seed: Optional[int] = 0) -> List[np.ndarray]:
+    """
+    Initial time-constant sets: log-evenly spread over the measured delays,
+    then random log-uniform draws
+    """
+    positive = np.sort(delays[delays > t0] - t0)
+    if positive.size < 2:
+        raise ValueError("Need at least two delays after time zero")
+    shortest = max(float(np.min(np.diff(positive))), positive[0] * 0.5, positive[-1] * 1e-4)
+    longest = float(positive[-1])
+    sets = [np.geomspace(shortest * 2, longest / 2, num_exponentials) if num_exponentials > 1
+            else np.array([np.sqrt(shortest * longest)])]
+    rng = np.random.default_rng(seed)
+    for _ in range(starts - 1):
+        sets.append(np.sort(np.exp(rng.uniform(np.log(shortest), np.log(longest), num_exponentials))))
+    return sets
+
+
+class GlobalFitter:
+    """
+    Global multi-exponential fits of delay x wavenumber matrices
+
+    The matrix is reduced to its leading singular components first (see
+    :func:`~.svd.truncated_svd`; chunked, so memmaps and HDF5 datasets
+    work), then every starting set of time constants is fitted to the
+    (delays, rank) subspace. Starts are spread over a process pool of
+    ``workers`` (default: CPU count) when more than one is available, and
+    the lowest-cost fit wins. Decay-associated spectra are mapped back to
+    all wavenumbers at the end.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def fit(self, delays, matrix, num_exponentials: int = 2, rank: Optional[int] = None,
+            svd: Optional[SVDResult] = None, initial_taus: Optional[Sequence[float]] = None,
+            starts: int = 8, offset: bool = False, t0: float = 0.0, chunk_rows: int = 1024,
+            max_iterations: int = 100) -> Dict[str, Any]:
+        """
+        Fit ``num_exponentials`` shared time constants (seconds)
+
+        ``matrix`` is (delays, wavenumbers); rows may be a memmap. The SVD
+        keeps ``rank`` components (default: those above the noise floor,
+        at least ``num_exponentials`` + offset); pass ``svd`` to reuse one.
+        """
+        delays = np.asarray(delays, dtype=np.float64)
+        if num_exponentials < 1:
+            raise ValueError("num_exponentials must be at least 1")
+        if matrix is not None and matrix.shape[0] != delays.size:
+            raise ValueError("The matrix needs one row per delay")
+        num_components = num_exponentials + int(offset)
+
+        start = time.perf_counter()
+        if svd is None:
+            svd = truncated_svd(matrix, rank=max(rank or 20, num_components), chunk_rows=chunk_rows)
+        rank = min(svd.rank, rank or max(svd.components(), num_components))
+        reduced = svd.u[:, :rank] * svd.s[:rank]
+        svd_time = time.perf_counter() - start
+
+        if initial_taus is not None:
+            if len(initial_taus) != num_exponentials or min(initial_taus) <= 0:
+                raise ValueError(f"initial_taus needs {num_exponentials} positive values")
+            initial_sets = [np.asarray(initial_taus, dtype=np.float64)]
+        else:
+            initial_sets = starting_taus(delays, num_exponentials, max(1, starts), t0)
+
+        if len(initial_sets) > 1 and self.workers > 1:
+            futures = [self._executor().submit(fit_kinetics, delays, reduced, taus, offset, t0, max_iterations)
+                       for taus in initial_sets]
+            fits = [future.result() for future in futures]
+            mode = "process_pool"
+        else:
+            fits = [fit_kinetics(delays, reduced, taus, offset, t0, max_iterations) for taus in initial_sets]
+            mode = "in_process"
+        best = min(fits, key=lambda fit: fit.cost)
+        elapsed = time.perf_counter() - start
+
+        # Decay-associated spectra over every wavenumber, and fit quality including the discarded subspace
+        spectra = best.amplitudes @ svd.vt[:rank]
+        discarded = max(svd.frobenius2 - float((svd.s[:rank] ** 2).sum()), 0.0)
+        elements = svd.shape[0] * svd.shape[1]
+        return {
+            "taus": best.taus.tolist(),
+            "tau_stderr": [None if not np.isfinite(v) else float(v) for v in best.tau_stderr],
+            "offset": offset,
+            "spectra": spectra.tolist(),  # one decay-associated spectrum per tau (then the offset)
+            "traces": exponential_basis(delays, best.taus, offset, t0).T.tolist(),
+            "rank": rank,
+            "rmse": float(np.sqrt((best.cost + discarded) / elements)) if elements else None,
+            "noise_level": svd.noise_level(),
+            "iterations": best.iterations,
+            "converged": best.converged,
+            "starts": [{"initial_taus": fit.initial_taus.tolist(), "taus": fit.taus.tolist(), "cost": fit.cost}
+                       for fit in fits],
+            "mode": mode,
+            "svd_time": svd_time,
+            "elapsed": elapsed
+        }
@@ -0,0 +1,353 @@
+"""
+Noise Spectrum Analysis
+Welch power spectra of the PicoScope stream, computed off the acquisition path
+"""
+
+import math
+import time
+import queue
+import asyncio
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = ("hann", "hamming", "blackman", "boxcar")
+
+_NUMPY_WINDOWS = {"hann": np.hanning, "hamming": np.hamming, "blackman": np.blackman}
+
+
+@lru_cache(maxsize=32)
+def cached_window(name: str, length: int) -> Tuple[np.ndarray, float]:
+    """Read-only periodic window and its sum of squares (PSD normalization)"""
+    if name == "boxcar":
+        window = np.ones(length)
+    elif name in _NUMPY_WINDOWS:
+        # Periodic (DFT-even) variants, as used for spectral estimation
+        window = _NUMPY_WINDOWS[name](length + 1)[:-1]
+    else:
+        raise ValueError(f"Unknown window '{name}', expected one of {WINDOWS}")
+    window.setflags(write=False)
+    return window, float(np.sum(window * window))
+
+
+class WelchEstimator:
+    """
+    Averaged one-sided power spectral density of a sample stream
+
+    Samples are cut into overlapping, mean-removed, windowed frames of
+    ``segment_length``. Each :meth:`add` is one capture: frames never span
+    two of them, because the tune/move gap between captures would break
+    the uniform sampling (and smear phase-coherent lines such as mains
+    pickup). Only a stream split across calls (``continuous=True``) carries
+    its remainder over; captures shorter than ``segment_length`` add no
+    frame and are counted in ``short_blocks``. Frame and carry buffers are
+    allocated once and reused, and the FFT length never
+    changes, so numpy's FFT plan cache is hit on every block. The first
+    ``averages`` frames are averaged equally, later ones exponentially with
+    the same weight, so the estimate follows slow changes.
+    """
+
+    def __init__(self, segment_length: int, sample_rate: float, window: str = "hann",
+                 overlap: float = 0.5, averages: int = 16):
+        if segment_length < 2 or sample_rate <= 0 or not 0 <= overlap < 1 or averages < 1:
+            raise ValueError("Require segment_length >= 2, sample_rate > 0, 0 <= overlap < 1, averages >= 1")
+        self.segment_length = segment_length
+        self.sample_rate = sample_rate
+        self.averages = averages
+        self.window_name = window
+        self._window, window_power = cached_window(window, segment_length)
+        self._step = max(1, int(round(segment_length * (1.0 - overlap))))
+        self.frequencies = np.fft.rfftfreq(segment_length, 1.0 / sample_rate)
+
+        # One-sided density: double every bin except DC (and Nyquist for even lengths)
+        self._scale = np.full(self.frequencies.size, 2.0 / (sample_rate * window_power))
+        self._scale[0] /= 2.0
+        if segment_length % 2 == 0:
+            self._scale[-1] /= 2.0
+
+        self._stream = np.empty(4 * segment_length)  # carry + incoming block
+        self._carry = 0
+        self._frames = np.empty((0, segment_length))
+        self.psd = np.zeros(self.frequencies.size)
+        self.frames = 0
+        self.short_blocks = 0
+
+    def reset(self) -> None:
+        self._carry = 0
+        self.psd[:] = 0.0
+        self.frames = 0
+        self.short_blocks = 0
+
+    def _frame_buffer(self, count: int) -> np.ndarray:
+        if self._frames.shape[0] < count:
+            self._frames = np.empty((max(count, 2 * self._frames.shape[0]), self.segment_length))
+        return self._frames[:count]
+
+    def _accumulate(self, frames: np.ndarray) -> None:
+        """Detrend and window ``frames`` in place, then fold their periodograms into the average"""
+        frames -= frames.mean(axis=1, keepdims=True)
+        frames *= self._window
+        spectrum = np.fft.rfft(frames, axis=1)
+        power = (spectrum.real ** 2 + spectrum.imag ** 2).mean(axis=0) * self._scale
+        count = frames.shape[0]
+        if self.frames < self.averages:
+            weight = count / (self.frames + count)
+        else:
+            weight = min(1.0, count / self.averages)
+        self.psd += (power - self.psd) * weight
+        self.frames += count
+
+    def add(self, samples: np.ndarray, continuous: bool = False) -> int:
+        """
+        Add one capture of uniformly sampled values (or, with ``continuous``,
+        the next part of the previous one); returns the number of new frames
+        """
+        samples = np.asarray(samples, dtype=np.float64).ravel()
+        if not continuous:
+            self._carry = 0
+        total = self._carry + samples.size
+        if self._stream.size < total:
+            grown = np.empty(max(total, 2 * self._stream.size))
+            grown[:self._carry] = self._stream[:self._carry]
+            self._stream = grown
+        self._stream[self._carry:total] = samples
+        if total < self.segment_length:
+            self._carry = total
+            if not continuous:
+                self.short_blocks += 1
+            return 0
+
+        count = (total - self.segment_length) // self._step + 1
+        views = np.lib.stride_tricks.sliding_window_view(self._stream[:total], self.segment_length)
+        frames = self._frame_buffer(count)
+        np.copyto(frames, views[:count * self._step:self._step])
+        self._accumulate(frames)
+
+        consumed = count * self._step
+        remaining = total - consumed
+        self._stream[:remaining] = self._stream[consumed:total]
+        self._carry = remaining
+        return count
+
+    def add_records(self, records: np.ndarray) -> int:
+        """Add independent records of ``segment_length`` samples (e.g. one trace per trigger)"""
+        records = np.asarray(records, dtype=np.float64)
+        if records.ndim != 2 or records.shape[1] != self.segment_length:
+            raise ValueError(f"Expected (records, {self.segment_length}) samples")
+        frames = self._frame_buffer(records.shape[0])
+        np.copyto(frames, records)
+        self._accumulate(frames)
+        return records.shape[0]
+
+
+def decimate(frequencies: np.ndarray, psd: np.ndarray, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a spectrum to at most ``max_points`` bins for display
+
+    Bins are merged in groups that report their maximum, so narrow
+    pickup lines stay visible at any zoom level.
+    """
+    if psd.size <= max_points:
+        return frequencies, psd
+    group = math.ceil(psd.size / max_points)
+    usable = (psd.size // group) * group
+    grouped = psd[:usable].reshape(-1, group)
+    return frequencies[:usable].reshape(-1, group).mean(axis=1), grouped.max(axis=1)
+
+
+def line_report(frequencies: np.ndarray, psd: np.ndarray, mains_frequency: float,
+                harmonics: int = 3, num_peaks: int = 5) -> Dict[str, Any]:
+    """Mains harmonics and the strongest lines relative to the median noise floor"""
+    floor = float(np.median(psd[1:])) if psd.size > 1 else 0.0
+
+    def level(power: float) -> Optional[float]:
+        return 10.0 * math.log10(power / floor) if floor > 0 and power > 0 else None
+
+    resolution = frequencies[1] - frequencies[0] if frequencies.size > 1 else 0.0
+    mains = []
+    for order in range(1, harmonics + 1):
+        target = order * mains_frequency
+        if target > frequencies[-1]:
+            break
+        index = int(np.argmin(np.abs(frequencies - target)))
+        # Leakage spreads a line over neighbouring bins; report the local maximum
+        low, high = max(1, index - 1), min(psd.size, index + 2)
+        power = float(psd[low:high].max())
+        mains.append({"frequency": target, "psd": power, "above_floor_db": level(power)})
+
+    candidates = np.argsort(psd[1:])[::-1][:num_peaks] + 1
+    peaks = [{"frequency": float(frequencies[i]), "psd": float(psd[i]), "above_floor_db": level(float(psd[i]))}
+             for i in sorted(candidates)]
+    return {"floor": floor, "resolution": float(resolution), "mains": mains, "peaks": peaks}
+
+
+class NoiseAnalyzer:
+    """
+    Live noise spectra of every PicoScope block
+
+    Attached to the controller as a block listener: :meth:`submit` only
+    puts the block on a bounded queue (dropping it when the analyzer is
+    behind), and a worker thread does the FFTs, so acquisition never waits.
+    Two spectra are kept: the shot-to-shot series (one value per trigger,
+    sampled at the trigger rate, where 50/60 Hz pickup and laser jitter
+    show up) and the sampled trace within a shot. Shot frames are taken
+    within a block only, so ``segment_length`` must not exceed the shots
+    per block; shorter blocks are counted in ``short_blocks``. Decimated spectra are
+    published at most every ``publish_interval`` seconds.
+    """
+
+    def __init__(self, trigger_rate: float, sample_interval: float, samples_per_segment: int,
+                 segment_length: int = 1024, window: str = "hann", overlap: float = 0.5,
+                 averages: int = 16, publish_interval: float = 0.5, max_points: int = 512,
+                 mains_frequency: float = 50.0, queue_size: int = 8, enabled: bool = True):
+        self.trigger_rate = trigger_rate
+        self.sample_interval = sample_interval
+        self.samples_per_segment = samples_per_segment
+        self.enabled = enabled
+        self.publish_interval = publish_interval
+        self.max_points = max_points
+        self.mains_frequency = mains_frequency
+        self.settings: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.configure(segment_length=segment_length, window=window, overlap=overlap, averages=averages)
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self.seq = 0
+        self.latest: Optional[Dict[str, Any]] = None
+        self._published_at = 0.0
+        self.blocks = 0
+        self.dropped = 0
+        self.busy_time = 0.0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "NoiseAnalyzer":
+        """Build an analyzer from the ``picoscope_5244d`` config"""
+        acquisition = config.get('acquisition', {})
+        noise = config.get('noise', {})
+        return cls(
+            trigger_rate=acquisition.get('trigger_rate', 1000),
+            sample_interval=acquisition.get('default_timebase', 1000) * 1e-9,
+            samples_per_segment=acquisition.get('samples_per_segment', 100),
+            segment_length=noise.get('segment_length', 1024),
+            window=noise.get('window', "hann"),
+            overlap=noise.get('overlap', 0.5),
+            averages=noise.get('averages', 16),
+            publish_interval=noise.get('publish_interval', 0.5),
+            max_points=noise.get('max_points', 512),
+            mains_frequency=noise.get('mains_frequency', config.get('simulation', {}).get('mains_frequency', 50.0)),
+            enabled=noise.get('enabled', True)
+        )
+
+    def configure(self, **settings: Any) -> None:
+        """Change segment_length, window, overlap or averages; restarts averaging"""
+        merged = {**self.settings, **{k: v for k, v in settings.items() if v is not None}}
+        shots = WelchEstimator(merged["segment_length"], self.trigger_rate, merged["window"],
+                               merged["overlap"], merged["averages"])
+        traces = WelchEstimator(self.samples_per_segment, 1.0 / self.sample_interval, merged["window"],
+                                0.0, merged["averages"])
+        with self._lock:
+            self.shots, self.traces, self.settings = shots, traces, merged
+
+    def reset(self) -> None:
+        with self._lock:
+            self.shots.reset()
+            self.traces.reset()
+
+    # --- acquisition side ------------------------------------------------
+
+    def submit(self, block: np.ndarray) -> None:
+        """Block listener: queue a ``(segments, samples)`` block, never blocking"""
+        if not self.enabled:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="noise-analyzer", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(block)
+        except queue.Full:
+            self.dropped += 1
+
+    # --- worker ----------------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            block = self._queue.get()
+            start = time.perf_counter()
+            try:
+                with self._lock:
+                    self.shots.add(block.mean(axis=1))
+                    if block.shape[1] == self.traces.segment_length:
+                        self.traces.add_records(block)
+                self.blocks += 1
+                if time.monotonic() - self._published_at >= self.publish_interval:
+                    self._publish()
+            except Exception as e:
+                logger.error(f"Noise analysis failed: {e}")
+            self.busy_time += time.perf_counter() - start
+
+    def _spectrum(self, estimator: WelchEstimator, report: bool) -> Dict[str, Any]:
+        frequencies, psd = decimate(estimator.frequencies, estimator.psd, self.max_points)
+        data = {
+            "sample_rate": estimator.sample_rate,
+            "segment_length": estimator.segment_length,
+            "frames": estimator.frames,
+            "short_blocks": estimator.short_blocks,
+            "frequencies": frequencies.tolist(),
+            "psd": psd.tolist()  # V^2/Hz
+        }
+        if report and estimator.frames:
+            data["lines"] = line_report(estimator.frequencies, estimator.psd, self.mains_frequency)
+        return data
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current decimated spectra (computed now, not waiting for the next publish)"""
+        with self._lock:
+            return {
+                "seq": self.seq,
+                "time": time.time(),
+                "settings": dict(self.settings),
+                "shots": self._spectrum(self.shots, report=True),
+                "trace": self._spectrum(self.traces, report=False)
+            }
+
+    def _publish(self) -> None:
+        self.seq += 1
+        self._published_at = time.monotonic()
+        self.latest = self.snapshot()
+        for loop, subscriber in list(self._subscribers):
+            loop.call_soon_threadsafe(self._replace, subscriber, self.latest)
+
+    @staticmethod
+    def _replace(subscriber: asyncio.Queue, update: Dict[str, Any]) -> None:
+        # UI clients only need the newest spectrum
+        if subscriber.full():
+            subscriber.get_nowait()
+        subscriber.put_nowait(update)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue receiving every published spectrum (call on the event loop)"""
+        subscriber: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._subscribers.append((asyncio.get_running_loop(), subscriber))
+        return subscriber
+
+    def unsubscribe(self, subscriber: asyncio.Queue) -> None:
+        self._subscribers = [(loop, q) for loop, q in self._subscribers if q is not subscriber]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "blocks": self.blocks,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "busy_time": self.busy_time,
+            "mean_block_time": self.busy_time / self.blocks if self.blocks else None,
+            "published": self.seq,
+            "subscribers": len(self._subscribers)
+        }
@@ -0,0 +1,226 @@
+"""
+Peak Fitting
+Multi-peak Lorentzian/Gaussian models fitted to batches of spectra by vectorized Levenberg-Marquardt
+"""
+
+import math
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SHAPES = ("lorentzian", "gaussian")
+
+_GAUSS = 4.0 * math.log(2.0)  # FWHM parameterization: exp(-4 ln2 (x - c)^2 / w^2)
+
+# Parameter layout: [offset, amplitude_1, center_1, fwhm_1, amplitude_2, ...]
+PARAMS_PER_PEAK = 3
+
+
+def peak_model(x: np.ndarray, params: np.ndarray, shape: str = "lorentzian", jacobian: bool = False):
+    """
+    Evaluate the model for a batch of parameter vectors
+
+    ``params`` is (batch, 1 + 3 * peaks). Returns the (batch, points) model
+    and, with ``jacobian``, its (batch, points, parameters) derivatives.
+    """
+    batch, num_params = params.shape
+    num_peaks = (num_params - 1) // PARAMS_PER_PEAK
+    peaks = params[:, 1:].reshape(batch, num_peaks, PARAMS_PER_PEAK)
+    amplitude, center, width = (peaks[..., k, None] for k in range(PARAMS_PER_PEAK))  # (batch, peaks, 1)
+    d = x[None, None, :] - center
+
+    if shape == "lorentzian":
+        h2 = (width / 2.0) ** 2
+        denominator = d * d + h2
+        profile = h2 / denominator
+        if jacobian:
+            d_center = amplitude * h2 * 2.0 * d / denominator ** 2
+            d_width = amplitude * (width / 2.0) * d * d / denominator ** 2
+    elif shape == "gaussian":
+        profile = np.exp(-_GAUSS * d * d / (width * width))
+        if jacobian:
+            d_center = amplitude * profile * 2.0 * _GAUSS * d / (width * width)
+            d_width = amplitude * profile * 2.0 * _GAUSS * d * d / width ** 3
+    else:
+        raise ValueError(f"Unknown peak shape '{shape}', expected one of {SHAPES}")
+
+    model = params[:, :1] + (amplitude * profile).sum(axis=1)
+    if not jacobian:
+        return model
+    derivatives = np.stack([profile, d_center, d_width], axis=2)  # (batch, peaks, 3, points)
+    jac = np.concatenate([
+        np.ones((batch, 1, x.size)),
+        derivatives.reshape(batch, num_peaks * PARAMS_PER_PEAK, x.size)
+    ], axis=1)
+    return model, jac.transpose(0, 2, 1)
+
+
+def initial_guess(x: np.ndarray, spectra: np.ndarray, num_peaks: int) -> np.ndarray:
+    """
+    Starting parameters for spectra without a warm start
+
+    Peaks are placed greedily at the largest remaining |signal| (either
+    sign), each masking its neighbourhood; all spectra at once.
+    """
+    batch = spectra.shape[0]
+    span = float(x.max() - x.min()) or 1.0
+    width = span / (8.0 * max(1, num_peaks))
+    offset = np.nanmedian(spectra, axis=1)
+    residual = np.nan_to_num(spectra - offset[:, None])
+    params = np.empty((batch, 1 + PARAMS_PER_PEAK * num_peaks))
+    params[:, 0] = offset
+    rows = np.arange(batch)
+    for k in range(num_peaks):
+        index = np.abs(residual).argmax(axis=1)
+        center = x[index]
+        params[:, 1 + 3 * k] = residual[rows, index]
+        params[:, 2 + 3 * k] = center
+        params[:, 3 + 3 * k] = width
+        residual = np.where(np.abs(x[None, :] - center[:, None]) < width, 0.0, residual)
+    return params
+
+
+@dataclass
+class PeakFit:
+    """Fitted parameters of a batch of spectra"""
+    params: np.ndarray  # (batch, 1 + 3 * peaks)
+    stderr: np.ndarray  # same shape, from the covariance at the optimum
+    chi2: np.ndarray  # reduced chi-square (residual variance) per spectrum
+    iterations: np.ndarray
+    converged: np.ndarray
+    shape: str
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """One dict per spectrum, peaks with center, amplitude, FWHM and area"""
+        results = []
+        num_peaks = (self.params.shape[1] - 1) // PARAMS_PER_PEAK
+        area_factor = math.pi / 2.0 if self.shape == "lorentzian" else math.sqrt(math.pi / _GAUSS)
+        for n, params in enumerate(self.params):
+            errors = self.stderr[n]
+            peaks = []
+            for k in range(num_peaks):
+                amplitude, center, width = params[1 + 3 * k: 4 + 3 * k]
+                peaks.append({
+                    "center": float(center),
+                    "amplitude": float(amplitude),
+                    "fwhm": float(width),
+                    "area": float(amplitude * width * area_factor),
+                    "stderr": {
+                        "center": _finite(errors[2 + 3 * k]),
+                        "amplitude": _finite(errors[1 + 3 * k]),
+                        "fwhm": _finite(errors[3 + 3 * k])
+                    }
+                })
+            results.append({
+                "offset": float(params[0]),
+                "peaks": sorted(peaks, key=lambda peak: peak["center"]),
+                "chi2": _finite(self.chi2[n]),
+                "iterations": int(self.iterations[n]),
+                "converged": bool(self.converged[n])
+            })
+        return results
+
+
+def _finite(value) -> Optional[float]:
+    return float(value) if np.isfinite(value) else None
+
+
+def fit_peaks(x, spectra, num_peaks: int = 1, shape: str = "lorentzian",
+              initial: Optional[np.ndarray] = None, max_iterations: int = 100,
+              tolerance: float = 1e-8) -> PeakFit:
+    """
+    Fit ``num_peaks`` peaks plus a constant offset to every spectrum
+
+    All spectra are iterated together: one batched Jacobian, one batched
+    solve of the damped normal equations per iteration, with a separate
+    damping factor per spectrum. Converged spectra are frozen while the
+    rest continue. ``initial`` (batch or single parameter vector) warm
+    starts the fit, e.g. from the previous point or sample; otherwise see
+    :func:`initial_guess`. Missing points (NaN) are ignored.
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown peak shape '{shape}', expected one of {SHAPES}")
+    x = np.asarray(x, dtype=np.float64)
+    y = np.array(spectra, dtype=np.float64, ndmin=2)
+    batch, n = y.shape
+    num_params = 1 + PARAMS_PER_PEAK * num_peaks
+    if x.shape != (n,):
+        raise ValueError("x must have one value per spectrum point")
+    weights = np.isfinite(y).astype(np.float64)
+    y = np.where(weights > 0, y, 0.0)
+
+    if initial is None:
+        params = initial_guess(x, np.where(weights > 0, y, np.nan), num_peaks)
+    else:
+        params = np.broadcast_to(np.asarray(initial, dtype=np.float64), (batch, num_params)).copy()
+    x_low, x_high = float(x.min()), float(x.max())
+    span = (x_high - x_low) or 1.0
+    min_width = float(np.min(np.diff(np.sort(x)))) if n > 1 else 1.0
+    min_width = min_width if min_width > 0 else 1.0
+
+    def cost_of(p, rows=slice(None)):
+        residual = (y[rows] - peak_model(x, p, shape)) * weights[rows]
+        return (residual * residual).sum(axis=1)
+
+    damping = np.full(batch, 1e-3)
+    cost = cost_of(params)
+    active = np.ones(batch, dtype=bool)
+    converged = np.zeros(batch, dtype=bool)
+    iterations = np.zeros(batch, dtype=int)
+    identity = np.eye(num_params)
+
+    for _ in range(max_iterations):
+        if not active.any():
+            break
+        rows = np.flatnonzero(active)
+        p = params[rows]
+        model, jac = peak_model(x, p, shape, jacobian=True)
+        w = weights[rows]
+        residual = (y[rows] - model) * w
+        jw = jac * w[:, :, None]
+        normal = np.einsum('bnp,bnq->bpq', jw, jw)
+        gradient = np.einsum('bnp,bn->bp', jw, residual)
+        diagonal = np.einsum('bpp->bp', normal)
+        damped = normal + (damping[rows, None] * diagonal + 1e-12 * (diagonal.max(axis=1, keepdims=True) + 1e-300))[:, :, None] * identity
+        try:
+            step = np.linalg.solve(damped, gradient[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            step = np.stack([np.linalg.lstsq(m, g, rcond=None)[0] for m, g in zip(damped, gradient)])
+
+        # Keep peaks inside the measured range with a resolvable width
+        trial = p + step
+        trial[:, 2::PARAMS_PER_PEAK] = np.clip(trial[:, 2::PARAMS_PER_PEAK], x_low, x_high)
+        trial[:, 3::PARAMS_PER_PEAK] = np.clip(np.abs(trial[:, 3::PARAMS_PER_PEAK]), min_width / 2.0, 2.0 * span)
+        trial_cost = cost_of(trial, rows)
+        improved = np.isfinite(trial_cost) & (trial_cost <= cost[rows])
+
+        accepted = rows[improved]
+        relative = (cost[accepted] - trial_cost[improved]) / np.maximum(cost[accepted], 1e-300)
+        params[accepted] = trial[improved]
+        cost[accepted] = trial_cost[improved]
+        damping[accepted] = np.maximum(damping[accepted] / 10.0, 1e-12)
+        damping[rows[~improved]] *= 10.0
+        iterations[rows] += 1
+
+        done = np.zeros(batch, dtype=bool)
+        done[accepted[relative < tolerance]] = True
+        done |= damping > 1e12  # no further progress possible
+        converged |= done & active
+        active &= ~done
+
+    # Standard errors from the undamped covariance at the optimum
+    _, jac = peak_model(x, params, shape, jacobian=True)
+    jw = jac * weights[:, :, None]
+    normal = np.einsum('bnp,bnq->bpq', jw, jw)
+    dof = np.maximum(weights.sum(axis=1) - num_params, 1)
+    chi2 = cost / dof
+    try:
+        covariance = np.linalg.inv(normal)
+        stderr = np.sqrt(np.abs(np.einsum('bpp->bp', covariance)) * chi2[:, None])
+    except np.linalg.LinAlgError:
+        stderr = np.full_like(params, np.nan)
+    return PeakFit(params, stderr, chi2, iterations, converged, shape)
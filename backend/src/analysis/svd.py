@@ -0,0 +1,155 @@
+"""
+Truncated SVD
+Randomized singular value decomposition of large (delays x wavenumbers) matrices, streamed in row chunks
+"""
+
+import math
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def row_blocks(matrix, chunk_rows: int = 1024) -> Iterator[Tuple[slice, np.ndarray]]:
+    """
+    (rows, float64 block) pairs covering ``matrix``
+
+    ``matrix`` is anything with ``shape`` and row slicing: an array, an
+    ``np.load(..., mmap_mode="r")`` memmap or an h5py dataset, so only one
+    chunk is in memory at a time. Missing values (NaN) read as zero.
+    """
+    rows = matrix.shape[0]
+    for start in range(0, rows, chunk_rows):
+        part = slice(start, min(start + chunk_rows, rows))
+        block = np.asarray(matrix[part], dtype=np.float64)
+        yield part, np.where(np.isfinite(block), block, 0.0)
+
+
+@dataclass
+class SVDResult:
+    """Leading singular triplets of a matrix, ``matrix ~ u @ diag(s) @ vt``"""
+    u: np.ndarray  # (rows, rank)
+    s: np.ndarray  # (rank,)
+    vt: np.ndarray  # (rank, columns)
+    frobenius2: float  # squared Frobenius norm of the whole matrix
+    shape: Tuple[int, int]
+
+    @property
+    def rank(self) -> int:
+        return self.s.size
+
+    def explained(self) -> np.ndarray:
+        """Cumulative fraction of the total variance captured by the first k components"""
+        return np.cumsum(self.s ** 2) / self.frobenius2 if self.frobenius2 > 0 else np.zeros_like(self.s)
+
+    def noise_level(self) -> float:
+        """
+        RMS noise per element, from the energy not captured by the
+        components (a slight overestimate when rank is below the signal rank)
+        """
+        rows, columns = self.shape
+        residual = max(self.frobenius2 - float((self.s ** 2).sum()), 0.0)
+        dof = (rows - self.rank) * (columns - self.rank)
+        return math.sqrt(residual / dof) if dof > 0 else 0.0
+
+    def components(self, noise: Optional[float] = None) -> int:
+        """
+        Number of components above the noise floor
+
+        Singular values of pure white noise of RMS ``noise`` stay below
+        ``noise * (sqrt(rows) + sqrt(columns))`` (Marchenko-Pastur edge);
+        everything larger is counted as signal. Values at rounding level
+        (numerical rank tolerance) never count.
+        """
+        rows, columns = self.shape
+        noise = self.noise_level() if noise is None else noise
+        edge = noise * (math.sqrt(rows) + math.sqrt(columns))
+        if self.rank:
+            edge = max(edge, float(self.s[0]) * np.finfo(np.float64).eps * max(rows, columns))
+        return int(np.count_nonzero(self.s > edge))
+
+    def reconstruct(self, components: Optional[int] = None, rows=slice(None)) -> np.ndarray:
+        """Noise-reduced matrix (or a row range of it) from the first ``components``"""
+        k = self.rank if components is None else min(components, self.rank)
+        return (self.u[rows, :k] * self.s[:k]) @ self.vt[:k]
+
+    def to_dict(self, max_vectors: Optional[int] = None) -> Dict[str, Any]:
+        k = self.rank if max_vectors is None else min(max_vectors, self.rank)
+        return {
+            "shape": list(self.shape),
+            "singular_values": self.s.tolist(),
+            "explained": self.explained().tolist(),
+            "noise_level": self.noise_level(),
+            "components": self.components(),
+            "u": self.u[:, :k].T.tolist(),  # one kinetic trace per component
+            "vt": self.vt[:k].tolist()  # one spectrum per component
+        }
+
+
+def truncated_svd(matrix, rank: int = 20, oversample: int = 10, power_iterations: int = 2,
+                  chunk_rows: int = 1024, seed: Optional[int] = 0) -> SVDResult:
+    """
+    Leading ``rank`` singular triplets by randomized range finding (Halko et al.)
+
+    The matrix is only touched through row-chunked products with thin
+    (columns x (rank + oversample)) matrices, 2 + 2 * ``power_iterations``
+    passes in total, so it may be a memmap or an HDF5 dataset larger than
+    memory. Power iterations sharpen the decay of the spectrum for noisy
+    data; the basis is re-orthonormalized after every pass.
+    """
+    rows, columns = matrix.shape
+    sketch = min(rank + oversample, rows, columns)
+    rank = min(rank, sketch)
+    rng = np.random.default_rng(seed)
+    omega = rng.standard_normal((columns, sketch))
+
+    def times(right: np.ndarray) -> np.ndarray:
+        """matrix @ right"""
+        out = np.empty((rows, right.shape[1]))
+        for part, block in row_blocks(matrix, chunk_rows):
+            out[part] = block @ right
+        return out
+
+    def transpose_times(left: np.ndarray) -> Tuple[np.ndarray, float]:
+        """matrix.T @ left, and the squared Frobenius norm on the way"""
+        out = np.zeros((columns, left.shape[1]))
+        norm2 = 0.0
+        for part, block in row_blocks(matrix, chunk_rows):
+            out += block.T @ left[part]
+            norm2 += float(np.einsum('ij,ij->', block, block))
+        return out, norm2
+
+    q, _ = np.linalg.qr(times(omega))
+    for _ in range(power_iterations):
+        z, _ = np.linalg.qr(transpose_times(q)[0])
+        q, _ = np.linalg.qr(times(z))
+    bt, frobenius2 = transpose_times(q)  # B = Q^T A, kept transposed: (columns, sketch)
+    v, s, ut_small = np.linalg.svd(bt, full_matrices=False)
+    u = q @ ut_small.T
+    return SVDResult(u[:, :rank], s[:rank], v[:, :rank].T, frobenius2, (rows, columns))
+
+
+def grid_matrix(delays, wavenumbers, values) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (delays, wavenumbers, matrix, counts) from scattered measurements
+
+    Repeated (delay, wavenumber) pairs are averaged; cells never measured
+    are NaN and have count 0. Rows are delays, columns wavenumbers, both
+    sorted.
+    """
+    delays = np.asarray(delays, dtype=np.float64)
+    wavenumbers = np.asarray(wavenumbers, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(values) & np.isfinite(delays) & np.isfinite(wavenumbers)
+    delay_axis, row = np.unique(delays[finite], return_inverse=True)
+    wavenumber_axis, column = np.unique(wavenumbers[finite], return_inverse=True)
+    total = np.zeros((delay_axis.size, wavenumber_axis.size))
+    counts = np.zeros(total.shape, dtype=np.int64)
+    np.add.at(total, (row, column), values[finite])
+    np.add.at(counts, (row, column), 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        matrix = np.where(counts > 0, total / counts, np.nan)
+    return delay_axis, wavenumber_axis, matrix, counts
@@ -8,7 +8,7 @@ import sys
 import importlib
 import logging
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
@@ -19,6 +19,8 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, JSONResponse
 import uvicorn
 
+from src.services import device_session, flight_recorder, health_monitor  # device checks are registered by the module routers
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -112,14 +114,26 @@ async def list_modules() -> Dict[str, Any]:
         }
     }
 
-# Health check endpoint
+# Health check endpoints
 @app.get("/api/health")
 async def health_check() -> Dict[str, Any]:
-    """Health check endpoint"""
+    """Last health-check report (cached; checks run on the [validation] schedule)"""
+    report = health_monitor.report()
+    return {
+        "status": "success",
+        "message": f"IR Spectroscopy Control Interface API is running (health: {report['overall']})",
+        "modules_loaded": len(registered_modules),
+        "data": report
+    }
+
+@app.post("/api/health/check")
+async def run_health_checks() -> Dict[str, Any]:
+    """Run every health check now and return the fresh report"""
+    report = await health_monitor.run_checks()
     return {
         "status": "success",
-        "message": "IR Spectroscopy Control Interface API is running",
-        "modules_loaded": len(registered_modules)
+        "message": f"Health: {report['overall']}",
+        "data": report
     }
 
 # System information endpoint
@@ -136,6 +150,71 @@ async def system_info() -> Dict[str, Any]:
         }
     }
 
+# Device I/O flight recorder
+@app.get("/api/system/flight-recorder")
+async def get_flight_recorder(last: int = 100, device: Optional[str] = None) -> Dict[str, Any]:
+    """Most recent device commands and replies from the ring buffer"""
+    records = flight_recorder.records(last=last, device=device)
+    return {
+        "status": "success",
+        "data": {
+            "recorder": flight_recorder.get_status(),
+            "records": [dict(r, data=r["data"].decode(errors='replace')) for r in records]
+        }
+    }
+
+@app.post("/api/system/flight-recorder/dump")
+async def dump_flight_recorder() -> Dict[str, Any]:
+    """Write the ring buffer to disk now (decode with ``python -m src.services.flight_recorder``)"""
+    try:
+        path = flight_recorder.dump("request")
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": f"Failed to dump flight recorder: {e}"
+            }
+        )
+    return {
+        "status": "success",
+        "message": f"Flight recorder dumped to {path}",
+        "data": {"path": path}
+    }
+
+# Device session record/replay
+@app.get("/api/system/session")
+async def get_device_session() -> Dict[str, Any]:
+    """Record/replay mode of the device transports and progress of the session"""
+    return {"status": "success", "data": device_session.get_status()}
+
+@app.post("/api/system/session/save")
+async def save_device_session() -> Dict[str, Any]:
+    """Flush the session being recorded to disk (replay with ``python -m src.modules.experiment.replay``)"""
+    if not device_session.recording:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "status": "error",
+                "message": "No device session is being recorded ([replay] mode = \"record\")"
+            }
+        )
+    try:
+        path = device_session.flush()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": f"Failed to flush device session: {e}"
+            }
+        )
+    return {
+        "status": "success",
+        "message": f"Device session flushed to {path}",
+        "data": {"path": path}
+    }
+
 # Mount static files for frontend (for production deployment)
 static_folder_path = os.path.join(os.path.dirname(__file__), 'static')
 if os.path.exists(static_folder_path):
@@ -209,6 +288,13 @@ async def internal_error_handler(request, exc):
 async def startup_event():
     logger.info("Starting IR Spectroscopy Control Interface")
     logger.info(f"Registered modules: {registered_modules}")
+    health_monitor.start()
+
+# Shutdown event
+@app.on_event("shutdown")
+async def shutdown_event():
+    await health_monitor.stop()
+    device_session.stop()  # finishes a session being recorded
 
 if __name__ == '__main__':
     logger.info("Starting IR Spectroscopy Control Interface with uvicorn")
@@ -6,10 +6,17 @@ Handles MUX control for sample positioning
 import serial
 import time
 import logging
+import threading
+from collections import deque
 from typing import Optional, Dict, Any
 import toml
 import os
 
+from ...services.flight_recorder import flight_recorder
+from ...services.leases import device_leases
+from ...services.replay import device_session
+from ...simulators import create_arduino_simulator, is_simulated
+
 logger = logging.getLogger(__name__)
 
 class ArduinoController:
@@ -20,12 +27,19 @@ class ArduinoController:
         self.connection: Optional[serial.Serial] = None
         self.config = self._load_config(config_path)
         self.is_connected = False
+        self.simulated = is_simulated(self.config)
+        self.simulator = None
+        # Measured command round-trip of recent MUX moves (excludes position_delay)
+        self.move_times = deque(maxlen=50)
+        # One command/reply exchange on the serial line at a time (runs and API reads share it)
+        self._lock = threading.Lock()
+        self.position: Optional[int] = None  # last set or read MUX position
         
     def _load_config(self, config_path: str = None) -> Dict[str, Any]:
         """Load configuration from TOML file"""
         if config_path is None:
             # Default to hardware_configuration.toml in project root
-            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
             config_path = os.path.join(project_root, "hardware_configuration.toml")
         
         try:
@@ -43,14 +57,29 @@ class ArduinoController:
             baud_rate = self.config.get('baud_rate', 115200)
             timeout = self.config.get('timeout', 2.0)
             
-            self.connection = serial.Serial(
-                port=port,
-                baudrate=baud_rate,
-                timeout=timeout
-            )
-            
-            # Wait for Arduino to initialize
-            time.sleep(2)
+            if device_session.replaying:
+                self.connection = None  # answered from the recorded session
+                port = "replay://arduino"
+            elif self.simulated:
+                self.simulator = create_arduino_simulator(self.config)
+                if self.config.get('simulation', {}).get('transport') == 'pty':
+                    # Drive the emulator through a real serial port
+                    port = self.simulator.serve_pty()
+                    self.connection = serial.Serial(port=port, baudrate=baud_rate, timeout=timeout)
+                else:
+                    port = self.simulator.port
+                    self.connection = self.simulator
+            else:
+                # serial_for_url accepts device names as well as URLs such as loop:// or socket://
+                self.connection = serial.serial_for_url(
+                    port,
+                    baudrate=baud_rate,
+                    timeout=timeout
+                )
+                
+                # Wait for Arduino to initialize
+                time.sleep(2)
+            self.connection = flight_recorder.wrap_serial(device_session.serial("arduino", self.connection), "arduino")
             
             # Test connection
             if self._test_connection():
@@ -69,15 +98,23 @@ class ArduinoController:
         """Close connection to Arduino"""
         if self.connection and self.connection.is_open:
             self.connection.close()
+        if self.simulator is not None:
+            self.simulator.close()
+            self.simulator = None
         self.is_connected = False
+        self.position = None
         logger.info("Disconnected from Arduino")
     
+    def _exchange(self, command: str) -> str:
+        """Send one command line and return its reply line"""
+        with self._lock:
+            self.connection.write(command.encode())
+            return self.connection.readline().decode().strip()
+    
     def _test_connection(self) -> bool:
         """Test if Arduino is responding"""
         try:
-            self.connection.write(b"PING\n")
-            response = self.connection.readline().decode().strip()
-            return response == "PONG"
+            return self._exchange("PING\n") == "PONG"
         except Exception as e:
             logger.error(f"Connection test failed: {e}")
             return False
@@ -89,15 +126,17 @@ class ArduinoController:
             return False
         
         try:
-            command = f"MUX {position}\n"
-            self.connection.write(command.encode())
-            response = self.connection.readline().decode().strip()
+            start = time.perf_counter()
+            response = self._exchange(f"MUX {position}\n")
             
             if response == f"MUX_SET {position}":
+                self.move_times.append(time.perf_counter() - start)
+                self.position = position
                 logger.info(f"MUX position set to {position}")
                 return True
             else:
                 logger.error(f"Unexpected response: {response}")
+                flight_recorder.fault("arduino", f"MUX {position}: unexpected response {response!r}")
                 return False
                 
         except Exception as e:
@@ -111,27 +150,39 @@ class ArduinoController:
             return None
         
         try:
-            self.connection.write(b"GET_MUX\n")
-            response = self.connection.readline().decode().strip()
+            response = self._exchange("GET_MUX\n")
             
             if response.startswith("MUX_POS "):
-                position = int(response.split()[1])
-                return position
+                self.position = int(response.split()[1])
+                return self.position
             else:
                 logger.error(f"Unexpected response: {response}")
+                flight_recorder.fault("arduino", f"GET_MUX: unexpected response {response!r}")
                 return None
                 
         except Exception as e:
             logger.error(f"Failed to get MUX position: {e}")
             return None
     
+    def mean_move_time(self) -> Optional[float]:
+        """Mean measured MUX move time in seconds, or None before the first move"""
+        if not self.move_times:
+            return None
+        return sum(self.move_times) / len(self.move_times)
+    
     def get_status(self) -> Dict[str, Any]:
-        """Get Arduino status information"""
+        """Get Arduino status information; while a run leases the MUX the last known position is reported"""
+        leased = device_leases.holder("arduino") is not None
+        if self.is_connected and not leased:
+            self.get_mux_position()
         return {
             "connected": self.is_connected,
+            "simulated": self.simulated,
             "port": self.config.get('port', 'Unknown'),
             "device_type": self.config.get('device_type', 'Arduino Uno R4 Minima'),
-            "current_position": self.get_mux_position() if self.is_connected else None
+            "current_position": self.position if self.is_connected else None,
+            "leased": leased,
+            "mean_move_time": self.mean_move_time()
         }
     
     def __enter__(self):
@@ -7,12 +7,14 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Dict, Any, List
 from .controller import ArduinoController
+from ...services import device_leases, lease_guard
 import logging
 
 logger = logging.getLogger(__name__)
 
 # Create router for Arduino routes
-arduino_uno_r4_router = APIRouter(prefix="/api/arduino", tags=["Arduino Uno R4"])
+arduino_uno_r4_router = APIRouter(prefix="/api/arduino", tags=["Arduino Uno R4"],
+                                  dependencies=[lease_guard("arduino")])
 
 # Global controller instance
 arduino_controller = ArduinoController()
@@ -32,7 +34,7 @@ class PositionResponse(BaseModel):
     message: str = None
 
 @arduino_uno_r4_router.post("/connect")
-async def connect() -> Dict[str, Any]:
+def connect() -> Dict[str, Any]:
     """Connect to Arduino device"""
     try:
         success = arduino_controller.connect()
@@ -63,7 +65,7 @@ async def connect() -> Dict[str, Any]:
         )
 
 @arduino_uno_r4_router.post("/disconnect")
-async def disconnect() -> Dict[str, Any]:
+def disconnect() -> Dict[str, Any]:
     """Disconnect from Arduino device"""
     try:
         arduino_controller.disconnect()
@@ -83,7 +85,7 @@ async def disconnect() -> Dict[str, Any]:
         )
 
 @arduino_uno_r4_router.get("/status")
-async def get_status() -> Dict[str, Any]:
+def get_status() -> Dict[str, Any]:
     """Get Arduino connection and device status"""
     try:
         status = arduino_controller.get_status()
@@ -102,10 +104,13 @@ async def get_status() -> Dict[str, Any]:
         )
 
 @arduino_uno_r4_router.get("/mux/position")
-async def get_mux_position() -> Dict[str, Any]:
-    """Get current MUX position"""
+def get_mux_position() -> Dict[str, Any]:
+    """Get current MUX position (the last known one while a run holds the MUX)"""
     try:
-        position = arduino_controller.get_mux_position()
+        if device_leases.holder("arduino") is not None and arduino_controller.position is not None:
+            position = arduino_controller.position
+        else:
+            position = arduino_controller.get_mux_position()
         if position is not None:
             return {
                 "status": "success",
@@ -132,7 +137,7 @@ async def get_mux_position() -> Dict[str, Any]:
         )
 
 @arduino_uno_r4_router.post("/mux/position")
-async def set_mux_position(request: PositionRequest) -> Dict[str, Any]:
+def set_mux_position(request: PositionRequest) -> Dict[str, Any]:
     """Set MUX position"""
     try:
         position = request.position
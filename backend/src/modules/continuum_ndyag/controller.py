@@ -0,0 +1,193 @@
+"""
+Continuum Nd:YAG Controller Module
+Schedules pump shots through the QC9524 TTL channel without blocking the event loop
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Optional, Dict, Any, Sequence, Union
+import toml
+
+from ..quantum_composers_9524.utils import SYSTEM_CHANNEL, config_to_state
+from .utils import PATTERNS, GateSequence, compile_gates
+
+logger = logging.getLogger(__name__)
+
+class NdYAGController:
+    """
+    Controller for the Continuum Surelite pump laser
+
+    The laser has no data connection; it fires on TTL pulses from the QC9524
+    channel configured as ``ttl_channel``. Warmup and shot counts are derived
+    from monotonic timestamps, and timed patterns end through
+    ``loop.call_later`` rather than sleeping in a request handler.
+    """
+
+    def __init__(self, qc_controller=None, config_path: str = None):
+        """Initialize Nd:YAG controller with configuration"""
+        self.qc = qc_controller
+        self.config = self._load_config(config_path)
+
+        control = self.config.get('control_parameters', {})
+        self.ttl_channel = control.get('ttl_channel', 'A')
+        self.warmup_time = float(control.get('warmup_time', 900))
+        self.min_pulse_interval = self.config.get('safety', {}).get('min_pulse_interval', 100) * 1e-3
+        self.repetition_rate_max = self.config.get('parameters', {}).get('repetition_rate_max', 10)
+
+        self.warmup_started: Optional[float] = None
+        self.pattern: Optional[GateSequence] = None
+        self.firing_since: Optional[float] = None
+        self.shots_completed = 0
+        self._stop_handle: Optional[asyncio.TimerHandle] = None
+        self._warmup_handle: Optional[asyncio.TimerHandle] = None
+
+    def _load_config(self, config_path: str = None) -> Dict[str, Any]:
+        """Load configuration from TOML file"""
+        if config_path is None:
+            # Default to hardware_configuration.toml in project root
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+            config_path = os.path.join(project_root, "hardware_configuration.toml")
+
+        try:
+            with open(config_path, 'r') as f:
+                config = toml.load(f)
+            return config.get('continuum_ndyag', {})
+        except Exception as e:
+            logger.error(f"Failed to load configuration: {e}")
+            return {}
+
+    @property
+    def t0_period(self) -> float:
+        """T0 period of the QC9524 in seconds (mirror first, then configured timing)"""
+        if self.qc is not None:
+            period = self.qc.mirror.get(SYSTEM_CHANNEL, {}).get("PERIOD")
+            if period:
+                return period
+            return config_to_state(self.qc.config).get(SYSTEM_CHANNEL, {}).get("PERIOD", 0.001)
+        return 0.001
+
+    # --- warmup ----------------------------------------------------------
+
+    def start_warmup(self) -> None:
+        """Mark the flashlamps as switched on; the laser is usable after ``warmup_time``"""
+        self.warmup_started = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            if self._warmup_handle is not None:
+                self._warmup_handle.cancel()
+            self._warmup_handle = loop.call_later(
+                self.warmup_time, lambda: logger.info("Nd:YAG warmup complete"))
+        logger.info(f"Nd:YAG warmup started ({self.warmup_time:.0f} s)")
+
+    def warmup_remaining(self) -> Optional[float]:
+        """Seconds of warmup left, or None if warmup was never started"""
+        if self.warmup_started is None:
+            return None
+        return max(0.0, self.warmup_time - (time.monotonic() - self.warmup_started))
+
+    @property
+    def is_warm(self) -> bool:
+        return self.warmup_remaining() == 0.0
+
+    # --- patterns --------------------------------------------------------
+
+    def compile_pattern(self, pattern: Union[str, Sequence[bool]]) -> GateSequence:
+        """Validate a named or custom gate pattern against the laser limits (raises ValueError)"""
+        if isinstance(pattern, str):
+            if pattern not in PATTERNS:
+                raise ValueError(f"Unknown pattern '{pattern}', expected one of {list(PATTERNS)}")
+            name, gates = pattern, PATTERNS[pattern]
+        else:
+            name, gates = "custom", list(pattern)
+        return compile_gates(name, gates, self.t0_period, self.min_pulse_interval,
+                             self.repetition_rate_max)
+
+    @property
+    def shot_count(self) -> int:
+        """Shots fired so far, including the pattern that is currently running"""
+        return self.shots_completed + self._current_shots()
+
+    def _current_shots(self) -> int:
+        if self.firing_since is None or self.pattern is None or not self.pattern.spacing:
+            return 0
+        elapsed = time.monotonic() - self.firing_since
+        return int(elapsed / self.pattern.shot_interval) + 1
+
+    async def start_pattern(self, pattern: Union[str, Sequence[bool]],
+                            duration: Optional[float] = None) -> GateSequence:
+        """
+        Start firing a gate pattern, optionally for ``duration`` seconds
+
+        Invalid patterns, a cold laser or a missing QC9524 connection raise
+        immediately; programming the QC runs in a worker thread.
+        """
+        sequence = self.compile_pattern(pattern)
+        if sequence.spacing and not self.is_warm:
+            remaining = self.warmup_remaining()
+            raise ValueError("Nd:YAG warmup not started" if remaining is None
+                             else f"Nd:YAG still warming up ({remaining:.0f} s remaining)")
+        if self.qc is None or not self.qc.is_connected:
+            raise ValueError("QC9524 not connected")
+
+        await self.stop()
+        success = await asyncio.to_thread(
+            self.qc.apply_state, {self.ttl_channel: sequence.channel_state()})
+        if not success:
+            raise RuntimeError("Failed to program Nd:YAG trigger channel")
+
+        self.pattern = sequence
+        self.firing_since = time.monotonic() if sequence.spacing else None
+        if duration is not None:
+            loop = asyncio.get_running_loop()
+            self._stop_handle = loop.call_later(duration, lambda: asyncio.ensure_future(self.stop()))
+        logger.info(f"Nd:YAG pattern '{sequence.name}' started at {sequence.repetition_rate:.2f} Hz")
+        return sequence
+
+    async def stop(self, priority: bool = False) -> bool:
+        """
+        Stop firing and fold the running pattern into the shot count
+
+        With ``priority`` (safety shutdowns) the trigger channel is switched
+        off ahead of every queued QC9524 sync.
+        """
+        if self._stop_handle is not None:
+            self._stop_handle.cancel()
+            self._stop_handle = None
+        if self.pattern is None:
+            return True
+
+        self.shots_completed += self._current_shots()
+        self.pattern = None
+        self.firing_since = None
+        if self.qc is None or not self.qc.is_connected:
+            return False
+        success = await asyncio.to_thread(self.qc.apply_state, {self.ttl_channel: {"STATE": "OFF"}}, priority)
+        logger.info(f"Nd:YAG stopped ({self.shots_completed} shots total)")
+        return success
+
+    @property
+    def last_shutdown_wait(self) -> Optional[float]:
+        """QC9524 lock wait of the last priority stop"""
+        return self.qc.last_shutdown_wait if self.qc is not None else None
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get Nd:YAG scheduling status"""
+        return {
+            "device_type": self.config.get('device_type', 'Continuum Surelite Nd:YAG Laser'),
+            "ttl_channel": self.ttl_channel,
+            "qc_connected": bool(self.qc is not None and self.qc.is_connected),
+            "warmup_remaining": self.warmup_remaining(),
+            "warm": self.is_warm,
+            "firing": self.firing_since is not None,
+            "pattern": self.pattern.to_dict() if self.pattern else None,
+            "shot_count": self.shot_count,
+            "limits": {
+                "min_pulse_interval": self.min_pulse_interval,
+                "repetition_rate_max": self.repetition_rate_max
+            }
+        }
@@ -0,0 +1,100 @@
+"""
+Continuum Nd:YAG API Routes
+Defines REST API endpoints for pump warmup and shot scheduling
+"""
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import Dict, Any, List, Optional
+from ..quantum_composers_9524.routes import qc9524_controller
+from .controller import NdYAGController
+from .utils import PATTERNS
+from ...services import lease_guard
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Create router for Nd:YAG routes
+continuum_ndyag_router = APIRouter(prefix="/api/ndyag", tags=["Continuum Nd:YAG"],
+                                   dependencies=[lease_guard("ndyag", "qc", safe={"/pattern/stop": None})])
+
+# Global controller instance; the laser is fired through the shared QC9524
+ndyag_controller = NdYAGController(qc9524_controller)
+
+# Pydantic models for request/response
+class PatternRequest(BaseModel):
+    pattern: Optional[str] = None  # named pattern, see GET /patterns
+    gates: Optional[List[bool]] = None  # custom repeating pattern, one entry per pump slot
+    duration: Optional[float] = None  # seconds; run until stopped when omitted
+
+def _error(message: str, status_code: int = 500) -> HTTPException:
+    return HTTPException(
+        status_code=status_code,
+        detail={
+            "status": "error",
+            "message": message
+        }
+    )
+
+@continuum_ndyag_router.get("/status")
+async def get_status() -> Dict[str, Any]:
+    """Get warmup, firing and shot count status"""
+    return {
+        "status": "success",
+        "data": ndyag_controller.get_status()
+    }
+
+@continuum_ndyag_router.post("/warmup/start")
+async def start_warmup() -> Dict[str, Any]:
+    """Record that the flashlamps were switched on and start the warmup timer"""
+    ndyag_controller.start_warmup()
+    return {
+        "status": "success",
+        "message": "Nd:YAG warmup started",
+        "data": {"warmup_remaining": ndyag_controller.warmup_remaining()}
+    }
+
+@continuum_ndyag_router.get("/patterns")
+async def list_patterns() -> Dict[str, Any]:
+    """List named gate patterns compiled against the current limits"""
+    patterns = {}
+    for name in PATTERNS:
+        try:
+            patterns[name] = ndyag_controller.compile_pattern(name).to_dict()
+        except ValueError as e:
+            patterns[name] = {"error": str(e)}
+    return {
+        "status": "success",
+        "data": patterns
+    }
+
+@continuum_ndyag_router.post("/pattern/start")
+async def start_pattern(request: PatternRequest) -> Dict[str, Any]:
+    """Start a gate pattern; patterns that violate the laser limits are rejected"""
+    if (request.pattern is None) == (request.gates is None):
+        raise _error("Specify exactly one of 'pattern' or 'gates'", status_code=400)
+    try:
+        sequence = await ndyag_controller.start_pattern(
+            request.pattern if request.pattern is not None else request.gates,
+            duration=request.duration
+        )
+    except ValueError as e:
+        raise _error(str(e), status_code=400)
+    except RuntimeError as e:
+        raise _error(str(e))
+    return {
+        "status": "success",
+        "message": f"Pattern '{sequence.name}' started",
+        "data": sequence.to_dict()
+    }
+
+@continuum_ndyag_router.post("/pattern/stop")
+async def stop_pattern() -> Dict[str, Any]:
+    """Stop firing"""
+    if not await ndyag_controller.stop():
+        raise _error("Failed to stop Nd:YAG trigger channel")
+    return {
+        "status": "success",
+        "message": "Nd:YAG stopped",
+        "data": {"shot_count": ndyag_controller.shot_count}
+    }
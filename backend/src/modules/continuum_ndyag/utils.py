@@ -0,0 +1,107 @@
+"""
+Continuum Nd:YAG Utility Functions
+Pump gate patterns and their translation to QC9524 duty-cycle settings
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Dict, Any, List, Sequence
+
+
+@dataclass
+class GateSequence:
+    """
+    Compiled pump on/off pattern
+
+    ``spacing`` is the number of T0 periods between pump shots (0 when the
+    pattern never fires). The sequence is realised on the QC9524 as a
+    duty-cycle channel: 1 pulse on, ``spacing - 1`` pulses off.
+    """
+    name: str
+    gates: List[bool]
+    slot_periods: int
+    spacing: int
+    t0_period: float
+
+    @property
+    def shot_interval(self) -> float:
+        return self.spacing * self.t0_period
+
+    @property
+    def repetition_rate(self) -> float:
+        return 1.0 / self.shot_interval if self.spacing else 0.0
+
+    def channel_state(self) -> Dict[str, Any]:
+        """QC9524 field values for the pump channel"""
+        if not self.spacing:
+            return {"STATE": "OFF"}
+        if self.spacing == 1:
+            return {"STATE": "ON", "CMODE": "NORM"}
+        return {"STATE": "ON", "CMODE": "DCYC", "PCOUNTER": 1, "OCOUNTER": self.spacing - 1}
+
+    def pump_mask(self, num_probe_shots: int, probe_divider: int = 1) -> List[bool]:
+        """
+        Which probe shots coincide with a pump shot
+
+        Probe shots fire every ``probe_divider`` T0 periods starting in phase
+        with the pump, so pumped/unpumped shots can be separated for dOD.
+        """
+        if not self.spacing:
+            return [False] * num_probe_shots
+        return [(k * probe_divider) % self.spacing == 0 for k in range(num_probe_shots)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "gates": self.gates,
+            "slot_periods": self.slot_periods,
+            "spacing": self.spacing,
+            "shot_interval": self.shot_interval,
+            "repetition_rate": self.repetition_rate,
+            "channel_state": self.channel_state()
+        }
+
+
+# Named patterns, expressed in pump slots (one slot = the fastest allowed pump interval)
+PATTERNS = {
+    "continuous": [True],
+    "alternate": [True, False],  # chop every other slot for pumped/unpumped dOD pairs
+    "off": [False],
+}
+
+
+def compile_gates(name: str, gates: Sequence[bool], t0_period: float, min_pulse_interval: float,
+                  repetition_rate_max: float) -> GateSequence:
+    """
+    Turn a repeating gate pattern into a duty-cycle setting, enforcing the laser limits
+
+    Each gate is one pump slot: the smallest whole number of T0 periods that
+    is at least ``min_pulse_interval``. Raises ValueError when the pattern is
+    not evenly spaced (not expressible as a duty cycle) or exceeds the limits.
+    """
+    gates = [bool(g) for g in gates]
+    if not gates:
+        raise ValueError("Gate pattern is empty")
+    if t0_period <= 0:
+        raise ValueError("T0 period must be positive")
+
+    slot_periods = max(1, math.ceil(round(min_pulse_interval / t0_period, 9)))
+    on_slots = [i for i, gate in enumerate(gates) if gate]
+    if not on_slots:
+        return GateSequence(name, gates, slot_periods, 0, t0_period)
+
+    # Gaps between consecutive shots, including the wrap-around to the next repetition
+    gaps = [b - a for a, b in zip(on_slots, on_slots[1:])] + [len(gates) - on_slots[-1] + on_slots[0]]
+    if len(set(gaps)) != 1:
+        raise ValueError(f"Pattern '{name}' is not evenly spaced and cannot be gated by the QC9524")
+
+    spacing = gaps[0] * slot_periods
+    interval = spacing * t0_period
+    if interval < min_pulse_interval * (1 - 1e-9):
+        raise ValueError(f"Pattern '{name}' fires every {interval * 1e3:.1f} ms, "
+                         f"below min_pulse_interval {min_pulse_interval * 1e3:.1f} ms")
+    if repetition_rate_max and 1.0 / interval > repetition_rate_max * (1 + 1e-9):
+        raise ValueError(f"Pattern '{name}' fires at {1.0 / interval:.2f} Hz, "
+                         f"above repetition_rate_max {repetition_rate_max} Hz")
+
+    return GateSequence(name, gates, slot_periods, spacing, t0_period)
@@ -0,0 +1,445 @@
+"""
+Daylight MIRcat Controller Module
+Handles QCL arming, tuning and emission through the MIRcat SDK
+"""
+
+import os
+import sys
+import time
+import logging
+from ctypes import CDLL, byref, c_bool, c_float, c_uint8
+from typing import Optional, Dict, Any, Tuple
+import toml
+
+from ...analysis import SpectralAxis
+from ...services.flight_recorder import flight_recorder
+from ...services.replay import device_session
+from ...services.safety import PriorityLock
+from ...simulators import create_mircat_sdk, is_simulated
+from .sdk.MIRcatSDKConstants import (
+    MIRcatSDK_RET_SUCCESS,
+    MIRcatSDK_UNITS_CM1,
+    MIRcatSDK_UNITS_MICRONS,
+)
+from .utils import (
+    DATABASE_DIR,
+    TuneLatencyModel,
+    get_qcl_ranges,
+    get_tunable_ranges,
+    get_tuning_range,
+    qcl_for_wavenumber,
+)
+
+logger = logging.getLogger(__name__)
+
+class MIRcatController:
+    """Controller for Daylight MIRcat QCL probe laser"""
+
+    def __init__(self, config_path: str = None):
+        """Initialize MIRcat controller with configuration"""
+        self.sdk = None
+        self.config = self._load_config(config_path)
+        self.is_connected = False
+        self.simulated = is_simulated(self.config)
+        self.num_qcls = int(self.config.get('parameters', {}).get('num_qcls', 1))
+        self.current_wavenumber: Optional[float] = None
+        self.current_qcl: Optional[int] = None
+        self.qcl_ranges = get_qcl_ranges(self.config)
+        self._lock = PriorityLock()  # safety shutdowns jump queued commands
+
+        # Cached for the safety watchdog, which never polls the laser itself
+        self.emission_since: Optional[float] = None  # monotonic time emission was seen switching on
+        self.armed: Optional[bool] = None  # last known, from queries and commands
+        self.emitting: Optional[bool] = None
+        self.temperatures: Dict[int, float] = {}  # QCL -> Celsius
+        self.temperatures_at: Optional[float] = None
+        self.last_shutdown_wait: Optional[float] = None
+
+        tuning = self.config.get('tuning', {})
+        model_file = tuning.get('latency_model_file', 'mircat_tune_latency.json')
+        if not os.path.isabs(model_file):
+            model_file = os.path.join(DATABASE_DIR, model_file)
+        self.latency_model = TuneLatencyModel(model_file)
+
+    def _load_config(self, config_path: str = None) -> Dict[str, Any]:
+        """Load configuration from TOML file"""
+        if config_path is None:
+            # Default to hardware_configuration.toml in project root
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+            config_path = os.path.join(project_root, "hardware_configuration.toml")
+
+        try:
+            with open(config_path, 'r') as f:
+                config = toml.load(f)
+            return config.get('daylight_mircat', {})
+        except Exception as e:
+            logger.error(f"Failed to load configuration: {e}")
+            return {}
+
+    def _load_sdk(self):
+        """Load the MIRcat SDK shared library (or the fake SDK in simulation)"""
+        if self.simulated:
+            return create_mircat_sdk(self.config)
+
+        sdk_path = self.config.get('sdk_path') or os.path.join(os.path.dirname(__file__), 'sdk')
+        if not os.path.isdir(sdk_path):
+            sdk_path = os.path.join(os.path.dirname(__file__), 'sdk')
+
+        # MIRcatSDK.dll depends on QtCore4.dll in the same directory
+        if sys.platform == 'win32' and hasattr(os, 'add_dll_directory'):
+            os.add_dll_directory(sdk_path)
+        return CDLL(os.path.join(sdk_path, 'MIRcatSDK.dll'))
+
+    def connect(self) -> bool:
+        """Initialize the SDK and connect to the MIRcat"""
+        try:
+            with self._lock:
+                sdk = None if device_session.replaying else self._load_sdk()
+                self.sdk = flight_recorder.wrap_calls(device_session.calls("mircat", sdk), "mircat",
+                                                      status_codes=True)
+                ret = self.sdk.MIRcatSDK_Initialize()
+                if ret != MIRcatSDK_RET_SUCCESS.value:
+                    logger.error(f"Failed to initialize MIRcat SDK, error code: {ret}")
+                    self.sdk = None
+                    return False
+
+                num_qcls = c_uint8(0)
+                self.sdk.MIRcatSDK_GetNumInstalledQcls(byref(num_qcls))
+                if num_qcls.value:
+                    self.num_qcls = num_qcls.value
+
+                self.is_connected = True
+                self._read_tuned_position()
+            self.is_emitting()
+            self.is_armed()
+
+            logger.info(f"Successfully connected to MIRcat ({self.num_qcls} QCLs)")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to connect to MIRcat: {e}")
+            self.sdk = None
+            return False
+
+    def disconnect(self) -> None:
+        """De-initialize the SDK"""
+        with self._lock:
+            if self.sdk is not None and self.is_connected:
+                try:
+                    self.sdk.MIRcatSDK_DeInitialize()
+                except Exception as e:
+                    logger.error(f"Failed to de-initialize MIRcat SDK: {e}")
+            self.sdk = None
+            self.is_connected = False
+            self.armed = self.emitting = None
+        self.latency_model.flush()
+        logger.info("Disconnected from MIRcat")
+
+    def _read_tuned_position(self) -> None:
+        """Read the currently tuned wavenumber and QCL from the laser"""
+        tuned_ww = c_float()
+        units = c_uint8()
+        qcl = c_uint8()
+        ret = self.sdk.MIRcatSDK_GetTuneWW(byref(tuned_ww), byref(units), byref(qcl))
+        if ret != MIRcatSDK_RET_SUCCESS.value or tuned_ww.value <= 0:
+            return
+
+        wavenumber = tuned_ww.value
+        if units.value == MIRcatSDK_UNITS_MICRONS.value:
+            wavenumber = 10000.0 / wavenumber
+        self.current_wavenumber = wavenumber
+        self.current_qcl = qcl.value or None
+
+    def _query_bool(self, function_name: str) -> Optional[bool]:
+        """Call an SDK getter that returns a single bool"""
+        if not self.is_connected:
+            return None
+
+        value = c_bool(False)
+        with self._lock:
+            ret = getattr(self.sdk, function_name)(byref(value))
+        if ret != MIRcatSDK_RET_SUCCESS.value:
+            logger.error(f"{function_name} failed, error code: {ret}")
+            return None
+        return value.value
+
+    def is_armed(self) -> Optional[bool]:
+        """Return whether the laser is armed"""
+        armed = self._query_bool('MIRcatSDK_IsLaserArmed')
+        if armed is not None:
+            self.armed = armed
+        return armed
+
+    def is_emitting(self) -> Optional[bool]:
+        """Return whether laser emission is on"""
+        emitting = self._query_bool('MIRcatSDK_IsEmissionOn')
+        if emitting is not None:
+            self._emission_changed(emitting)
+        return emitting
+
+    def _emission_changed(self, emitting: bool) -> None:
+        self.emitting = emitting
+        if not emitting:
+            self.emission_since = None
+        elif self.emission_since is None:
+            self.emission_since = time.monotonic()
+
+    def read_temperatures(self, blocking: bool = True) -> Optional[Dict[int, float]]:
+        """
+        Read every QCL temperature (Celsius) into the cache
+
+        With ``blocking=False`` nothing is read while another command holds
+        the laser, so the read never delays acquisition.
+        """
+        if not self.is_connected:
+            return None
+        if not self._lock.acquire(blocking):
+            return None
+        try:
+            temperatures = {}
+            for qcl in range(1, self.num_qcls + 1):
+                temperature = c_float()
+                ret = self.sdk.MIRcatSDK_GetQCLTemperature(c_uint8(qcl), byref(temperature))
+                if ret != MIRcatSDK_RET_SUCCESS.value:
+                    logger.error(f"MIRcatSDK_GetQCLTemperature failed for QCL {qcl}, error code: {ret}")
+                    return None
+                temperatures[qcl] = temperature.value
+        finally:
+            self._lock.release()
+        self.temperatures = temperatures
+        self.temperatures_at = time.monotonic()
+        return temperatures
+
+    def get_actual_wavenumber(self) -> Optional[Tuple[float, bool]]:
+        """Measured wavenumber (cm-1) and whether the laser reports valid light (``lightValid``)"""
+        if not self.is_connected:
+            return None
+
+        actual_ww = c_float()
+        units = c_uint8()
+        light_valid = c_bool(False)
+        with self._lock:
+            ret = self.sdk.MIRcatSDK_GetActualWW(byref(actual_ww), byref(units), byref(light_valid))
+        if ret != MIRcatSDK_RET_SUCCESS.value:
+            logger.error(f"MIRcatSDK_GetActualWW failed, error code: {ret}")
+            return None
+        wavenumber = actual_ww.value
+        if units.value == MIRcatSDK_UNITS_MICRONS.value and wavenumber > 0:
+            wavenumber = 10000.0 / wavenumber
+        return wavenumber, light_valid.value
+
+    def is_light_valid(self) -> Optional[bool]:
+        """Return whether the laser reports valid output light"""
+        actual = self.get_actual_wavenumber()
+        return actual[1] if actual is not None else None
+
+    def arm_laser(self) -> bool:
+        """Arm the laser and wait until the controller reports it armed"""
+        if not self.is_connected:
+            logger.error("MIRcat not connected")
+            return False
+
+        try:
+            if self.is_armed():
+                return True
+
+            with self._lock:
+                ret = self.sdk.MIRcatSDK_ArmDisarmLaser()
+            if ret != MIRcatSDK_RET_SUCCESS.value:
+                logger.error(f"Failed to arm MIRcat, error code: {ret}")
+                return False
+
+            timeout = self.config.get('communication', {}).get('timeout', 5.0)
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                if self.is_armed():
+                    logger.info("MIRcat armed")
+                    return True
+                device_session.sleep(0.1)
+
+            logger.error("Timed out waiting for MIRcat to arm")
+            return False
+
+        except Exception as e:
+            logger.error(f"Failed to arm MIRcat: {e}")
+            return False
+
+    def disarm_laser(self) -> bool:
+        """Disarm the laser"""
+        if not self.is_connected:
+            logger.error("MIRcat not connected")
+            return False
+
+        try:
+            with self._lock:
+                ret = self.sdk.MIRcatSDK_DisarmLaser()
+            if ret != MIRcatSDK_RET_SUCCESS.value:
+                logger.error(f"Failed to disarm MIRcat, error code: {ret}")
+                return False
+            self.armed = False
+            self._emission_changed(False)
+            logger.info("MIRcat disarmed")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to disarm MIRcat: {e}")
+            return False
+
+    def set_emission(self, enabled: bool) -> bool:
+        """Turn laser emission on or off"""
+        if not self.is_connected:
+            logger.error("MIRcat not connected")
+            return False
+
+        try:
+            with self._lock:
+                if enabled:
+                    ret = self.sdk.MIRcatSDK_TurnEmissionOn()
+                else:
+                    ret = self.sdk.MIRcatSDK_TurnEmissionOff()
+            if ret != MIRcatSDK_RET_SUCCESS.value:
+                logger.error(f"Failed to turn emission {'on' if enabled else 'off'}, error code: {ret}")
+                return False
+            self._emission_changed(enabled)
+            logger.info(f"MIRcat emission {'on' if enabled else 'off'}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to set MIRcat emission: {e}")
+            return False
+
+    def qcl_for_wavenumber(self, wavenumber: float) -> int:
+        """Return the QCL chip that covers the given wavenumber"""
+        return qcl_for_wavenumber(wavenumber, self.qcl_ranges)
+
+    def check_axis(self, axis: SpectralAxis) -> None:
+        """
+        Raise ValueError if any point of ``axis`` cannot be tuned to
+
+        Checks the whole scan against every QCL chip range at once, before
+        anything is sent to the SDK.
+        """
+        axis.check_range(get_tunable_ranges(self.config))
+
+    def tune_to_wavenumber(self, wavenumber: float, qcl: Optional[int] = None) -> bool:
+        """
+        Tune to a wavenumber (cm-1) and wait until the laser reports tuned
+
+        The duration of every successful tune is recorded in the latency model.
+        """
+        if not self.is_connected:
+            logger.error("MIRcat not connected")
+            return False
+
+        try:
+            self.check_axis(SpectralAxis([wavenumber]))
+        except ValueError as e:
+            logger.error(str(e))
+            return False
+
+        if qcl is None:
+            qcl = self.qcl_for_wavenumber(wavenumber)
+
+        tuning = self.config.get('tuning', {})
+        timeout = tuning.get('tune_timeout', 30.0)
+        poll_interval = tuning.get('poll_interval', 0.05)
+
+        try:
+            with self._lock:
+                start_wavenumber = self.current_wavenumber
+                start_qcl = self.current_qcl
+                start_time = time.perf_counter()
+
+                ret = self.sdk.MIRcatSDK_TuneToWW(c_float(wavenumber), MIRcatSDK_UNITS_CM1, c_uint8(qcl))
+                if ret != MIRcatSDK_RET_SUCCESS.value:
+                    logger.error(f"Failed to tune to {wavenumber} cm-1, error code: {ret}")
+                    return False
+
+                is_tuned = c_bool(False)
+                deadline = time.monotonic() + timeout
+                while True:
+                    self.sdk.MIRcatSDK_IsTuned(byref(is_tuned))
+                    if is_tuned.value:
+                        break
+                    if self._lock.preempt_requested:
+                        logger.warning(f"Tune to {wavenumber} cm-1 abandoned for a safety shutdown")
+                        self.current_wavenumber = None
+                        return False
+                    if time.monotonic() > deadline:
+                        logger.error(f"Timed out tuning to {wavenumber} cm-1")
+                        self.current_wavenumber = None
+                        return False
+                    device_session.sleep(poll_interval)
+
+                duration = time.perf_counter() - start_time
+                self.current_wavenumber = wavenumber
+                self.current_qcl = qcl
+
+            if start_wavenumber is not None:
+                self.latency_model.record(start_wavenumber, wavenumber,
+                                          start_qcl or qcl, qcl, duration)
+            logger.info(f"Tuned to {wavenumber} cm-1 on QCL {qcl} in {duration:.3f} s")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to tune MIRcat: {e}")
+            return False
+
+    def emergency_shutdown(self) -> bool:
+        """
+        Turn emission off and disarm, ahead of every queued command
+
+        Both calls are sent even if the first fails; "already off/disarmed"
+        replies count as success.
+        """
+        if not self.is_connected:
+            return False
+
+        with self._lock.priority() as wait:
+            self.last_shutdown_wait = wait
+            emission = self.sdk.MIRcatSDK_TurnEmissionOff()
+            disarm = self.sdk.MIRcatSDK_DisarmLaser()
+            emitting = c_bool(True)
+            ret = self.sdk.MIRcatSDK_IsEmissionOn(byref(emitting))
+        off = ret == MIRcatSDK_RET_SUCCESS.value and not emitting.value
+        if disarm == MIRcatSDK_RET_SUCCESS.value:
+            self.armed = False
+        if off:
+            self._emission_changed(False)
+            logger.warning(f"MIRcat emergency shutdown after {wait * 1000:.1f} ms lock wait")
+        else:
+            logger.critical(f"MIRcat emergency shutdown failed (emission off: {emission}, disarm: {disarm})")
+        return off
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Get MIRcat status information
+
+        Armed/emitting are the last known states and temperatures the cached
+        ones (read here only if none are cached yet and the laser is idle),
+        so a status poll never waits behind a tune; the safety watchdog does
+        the live polling.
+        """
+        low, high = get_tuning_range(self.config)
+        monitoring = self.config.get('safety', {}).get('temperature_monitoring', False)
+        if self.is_connected and monitoring and self.temperatures_at is None:
+            self.read_temperatures(blocking=False)
+        return {
+            "connected": self.is_connected,
+            "simulated": self.simulated,
+            "device_type": self.config.get('device_type', 'Daylight MIRcat QCL'),
+            "armed": self.armed if self.is_connected else None,
+            "emitting": self.emitting if self.is_connected else None,
+            "current_wavenumber": self.current_wavenumber,
+            "current_qcl": self.current_qcl,
+            "num_qcls": self.num_qcls,
+            "temperatures": self.temperatures,
+            "tuning_range": [low, high]
+        }
+
+    def __enter__(self):
+        """Context manager entry"""
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit"""
+        self.disconnect()
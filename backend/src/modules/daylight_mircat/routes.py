@@ -0,0 +1,147 @@
+"""
+Daylight MIRcat API Routes
+Defines REST API endpoints for MIRcat laser control
+"""
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import Dict, Any, Optional
+from .controller import MIRcatController
+from ...analysis import SpectralAxis
+from ...services import lease_guard
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Create router for MIRcat routes
+daylight_mircat_router = APIRouter(prefix="/api/mircat", tags=["Daylight MIRcat"],
+                                   dependencies=[lease_guard("mircat", safe={
+                                       "/disarm": None,
+                                       "/emission": lambda body: body.get("enabled") is False
+                                   })])
+
+# Global controller instance
+mircat_controller = MIRcatController()
+
+# Pydantic models for request/response
+class TuneRequest(BaseModel):
+    wavenumber: float
+    units: str = "cm1"  # unit of ``wavenumber``: "cm1" or "microns"
+    qcl: Optional[int] = None
+
+class EmissionRequest(BaseModel):
+    enabled: bool
+
+def _error(message: str, status_code: int = 500) -> HTTPException:
+    return HTTPException(
+        status_code=status_code,
+        detail={
+            "status": "error",
+            "message": message
+        }
+    )
+
+@daylight_mircat_router.post("/connect")
+def connect() -> Dict[str, Any]:
+    """Connect to MIRcat laser"""
+    if not mircat_controller.connect():
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": "Failed to connect to MIRcat",
+                "data": {"connected": False}
+            }
+        )
+    return {
+        "status": "success",
+        "message": "Connected to MIRcat",
+        "data": {"connected": True}
+    }
+
+@daylight_mircat_router.post("/disconnect")
+def disconnect() -> Dict[str, Any]:
+    """Disconnect from MIRcat laser"""
+    try:
+        mircat_controller.disconnect()
+        return {
+            "status": "success",
+            "message": "Disconnected from MIRcat",
+            "data": {"connected": False}
+        }
+    except Exception as e:
+        logger.error(f"Disconnection error: {e}")
+        raise _error(str(e))
+
+@daylight_mircat_router.get("/status")
+def get_status() -> Dict[str, Any]:
+    """Get MIRcat connection and laser status"""
+    try:
+        return {
+            "status": "success",
+            "data": mircat_controller.get_status()
+        }
+    except Exception as e:
+        logger.error(f"Status error: {e}")
+        raise _error(str(e))
+
+@daylight_mircat_router.post("/arm")
+def arm_laser() -> Dict[str, Any]:
+    """Arm the laser"""
+    if not mircat_controller.arm_laser():
+        raise _error("Failed to arm MIRcat")
+    return {
+        "status": "success",
+        "message": "MIRcat armed",
+        "data": {"armed": True}
+    }
+
+@daylight_mircat_router.post("/disarm")
+def disarm_laser() -> Dict[str, Any]:
+    """Disarm the laser"""
+    if not mircat_controller.disarm_laser():
+        raise _error("Failed to disarm MIRcat")
+    return {
+        "status": "success",
+        "message": "MIRcat disarmed",
+        "data": {"armed": False}
+    }
+
+@daylight_mircat_router.post("/emission")
+def set_emission(request: EmissionRequest) -> Dict[str, Any]:
+    """Turn laser emission on or off"""
+    if not mircat_controller.set_emission(request.enabled):
+        raise _error("Failed to change MIRcat emission")
+    return {
+        "status": "success",
+        "message": f"Emission {'on' if request.enabled else 'off'}",
+        "data": {"emitting": request.enabled}
+    }
+
+@daylight_mircat_router.post("/tune")
+def tune(request: TuneRequest) -> Dict[str, Any]:
+    """Tune to a wavenumber (cm-1) or wavelength (microns); runs in the threadpool while the laser settles"""
+    try:
+        axis = SpectralAxis([request.wavenumber], request.units)
+        mircat_controller.check_axis(axis)
+    except ValueError as e:
+        raise _error(str(e), status_code=400)
+    wavenumber = float(axis.wavenumbers[0])
+    if not mircat_controller.tune_to_wavenumber(wavenumber, request.qcl):
+        raise _error(f"Failed to tune to {wavenumber:g} cm-1")
+    return {
+        "status": "success",
+        "message": f"Tuned to {wavenumber:g} cm-1",
+        "data": {
+            "current_wavenumber": mircat_controller.current_wavenumber,
+            "current_qcl": mircat_controller.current_qcl
+        }
+    }
+
+@daylight_mircat_router.get("/latency-model")
+async def get_latency_model() -> Dict[str, Any]:
+    """Get the fitted tune-latency model"""
+    return {
+        "status": "success",
+        "data": mircat_controller.latency_model.summary()
+    }
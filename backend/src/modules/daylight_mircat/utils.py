@@ -0,0 +1,238 @@
+"""
+Daylight MIRcat Utility Functions
+Tune-latency model and QCL chip lookup helpers
+"""
+
+import json
+import os
+import atexit
+import logging
+import threading
+from typing import Optional, Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default location for persisted MIRcat data (next to app.db)
+DATABASE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "database")
+
+
+def get_tuning_range(config: Dict[str, Any]) -> Tuple[float, float]:
+    """Return (low, high) tuning range in wavenumbers from the MIRcat config"""
+    params = config.get('parameters', {})
+    # wavelength_min/max are stored in wavenumbers and may be given in either order
+    bounds = (float(params.get('wavelength_min', 1645)), float(params.get('wavelength_max', 2075)))
+    return min(bounds), max(bounds)
+
+
+def get_qcl_ranges(config: Dict[str, Any]) -> List[Tuple[float, float]]:
+    """
+    Return the wavenumber range covered by each QCL chip
+
+    Uses ``[daylight_mircat.tuning] qcl_ranges`` when configured, otherwise the
+    overall tuning range is split evenly between ``num_qcls`` chips.
+    """
+    tuning = config.get('tuning', {})
+    if tuning.get('qcl_ranges'):
+        return [(min(r), max(r)) for r in tuning['qcl_ranges']]
+
+    low, high = get_tuning_range(config)
+    num_qcls = max(1, int(config.get('parameters', {}).get('num_qcls', 1)))
+    span = (high - low) / num_qcls
+    return [(low + i * span, low + (i + 1) * span) for i in range(num_qcls)]
+
+
+def get_tunable_ranges(config: Dict[str, Any]) -> List[Tuple[float, float]]:
+    """QCL chip ranges clipped to the overall tuning range (gaps between chips are not tunable)"""
+    low, high = get_tuning_range(config)
+    ranges = [(max(low, r_low), min(high, r_high)) for r_low, r_high in get_qcl_ranges(config)]
+    return [r for r in ranges if r[0] <= r[1]]
+
+
+def qcl_for_wavenumber(wavenumber: float, qcl_ranges: List[Tuple[float, float]]) -> int:
+    """Return the 1-based QCL index that covers the given wavenumber"""
+    for index, (low, high) in enumerate(qcl_ranges, start=1):
+        if low <= wavenumber <= high:
+            return index
+
+    # Outside all ranges: pick the nearest chip and let the SDK reject it if needed
+    distances = [min(abs(wavenumber - low), abs(wavenumber - high)) for low, high in qcl_ranges]
+    return distances.index(min(distances)) + 1
+
+
+class _LinearFit:
+    """Running least-squares fit of duration = intercept + slope * step"""
+
+    def __init__(self, n=0, sx=0.0, sy=0.0, sxx=0.0, sxy=0.0):
+        self.n = n
+        self.sx = sx
+        self.sy = sy
+        self.sxx = sxx
+        self.sxy = sxy
+
+    def add(self, x: float, y: float) -> None:
+        self.n += 1
+        self.sx += x
+        self.sy += y
+        self.sxx += x * x
+        self.sxy += x * y
+
+    def coefficients(self, default_intercept: float, default_slope: float) -> Tuple[float, float]:
+        """Return (intercept, slope), falling back to defaults when under-determined"""
+        if self.n == 0:
+            return default_intercept, default_slope
+
+        denominator = self.n * self.sxx - self.sx * self.sx
+        if self.n == 1 or abs(denominator) < 1e-12:
+            # Only the mean duration at one step size is known: scale the defaults to match it
+            mean_x, mean_y = self.sx / self.n, self.sy / self.n
+            expected = default_intercept + default_slope * mean_x
+            scale = mean_y / expected if expected > 0 else 1.0
+            return default_intercept * scale, default_slope * scale
+
+        slope = (self.n * self.sxy - self.sx * self.sy) / denominator
+        if slope < 0:
+            # Longer moves are never faster: a flat fit is the mean duration
+            return self.sy / self.n, 0.0
+        return (self.sy - slope * self.sx) / self.n, slope
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"n": self.n, "sx": self.sx, "sy": self.sy, "sxx": self.sxx, "sxy": self.sxy}
+
+
+class TuneLatencyModel:
+    """
+    Persistent model of MIRcat tuning time
+
+    Every completed tune is recorded with its start/end wavenumber, QCL chips
+    and duration. Durations are fitted as ``intercept + slope * |step|``
+    separately for moves within a chip and moves that cross between chips.
+
+    Recording never touches the disk: the model is written by a timer
+    thread ``save_interval`` seconds after the first unsaved tune, and on
+    :meth:`flush` (disconnect, interpreter exit).
+    """
+
+    # Fallback values used until enough tunes have been recorded
+    DEFAULT_INTERCEPT = 0.25  # seconds
+    DEFAULT_SLOPE = 0.002  # seconds per cm-1
+    DEFAULT_QCL_CHANGE_INTERCEPT = 1.5  # seconds
+
+    def __init__(self, path: Optional[str] = None, max_samples: int = 500, save_interval: float = 10.0):
+        """Initialize the model, loading previous measurements from ``path``"""
+        self.path = path
+        self.max_samples = max_samples
+        self.save_interval = save_interval
+        self.samples: List[Dict[str, Any]] = []
+        self._fits = {"same_qcl": _LinearFit(), "qcl_change": _LinearFit()}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self.load()
+        if path:
+            atexit.register(self.flush)
+
+    def record(self, start_wavenumber: float, end_wavenumber: float,
+               start_qcl: int, end_qcl: int, duration: float) -> None:
+        """Record one completed tune; the model is persisted in the background"""
+        step = abs(end_wavenumber - start_wavenumber)
+        key = "same_qcl" if start_qcl == end_qcl else "qcl_change"
+
+        with self._lock:
+            self._fits[key].add(step, duration)
+            self.samples.append({
+                "start_wavenumber": start_wavenumber,
+                "end_wavenumber": end_wavenumber,
+                "start_qcl": start_qcl,
+                "end_qcl": end_qcl,
+                "duration": duration
+            })
+            # Aggregates keep the full history; the sample list is only for inspection
+            del self.samples[:-self.max_samples]
+            self._dirty = True
+            if self.path and self._timer is None:
+                self._timer = threading.Timer(self.save_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def predict(self, start_wavenumber: Optional[float], end_wavenumber: float,
+                start_qcl: Optional[int], end_qcl: int) -> float:
+        """Predict tune duration in seconds (0 when the start position is unknown)"""
+        if start_wavenumber is None:
+            return 0.0
+        if start_wavenumber == end_wavenumber and start_qcl == end_qcl:
+            return 0.0
+
+        step = abs(end_wavenumber - start_wavenumber)
+        if start_qcl == end_qcl:
+            intercept, slope = self._fits["same_qcl"].coefficients(
+                self.DEFAULT_INTERCEPT, self.DEFAULT_SLOPE)
+        else:
+            intercept, slope = self._fits["qcl_change"].coefficients(
+                self.DEFAULT_QCL_CHANGE_INTERCEPT, self.DEFAULT_SLOPE)
+        return max(0.0, intercept + slope * step)
+
+    def summary(self) -> Dict[str, Any]:
+        """Return fitted coefficients and sample counts"""
+        same_intercept, same_slope = self._fits["same_qcl"].coefficients(
+            self.DEFAULT_INTERCEPT, self.DEFAULT_SLOPE)
+        change_intercept, change_slope = self._fits["qcl_change"].coefficients(
+            self.DEFAULT_QCL_CHANGE_INTERCEPT, self.DEFAULT_SLOPE)
+        return {
+            "same_qcl": {
+                "samples": self._fits["same_qcl"].n,
+                "intercept": same_intercept,
+                "slope": same_slope
+            },
+            "qcl_change": {
+                "samples": self._fits["qcl_change"].n,
+                "intercept": change_intercept,
+                "slope": change_slope
+            },
+            "recent_samples": len(self.samples),
+            "path": self.path
+        }
+
+    def load(self) -> None:
+        """Load the model from disk if a file exists"""
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            for key in self._fits:
+                if key in data.get("fits", {}):
+                    self._fits[key] = _LinearFit(**data["fits"][key])
+            self.samples = data.get("samples", [])[-self.max_samples:]
+        except Exception as e:
+            logger.error(f"Failed to load tune latency model: {e}")
+
+    def flush(self) -> None:
+        """Write the model now if tunes were recorded since the last save"""
+        with self._lock:
+            timer, self._timer = self._timer, None
+            dirty = self._dirty
+        if timer is not None:
+            timer.cancel()
+        if dirty:
+            self.save()
+
+    def save(self) -> None:
+        """Write the model to disk atomically"""
+        if not self.path:
+            return
+
+        with self._lock:
+            self._dirty = False
+            data = {
+                "fits": {key: fit.to_dict() for key, fit in self._fits.items()},
+                "samples": list(self.samples)
+            }
+
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Failed to save tune latency model: {e}")
@@ -0,0 +1,158 @@
+"""
+Adaptive Spectral Sampling
+Refines a coarse wavenumber grid where the measured spectrum bends or changes quickly
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AdaptiveSettings:
+    """
+    Adaptive scan parameters
+
+    ``threshold`` is the largest acceptable interpolation error between two
+    neighbouring points, as a fraction of the spectrum's peak-to-peak range.
+    Refinement stops when no interval exceeds it, or when ``max_points`` or
+    ``time_budget`` (seconds, optional) is spent.
+    """
+    coarse_points: int = 33
+    threshold: float = 0.01
+    max_points: int = 100
+    time_budget: Optional[float] = None
+    batch_size: int = 8  # intervals split per round, worst first
+    gradient_weight: float = 0.05  # weight of the raw change across an interval
+    min_spacing: float = 0.5  # cm-1, never split an interval below this
+    noise_factor: float = 2.0  # ignore scores smaller than this many standard errors
+    max_rounds: int = 50
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+def coarse_grid(low: float, high: float, settings: AdaptiveSettings) -> List[float]:
+    """Initial uniform grid over [low, high]"""
+    count = max(2, min(settings.coarse_points, settings.max_points))
+    return [round(float(x), 2) for x in np.linspace(low, high, count)]
+
+
+def interval_scores(x: Sequence[float], y: Sequence[float],
+                    stderr: Optional[Sequence[Optional[float]]] = None,
+                    noise_factor: float = 2.0, gradient_weight: float = 0.05) -> np.ndarray:
+    """
+    Estimated linear-interpolation error of every interval between sorted points
+
+    Each interval is scored by the curvature error ``|y''| h^2 / 8`` (from
+    second differences at both ends), or ``gradient_weight`` times its change
+    in value if larger, so steep flanks of unresolved bands are still found.
+    Scores within ``noise_factor`` standard errors count as zero.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = x.size
+    if n < 2:
+        return np.zeros(0)
+
+    h = np.diff(x)
+    slopes = np.diff(y) / h
+    curvature = np.zeros(n)
+    if n > 2:
+        curvature[1:-1] = np.abs(2.0 * np.diff(slopes) / (x[2:] - x[:-2]))
+    local_curvature = np.maximum(curvature[:-1], curvature[1:])
+
+    scores = np.maximum(local_curvature * h ** 2 / 8.0, gradient_weight * np.abs(np.diff(y)))
+    if stderr is not None:
+        errors = np.asarray([e if e is not None else 0.0 for e in stderr], dtype=float)
+        noise = noise_factor * np.maximum(errors[:-1], errors[1:])
+        scores = np.where(scores > noise, scores, 0.0)
+    return scores
+
+
+def refine_points(x: Sequence[float], y: Sequence[float], settings: AdaptiveSettings,
+                  stderr: Optional[Sequence[Optional[float]]] = None,
+                  budget: Optional[int] = None) -> List[float]:
+    """
+    New wavenumbers to measure next: midpoints of the worst intervals
+
+    Only intervals scoring above ``threshold`` times the peak-to-peak range
+    and wider than twice ``min_spacing`` are split, worst first, up to
+    ``batch_size`` (and ``budget``) new points.
+    """
+    order = np.argsort(np.asarray(x, dtype=float))
+    xs = np.asarray(x, dtype=float)[order]
+    ys = np.asarray(y, dtype=float)[order]
+    errors = [stderr[i] for i in order] if stderr is not None else None
+
+    span = float(np.ptp(ys)) if ys.size else 0.0
+    if span <= 0:
+        return []
+
+    scores = interval_scores(xs, ys, errors, settings.noise_factor, settings.gradient_weight) / span
+    widths = np.diff(xs)
+    candidates = [i for i in np.argsort(-scores)
+                  if scores[i] > settings.threshold and widths[i] >= 2 * settings.min_spacing]
+    limit = settings.batch_size if budget is None else min(settings.batch_size, budget)
+    candidates = candidates[:max(0, limit)]
+    return sorted(round(float((xs[i] + xs[i + 1]) / 2.0), 2) for i in candidates)
+
+
+def sample_adaptively(function: Callable[[np.ndarray], np.ndarray], low: float, high: float,
+                      settings: AdaptiveSettings) -> np.ndarray:
+    """Run the refinement loop against a spectrum function (noise free); returns sorted points"""
+    points = coarse_grid(low, high, settings)
+    values = list(function(np.asarray(points)))
+    for _ in range(settings.max_rounds):
+        new = refine_points(points, values, settings, budget=settings.max_points - len(points))
+        if not new:
+            break
+        points.extend(new)
+        values.extend(function(np.asarray(new)))
+    return np.sort(np.asarray(points))
+
+
+def interpolation_error(function: Callable[[np.ndarray], np.ndarray], points: np.ndarray,
+                        reference: np.ndarray) -> float:
+    """Largest linear-interpolation error on ``reference``, as a fraction of the peak-to-peak range"""
+    truth = function(reference)
+    span = float(np.ptp(truth)) or 1.0
+    estimate = np.interp(reference, points, function(points))
+    return float(np.max(np.abs(estimate - truth)) / span)
+
+
+def benchmark_adaptive(function: Callable[[np.ndarray], np.ndarray], low: float, high: float,
+                       settings: AdaptiveSettings, uniform_points: int = 100,
+                       resolution: float = 0.05) -> Dict[str, Any]:
+    """
+    Compare adaptive sampling with uniform grids on a known spectrum
+
+    Reports the adaptive point count and error, the error of a
+    ``uniform_points`` grid, and the smallest uniform grid that matches the
+    adaptive error.
+    """
+    reference = np.arange(low, high + resolution / 2, resolution)
+    adaptive = sample_adaptively(function, low, high, settings)
+    adaptive_error = interpolation_error(function, adaptive, reference)
+    uniform_error = interpolation_error(function, np.linspace(low, high, uniform_points), reference)
+
+    # Smallest uniform grid at least as good as the adaptive one (error is not monotonic in N)
+    matching = None
+    for count in range(2, int((high - low) / resolution) + 1):
+        if interpolation_error(function, np.linspace(low, high, count), reference) <= adaptive_error:
+            matching = count
+            break
+
+    return {
+        "adaptive_points": int(adaptive.size),
+        "adaptive_error": adaptive_error,
+        "uniform_points": uniform_points,
+        "uniform_error": uniform_error,
+        "uniform_points_for_same_error": matching,
+        "point_saving": 1.0 - adaptive.size / matching if matching else None,
+        "points": adaptive.tolist()
+    }
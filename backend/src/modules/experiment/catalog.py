@@ -0,0 +1,342 @@
+"""
+Run Catalog
+Indexed SQLite metadata of every run, for searching without walking data directories
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, Any, Iterable, List, Optional
+
+from .storage import RUNS_DIR, read_run
+
+logger = logging.getLogger(__name__)
+
+# Catalog lives next to app.db
+CATALOG_PATH = os.path.join(os.path.dirname(RUNS_DIR), "catalog.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    date TEXT NOT NULL,
+    state TEXT,
+    sample TEXT,
+    detector TEXT,
+    wn_min REAL,
+    wn_max REAL,
+    num_points INTEGER,
+    completed INTEGER,
+    settings_hash TEXT,
+    data_file TEXT,
+    hdf5_file TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_positions (
+    run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    mux_position INTEGER NOT NULL,
+    started_at REAL NOT NULL,  -- copied from runs so position searches are ordered by the index
+    PRIMARY KEY (mux_position, started_at, run_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS run_positions_run ON run_positions(run_id);
+CREATE INDEX IF NOT EXISTS runs_started ON runs(started_at);
+CREATE INDEX IF NOT EXISTS runs_sample ON runs(sample, started_at);
+CREATE INDEX IF NOT EXISTS runs_hash ON runs(settings_hash, started_at);
+CREATE INDEX IF NOT EXISTS runs_state ON runs(state, started_at);
+CREATE INDEX IF NOT EXISTS runs_range ON runs(wn_min, wn_max);
+"""
+
+_COLUMNS = ("run_id", "started_at", "date", "state", "sample", "detector", "wn_min", "wn_max",
+            "num_points", "completed", "settings_hash", "data_file", "hdf5_file", "indexed_at")
+
+
+def settings_hash(settings: Dict[str, Any], device_config: Dict[str, Any]) -> str:
+    """
+    Short hash of what makes two runs comparable: run settings other than
+    the point list plus the configuration of every device used
+    """
+    settings = {key: value for key, value in settings.items() if key not in ("points", "sample")}
+    payload = json.dumps({"settings": settings, "devices": device_config}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def run_started_at(run_id: str) -> Optional[float]:
+    """Start time encoded in an engine run id (``YYYYmmdd-HHMMSS-xxxxxx``, local time)"""
+    try:
+        return time.mktime(time.strptime(run_id[:15], "%Y%m%d-%H%M%S"))
+    except ValueError:
+        return None
+
+
+class RunCatalog:
+    """
+    SQLite catalog of runs
+
+    The database is in WAL mode so searches never block on a run being
+    recorded. Writes go through one connection under a lock (callers on the
+    event loop use ``asyncio.to_thread``); every thread reads through its
+    own connection.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or CATALOG_PATH
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._write_lock:
+            connection = self._connection()
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10.0)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self._local.connection = connection
+        return connection
+
+    # --- writes ----------------------------------------------------------
+
+    def record(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """Insert or replace runs (one transaction); returns the number written"""
+        now = time.time()
+        count = 0
+        with self._write_lock:
+            connection = self._connection()
+            with connection:
+                for entry in entries:
+                    started_at = entry.get("started_at") or now
+                    row = {
+                        **{column: entry.get(column) for column in _COLUMNS},
+                        "started_at": started_at,
+                        "date": time.strftime("%Y-%m-%d", time.localtime(started_at)),
+                        "indexed_at": now
+                    }
+                    connection.execute(
+                        f"INSERT OR REPLACE INTO runs ({', '.join(_COLUMNS)}) "
+                        f"VALUES ({', '.join(':' + c for c in _COLUMNS)})", row)
+                    connection.execute("DELETE FROM run_positions WHERE run_id = ?", (row["run_id"],))
+                    connection.executemany(
+                        "INSERT OR IGNORE INTO run_positions (run_id, mux_position, started_at) VALUES (?, ?, ?)",
+                        [(row["run_id"], int(p), started_at) for p in entry.get("mux_positions") or []])
+                    count += 1
+        return count
+
+    def update(self, run_id: str, **values: Any) -> None:
+        """Update columns of a recorded run (e.g. state and completed points)"""
+        values = {key: value for key, value in values.items() if key in _COLUMNS and key != "run_id"}
+        if not values:
+            return
+        assignments = ", ".join(f"{key} = :{key}" for key in values)
+        with self._write_lock:
+            connection = self._connection()
+            with connection:
+                connection.execute(f"UPDATE runs SET {assignments} WHERE run_id = :run_id",
+                                   {**values, "run_id": run_id})
+
+    # --- queries ---------------------------------------------------------
+
+    def search(self, date_from: Optional[str] = None, date_to: Optional[str] = None,
+               sample: Optional[str] = None, mux_position: Optional[int] = None,
+               wavenumber: Optional[float] = None, wn_min: Optional[float] = None,
+               wn_max: Optional[float] = None, settings_hash: Optional[str] = None,
+               state: Optional[str] = None, detector: Optional[str] = None,
+               limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        """
+        Runs matching every given filter, newest first
+
+        Dates are ``YYYY-MM-DD`` (inclusive). ``wavenumber`` selects runs whose
+        range covers it; ``wn_min``/``wn_max`` select runs overlapping that
+        range.
+        """
+        start = time.perf_counter()
+        clauses: List[str] = []
+        params: Dict[str, Any] = {}
+        if date_from is not None:
+            clauses.append("runs.started_at >= :t_from")
+            params["t_from"] = _day_start(date_from)
+        if date_to is not None:
+            clauses.append("runs.started_at < :t_to")
+            params["t_to"] = _day_start(date_to) + 86400
+        for column, value in (("sample", sample), ("settings_hash", settings_hash),
+                              ("state", state), ("detector", detector)):
+            if value is not None:
+                clauses.append(f"runs.{column} = :{column}")
+                params[column] = value
+        if wavenumber is not None:
+            clauses.append("runs.wn_min <= :wavenumber AND runs.wn_max >= :wavenumber")
+            params["wavenumber"] = wavenumber
+        if wn_max is not None:
+            clauses.append("runs.wn_min <= :wn_max")
+            params["wn_max"] = wn_max
+        if wn_min is not None:
+            clauses.append("runs.wn_max >= :wn_min")
+            params["wn_min"] = wn_min
+        source, order = "runs", "runs.started_at"
+        if mux_position is not None:
+            source = "run_positions JOIN runs ON runs.run_id = run_positions.run_id"
+            clauses.append("run_positions.mux_position = :mux_position")
+            params["mux_position"] = mux_position
+            order = "run_positions.started_at"
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        connection = self._connection()
+        total = connection.execute(f"SELECT COUNT(*) FROM {source}{where}", params).fetchone()[0]
+        rows = connection.execute(
+            f"SELECT runs.* FROM {source}{where} ORDER BY {order} DESC LIMIT :limit OFFSET :offset",
+            {**params, "limit": limit, "offset": offset}).fetchall()
+        runs = [self._row(row) for row in rows]
+        positions = self._positions([run["run_id"] for run in runs])
+        for run in runs:
+            run["mux_positions"] = positions.get(run["run_id"], [])
+        return {
+            "total": total,
+            "runs": runs,
+            "query_time": time.perf_counter() - start
+        }
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        run = self._row(row)
+        run["mux_positions"] = self._positions([run_id]).get(run_id, [])
+        return run
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def _positions(self, run_ids: List[str]) -> Dict[str, List[int]]:
+        if not run_ids:
+            return {}
+        marks = ", ".join("?" * len(run_ids))
+        positions: Dict[str, List[int]] = {}
+        for run_id, position in self._connection().execute(
+                f"SELECT run_id, mux_position FROM run_positions WHERE run_id IN ({marks}) "
+                f"ORDER BY mux_position", run_ids):
+            positions.setdefault(run_id, []).append(position)
+        return positions
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict[str, Any]:
+        return {key: row[key] for key in row.keys()}
+
+    # --- backfill --------------------------------------------------------
+
+    def backfill(self, directory: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Index every run file under ``directory`` (recursively)
+
+        JSONL run files supply settings, state and point count; an HDF5
+        file with the same run id is linked, and HDF5 files without a JSONL
+        file are indexed from their attributes.
+        """
+        directory = directory or RUNS_DIR
+        start = time.perf_counter()
+        entries: Dict[str, Dict[str, Any]] = {}
+        errors = []
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                try:
+                    if name.endswith(".jsonl") and not name.endswith(".checkpoint.jsonl"):
+                        entry = _entry_from_jsonl(path)
+                    elif name.endswith(".h5"):
+                        entry = _entry_from_hdf5(path)
+                    else:
+                        continue
+                except Exception as e:
+                    errors.append({"file": path, "error": str(e)})
+                    continue
+                if entry is None:
+                    continue
+                # Prefer the JSONL metadata and keep both file locations
+                existing = entries.get(entry["run_id"])
+                if existing is None:
+                    entries[entry["run_id"]] = entry
+                elif entry.get("data_file"):
+                    entry["hdf5_file"] = entry["hdf5_file"] or existing.get("hdf5_file")
+                    entries[entry["run_id"]] = entry
+                else:
+                    existing["hdf5_file"] = existing.get("hdf5_file") or entry["hdf5_file"]
+
+        indexed = self.record(entries.values())
+        logger.info(f"Catalog backfill of {directory}: {indexed} runs, {len(errors)} unreadable files")
+        return {
+            "directory": directory,
+            "indexed": indexed,
+            "errors": errors,
+            "duration": time.perf_counter() - start
+        }
+
+
+def _day_start(date: str) -> float:
+    return time.mktime(time.strptime(date, "%Y-%m-%d"))
+
+
+def catalog_entry(run_id: str, settings: Dict[str, Any], **values: Any) -> Dict[str, Any]:
+    """Catalog fields derived from a run's settings"""
+    points = settings.get("points") or []
+    positions = settings.get("mux_positions") or (
+        [settings["mux_position"]] if settings.get("mux_position") is not None else [])
+    return {
+        "run_id": run_id,
+        "started_at": run_started_at(run_id),
+        "sample": settings.get("sample"),
+        "detector": settings.get("detector"),
+        "wn_min": min(points) if points else None,
+        "wn_max": max(points) if points else None,
+        "num_points": len(points),
+        "mux_positions": positions,
+        **values
+    }
+
+
+def _entry_from_jsonl(path: str) -> Optional[Dict[str, Any]]:
+    records = read_run(path)
+    header = next((r for r in records if r.get("type") == "header"), None)
+    if header is None or "run_id" not in header:
+        return None
+    footers = [r for r in records if r.get("type") == "footer"]
+    points = sum(1 for r in records if r.get("type") == "point")
+    hdf5_file = os.path.splitext(path)[0] + ".h5"
+    settings = header.get("settings", {})
+    entry = catalog_entry(
+        header["run_id"], settings,
+        state=footers[-1].get("state") if footers else "interrupted",
+        completed=points,
+        settings_hash=header.get("settings_hash") or settings_hash(settings, {}),
+        data_file=path,
+        hdf5_file=hdf5_file if os.path.exists(hdf5_file) else None
+    )
+    entry["started_at"] = entry["started_at"] or os.path.getmtime(path)
+    return entry
+
+
+def _entry_from_hdf5(path: str) -> Optional[Dict[str, Any]]:
+    import h5py
+
+    with h5py.File(path, "r", libver="latest", swmr=True) as f:
+        run_id = f.attrs.get("run_id")
+        if run_id is None:
+            return None
+        settings = json.loads(f.attrs.get("settings", "{}"))
+        state = f.attrs.get("state")
+        stored_hash = f.attrs.get("settings_hash")
+        points = f["points"].shape[0] if "points" in f else 0
+    entry = catalog_entry(
+        str(run_id), settings,
+        state=str(state) if state is not None else None,
+        completed=points,
+        settings_hash=str(stored_hash) if stored_hash is not None else settings_hash(settings, {}),
+        hdf5_file=path
+    )
+    entry["started_at"] = entry["started_at"] or os.path.getmtime(path)
+    return entry
@@ -0,0 +1,155 @@
+"""
+Experiment Checkpoints
+Append-only progress log that lets an interrupted run resume without re-measuring points
+"""
+
+import json
+import os
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+from .storage import RUNS_DIR
+
+logger = logging.getLogger(__name__)
+
+# (repeat, index into the run's scan points, MUX position)
+Step = Tuple[int, int, Optional[int]]
+
+
+def checkpoint_path(run_id: str, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or RUNS_DIR, f"{run_id}.checkpoint.jsonl")
+
+
+class CheckpointWriter:
+    """
+    Appends one small record per event to ``<run_id>.checkpoint.jsonl``
+
+    ``header`` holds the run settings, ``plan`` records add scan points and
+    execution steps (adaptive runs add one per round), ``checkpoint``
+    records mark a completed point with the run-file offset it ends at, and
+    ``end`` marks a run that finished, failed or was stopped. Records are
+    a few hundred bytes and written by the persist stage, never by the
+    stages on the hardware path.
+    """
+
+    def __init__(self, run_id: str, directory: Optional[str] = None):
+        self.run_id = run_id
+        self.path = checkpoint_path(run_id, directory)
+        self._file = None
+
+    def open(self, record: Optional[Dict[str, Any]] = None) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if record is not None:
+            self._write(record)
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def write_plan(self, points: List[float], steps: List[Step], strategy: Optional[str] = None) -> None:
+        self._write({"type": "plan", "points": points, "steps": [list(s) for s in steps], "strategy": strategy})
+
+    def write_checkpoint(self, completed: int, data_offset: int, device_state: Dict[str, Any],
+                         elapsed: float) -> None:
+        self._write({
+            "type": "checkpoint",
+            "completed": completed,
+            "data_offset": data_offset,
+            "device_state": device_state,
+            "elapsed": elapsed
+        })
+
+    def close(self, state: Optional[str] = None) -> None:
+        if self._file is None:
+            return
+        if state is not None:
+            self._write({"type": "end", "state": state})
+        self._file.close()
+        self._file = None
+
+
+@dataclass
+class Checkpoint:
+    """State of a run reconstructed from its checkpoint log"""
+    run_id: str
+    settings: Dict[str, Any]
+    points: List[float] = field(default_factory=list)
+    steps: List[Step] = field(default_factory=list)
+    strategy: Optional[str] = None
+    completed: int = 0
+    data_offset: int = 0
+    device_state: Dict[str, Any] = field(default_factory=dict)
+    elapsed: float = 0.0
+    state: Optional[str] = None  # last "end" state; None if the process died mid-run
+
+    @property
+    def resumable(self) -> bool:
+        return self.state != "completed"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "completed": self.completed,
+            "planned": len(self.steps),
+            "state": self.state,
+            "resumable": self.resumable,
+            "elapsed": self.elapsed,
+            "device_state": self.device_state
+        }
+
+
+def load_checkpoint(run_id: str, directory: Optional[str] = None) -> Checkpoint:
+    """Replay a checkpoint log; a torn final line is ignored"""
+    path = checkpoint_path(run_id, directory)
+    if not os.path.exists(path):
+        raise ValueError(f"No checkpoint for run {run_id}")
+
+    checkpoint: Optional[Checkpoint] = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping incomplete checkpoint record in {path}")
+                continue
+
+            kind = record.get("type")
+            if kind == "header":
+                checkpoint = Checkpoint(run_id, record["settings"], data_offset=record.get("data_offset", 0))
+            elif checkpoint is None:
+                continue
+            elif kind == "plan":
+                checkpoint.points.extend(record["points"])
+                checkpoint.steps.extend(tuple(s) for s in record["steps"])
+                checkpoint.strategy = record.get("strategy") or checkpoint.strategy
+            elif kind == "checkpoint":
+                checkpoint.completed = record["completed"]
+                checkpoint.data_offset = record["data_offset"]
+                checkpoint.device_state = record["device_state"]
+                checkpoint.elapsed = record["elapsed"]
+                checkpoint.state = None
+            elif kind == "end":
+                checkpoint.state = record["state"]
+            elif kind == "resume":
+                checkpoint.state = None
+
+    if checkpoint is None:
+        raise ValueError(f"Checkpoint for run {run_id} has no header")
+    return checkpoint
+
+
+def list_checkpoints(directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Summaries of every run with a checkpoint log, newest first"""
+    directory = directory or RUNS_DIR
+    if not os.path.isdir(directory):
+        return []
+    summaries = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith(".checkpoint.jsonl"):
+            try:
+                summaries.append(load_checkpoint(name[:-len(".checkpoint.jsonl")], directory).to_dict())
+            except (ValueError, OSError) as e:
+                logger.warning(f"Unreadable checkpoint {name}: {e}")
+    return summaries
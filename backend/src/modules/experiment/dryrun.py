@@ -0,0 +1,135 @@
+"""
+Experiment Dry Run
+Predicts a run's per-stage timeline from configured timings and measured device latencies
+"""
+
+import logging
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Used before the engine has measured a run
+DEFAULT_PROCESS_TIME = 0.002
+DEFAULT_PERSIST_TIME = 0.001
+
+
+@dataclass
+class StageCosts:
+    """Per-point costs of every pipeline stage, all in seconds"""
+    acquire_time: float  # integration time per point
+    settle_time: float = 0.0  # after every tune
+    point_delay: float = 0.0  # before every acquisition
+    mux_time: float = 0.0  # MUX move plus position_delay
+    delay_step_time: float = 0.0  # programming a QC9524 delay point
+    acquire_overhead: float = 0.0  # measured acquisition time minus integration time (< 0 in accelerated simulation)
+    process_time: float = DEFAULT_PROCESS_TIME
+    persist_time: float = DEFAULT_PERSIST_TIME
+
+    def to_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+def simulate_timeline(points: List[float], steps: List[Tuple[int, int, Optional[int]]], latency_model,
+                      qcl_lookup: Callable[[float], int], costs: StageCosts,
+                      delay_index: Optional[int] = None, start_wavenumber: Optional[float] = None,
+                      start_qcl: Optional[int] = None, start_position: Optional[int] = None,
+                      include_timeline: bool = False) -> Dict[str, Any]:
+    """
+    Replay the engine pipeline over ``steps`` without hardware
+
+    Follows the engine's scheduling: ``move`` of a point starts once
+    ``acquire`` of the previous point has released the bench, while
+    ``process`` and ``persist`` each run one point at a time behind it.
+    Tune times come from the MIRcat latency model.
+    """
+    wavenumber, qcl, position, delay = start_wavenumber, start_qcl, start_position, None
+    breakdown = {"tune": 0.0, "settle": 0.0, "mux": 0.0, "delay_step": 0.0, "point_delay": 0.0}
+    busy = {stage: [] for stage in ("move", "acquire", "process", "persist")}
+    timeline: List[Dict[str, Any]] = []
+    bench_free = process_free = persist_free = 0.0
+    tunes = moves = 0
+
+    for step, (repeat, index, mux) in enumerate(steps):
+        target = points[index]
+        move = costs.point_delay
+        breakdown["point_delay"] += costs.point_delay
+        if target != wavenumber:
+            target_qcl = qcl_lookup(target)
+            tune = latency_model.predict(wavenumber, target, qcl, target_qcl)
+            move += tune + costs.settle_time
+            breakdown["tune"] += tune
+            breakdown["settle"] += costs.settle_time
+            wavenumber, qcl = target, target_qcl
+            tunes += 1
+        if mux is not None and mux != position:
+            move += costs.mux_time
+            breakdown["mux"] += costs.mux_time
+            position = mux
+            moves += 1
+        if delay_index is not None and delay != delay_index:
+            move += costs.delay_step_time
+            breakdown["delay_step"] += costs.delay_step_time
+            delay = delay_index
+        acquire = max(0.0, costs.acquire_time + costs.acquire_overhead)
+
+        move_start = bench_free
+        acquire_start = move_start + move
+        bench_free = acquire_start + acquire
+        process_start = max(bench_free, process_free)
+        process_free = process_start + costs.process_time
+        persist_start = max(process_free, persist_free)
+        persist_free = persist_start + costs.persist_time
+
+        for stage, duration in (("move", move), ("acquire", acquire),
+                                ("process", costs.process_time), ("persist", costs.persist_time)):
+            busy[stage].append(duration)
+        if include_timeline:
+            timeline.append({
+                "step": step,
+                "repeat": repeat,
+                "wavenumber": target,
+                "mux_position": mux,
+                "move": [move_start, acquire_start],
+                "acquire": [acquire_start, bench_free],
+                "process": [process_start, process_free],
+                "persist": [persist_start, persist_free]
+            })
+
+    total = persist_free
+    stages = {
+        stage: {
+            "total": sum(values),
+            "mean": sum(values) / len(values) if values else 0.0,
+            "max": max(values, default=0.0),
+            "utilization": sum(values) / total if total else 0.0
+        }
+        for stage, values in busy.items()
+    }
+    # move and acquire share the bench, so they form one serial chain (as in StageTimer.summary)
+    chains = {
+        "move+acquire": stages["move"]["total"] + stages["acquire"]["total"],
+        "process": stages["process"]["total"],
+        "persist": stages["persist"]["total"],
+    }
+    critical = max(chains, key=chains.get) if steps else None
+    if critical == "move+acquire":
+        bottleneck = "move" if stages["move"]["total"] > stages["acquire"]["total"] else "acquire"
+    else:
+        bottleneck = critical
+
+    result = {
+        "steps": len(steps),
+        "tunes": tunes,
+        "mux_moves": moves,
+        "total_time": total,
+        "stages": stages,
+        "move_breakdown": breakdown,
+        "chains": chains,
+        "critical_path": critical,
+        "bottleneck": bottleneck,
+        "costs": costs.to_dict()
+    }
+    if include_timeline:
+        result["timeline"] = timeline
+    return result
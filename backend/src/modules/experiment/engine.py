@@ -0,0 +1,1191 @@
+"""
+Experiment Engine
+Asyncio pipeline that overlaps tuning, acquisition, processing and persistence
+"""
+
+import asyncio
+import math
+import os
+import sqlite3
+import time
+import uuid
+import logging
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict, replace
+from typing import Optional, Dict, Any, List, Tuple
+import numpy as np
+import toml
+
+from ..daylight_mircat.utils import get_tuning_range
+from ...analysis import SpectralAxis
+from ...services import CalibrationSet, DeviceLeaseManager, device_session
+from .adaptive import AdaptiveSettings, coarse_grid, refine_points
+from .catalog import RunCatalog, catalog_entry, settings_hash
+from .checkpoint import Checkpoint, CheckpointWriter, Step, load_checkpoint
+from .dryrun import DEFAULT_PERSIST_TIME, DEFAULT_PROCESS_TIME, StageCosts, simulate_timeline
+from .hdf5 import HDF5RunWriter
+from .live import LiveSpectrum
+from .integration import (DeltaODAccumulator, IntegrationTarget, LockinAccumulator, shot_delta_od, snr,
+                          stop_reason)
+from .multisample import DEFAULT_MOVE_TIME, MultiSampleSchedule, PointCosts, plan_multisample
+from .planner import ScanPlan, plan_scan
+from .rejection import RejectionSettings, merge_counts, reject_shots
+from .storage import RunWriter, read_run
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("plan", "move", "acquire", "process", "persist")
+DETECTORS = ("picoscope", "lockin")
+
+# End-of-stream marker passed between stage queues
+_DONE = None
+
+
+class DeviceNotReady(ValueError):
+    """A device the run needs is not connected or set up yet; the same settings can start later"""
+
+
+@dataclass
+class ScanPoint:
+    """One point of the execution order"""
+    step: int  # position in execution order
+    repeat: int
+    index: int  # index into the requested point list
+    wavenumber: float
+    mux_position: Optional[int] = None
+    delay_index: Optional[int] = None  # point of the loaded QC9524 delay scan
+
+
+@dataclass
+class PointResult:
+    """Processed measurement of one scan point"""
+    point: ScanPoint
+    detector: str
+    signal: Optional[float]  # dOD (scope) or demodulated X in volts (lock-in)
+    stderr: Optional[float]
+    num_shots: int
+    delay: Optional[float] = None  # actual pump-probe delay, seconds
+    integration_time: Optional[float] = None  # seconds of data behind the point
+    stop_reason: Optional[str] = None  # why SNR-targeted accumulation stopped
+    timing: Dict[str, float] = field(default_factory=dict)
+    rejected: Optional[Dict[str, int]] = None  # shots dropped before averaging, per reason
+
+    @property
+    def snr(self) -> Optional[float]:
+        return snr(self.signal, self.stderr)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **asdict(self.point),
+            "detector": self.detector,
+            "signal": self.signal,
+            "stderr": self.stderr,
+            "num_shots": self.num_shots,
+            "delay": self.delay,
+            "integration_time": self.integration_time,
+            "snr": self.snr,
+            "stop_reason": self.stop_reason,
+            "rejected": self.rejected,
+            "timing": self.timing
+        }
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> "PointResult":
+        """Rebuild a result from a ``point`` record of a run file"""
+        point = ScanPoint(**{name: record.get(name) for name in ScanPoint.__dataclass_fields__})
+        return cls(point, record["detector"], record["signal"], record["stderr"], record["num_shots"],
+                   record.get("delay"), record.get("integration_time"), record.get("stop_reason"),
+                   record.get("timing", {}), record.get("rejected"))
+
+
+def point_summary(result: PointResult) -> Dict[str, Any]:
+    """Measured values of a point without its timing, for comparing a replayed run with the original"""
+    return {key: value for key, value in result.to_dict().items() if key != "timing"}
+
+
+@dataclass
+class RunSettings:
+    """Everything needed to execute one run"""
+    points: List[float]
+    sample: Optional[str] = None  # free-text sample name, indexed by the run catalog
+    repeats: int = 1
+    strategy: str = "auto"
+    detector: str = "picoscope"
+    integration_time: float = 1.0  # seconds per point
+    mux_position: Optional[int] = None
+    mux_positions: Optional[List[int]] = None  # several samples: scheduled by plan_multisample
+    mux_order: str = "auto"  # "auto", "interleaved" or "sequential"
+    delay_index: Optional[int] = None
+    settle_time: float = 0.5  # after a tune (laser_stabilization_time)
+    point_delay: float = 0.1  # before every acquisition (point_to_point_delay)
+    max_scan_time: Optional[float] = None
+    adaptive: Optional[AdaptiveSettings] = None  # refine a coarse grid over the range of ``points``
+    integration_target: Optional[IntegrationTarget] = None  # accumulate per point until the target is met
+    rejection: Optional[RejectionSettings] = None  # screen shots before averaging
+
+    @property
+    def screens_shots(self) -> bool:
+        return self.rejection is not None and self.rejection.enabled
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunSettings":
+        values = dict(data)
+        if values.get("adaptive") is not None:
+            values["adaptive"] = AdaptiveSettings(**values["adaptive"])
+        if values.get("integration_target") is not None:
+            values["integration_target"] = IntegrationTarget(**values["integration_target"])
+        if values.get("rejection") is not None:
+            values["rejection"] = RejectionSettings(**values["rejection"])
+        return cls(**values)
+
+
+@dataclass
+class ExperimentDevices:
+    """Controllers the engine drives; optional devices may be None"""
+    mircat: Any
+    arduino: Any = None
+    qc: Any = None
+    scope: Any = None
+    lockin: Any = None
+    ndyag: Any = None
+
+
+class StageTimer:
+    """
+    Busy and idle time of every pipeline stage
+
+    Busy time is spent doing the stage's work; wait time is spent blocked
+    on the previous stage (or, for ``move``, on the optical bench still
+    being used by ``acquire``).
+    """
+
+    def __init__(self):
+        self.busy: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.wait: Dict[str, float] = {stage: 0.0 for stage in STAGES}
+
+    @contextmanager
+    def measure(self, stage: str, record: Optional[Dict[str, float]] = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.busy[stage].append(duration)
+            if record is not None:
+                record[stage] = duration
+
+    @contextmanager
+    def waiting(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.wait[stage] += time.perf_counter() - start
+
+    def summary(self, wall_time: float) -> Dict[str, Any]:
+        stages = {}
+        for stage in STAGES:
+            samples = self.busy[stage]
+            total = sum(samples)
+            stages[stage] = {
+                "count": len(samples),
+                "total": total,
+                "mean": total / len(samples) if samples else 0.0,
+                "max": max(samples, default=0.0),
+                "wait": self.wait[stage],
+                "utilization": total / wall_time if wall_time else 0.0
+            }
+
+        # move and acquire share the optical bench, so they form one serial chain
+        chains = {
+            "move+acquire": stages["move"]["total"] + stages["acquire"]["total"],
+            "process": stages["process"]["total"],
+            "persist": stages["persist"]["total"],
+        }
+        serial_time = sum(s["total"] for s in stages.values())
+        return {
+            "wall_time": wall_time,
+            "serial_time": serial_time,
+            "overlap_saving": max(0.0, serial_time - wall_time),
+            "critical_path": max(chains, key=chains.get) if any(chains.values()) else None,
+            "chains": chains,
+            "stages": stages
+        }
+
+
+class ExperimentEngine:
+    """
+    Pipelined pump-probe scan executor
+
+    Stages run as concurrent tasks connected by queues::
+
+        plan -> move (MIRcat/MUX/QC) -> acquire (PicoScope/HF2LI) -> process -> persist
+
+    ``move`` for point N+1 starts as soon as ``acquire`` for point N has
+    released the optical bench, so tuning overlaps processing and writing of
+    the previous point. Blocking device calls run in worker threads.
+
+    Every persisted point is followed by a checkpoint record (see
+    ``checkpoint.py``), so a stopped, failed or killed run can be resumed
+    with :meth:`resume` without re-measuring finished points. Runs are
+    recorded in ``catalog`` and hold exclusive ``leases`` on their devices
+    when those are given. With a ``calibration``, PicoScope blocks are
+    linearized before processing and results carry calibrated spectra.
+    """
+
+    def __init__(self, devices: ExperimentDevices, config_path: str = None,
+                 runs_dir: Optional[str] = None, catalog: Optional[RunCatalog] = None,
+                 leases: Optional[DeviceLeaseManager] = None,
+                 calibration: Optional[CalibrationSet] = None):
+        self.devices = devices
+        self.config = self._load_config(config_path)
+        self.runs_dir = runs_dir
+        self.catalog = catalog
+        self.leases = leases
+        self.calibration = calibration
+
+        self.state = "idle"
+        self.run_id: Optional[str] = None
+        self.settings: Optional[RunSettings] = None
+        self.plan: Optional[ScanPlan] = None
+        self.schedule: Optional[MultiSampleSchedule] = None
+        self.total_steps: Optional[int] = None
+        self.scan_points: List[float] = []  # every wavenumber of the run; ScanPoint.index refers here
+        self._axis: Optional[Tuple[Tuple[str, int], SpectralAxis]] = None  # reported spectral axis, per run
+        self.steps: List[Step] = []  # execution order; ScanPoint.step refers here
+        self.adaptive_rounds: List[Dict[str, Any]] = []
+        self._progress: Optional[asyncio.Event] = None
+        self.results: List[PointResult] = []
+        self.error: Optional[str] = None
+        self.timer = StageTimer()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.writer: Optional[RunWriter] = None
+        self.checkpoints: Optional[CheckpointWriter] = None
+        self.hdf5: Optional[HDF5RunWriter] = None  # when data_format = "HDF5"
+        self.live = LiveSpectrum()  # incremental point updates for UI clients
+        self._resume: Optional[Checkpoint] = None
+        self._elapsed_before = 0.0  # run time of earlier sessions of a resumed run
+        # Measured per-point costs kept across runs, for dry-run estimates
+        self.latencies: Dict[str, deque] = {
+            name: deque(maxlen=200) for name in ("acquire_overhead", "process", "persist")
+        }
+        self._task: Optional[asyncio.Task] = None
+        self._mux_position: Optional[int] = None
+        self._delay_index: Optional[int] = None
+
+    def _load_config(self, config_path: str = None) -> Dict[str, Any]:
+        """Load configuration from TOML file"""
+        if config_path is None:
+            # Default to hardware_configuration.toml in project root
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+            config_path = os.path.join(project_root, "hardware_configuration.toml")
+
+        try:
+            with open(config_path, 'r') as f:
+                config = toml.load(f)
+            return config.get('experiment', {})
+        except Exception as e:
+            logger.error(f"Failed to load configuration: {e}")
+            return {}
+
+    # --- settings --------------------------------------------------------
+
+    def default_points(self) -> List[float]:
+        """``default_scan_points`` wavenumbers over ``default_scan_range`` (microns), clipped to the MIRcat range"""
+        scan_range = self.config.get('default_scan_range', [6.0, 10.0])
+        num_points = int(self.config.get('default_scan_points', 100))
+        low, high = get_tuning_range(self.devices.mircat.config)
+        start, stop = SpectralAxis(scan_range, "microns").span("cm1")
+        start, stop = max(low, start), min(high, stop)
+        if start > stop:
+            raise ValueError(f"default_scan_range {scan_range} um is outside the MIRcat range {low}-{high} cm-1")
+        return np.round(np.linspace(start, stop, num_points), 2).tolist()
+
+    def build_settings(self, points: Optional[List[float]] = None, **overrides: Any) -> RunSettings:
+        """Fill unspecified run settings from ``[experiment]``"""
+        timing = self.config.get('timing', {})
+        safety = self.config.get('safety', {})
+        rejection = self.config.get('outlier_rejection')
+        values = {
+            "points": points if points else self.default_points(),
+            "integration_time": self.config.get('default_integration_time', 1.0),
+            "settle_time": timing.get('laser_stabilization_time', 0.5),
+            "point_delay": timing.get('point_to_point_delay', 0.1),
+            "max_scan_time": safety.get('max_scan_time'),
+            "rejection": RejectionSettings(**rejection) if rejection is not None else None,
+        }
+        values.update({key: value for key, value in overrides.items() if value is not None})
+        return RunSettings(**values)
+
+    def validate(self, settings: RunSettings, connected: bool = True) -> None:
+        """
+        Raise ValueError if the run cannot start with the connected devices
+
+        With ``connected=False`` only the settings are checked (dry runs).
+        """
+        devices = self.devices
+        if not settings.points:
+            raise ValueError("No scan points")
+        if settings.detector not in DETECTORS:
+            raise ValueError(f"Unknown detector '{settings.detector}', expected one of {DETECTORS}")
+        if settings.integration_time <= 0:
+            raise ValueError("integration_time must be positive")
+        if settings.integration_target is not None:
+            settings.integration_target.validate()
+        if settings.rejection is not None:
+            settings.rejection.validate()
+        if connected and not devices.mircat.is_connected:
+            raise DeviceNotReady("MIRcat not connected")
+        devices.mircat.check_axis(SpectralAxis(settings.points))
+        detector = devices.scope if settings.detector == "picoscope" else devices.lockin
+        if connected and detector is None:
+            raise ValueError(f"Detector '{settings.detector}' not available")
+        if connected and not detector.is_connected:
+            raise DeviceNotReady(f"Detector '{settings.detector}' not connected")
+        positions = settings.mux_positions or ([settings.mux_position] if settings.mux_position is not None else [])
+        if positions:
+            if connected and devices.arduino is None:
+                raise ValueError("MUX position requested but no Arduino available")
+            if connected and not devices.arduino.is_connected:
+                raise DeviceNotReady("MUX position requested but Arduino not connected")
+            arduino_config = devices.arduino.config if devices.arduino is not None else {}
+            num_positions = arduino_config.get('parameters', {}).get('num_positions', 10)
+            invalid = [p for p in positions if not 1 <= p <= num_positions]
+            if invalid:
+                raise ValueError(f"MUX position(s) {invalid} outside 1-{num_positions}")
+        if settings.adaptive is not None:
+            if settings.repeats != 1 or settings.mux_positions:
+                raise ValueError("Adaptive scans support a single sample and one repeat")
+            if len(set(settings.points)) < 2:
+                raise ValueError("Adaptive scans need at least two points to define the range")
+        if settings.delay_index is not None:
+            table = devices.qc.timing_table if devices.qc is not None else None
+            if table is None and devices.qc is not None:
+                raise DeviceNotReady("delay_index requires a loaded QC9524 delay scan")
+            if table is None or not 0 <= settings.delay_index < len(table.points):
+                raise ValueError("delay_index requires a loaded QC9524 delay scan")
+
+    # --- run control -----------------------------------------------------
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def required_devices(self, settings: RunSettings) -> List[str]:
+        """Devices a run drives, and so must lease"""
+        devices = ["mircat", "scope" if settings.detector == "picoscope" else "lockin"]
+        if settings.mux_positions or settings.mux_position is not None:
+            devices.append("arduino")
+        if settings.delay_index is not None:
+            devices.append("qc")
+        return devices
+
+    def start(self, settings: RunSettings, holder: Optional[str] = None) -> str:
+        """Validate and launch a run in the background; returns the run id"""
+        if self.is_running:
+            raise ValueError("An experiment is already running")
+        self.validate(settings)
+        return self._launch(settings, self._new_run_id(), holder)
+
+    async def run(self, settings: RunSettings, holder: Optional[str] = None) -> Dict[str, Any]:
+        """Validate and execute a run to completion; returns the status"""
+        if self.is_running:
+            raise ValueError("An experiment is already running")
+        self.validate(settings)
+        self._launch(settings, self._new_run_id(), holder)
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            if not self._task.cancelled():
+                raise
+        return self.get_status()
+
+    def resume(self, run_id: str, holder: Optional[str] = None) -> str:
+        """Continue a stopped, failed or interrupted run from its last checkpoint"""
+        if self.is_running:
+            raise ValueError("An experiment is already running")
+        checkpoint = load_checkpoint(run_id, self.runs_dir)
+        if not checkpoint.resumable:
+            raise ValueError(f"Run {run_id} already completed")
+        settings = RunSettings.from_dict(checkpoint.settings)
+        self.validate(settings)
+        self._launch(settings, run_id, holder, checkpoint)
+        logger.info(f"Resuming experiment {run_id} after {checkpoint.completed} points")
+        return self.run_id
+
+    def _launch(self, settings: RunSettings, run_id: str, holder: Optional[str] = None,
+                checkpoint: Optional[Checkpoint] = None) -> str:
+        """Lease the run's devices (raises LeaseUnavailable) and start it; the lease ends with the run"""
+        lease = None
+        if self.leases is not None:
+            lease = self.leases.acquire(holder or f"run {run_id}", self.required_devices(settings))
+        self._reset(settings, run_id)
+        if checkpoint is not None:
+            self._resume = checkpoint
+            self._elapsed_before = checkpoint.elapsed
+        self._task = asyncio.get_running_loop().create_task(self._execute())
+        if lease is not None:
+            self._task.add_done_callback(lambda _: self.leases.release(lease))
+        return run_id
+
+    @staticmethod
+    def _new_run_id() -> str:
+        return time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+
+    async def stop(self) -> None:
+        """Cancel the running experiment; completed points stay on disk"""
+        if self.is_running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _reset(self, settings: RunSettings, run_id: str) -> None:
+        self.run_id = run_id
+        self.settings = settings
+        self.plan = None
+        self.schedule = None
+        self.total_steps = None
+        self.scan_points = []
+        self.steps = []
+        self._resume = None
+        self._elapsed_before = 0.0
+        self.adaptive_rounds = []
+        self._progress = asyncio.Event()
+        self.results = []
+        self.error = None
+        self.timer = StageTimer()
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self._mux_position = None
+        self._delay_index = None
+        self.state = "running"
+
+    async def _execute(self) -> None:
+        settings = self.settings
+        config_hash = self.config_hash()
+        self.writer = RunWriter(self.run_id, self.runs_dir)
+        self.checkpoints = CheckpointWriter(self.run_id, self.runs_dir)
+        self.hdf5 = None
+        tasks: List[asyncio.Task] = []
+
+        try:
+            # Opening the files can fail too: inside the try, so the run still ends as failed
+            await self._open_storage(settings, config_hash)
+            await self._catalog("record", [catalog_entry(
+                self.run_id, settings.to_dict(),
+                state=self.state,
+                completed=len(self.results),
+                settings_hash=config_hash,
+                data_file=self.writer.path,
+                hdf5_file=self.hdf5.path if self.hdf5 is not None else None
+            )])
+
+            # A recorded device session carries the runs, so a replay can re-execute them
+            device_session.note("run", {"run_id": self.run_id, "settings": settings.to_dict(),
+                                        "devices": [name for name, device in vars(self.devices).items()
+                                                    if device is not None],
+                                        "resumed": self._resume is not None})
+
+            queues = {stage: asyncio.Queue() for stage in STAGES[1:]}
+            bench = asyncio.Semaphore(1)
+            tasks = [
+                asyncio.create_task(self._plan_stage(queues["move"]), name="plan"),
+                asyncio.create_task(self._move_stage(queues["move"], queues["acquire"], bench), name="move"),
+                asyncio.create_task(self._acquire_stage(queues["acquire"], queues["process"], bench),
+                                    name="acquire"),
+                asyncio.create_task(self._process_stage(queues["process"], queues["persist"]), name="process"),
+                asyncio.create_task(self._persist_stage(queues["persist"]), name="persist"),
+            ]
+
+            done, _ = await asyncio.wait(tasks, timeout=settings.max_scan_time,
+                                         return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+            if len(done) < len(tasks):
+                raise TimeoutError(f"Run exceeded max_scan_time ({settings.max_scan_time} s)")
+            self.state = "completed"
+        except asyncio.CancelledError:
+            self.state = "stopped"
+            raise
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logger.error(f"Experiment {self.run_id} failed: {e}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.finished_at = time.perf_counter()
+            footer = {"state": self.state, "error": self.error, "timing": self.get_timing()}
+            await asyncio.to_thread(self.writer.close, footer)
+            await asyncio.to_thread(self.checkpoints.close, self.state)
+            if self.hdf5 is not None:
+                await asyncio.to_thread(self.hdf5.close, {"state": self.state, "error": self.error or ""})
+            await self._catalog("update", self.run_id, state=self.state, completed=len(self.results))
+            device_session.note("run_end", {"run_id": self.run_id, "state": self.state, "error": self.error,
+                                            "elapsed": self.finished_at - self.started_at,
+                                            "points": [point_summary(r) for r in self.results]})
+            logger.info(f"Experiment {self.run_id} {self.state}: {len(self.results)} points")
+
+    async def _open_storage(self, settings: RunSettings, config_hash: str) -> None:
+        """Open (or, on resume, cut back and reopen) the run file, the checkpoint log and the HDF5 file"""
+        if self._resume is None:
+            header = {"run_id": self.run_id, "settings": settings.to_dict(), "settings_hash": config_hash}
+            await asyncio.to_thread(self.writer.open, header)
+            await asyncio.to_thread(self.checkpoints.open, {
+                "type": "header",
+                "run_id": self.run_id,
+                "settings": settings.to_dict(),
+                "data_offset": self.writer.offset
+            })
+        else:
+            self.results = await asyncio.to_thread(self._restore, self._resume)
+            await asyncio.to_thread(self.writer.open, {"run_id": self.run_id, "completed": len(self.results)},
+                                    "resume")
+            await asyncio.to_thread(self.checkpoints.open, {"type": "resume", "completed": len(self.results)})
+        self.live.reset(self.run_id, self.results)
+        if str(self.config.get('data_format', '')).upper() == "HDF5":
+            storage = self.config.get('storage', {})
+            hdf5 = HDF5RunWriter(
+                self.run_id, self.runs_dir,
+                compression=storage.get('compression', 'gzip'),
+                compression_level=storage.get('compression_level', 4),
+                chunk_points=storage.get('chunk_points', 256),
+                save_raw=storage.get('save_raw', True)
+            )
+            await asyncio.to_thread(hdf5.open, {"run_id": self.run_id, "settings": settings.to_dict(),
+                                                "settings_hash": config_hash},
+                                    len(self.results) if self._resume is not None else None)
+            self.hdf5 = hdf5
+            # Restored points the writer thread had not flushed before the crash (their raw traces are lost)
+            for result in self.results[hdf5.points:]:
+                hdf5.submit({"type": "point", **result.to_dict()})
+
+    def config_hash(self) -> str:
+        """Hash of the run settings and every device's configuration (see ``catalog.settings_hash``)"""
+        devices = {name: getattr(device, 'config', None)
+                   for name, device in vars(self.devices).items() if device is not None}
+        return settings_hash(self.settings.to_dict(), devices)
+
+    async def _catalog(self, method: str, *args: Any, **kwargs: Any) -> None:
+        """Record run metadata; a catalog failure never stops a run"""
+        if self.catalog is None:
+            return
+        try:
+            await asyncio.to_thread(getattr(self.catalog, method), *args, **kwargs)
+        except sqlite3.Error as e:
+            logger.warning(f"Run catalog update for {self.run_id} failed: {e}")
+
+    def _restore(self, checkpoint: Checkpoint) -> List[PointResult]:
+        """Cut the run file back to the checkpoint and reload the points it covers"""
+        self.writer.truncate(checkpoint.data_offset)
+        if not os.path.exists(self.writer.path):
+            return []
+        records = [r for r in read_run(self.writer.path) if r.get("type") == "point"]
+        if len(records) < checkpoint.completed:
+            raise ValueError(f"Run file {self.writer.path} holds {len(records)} of "
+                             f"{checkpoint.completed} checkpointed points")
+        return [PointResult.from_dict(r) for r in records[:checkpoint.completed]]
+
+    def _elapsed(self) -> float:
+        """Run time including earlier sessions of a resumed run"""
+        return self._elapsed_before + time.perf_counter() - self.started_at
+
+    # --- stages ----------------------------------------------------------
+
+    def point_costs(self, settings: RunSettings) -> PointCosts:
+        """Per-point time costs from the settings and measured MUX move time"""
+        arduino = self.devices.arduino
+        move_time = arduino.mean_move_time() if arduino is not None else None
+        position_delay = arduino.config.get('parameters', {}).get('position_delay', 0.0) if arduino is not None else 0.0
+        return PointCosts(
+            acquisition_time=settings.integration_time,
+            settle_time=settings.settle_time,
+            point_delay=settings.point_delay,
+            mux_move_time=move_time if move_time is not None else DEFAULT_MOVE_TIME,
+            position_delay=position_delay
+        )
+
+    def plan_run(self, settings: RunSettings) -> Tuple[ScanPlan, List[Tuple[int, int, Optional[int]]],
+                                                        Optional[MultiSampleSchedule]]:
+        """Return the scan plan and its (repeat, index, MUX position) steps"""
+        mircat = self.devices.mircat
+        if settings.mux_positions:
+            schedule = plan_multisample(
+                settings.points,
+                settings.mux_positions,
+                mircat.latency_model,
+                mircat.qcl_for_wavenumber,
+                self.point_costs(settings),
+                repeats=settings.repeats,
+                mode=settings.mux_order,
+                strategy=settings.strategy,
+                start_wavenumber=mircat.current_wavenumber,
+                start_qcl=mircat.current_qcl
+            )
+            return schedule.plan, schedule.steps, schedule
+
+        plan = plan_scan(
+            settings.points,
+            mircat.latency_model,
+            mircat.qcl_for_wavenumber,
+            repeats=settings.repeats,
+            strategy=settings.strategy,
+            start_wavenumber=mircat.current_wavenumber,
+            start_qcl=mircat.current_qcl
+        )
+        return plan, [(repeat, index, settings.mux_position) for repeat, index in plan.order], None
+
+    def _measured(self, name: str, default: float) -> float:
+        values = self.latencies[name]
+        return sum(values) / len(values) if values else default
+
+    def stage_costs(self, settings: RunSettings) -> StageCosts:
+        """Per-point stage costs from the settings and measured latencies"""
+        point = self.point_costs(settings)
+        qc = self.devices.qc
+        target = settings.integration_target
+        return StageCosts(
+            acquire_time=target.max_time if target is not None else settings.integration_time,
+            settle_time=settings.settle_time,
+            point_delay=settings.point_delay,
+            mux_time=point.mux_time,
+            delay_step_time=qc.get_stats()["mean_sync_time"] if qc is not None else 0.0,
+            acquire_overhead=self._measured("acquire_overhead", 0.0),
+            process_time=self._measured("process", DEFAULT_PROCESS_TIME),
+            persist_time=self._measured("persist", DEFAULT_PERSIST_TIME)
+        )
+
+    def dry_run(self, settings: RunSettings, include_timeline: bool = False) -> Dict[str, Any]:
+        """
+        Predict a run's duration, per-stage timeline and bottleneck without hardware
+
+        Adaptive runs are estimated as a uniform grid of ``max_points``
+        (an upper bound); SNR-targeted runs at ``max_time`` per point, with
+        the ``min_time`` total as ``best_case_time``.
+        """
+        self.validate(settings, connected=False)
+        notes = []
+        if settings.adaptive is not None:
+            adaptive = settings.adaptive
+            grid = coarse_grid(min(settings.points), max(settings.points),
+                               replace(adaptive, coarse_points=adaptive.max_points))
+            settings = replace(settings, points=grid, adaptive=None)
+            notes.append(f"Adaptive run estimated as {len(grid)} points (max_points), an upper bound")
+
+        mircat = self.devices.mircat
+        plan, steps, schedule = self.plan_run(settings)
+        costs = self.stage_costs(settings)
+
+        def simulate(costs: StageCosts, timeline: bool) -> Dict[str, Any]:
+            return simulate_timeline(plan.points, steps, mircat.latency_model, mircat.qcl_for_wavenumber, costs,
+                                     delay_index=settings.delay_index,
+                                     start_wavenumber=mircat.current_wavenumber, start_qcl=mircat.current_qcl,
+                                     start_position=self._mux_position, include_timeline=timeline)
+
+        result = simulate(costs, include_timeline)
+        if settings.integration_target is not None:
+            best = simulate(replace(costs, acquire_time=settings.integration_target.min_time), False)
+            result["best_case_time"] = best["total_time"]
+            notes.append("SNR-targeted points estimated at max_time")
+        if not self.latencies["process"]:
+            notes.append("No measured process/persist times yet; using defaults")
+
+        limit = settings.max_scan_time
+        result.update({
+            "strategy": plan.strategy,
+            "mux_order": schedule.mode if schedule is not None else None,
+            "max_scan_time": limit,
+            "fits": limit is None or result["total_time"] <= limit,
+            "notes": notes
+        })
+        return result
+
+    async def _plan_stage(self, out: asyncio.Queue) -> None:
+        settings = self.settings
+        resume = self._resume
+        if resume is not None:
+            # Replay the checkpointed plan from the first unfinished step
+            self.scan_points = list(resume.points)
+            self.steps = list(resume.steps)
+            await self._emit(out, len(self.results))
+            if settings.adaptive is None:
+                self.total_steps = len(self.steps)
+                await out.put(_DONE)
+                return
+
+        if settings.adaptive is not None:
+            await self._plan_adaptive(out)
+            return
+
+        with self.timer.measure("plan"):
+            self.plan, steps, self.schedule = self.plan_run(settings)
+            self.scan_points = self.plan.points
+            self.steps = list(steps)
+            self.total_steps = len(steps)
+        await asyncio.to_thread(self.checkpoints.write_plan, self.scan_points, self.steps, self.plan.strategy)
+        await self._emit(out, 0)
+        await out.put(_DONE)
+
+    async def _emit(self, out: asyncio.Queue, start: int) -> None:
+        """Queue ``self.steps[start:]`` for the move stage"""
+        delay_index = self.settings.delay_index
+        for step in range(start, len(self.steps)):
+            repeat, index, position = self.steps[step]
+            await out.put(ScanPoint(step, repeat, index, self.scan_points[index], position, delay_index))
+
+    async def _plan_adaptive(self, out: asyncio.Queue) -> None:
+        """
+        Measure a coarse grid, then keep adding points where the spectrum bends
+
+        Each round is planned for minimum tuning time and fed through the
+        pipeline; the next round is chosen once its results are persisted.
+        """
+        settings = self.settings
+        adaptive = settings.adaptive
+        mircat = self.devices.mircat
+        # A resumed run first finishes the round already queued by _plan_stage
+        new_points = [] if self.steps else coarse_grid(min(settings.points), max(settings.points), adaptive)
+
+        for round_index in range(adaptive.max_rounds + 1):
+            round_start = time.perf_counter()
+            first_step = len(self.steps)
+            if new_points:
+                with self.timer.measure("plan"):
+                    self.plan = plan_scan(new_points, mircat.latency_model, mircat.qcl_for_wavenumber,
+                                          strategy=settings.strategy,
+                                          start_wavenumber=mircat.current_wavenumber,
+                                          start_qcl=mircat.current_qcl)
+                    offset = len(self.scan_points)
+                    self.scan_points.extend(self.plan.points)
+                    steps = [(0, offset + index, settings.mux_position) for _, index in self.plan.order]
+                await asyncio.to_thread(self.checkpoints.write_plan, self.plan.points, steps, self.plan.strategy)
+                self.steps.extend(steps)
+                await self._emit(out, first_step)
+            measured = len(self.steps) - first_step
+
+            with self.timer.waiting("plan"):
+                while len(self.results) < len(self.steps):
+                    self._progress.clear()
+                    await self._progress.wait()
+
+            with self.timer.measure("plan"):
+                budget = adaptive.max_points - len(self.scan_points)
+                if adaptive.time_budget is not None and measured:
+                    # Stop before a round that would overrun the time budget
+                    per_point = (time.perf_counter() - round_start) / measured
+                    remaining = adaptive.time_budget - self._elapsed()
+                    budget = min(budget, int(remaining / per_point) if per_point > 0 else budget)
+                valid = [r for r in self.results if r.signal is not None]
+                new_points = refine_points(
+                    [r.point.wavenumber for r in valid],
+                    [r.signal for r in valid],
+                    adaptive,
+                    stderr=[r.stderr for r in valid],
+                    budget=budget
+                ) if budget > 0 else []
+                new_points = [p for p in new_points if p not in self.scan_points]
+
+            self.adaptive_rounds.append({
+                "round": round_index,
+                "measured": measured,
+                "total_points": len(self.scan_points),
+                "next_points": len(new_points),
+                "duration": time.perf_counter() - round_start
+            })
+            if not new_points:
+                break
+
+        self.total_steps = len(self.steps)
+        await out.put(_DONE)
+
+    async def _move_stage(self, inbox: asyncio.Queue, out: asyncio.Queue,
+                          bench: asyncio.Semaphore) -> None:
+        while True:
+            with self.timer.waiting("move"):
+                point = await inbox.get()
+                if point is _DONE:
+                    await out.put(_DONE)
+                    return
+                # The bench is released by acquire once point N has been captured
+                await bench.acquire()
+
+            timing: Dict[str, float] = {}
+            with self.timer.measure("move", timing):
+                settle = await asyncio.to_thread(self._move, point)
+                if settle:
+                    await asyncio.sleep(device_session.scaled(settle))
+            await out.put((point, timing))
+
+    def _move(self, point: ScanPoint) -> float:
+        """Bring the hardware to ``point``; returns the settling time required"""
+        devices = self.devices
+        settle = self.settings.point_delay
+
+        if devices.mircat.current_wavenumber != point.wavenumber:
+            if not devices.mircat.tune_to_wavenumber(point.wavenumber):
+                raise RuntimeError(f"Failed to tune MIRcat to {point.wavenumber} cm-1")
+            settle += self.settings.settle_time
+
+        if point.mux_position is not None and point.mux_position != self._mux_position:
+            if not devices.arduino.set_mux_position(point.mux_position):
+                raise RuntimeError(f"Failed to set MUX position {point.mux_position}")
+            self._mux_position = point.mux_position
+            settle += devices.arduino.config.get('parameters', {}).get('position_delay', 0.0)
+
+        if point.delay_index is not None and point.delay_index != self._delay_index:
+            if not devices.qc.step_delay_scan(point.delay_index):
+                raise RuntimeError(f"Failed to program delay scan point {point.delay_index}")
+            self._delay_index = point.delay_index
+
+        return settle
+
+    async def _acquire_stage(self, inbox: asyncio.Queue, out: asyncio.Queue,
+                             bench: asyncio.Semaphore) -> None:
+        while True:
+            with self.timer.waiting("acquire"):
+                item = await inbox.get()
+            if item is _DONE:
+                await out.put(_DONE)
+                return
+
+            point, timing = item
+            try:
+                with self.timer.measure("acquire", timing):
+                    raw = await asyncio.to_thread(self._acquire, point)
+            finally:
+                bench.release()
+            integrated = raw["accumulated"]["integration_time"] if "accumulated" in raw \
+                else self.settings.integration_time
+            self.latencies["acquire_overhead"].append(timing["acquire"] - integrated)
+            await out.put((point, timing, raw))
+
+    def _point_delay(self, point: ScanPoint) -> Optional[float]:
+        if point.delay_index is None:
+            return None
+        return self.devices.qc.timing_table.points[point.delay_index].actual_delay
+
+    def _pump_mask(self, num_shots: int) -> np.ndarray:
+        """Which probe shots are pumped, from the running Nd:YAG pattern (alternate shots otherwise)"""
+        ndyag = self.devices.ndyag
+        if ndyag is not None:
+            try:
+                pattern = ndyag.pattern or ndyag.compile_pattern("alternate")
+                if pattern.spacing:
+                    return np.asarray(pattern.pump_mask(num_shots), dtype=bool)
+            except ValueError:
+                pass
+        return np.arange(num_shots) % 2 == 0
+
+    def _mask_period(self) -> int:
+        """Probe shots per repetition of the pump pattern"""
+        ndyag = self.devices.ndyag
+        if ndyag is not None:
+            try:
+                pattern = ndyag.pattern or ndyag.compile_pattern("alternate")
+                if pattern.spacing:
+                    return pattern.spacing
+            except ValueError:
+                pass
+        return 2
+
+    def _acquire(self, point: ScanPoint) -> Dict[str, Any]:
+        settings = self.settings
+        delay = self._point_delay(point)
+        if settings.integration_target is not None:
+            return self._acquire_to_target(point, delay)
+
+        if settings.detector == "picoscope":
+            scope = self.devices.scope
+            num_shots = max(2, int(round(settings.integration_time * scope.trigger_rate)))
+            mask = self._pump_mask(num_shots)
+            block = scope.acquire_block(num_shots, pump_mask=mask, wavenumber=point.wavenumber, delay=delay)
+            if block is None:
+                raise RuntimeError(f"PicoScope acquisition failed at {point.wavenumber} cm-1")
+            return {"block": block, "mask": mask, "delay": delay, "valid": self._shot_validity(block.shape[0])}
+
+        samples = self.devices.lockin.read_samples(settings.integration_time,
+                                                   wavenumber=point.wavenumber, delay=delay)
+        if samples is None:
+            raise RuntimeError(f"HF2LI read failed at {point.wavenumber} cm-1")
+        return {"samples": samples, "delay": delay, "valid": self._shot_validity(samples["x"].size)}
+
+    def _shot_validity(self, num_shots: int) -> Optional[np.ndarray]:
+        """
+        Which shots of the block just taken the devices vouch for, or None
+        when shots are not screened
+
+        PicoScope segments that went over range are invalid; if the MIRcat
+        reports no valid light after the block, all of it is (the flag is
+        read once per block: a dropout anywhere in it is not localized).
+        """
+        if not self.settings.screens_shots:
+            return None
+        rejection = self.settings.rejection
+        valid = np.ones(num_shots, dtype=bool)
+        scope = self.devices.scope
+        if rejection.reject_overflow and self.settings.detector == "picoscope" and scope.last_overflow is not None:
+            valid &= ~scope.last_overflow[:num_shots]
+        if rejection.check_light and self.devices.mircat.is_light_valid() is False:
+            logger.warning("MIRcat reports no valid light; block rejected")
+            valid[:] = False
+        return valid
+
+    async def _process_stage(self, inbox: asyncio.Queue, out: asyncio.Queue) -> None:
+        while True:
+            with self.timer.waiting("process"):
+                item = await inbox.get()
+            if item is _DONE:
+                await out.put(_DONE)
+                return
+
+            point, timing, raw = item
+            with self.timer.measure("process", timing):
+                result = await asyncio.to_thread(self._process, point, raw)
+            result.timing = timing
+            await out.put((result, raw))
+
+    def _acquire_to_target(self, point: ScanPoint, delay: Optional[float]) -> Dict[str, Any]:
+        """Accumulate chunks until the integration target, min_time or max_time stops it"""
+        target = self.settings.integration_target
+        if self.settings.detector == "picoscope":
+            scope = self.devices.scope
+            period = self._mask_period()
+            # Whole pump-pattern periods per chunk keep the mask in phase across chunks
+            chunk = max(1, math.ceil(target.chunk_time * scope.trigger_rate / period)) * period
+            mask = self._pump_mask(chunk)
+            accumulator = DeltaODAccumulator()
+        else:
+            lockin = self.devices.lockin
+            accumulator = LockinAccumulator(1.0 / lockin.sample_rate, lockin.time_constant)
+
+        rejected = None
+        start = time.perf_counter()
+        while True:
+            if self.settings.detector == "picoscope":
+                block = scope.acquire_block(chunk, pump_mask=mask, wavenumber=point.wavenumber, delay=delay)
+                if block is None:
+                    raise RuntimeError(f"PicoScope acquisition failed at {point.wavenumber} cm-1")
+                shots = self._linearize(block).mean(axis=1)
+                valid = self._shot_validity(shots.size)
+                if valid is not None:
+                    keep, counts = reject_shots(shots, mask, self.settings.rejection, valid)
+                    rejected = merge_counts(rejected, counts)
+                    shots, chunk_mask = shots[keep], mask[keep]
+                else:
+                    chunk_mask = mask
+                accumulator.add_shots(shots, chunk_mask)
+            else:
+                samples = lockin.read_samples(target.chunk_time, wavenumber=point.wavenumber, delay=delay)
+                if samples is None:
+                    raise RuntimeError(f"HF2LI read failed at {point.wavenumber} cm-1")
+                x = samples["x"]
+                valid = self._shot_validity(x.size)
+                if valid is not None:
+                    rejected = merge_counts(rejected, {"invalid": int(x.size - np.count_nonzero(valid)),
+                                                       "outliers": 0})
+                    x = x[valid]
+                accumulator.add(x)
+
+            elapsed = time.perf_counter() - start
+            signal, stderr = accumulator.value()
+            reason = stop_reason(target, signal, stderr, elapsed)
+            if reason is not None:
+                break
+
+        return {
+            "accumulated": {
+                "signal": signal,
+                "stderr": stderr if math.isfinite(stderr) else None,
+                "num_shots": accumulator.num_shots,
+                "integration_time": elapsed,
+                "stop_reason": reason,
+                "rejected": rejected
+            },
+            "delay": delay
+        }
+
+    def _process(self, point: ScanPoint, raw: Dict[str, Any]) -> PointResult:
+        detector = self.settings.detector
+        if "accumulated" in raw:
+            accumulated = raw["accumulated"]
+            return PointResult(point, detector, accumulated["signal"], accumulated["stderr"],
+                               accumulated["num_shots"], raw.get("delay"),
+                               integration_time=accumulated["integration_time"],
+                               stop_reason=accumulated["stop_reason"],
+                               rejected=accumulated["rejected"])
+        valid = raw.get("valid")
+        rejected = None
+        if detector == "picoscope":
+            shots, mask = self._linearize(raw["block"]).mean(axis=1), raw["mask"]
+            if valid is not None:
+                keep, rejected = reject_shots(shots, mask, self.settings.rejection, valid)
+                shots, mask = shots[keep], mask[keep]
+            signal, stderr, num_shots = shot_delta_od(shots, mask)
+        else:
+            x = raw["samples"]["x"]
+            if valid is not None:
+                rejected = {"invalid": int(x.size - np.count_nonzero(valid)), "outliers": 0}
+                x = x[valid]
+            num_shots = int(x.size)
+            signal = float(x.mean()) if num_shots else None
+            stderr = float(x.std(ddof=1) / math.sqrt(num_shots)) if num_shots > 1 else None
+        return PointResult(point, detector, signal, stderr, num_shots, raw.get("delay"),
+                           integration_time=self.settings.integration_time, rejected=rejected)
+
+    def _linearize(self, block: np.ndarray) -> np.ndarray:
+        """Detector linearity correction of a whole block (raw data is stored uncorrected)"""
+        return self.calibration.linearize(block) if self.calibration is not None else block
+
+    async def _persist_stage(self, inbox: asyncio.Queue) -> None:
+        while True:
+            with self.timer.waiting("persist"):
+                item = await inbox.get()
+            if item is _DONE:
+                return
+
+            result, raw = item
+            with self.timer.measure("persist", result.timing):
+                record = {"type": "point", **result.to_dict()}
+                if self.hdf5 is not None:
+                    # Queued for the HDF5 writer thread; never waits on disk
+                    self.hdf5.submit(record, raw)
+                await asyncio.to_thread(self._persist, result, record, len(self.results) + 1)
+            self.results.append(result)
+            self._progress.set()
+            self.live.publish(result)
+            for stage in ("process", "persist"):
+                self.latencies[stage].append(result.timing[stage])
+
+    def _persist(self, result: PointResult, record: Dict[str, Any], completed: int) -> None:
+        """Append the point, then a checkpoint covering it (off the move/acquire path)"""
+        self.writer.write(record)
+        point = result.point
+        device_state = {
+            "wavenumber": point.wavenumber,
+            "mux_position": point.mux_position,
+            "delay_index": point.delay_index
+        }
+        self.checkpoints.write_checkpoint(completed, self.writer.offset, device_state, self._elapsed())
+
+    # --- reporting -------------------------------------------------------
+
+    def get_timing(self) -> Dict[str, Any]:
+        """Per-stage timing and the critical path of the current or last run"""
+        if self.started_at is None:
+            return {}
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return self.timer.summary(end - self.started_at)
+
+    def get_results(self) -> Dict[str, Any]:
+        """Results in execution order and, once complete, in requested order per repeat"""
+        data: Dict[str, Any] = {
+            "run_id": self.run_id,
+            "points": [r.to_dict() for r in self.results]
+        }
+        if self.total_steps is not None and len(self.results) == self.total_steps:
+            # One spectrum per (MUX position, repeat), in requested point order (adaptive: by wavenumber)
+            points = self.scan_points
+            if self.settings.adaptive is not None:
+                rank = {index: n for n, index in enumerate(sorted(range(len(points)), key=points.__getitem__))}
+                points = sorted(points)
+            else:
+                rank = {index: index for index in range(len(points))}
+            microns = self._spectral_axis(points).microns.tolist()
+            spectra: Dict[Tuple[Optional[int], int], Dict[str, Any]] = {}
+            for result in self.results:
+                key = (result.point.mux_position, result.point.repeat)
+                if key not in spectra:
+                    spectra[key] = {
+                        "mux_position": key[0],
+                        "repeat": key[1],
+                        "wavenumbers": points,
+                        "microns": microns,
+                        "signal": [None] * len(points),
+                        "stderr": [None] * len(points),
+                        "snr": [None] * len(points),
+                        "integration_time": [None] * len(points),
+                        "rejected_shots": [None] * len(points)
+                    }
+                position = rank[result.point.index]
+                spectra[key]["signal"][position] = result.signal
+                spectra[key]["stderr"][position] = result.stderr
+                spectra[key]["snr"][position] = result.snr
+                spectra[key]["integration_time"][position] = result.integration_time
+                if result.rejected is not None:
+                    spectra[key]["rejected_shots"][position] = sum(result.rejected.values())
+            data["spectra"] = [spectra[key] for key in sorted(spectra, key=lambda k: (k[0] or 0, k[1]))]
+            if self.calibration is not None:
+                self._calibrate_spectra(points, data["spectra"])
+        return data
+
+    def _spectral_axis(self, points: List[float]) -> SpectralAxis:
+        """Axis of the reported spectra, converted once per run (points only grow within a run)"""
+        key = (self.run_id, len(points))
+        if self._axis is None or self._axis[0] != key:
+            self._axis = (key, SpectralAxis(points))
+        return self._axis[1]
+
+    def _calibrate_spectra(self, points: List[float], spectra: List[Dict[str, Any]]) -> None:
+        """
+        Add actual wavenumbers and, for lock-in signals, power-normalized
+        signals, computed for all spectra at once (dOD is a ratio, so it is
+        independent of probe power and left as is)
+        """
+        wavenumbers = self.calibration.wavenumbers(points)
+        values = {
+            key: np.array([[np.nan if v is None else v for v in spectrum[key]] for spectrum in spectra])
+            for key in ("signal", "stderr")
+        }
+        if self.settings.detector == "lockin":
+            values = {key: self.calibration.normalize_power(wavenumbers, array) for key, array in values.items()}
+        for n, spectrum in enumerate(spectra):
+            spectrum["calibrated"] = {
+                "wavenumbers": wavenumbers.tolist(),
+                **{key: [None if np.isnan(v) else float(v) for v in array[n]] for key, array in values.items()}
+            }
+
+    def rejected_totals(self) -> Optional[Dict[str, int]]:
+        """Shots dropped before averaging so far in the run, per reason (None if not screened)"""
+        total = None
+        for result in self.results:
+            if result.rejected is not None:
+                total = merge_counts(total, result.rejected)
+        return total
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get experiment progress"""
+        return {
+            "state": self.state,
+            "run_id": self.run_id,
+            "completed_points": len(self.results),
+            "total_points": self.total_steps,
+            "resumed_from": self._resume.completed if self._resume is not None else None,
+            "strategy": self.plan.strategy if self.plan is not None else None,
+            "mux_order": self.schedule.mode if self.schedule is not None else None,
+            "mux_estimates": self.schedule.estimates if self.schedule is not None else None,
+            "adaptive_rounds": self.adaptive_rounds,
+            "rejected_shots": self.rejected_totals(),
+            "error": self.error,
+            "data_file": self.writer.path if self.writer is not None else None,
+            "hdf5": self.hdf5.get_stats() if self.hdf5 is not None else None,
+            "timing": self.get_timing()
+        }
+
+
+def delta_od(block: np.ndarray, mask: np.ndarray):
+    """
+    Pump-induced change in optical density from a block of probe shots
+
+    Each segment is averaged to one shot intensity; see
+    :func:`shot_delta_od`. Returns (dOD, standard error, number of shots).
+    """
+    return shot_delta_od(block.mean(axis=1), mask)
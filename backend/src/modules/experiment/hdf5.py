@@ -0,0 +1,379 @@
+"""
+HDF5 Run Storage
+Chunked, compressed HDF5 files written by a background thread and readable live (SWMR)
+"""
+
+import json
+import math
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import logging
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from .storage import RUNS_DIR
+
+logger = logging.getLogger(__name__)
+
+# One row per persisted point; None is stored as NaN (floats) or -1 (integers)
+POINT_DTYPE = np.dtype([
+    ("step", "i8"),
+    ("repeat", "i4"),
+    ("index", "i4"),
+    ("wavenumber", "f8"),
+    ("mux_position", "i4"),
+    ("delay_index", "i4"),
+    ("signal", "f8"),
+    ("stderr", "f8"),
+    ("num_shots", "i8"),
+    ("delay", "f8"),
+    ("integration_time", "f8"),
+    ("rejected_invalid", "i8"),  # shots dropped before averaging (see rejection.py), -1 if not screened
+    ("rejected_outliers", "i8"),
+    ("raw_offset", "i8"),  # first value of the point in /raw, -1 if not saved
+    ("raw_segments", "i4"),
+    ("raw_samples", "i4"),
+    ("mask_offset", "i8"),  # first shot of the point in /pump_mask, -1 for the lock-in
+])
+
+COMPRESSIONS = (None, "lzf", "gzip")
+
+# Raw values per chunk of /raw (float32: 256 KiB before compression)
+RAW_CHUNK = 65536
+
+# Stops the writer thread
+_CLOSE = None
+
+
+def hdf5_path(run_id: str, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or RUNS_DIR, f"{run_id}.h5")
+
+
+def _point_row(record: Dict[str, Any]) -> tuple:
+    rejected = record.get("rejected") or {}
+    record = {**record, **{f"rejected_{key}": count for key, count in rejected.items()}}
+
+    def number(key, missing):
+        value = record.get(key)
+        return missing if value is None else value
+    return tuple(
+        number(name, -1 if POINT_DTYPE[name].kind == "i" else math.nan)
+        for name in POINT_DTYPE.names
+    )
+
+
+class HDF5RunWriter:
+    """
+    Streams points and their raw traces to ``<run_id>.h5``
+
+    ``/points`` is a table of processed results (the spectra), ``/raw`` the
+    flattened PicoScope blocks (or lock-in X samples as ``(n, 1)`` blocks)
+    and ``/pump_mask`` the pump state of every scope shot; rows of
+    ``/points`` give each point's offset into the other two. All datasets are
+    chunked, compressed and extendable.
+
+    :meth:`submit` only queues a point; a writer thread appends everything
+    queued in one batch, flushes, and is the file's single SWMR writer, so
+    readers opening with ``swmr=True`` see each batch as soon as it lands.
+    """
+
+    def __init__(self, run_id: str, directory: Optional[str] = None, compression: Optional[str] = "gzip",
+                 compression_level: int = 4, chunk_points: int = 256, save_raw: bool = True):
+        compression = None if compression == "none" else compression
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression '{compression}', expected one of {COMPRESSIONS}")
+        self.run_id = run_id
+        self.path = hdf5_path(run_id, directory)
+        self.compression = compression
+        self.compression_level = compression_level
+        self.chunk_points = chunk_points
+        self.save_raw = save_raw
+
+        self._file = None
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self.error: Optional[str] = None
+        self.points = 0
+        self.bytes_written = 0
+        self.write_time = 0.0
+        self.max_pending = 0
+
+    def _filters(self) -> Dict[str, Any]:
+        if self.compression is None:
+            return {}
+        filters: Dict[str, Any] = {"compression": self.compression, "shuffle": True}
+        if self.compression == "gzip":
+            filters["compression_opts"] = self.compression_level
+        return filters
+
+    def open(self, attrs: Dict[str, Any], resume_points: Optional[int] = None) -> None:
+        """
+        Create the file (or reopen it keeping the first ``resume_points``
+        rows), switch to SWMR mode and start the writer thread
+
+        On resume, :attr:`points` is the number of rows kept, which can be
+        fewer than ``resume_points`` (rows still queued at a crash, or a
+        file that could not be reopened); the caller resubmits the rest.
+        """
+        import h5py
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = None
+        if resume_points is not None and os.path.exists(self.path):
+            self._file = self._reopen()
+            if self._file is not None:
+                self._truncate(resume_points)
+        if self._file is None:
+            self._file = h5py.File(self.path, "w", libver="latest")
+            filters = self._filters()
+            self._file.create_dataset("points", (0,), maxshape=(None,), dtype=POINT_DTYPE,
+                                      chunks=(self.chunk_points,), **filters)
+            self._file.create_dataset("raw", (0,), maxshape=(None,), dtype="f4", chunks=(RAW_CHUNK,), **filters)
+            self._file.create_dataset("pump_mask", (0,), maxshape=(None,), dtype="u1",
+                                      chunks=(RAW_CHUNK,), **filters)
+            for key, value in attrs.items():
+                self._file.attrs[key] = value if isinstance(value, (str, int, float)) else json.dumps(value)
+            self._file.attrs["state"] = "running"
+
+        # Datasets and attributes cannot be created once SWMR is on
+        self._file.swmr_mode = True
+        self.points = self._file["points"].shape[0]
+        self._thread = threading.Thread(target=self._run, name=f"hdf5-{self.run_id}", daemon=True)
+        self._thread.start()
+
+    def _reopen(self):
+        """The run's file opened for appending, or None if it has to be started over"""
+        import h5py
+
+        try:
+            return h5py.File(self.path, "a", libver="latest")
+        except OSError as e:
+            error = e
+        # A crash in SWMR write mode leaves the file flagged as still open for writing
+        h5clear = shutil.which("h5clear")
+        if h5clear is not None and subprocess.run([h5clear, "-s", self.path], capture_output=True).returncode == 0:
+            try:
+                return h5py.File(self.path, "a", libver="latest")
+            except OSError as e:
+                error = e
+        # Keep the old file (its raw traces) next to the new one
+        aside = f"{self.path[:-len('.h5')]}.crashed-{time.strftime('%Y%m%d-%H%M%S')}.h5"
+        os.replace(self.path, aside)
+        logger.warning(f"Could not reopen {self.path} ({error}); moved it to {aside} and starting a new file")
+        return None
+
+    def _truncate(self, num_points: int) -> None:
+        points = self._file["points"]
+        rows = points[:num_points]
+        points.resize((len(rows),))
+        raw_end = mask_end = 0
+        for row in rows:
+            if row["raw_offset"] >= 0:
+                raw_end = max(raw_end, row["raw_offset"] + int(row["raw_segments"]) * int(row["raw_samples"]))
+            if row["mask_offset"] >= 0:
+                mask_end = max(mask_end, row["mask_offset"] + int(row["raw_segments"]))
+        self._file["raw"].resize((raw_end,))
+        self._file["pump_mask"].resize((mask_end,))
+        self._file.attrs["state"] = "running"
+
+    def submit(self, record: Dict[str, Any], raw: Optional[Dict[str, Any]] = None) -> None:
+        """Queue one point for writing; never blocks"""
+        if self.error is not None:
+            raise RuntimeError(f"HDF5 writer failed: {self.error}")
+        self._queue.put((record, raw if self.save_raw else None))
+        self.max_pending = max(self.max_pending, self._queue.qsize())
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            closing = _CLOSE in batch
+            batch = [item for item in batch if item is not _CLOSE]
+            if batch and self.error is None:
+                try:
+                    start = time.perf_counter()
+                    self._write_batch(batch)
+                    self.write_time += time.perf_counter() - start
+                except Exception as e:
+                    self.error = str(e)
+                    logger.error(f"HDF5 writer for {self.run_id} failed: {e}")
+            if closing:
+                return
+
+    def _write_batch(self, batch: List[tuple]) -> None:
+        points, raw_ds, mask_ds = self._file["points"], self._file["raw"], self._file["pump_mask"]
+        raw_end, mask_end = raw_ds.shape[0], mask_ds.shape[0]
+        rows = np.zeros(len(batch), dtype=POINT_DTYPE)
+        raw_parts: List[np.ndarray] = []
+        mask_parts: List[np.ndarray] = []
+
+        for n, (record, raw) in enumerate(batch):
+            rows[n] = _point_row({**record, "raw_offset": None, "mask_offset": None,
+                                  "raw_segments": 0, "raw_samples": 0})
+            block = None
+            if raw is not None and "block" in raw:
+                block = np.asarray(raw["block"], dtype=np.float32)
+                mask = np.asarray(raw["mask"], dtype=np.uint8)
+                rows["mask_offset"][n] = mask_end
+                mask_parts.append(mask)
+                mask_end += mask.size
+            elif raw is not None and "samples" in raw:
+                block = np.asarray(raw["samples"]["x"], dtype=np.float32).reshape(-1, 1)
+            if block is not None:
+                rows["raw_offset"][n] = raw_end
+                rows["raw_segments"][n], rows["raw_samples"][n] = block.shape
+                raw_parts.append(block.ravel())
+                raw_end += block.size
+
+        # Bulk data first, then the rows that point at it, so readers never see a dangling offset
+        for dataset, parts, end in ((raw_ds, raw_parts, raw_end), (mask_ds, mask_parts, mask_end)):
+            if parts:
+                start = dataset.shape[0]
+                dataset.resize((end,))
+                dataset[start:end] = np.concatenate(parts)
+                dataset.flush()
+                self.bytes_written += (end - start) * dataset.dtype.itemsize
+        start = points.shape[0]
+        points.resize((start + len(rows),))
+        points[start:] = rows
+        points.flush()
+        self.points += len(rows)
+        self.bytes_written += rows.nbytes
+
+    def close(self, attrs: Optional[Dict[str, Any]] = None) -> None:
+        """Write everything still queued, stop the thread and record final attributes"""
+        if self._file is None:
+            return
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        self._file.close()
+        self._file = None
+        if attrs:
+            import h5py
+            # Attributes can only change outside SWMR mode
+            with h5py.File(self.path, "a", libver="latest") as f:
+                for key, value in attrs.items():
+                    f.attrs[key] = value if isinstance(value, (str, int, float)) else json.dumps(value)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "points": self.points,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "bytes_written": self.bytes_written,
+            "write_time": self.write_time,
+            "throughput_mb_s": self.bytes_written / self.write_time / 1e6 if self.write_time else None,
+            "compression": self.compression,
+            "error": self.error
+        }
+
+
+def read_hdf5_points(path: str, start: int = 0) -> Dict[str, Any]:
+    """
+    Read ``/points`` rows from ``start`` on, also while the run is still being written
+
+    The file is opened as an SWMR reader, so it sees every batch the writer
+    has flushed.
+    """
+    import h5py
+
+    if not os.path.exists(path):
+        raise ValueError(f"No HDF5 file {path}")
+    with h5py.File(path, "r", libver="latest", swmr=True) as f:
+        points = f["points"]
+        points.refresh()
+        rows = points[start:]
+        attrs = {key: (value.decode() if isinstance(value, bytes) else value) for key, value in f.attrs.items()}
+        attrs = {key: (value.item() if isinstance(value, np.generic) else value) for key, value in attrs.items()}
+        total = points.shape[0]
+
+    columns = {}
+    for name in rows.dtype.names:  # files written before a column was added lack it
+        values = rows[name].tolist()
+        if POINT_DTYPE[name].kind == "f":
+            values = [None if math.isnan(v) else v for v in values]
+        else:
+            values = [None if v < 0 and name not in ("raw_segments", "raw_samples") else v for v in values]
+        columns[name] = values
+    return {"attrs": attrs, "start": start, "total_points": total, "columns": columns}
+
+
+def read_hdf5_raw(path: str, step: int) -> Dict[str, Any]:
+    """Raw block and pump mask of the point at execution ``step``"""
+    import h5py
+
+    with h5py.File(path, "r", libver="latest", swmr=True) as f:
+        for name in ("points", "raw", "pump_mask"):
+            f[name].refresh()
+        rows = f["points"][:]
+        match = np.nonzero(rows["step"] == step)[0]
+        if not match.size:
+            raise ValueError(f"Step {step} not in {path}")
+        row = rows[match[-1]]
+        if row["raw_offset"] < 0:
+            raise ValueError(f"No raw data saved for step {step}")
+        segments, samples = int(row["raw_segments"]), int(row["raw_samples"])
+        block = f["raw"][row["raw_offset"]:row["raw_offset"] + segments * samples].reshape(segments, samples)
+        mask = f["pump_mask"][row["mask_offset"]:row["mask_offset"] + segments].astype(bool) \
+            if row["mask_offset"] >= 0 else None
+    return {"block": block, "mask": mask}
+
+
+def benchmark_writer(num_points: int = 200, segments: int = 1000, samples: int = 100,
+                     compressions=COMPRESSIONS, directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Sustained write throughput for synthetic scope blocks, per compression
+
+    Blocks look like probe shots (a pulse plus noise). Submission time is
+    what the persist stage pays; throughput is raw bytes over the time from
+    the first submit until the file is closed.
+    """
+    rng = np.random.default_rng(0)
+    t = np.arange(samples)
+    pulse = np.exp(-0.5 * ((t - samples / 3) / (samples / 10)) ** 2)
+    mask = np.arange(segments) % 2 == 0
+    blocks = [(pulse[None, :] * (1.0 + 0.01 * rng.standard_normal((segments, 1)))
+               + 0.002 * rng.standard_normal((segments, samples))).astype(np.float32) for _ in range(4)]
+
+    results = []
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        for compression in compressions:
+            writer = HDF5RunWriter(f"benchmark-{compression or 'none'}", tmp, compression=compression)
+            writer.open({"benchmark": True})
+            submit_time = 0.0
+            start = time.perf_counter()
+            for step in range(num_points):
+                record = {"step": step, "repeat": 0, "index": step, "wavenumber": 1700.0 + step,
+                          "signal": 0.0, "stderr": 0.0, "num_shots": segments}
+                t0 = time.perf_counter()
+                writer.submit(record, {"block": blocks[step % len(blocks)], "mask": mask})
+                submit_time += time.perf_counter() - t0
+            writer.close()
+            elapsed = time.perf_counter() - start
+            raw_bytes = num_points * segments * samples * 4
+            results.append({
+                "compression": compression,
+                "points": num_points,
+                "raw_mb": raw_bytes / 1e6,
+                "file_mb": os.path.getsize(writer.path) / 1e6,
+                "elapsed": elapsed,
+                "throughput_mb_s": raw_bytes / elapsed / 1e6,
+                "mean_submit_time": submit_time / num_points,
+                "max_pending": writer.max_pending
+            })
+    return results
@@ -0,0 +1,165 @@
+"""
+SNR-Targeted Integration
+Running statistics and stopping rules for accumulating shots until a point is good enough
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass
+class IntegrationTarget:
+    """
+    When to stop accumulating at one point
+
+    Accumulation stops once ``target_stderr`` (signal units) or
+    ``target_snr`` (|signal| / stderr) is reached, but never before
+    ``min_time`` and never after ``max_time`` seconds. Data are taken in
+    chunks of ``chunk_time`` seconds.
+    """
+    target_stderr: Optional[float] = None
+    target_snr: Optional[float] = None
+    min_time: float = 0.1
+    max_time: float = 5.0
+    chunk_time: float = 0.1
+
+    def validate(self) -> None:
+        if self.target_stderr is None and self.target_snr is None:
+            raise ValueError("Specify target_stderr and/or target_snr")
+        if self.chunk_time <= 0 or self.min_time < 0 or self.max_time < self.min_time:
+            raise ValueError("Require chunk_time > 0 and 0 <= min_time <= max_time")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+class RunningStats:
+    """Streaming mean and variance (Welford/Chan), updated a chunk at a time"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, values) -> None:
+        values = np.asarray(values, dtype=float).ravel()
+        count = values.size
+        if not count:
+            return
+        chunk_mean = float(values.mean())
+        chunk_m2 = float(((values - chunk_mean) ** 2).sum())
+        total = self.n + count
+        delta = chunk_mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += chunk_m2 + delta * delta * self.n * count / total
+        self.n = total
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else math.inf
+
+    @property
+    def stderr(self) -> float:
+        return math.sqrt(self.variance / self.n) if self.n > 1 else math.inf
+
+
+class DeltaODAccumulator:
+    """Pumped/unpumped probe shot statistics combined into dOD and its standard error"""
+
+    def __init__(self):
+        self.pumped = RunningStats()
+        self.unpumped = RunningStats()
+
+    def add(self, block: np.ndarray, mask: np.ndarray) -> None:
+        self.add_shots(block.mean(axis=1), mask)
+
+    def add_shots(self, shots: np.ndarray, mask: np.ndarray) -> None:
+        """Per-shot intensities, e.g. what is left after outlier rejection"""
+        self.pumped.add(shots[mask])
+        self.unpumped.add(shots[~mask])
+
+    @property
+    def num_shots(self) -> int:
+        return self.pumped.n + self.unpumped.n
+
+    def value(self) -> Tuple[Optional[float], float]:
+        p, u = self.pumped, self.unpumped
+        if p.n < 2 or u.n < 2 or p.mean <= 0 or u.mean <= 0:
+            return None, math.inf
+        signal = -math.log10(p.mean / u.mean)
+        stderr = math.sqrt((p.stderr / p.mean) ** 2 + (u.stderr / u.mean) ** 2) / math.log(10)
+        return signal, stderr
+
+
+class LockinAccumulator:
+    """
+    Demodulated X statistics
+
+    Lock-in samples are correlated over the filter time constant, so the
+    standard error uses the effective number of independent samples,
+    ``n * sample_interval / (2 * time_constant)`` when that is smaller than n.
+    """
+
+    def __init__(self, sample_interval: float, time_constant: float):
+        self.stats = RunningStats()
+        self.correlation = min(1.0, sample_interval / (2.0 * time_constant)) if time_constant > 0 else 1.0
+
+    def add(self, x: np.ndarray) -> None:
+        self.stats.add(x)
+
+    @property
+    def num_shots(self) -> int:
+        return self.stats.n
+
+    def value(self) -> Tuple[Optional[float], float]:
+        if self.stats.n < 2:
+            return None, math.inf
+        effective = max(2.0, self.stats.n * self.correlation)
+        return self.stats.mean, math.sqrt(self.stats.variance / effective)
+
+
+def shot_delta_od(shots: np.ndarray, mask: np.ndarray):
+    """
+    Pump-induced change in optical density from per-shot probe intensities
+
+    Pumped and unpumped shots are compared as ``-log10(I_pumped /
+    I_unpumped)``. Returns (dOD, standard error, number of shots).
+    """
+    pumped, unpumped = shots[mask], shots[~mask]
+    if pumped.size < 1 or unpumped.size < 1:
+        return None, None, int(shots.size)
+
+    mean_p, mean_u = pumped.mean(), unpumped.mean()
+    if mean_p <= 0 or mean_u <= 0:
+        return None, None, int(shots.size)
+    signal = -math.log10(mean_p / mean_u)
+
+    var_p = pumped.var(ddof=1) / pumped.size if pumped.size > 1 else 0.0
+    var_u = unpumped.var(ddof=1) / unpumped.size if unpumped.size > 1 else 0.0
+    stderr = math.sqrt(var_p / mean_p ** 2 + var_u / mean_u ** 2) / math.log(10)
+    return float(signal), float(stderr), int(shots.size)
+
+
+def snr(signal: Optional[float], stderr: Optional[float]) -> Optional[float]:
+    """|signal| / stderr, or None when undefined"""
+    if signal is None or stderr is None or not math.isfinite(stderr):
+        return None
+    return abs(signal) / stderr if stderr > 0 else math.inf
+
+
+def stop_reason(target: IntegrationTarget, signal: Optional[float], stderr: float,
+                elapsed: float) -> Optional[str]:
+    """Why accumulation should stop now, or None to keep going"""
+    if elapsed >= target.max_time:
+        return "max_time"
+    if elapsed < target.min_time or signal is None:
+        return None
+    if target.target_stderr is not None and stderr <= target.target_stderr:
+        return "target_stderr"
+    ratio = snr(signal, stderr)
+    if target.target_snr is not None and ratio is not None and ratio >= target.target_snr:
+        return "target_snr"
+    return None
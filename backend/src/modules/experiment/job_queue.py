@@ -0,0 +1,266 @@
+"""
+Experiment Job Queue
+Prioritized, persistent queue of runs for unattended operation
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+import logging
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, List, Optional
+
+from ...services import DEVICES, DeviceLeaseManager, LeaseUnavailable
+from .checkpoint import load_checkpoint
+from .engine import DeviceNotReady, ExperimentEngine, RunSettings
+from .storage import RUNS_DIR
+
+logger = logging.getLogger(__name__)
+
+# Queue state lives next to app.db
+JOBS_PATH = os.path.join(os.path.dirname(RUNS_DIR), "jobs.json")
+
+FINISHED_STATES = ("completed", "failed", "stopped", "cancelled")
+
+# Seconds between start attempts while the best job waits for a device to be connected
+DEVICE_RETRY_INTERVAL = 5.0
+
+
+@dataclass
+class Job:
+    """One queued run"""
+    job_id: str
+    settings: Dict[str, Any]  # RunSettings.to_dict()
+    devices: List[str]  # leased for the whole run
+    priority: int = 0  # higher runs first; equal priorities run in submission order
+    name: Optional[str] = None
+    state: str = "queued"
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    run_id: Optional[str] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class JobQueue:
+    """
+    Runs queued jobs one after another on the experiment engine
+
+    Each job leases the devices it declares for the duration of its run.
+    The scheduler wakes whenever a lease is released or a run ends and
+    starts the best waiting job straight away, so queued runs follow each
+    other without idle time. The queue is saved to ``jobs.json`` on every
+    change; a job that was running when the backend stopped is resumed from
+    its checkpoint. A job whose devices are not connected yet (e.g. right
+    after a restart) stays queued and is retried every
+    ``retry_interval`` s or on :meth:`notify`; only invalid settings fail it.
+    """
+
+    def __init__(self, engine: ExperimentEngine, leases: DeviceLeaseManager, path: Optional[str] = None,
+                 retry_interval: float = DEVICE_RETRY_INTERVAL):
+        self.engine = engine
+        self.leases = leases
+        self.path = path or JOBS_PATH
+        self.retry_interval = retry_interval
+        self.jobs: Dict[str, Job] = {}
+        self.paused = False
+        self._waiting_for_devices = False
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._load()
+        leases.add_listener(lambda _: self.notify())
+
+    # --- persistence -----------------------------------------------------
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Failed to load job queue {self.path}: {e}")
+            return
+        for record in data.get("jobs", []):
+            job = Job(**record)
+            if job.state == "running":
+                # Interrupted by a backend restart: continue from the checkpoint
+                job.state = "queued"
+            self.jobs[job.job_id] = job
+        logger.info(f"Loaded {len(self.jobs)} jobs from {self.path}")
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary = self.path + ".tmp"
+        with open(temporary, 'w') as f:
+            json.dump({"jobs": [job.to_dict() for job in self.jobs.values()]}, f, indent=1)
+        os.replace(temporary, self.path)
+
+    # --- queue operations ------------------------------------------------
+
+    def submit(self, settings: RunSettings, priority: int = 0, name: Optional[str] = None,
+               devices: Optional[List[str]] = None) -> Job:
+        """Queue a run; ``devices`` adds leases beyond the ones the run drives"""
+        self.engine.validate(settings, connected=False)
+        unknown = [d for d in devices or [] if d not in DEVICES]
+        if unknown:
+            raise ValueError(f"Unknown device(s) {unknown}, expected {DEVICES}")
+        required = set(self.engine.required_devices(settings)) | set(devices or [])
+        job = Job(uuid.uuid4().hex[:8], settings.to_dict(), sorted(required), priority, name)
+        self.jobs[job.job_id] = job
+        self._save()
+        self.notify()
+        logger.info(f"Queued job {job.job_id} ({name or 'unnamed'}), priority {priority}")
+        return job
+
+    def get(self, job_id: str) -> Job:
+        if job_id not in self.jobs:
+            raise ValueError(f"No job {job_id}")
+        return self.jobs[job_id]
+
+    def set_priority(self, job_id: str, priority: int) -> Job:
+        job = self.get(job_id)
+        if job.state != "queued":
+            raise ValueError(f"Job {job_id} is {job.state}")
+        job.priority = priority
+        self._save()
+        self.notify()
+        return job
+
+    async def cancel(self, job_id: str) -> Job:
+        """Drop a queued job or stop a running one"""
+        job = self.get(job_id)
+        if job.state == "queued":
+            job.state = "cancelled"
+            job.finished_at = time.time()
+            self._save()
+        elif job.state == "running":
+            await self.engine.stop()
+        else:
+            raise ValueError(f"Job {job_id} already {job.state}")
+        return job
+
+    def pending(self) -> List[Job]:
+        """Queued jobs in the order they will be considered"""
+        queued = [job for job in self.jobs.values() if job.state == "queued"]
+        return sorted(queued, key=lambda job: (-job.priority, job.submitted_at))
+
+    def pause(self) -> None:
+        self.paused = True
+
+    def resume(self) -> None:
+        self.paused = False
+        self.notify()
+
+    # --- scheduling ------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the scheduler on the running event loop"""
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._schedule())
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def notify(self) -> None:
+        """Look for a job to start now (devices freed, connected or set up)"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _schedule(self) -> None:
+        while True:
+            self._wake.clear()
+            self._start_next()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.retry_interval if self._waiting_for_devices else None)
+            except asyncio.TimeoutError:
+                pass
+
+    def _start_next(self) -> None:
+        """Start the best queued job whose devices are free (the engine runs one job at a time)"""
+        self._waiting_for_devices = False
+        if self.paused or self.engine.is_running:
+            return
+        for job in self.pending():
+            if not self.leases.available(job.devices):
+                continue
+            try:
+                self._start(job)
+            except LeaseUnavailable:
+                continue
+            except DeviceNotReady as e:
+                # Not the job's fault: keep it queued and try again once the device is there
+                if job.error != f"Waiting: {e}":
+                    job.error = f"Waiting: {e}"
+                    self._save()
+                    logger.info(f"Job {job.job_id} waiting: {e}")
+                self._waiting_for_devices = True
+                continue
+            except (ValueError, OSError) as e:
+                job.state = "failed"
+                job.error = str(e)
+                job.finished_at = time.time()
+                self._save()
+                logger.error(f"Job {job.job_id} could not start: {e}")
+                continue
+            return
+
+    def _start(self, job: Job) -> None:
+        holder = f"job {job.job_id}"
+        settings = RunSettings.from_dict(job.settings)
+        resumable = False
+        if job.run_id is not None:
+            try:
+                resumable = load_checkpoint(job.run_id, self.engine.runs_dir).resumable
+            except ValueError:
+                pass
+        # Extra declared devices are held alongside the engine's own lease
+        extra = [d for d in job.devices if d not in self.engine.required_devices(settings)]
+        extra_lease = self.leases.acquire(holder, extra) if extra else None
+        try:
+            if resumable:
+                self.engine.resume(job.run_id, holder=holder)
+            else:
+                job.run_id = self.engine.start(settings, holder=holder)
+        except Exception:
+            self.leases.release(extra_lease)
+            raise
+
+        job.state = "running"
+        job.started_at = job.started_at or time.time()
+        job.error = None
+        self._save()
+        logger.info(f"Started job {job.job_id} as run {job.run_id}")
+
+        def finished(_):
+            self.leases.release(extra_lease)
+            job.state = self.engine.state if self.engine.state in FINISHED_STATES else "failed"
+            job.error = self.engine.error
+            job.finished_at = time.time()
+            self._save()
+            logger.info(f"Job {job.job_id} {job.state}")
+            self.notify()
+
+        self.engine._task.add_done_callback(finished)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Queue state; never waits on a lease or the engine"""
+        counts: Dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.state] = counts.get(job.state, 0) + 1
+        return {
+            "paused": self.paused,
+            "scheduler_running": self._task is not None and not self._task.done(),
+            "counts": counts,
+            "pending": [job.job_id for job in self.pending()],
+            "leases": self.leases.get_status()
+        }
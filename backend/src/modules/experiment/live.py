@@ -0,0 +1,144 @@
+"""
+Live Spectrum Feed
+Sequence-numbered point updates for UI clients, with snapshot + catch-up on reconnect
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# (MUX position, repeat, index into the run's scan points) - one spectrum point
+PointKey = Tuple[Optional[int], int, int]
+
+
+class Subscription:
+    """One client's queue of updates; ``lagged`` is set if it fell too far behind"""
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.lagged = False
+
+    def push(self, update: Dict[str, Any]) -> None:
+        if self.lagged:
+            return
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            # The client must resynchronize from a snapshot
+            self.lagged = True
+
+
+class LiveSpectrum:
+    """
+    Incremental view of the running experiment's spectra
+
+    Every persisted point becomes one small ``point`` update with a
+    sequence number; a new run emits a ``reset``. The last ``history``
+    updates are kept so a reconnecting client can ask for everything after
+    the last sequence number it saw; when that is too old, or from an
+    earlier run, it gets a snapshot (current value of every point) instead.
+    """
+
+    def __init__(self, history: int = 10000, subscriber_queue: int = 1000):
+        self.seq = 0
+        self.run_id: Optional[str] = None
+        self.points: Dict[PointKey, Dict[str, Any]] = {}
+        self._history: deque = deque(maxlen=history)
+        self._run_start_seq = 0  # seq of the current run's reset
+        self._subscriber_queue = subscriber_queue
+        self._subscribers: List[Subscription] = []
+
+    def _emit(self, update: Dict[str, Any]) -> Dict[str, Any]:
+        self.seq += 1
+        update = {"seq": self.seq, **update}
+        self._history.append(update)
+        for subscription in self._subscribers:
+            subscription.push(update)
+        return update
+
+    def reset(self, run_id: str, results=()) -> None:
+        """Start a new run's feed (a resumed run passes its restored results)"""
+        self.run_id = run_id
+        self.points = {}
+        self._run_start_seq = self._emit({"type": "reset", "run_id": run_id})["seq"]
+        for result in results:
+            self.publish(result)
+
+    def publish(self, result) -> Dict[str, Any]:
+        """Emit one persisted ``PointResult``"""
+        point = result.point
+        key = (point.mux_position, point.repeat, point.index)
+        value = {
+            "step": point.step,
+            "mux_position": point.mux_position,
+            "repeat": point.repeat,
+            "index": point.index,
+            "wavenumber": point.wavenumber,
+            "signal": result.signal,
+            "stderr": result.stderr,
+            "snr": result.snr,
+            "rejected": result.rejected
+        }
+        op = "update" if key in self.points else "add"
+        self.points[key] = value
+        return self._emit({"type": "point", "op": op, "run_id": self.run_id, **value})
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current value of every point of the run, as of ``seq``"""
+        return {
+            "type": "snapshot",
+            "run_id": self.run_id,
+            "seq": self.seq,
+            "points": sorted(self.points.values(), key=lambda p: p["step"])
+        }
+
+    def matrix(self) -> Tuple[np.ndarray, List[Tuple[Optional[int], int]], np.ndarray]:
+        """
+        Current points as (wavenumbers, spectrum keys, values) with one row
+        per (MUX position, repeat) and NaN where a point is not measured yet
+        """
+        wavenumbers = np.array(sorted({p["wavenumber"] for p in self.points.values()}), dtype=np.float64)
+        keys = sorted({(p["mux_position"], p["repeat"]) for p in self.points.values()},
+                      key=lambda k: (k[0] or 0, k[1]))
+        values = np.full((len(keys), wavenumbers.size), np.nan)
+        rows = {key: n for n, key in enumerate(keys)}
+        for p in self.points.values():
+            if p["signal"] is not None:
+                column = np.searchsorted(wavenumbers, p["wavenumber"])
+                values[rows[(p["mux_position"], p["repeat"])], column] = p["signal"]
+        return wavenumbers, keys, values
+
+    def since(self, after: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Updates a client needs to catch up from sequence number ``after``
+
+        Returns only the missed updates when they are all still in history
+        and belong to the current run; otherwise a snapshot first.
+        """
+        oldest = self._history[0]["seq"] if self._history else self.seq + 1
+        if after is not None and self._run_start_seq - 1 <= after <= self.seq and after + 1 >= oldest:
+            return [update for update in self._history if update["seq"] > after]
+        return [self.snapshot()]
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self._subscriber_queue)
+        self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self._subscribers:
+            self._subscribers.remove(subscription)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "seq": self.seq,
+            "points": len(self.points),
+            "history": len(self._history),
+            "subscribers": len(self._subscribers)
+        }
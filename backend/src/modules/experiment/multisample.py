@@ -0,0 +1,145 @@
+"""
+Multi-Sample Scheduler
+Chooses between interleaving MUX positions at each spectral point and scanning samples back-to-back
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from .planner import ScanPlan, plan_scan
+
+logger = logging.getLogger(__name__)
+
+MUX_ORDERS = ("interleaved", "sequential")
+
+# MUX move time assumed before any move has been measured, seconds
+DEFAULT_MOVE_TIME = 0.05
+
+# (repeat, index into the requested point list, MUX position)
+ScheduleStep = Tuple[int, int, int]
+
+
+@dataclass
+class PointCosts:
+    """Per-point time costs used to estimate a schedule, all in seconds"""
+    acquisition_time: float
+    settle_time: float = 0.0  # after every tune
+    point_delay: float = 0.0  # before every acquisition
+    mux_move_time: float = DEFAULT_MOVE_TIME  # measured command round-trip
+    position_delay: float = 0.0  # configured wait after every MUX move
+
+    @property
+    def mux_time(self) -> float:
+        return self.mux_move_time + self.position_delay
+
+
+@dataclass
+class MultiSampleSchedule:
+    """Execution order over spectral points and MUX positions"""
+    mode: str
+    positions: List[int]
+    plan: ScanPlan
+    steps: List[ScheduleStep]
+    estimates: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "positions": self.positions,
+            "num_steps": len(self.steps),
+            "strategy": self.plan.strategy,
+            "estimates": self.estimates,
+            "steps": [list(step) for step in self.steps]
+        }
+
+
+def _interleaved(points: List[float], positions: List[int], repeats: int, plan_for) -> Tuple[ScanPlan, List[ScheduleStep]]:
+    """Tune once per spectral point, then visit every position (boustrophedon, so no move is wasted)"""
+    plan = plan_for(repeats)
+    steps: List[ScheduleStep] = []
+    for n, (repeat, index) in enumerate(plan.order):
+        order = positions if n % 2 == 0 else positions[::-1]
+        steps.extend((repeat, index, position) for position in order)
+    return plan, steps
+
+
+def _sequential(points: List[float], positions: List[int], repeats: int, plan_for) -> Tuple[ScanPlan, List[ScheduleStep]]:
+    """Run every repeat of one sample before moving the MUX to the next sample"""
+    plan = plan_for(repeats * len(positions))
+    steps = [(sweep % repeats, index, positions[sweep // repeats]) for sweep, index in plan.order]
+    return plan, steps
+
+
+_MODES = {
+    "interleaved": _interleaved,
+    "sequential": _sequential,
+}
+
+
+def estimate_schedule(plan: ScanPlan, steps: List[ScheduleStep], latency_model,
+                      qcl_lookup: Callable[[float], int], costs: PointCosts,
+                      start_wavenumber: Optional[float] = None, start_qcl: Optional[int] = None,
+                      start_position: Optional[int] = None) -> Dict[str, float]:
+    """Predict tuning, MUX and acquisition time along a schedule"""
+    tune_time = mux_time = 0.0
+    tunes = moves = 0
+    wavenumber, qcl, position = start_wavenumber, start_qcl, start_position
+    for _, index, mux in steps:
+        target = plan.points[index]
+        if target != wavenumber:
+            target_qcl = qcl_lookup(target)
+            tune_time += latency_model.predict(wavenumber, target, qcl, target_qcl) + costs.settle_time
+            wavenumber, qcl = target, target_qcl
+            tunes += 1
+        if mux != position:
+            mux_time += costs.mux_time
+            position = mux
+            moves += 1
+
+    acquisition = len(steps) * (costs.acquisition_time + costs.point_delay)
+    return {
+        "tunes": tunes,
+        "mux_moves": moves,
+        "tune_time": tune_time,
+        "mux_time": mux_time,
+        "acquisition_time": acquisition,
+        "total_time": tune_time + mux_time + acquisition
+    }
+
+
+def plan_multisample(points: List[float], positions: List[int], latency_model,
+                     qcl_lookup: Callable[[float], int], costs: PointCosts,
+                     repeats: int = 1, mode: str = "auto", strategy: str = "auto",
+                     start_wavenumber: Optional[float] = None, start_qcl: Optional[int] = None,
+                     start_position: Optional[int] = None) -> MultiSampleSchedule:
+    """
+    Schedule a scan of ``points`` on every MUX position
+
+    Both orders are built and estimated from the tune-latency model and the
+    measured MUX move time; with ``mode="auto"`` the faster one is chosen.
+    """
+    if mode != "auto" and mode not in MUX_ORDERS:
+        raise ValueError(f"Unknown MUX order '{mode}', expected one of {MUX_ORDERS}")
+    if not positions:
+        raise ValueError("No MUX positions")
+    if len(set(positions)) != len(positions):
+        raise ValueError("MUX positions must be unique")
+
+    def plan_for(sweeps: int) -> ScanPlan:
+        return plan_scan(points, latency_model, qcl_lookup, repeats=sweeps, strategy=strategy,
+                         start_wavenumber=start_wavenumber, start_qcl=start_qcl)
+
+    schedules: Dict[str, Tuple[ScanPlan, List[ScheduleStep]]] = {}
+    estimates: Dict[str, Dict[str, float]] = {}
+    for name in MUX_ORDERS:
+        plan, steps = _MODES[name](points, list(positions), repeats, plan_for)
+        schedules[name] = (plan, steps)
+        estimates[name] = estimate_schedule(plan, steps, latency_model, qcl_lookup, costs,
+                                            start_wavenumber, start_qcl, start_position)
+
+    best = mode if mode != "auto" else min(MUX_ORDERS, key=lambda name: estimates[name]["total_time"])
+    plan, steps = schedules[best]
+    logger.info(f"Multi-sample schedule: {len(positions)} positions x {len(points)} points x {repeats} "
+                f"using '{best}' (estimated {estimates[best]['total_time']:.1f} s)")
+    return MultiSampleSchedule(best, list(positions), plan, steps, estimates)
@@ -0,0 +1,172 @@
+"""
+Experiment Scan Planner
+Orders spectral scan points to minimize total MIRcat tuning time
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("requested", "monotonic", "serpentine", "grouped")
+
+# (repeat, index into the requested point list)
+PlanStep = Tuple[int, int]
+
+
+@dataclass
+class ScanPlan:
+    """Execution order for a scan, with predicted tuning cost"""
+    points: List[float]
+    repeats: int
+    strategy: str
+    order: List[PlanStep]
+    predicted_tune_time: float
+    strategy_costs: Dict[str, float] = field(default_factory=dict)
+
+    def execution_points(self) -> List[float]:
+        """Wavenumbers in execution order"""
+        return [self.points[index] for _, index in self.order]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "repeats": self.repeats,
+            "num_points": len(self.points),
+            "order": [[repeat, index] for repeat, index in self.order],
+            "execution_points": self.execution_points(),
+            "predicted_tune_time": self.predicted_tune_time,
+            "strategy_costs": self.strategy_costs
+        }
+
+
+def _order_requested(points, qcls, repeats, start):
+    return [(r, i) for r in range(repeats) for i in range(len(points))]
+
+
+def _sorted_indices(points, indices, start, reverse=None):
+    """Sort indices by wavenumber, starting from the end nearest ``start``"""
+    ascending = sorted(indices, key=lambda i: points[i])
+    if not ascending:
+        return ascending
+    if reverse is None:
+        reverse = start is not None and \
+            abs(points[ascending[-1]] - start) < abs(points[ascending[0]] - start)
+    return ascending[::-1] if reverse else ascending
+
+
+def _order_monotonic(points, qcls, repeats, start):
+    sweep = _sorted_indices(points, range(len(points)), start)
+    return [(r, i) for r in range(repeats) for i in sweep]
+
+
+def _order_serpentine(points, qcls, repeats, start):
+    sweep = _sorted_indices(points, range(len(points)), start)
+    order = []
+    for r in range(repeats):
+        order.extend((r, i) for i in (sweep if r % 2 == 0 else sweep[::-1]))
+    return order
+
+
+def _order_grouped(points, qcls, repeats, start):
+    """Visit each QCL chip once per repeat, sweeping monotonically within it"""
+    groups: Dict[int, List[int]] = {}
+    for i, qcl in enumerate(qcls):
+        groups.setdefault(qcl, []).append(i)
+
+    order = []
+    position = start
+    for r in range(repeats):
+        remaining = dict(groups)
+        while remaining:
+            # Next chip: the one whose nearest edge is closest to where we are
+            def distance(qcl):
+                values = [points[i] for i in remaining[qcl]]
+                if position is None:
+                    return min(values)
+                return min(abs(min(values) - position), abs(max(values) - position))
+
+            qcl = min(remaining, key=distance)
+            sweep = _sorted_indices(points, remaining.pop(qcl), position)
+            order.extend((r, i) for i in sweep)
+            position = points[sweep[-1]]
+    return order
+
+
+_ORDERINGS = {
+    "requested": _order_requested,
+    "monotonic": _order_monotonic,
+    "serpentine": _order_serpentine,
+    "grouped": _order_grouped,
+}
+
+
+def predict_tune_time(points: List[float], qcls: List[int], order: List[PlanStep],
+                      latency_model, start_wavenumber: Optional[float] = None,
+                      start_qcl: Optional[int] = None) -> float:
+    """Sum predicted tune durations along an execution order"""
+    total = 0.0
+    position, chip = start_wavenumber, start_qcl
+    for _, i in order:
+        total += latency_model.predict(position, points[i], chip, qcls[i])
+        position, chip = points[i], qcls[i]
+    return total
+
+
+def plan_scan(points: List[float], latency_model, qcl_lookup: Callable[[float], int],
+              repeats: int = 1, strategy: str = "auto",
+              start_wavenumber: Optional[float] = None,
+              start_qcl: Optional[int] = None) -> ScanPlan:
+    """
+    Build a scan plan for the requested points
+
+    With ``strategy="auto"`` every ordering is costed with the tune-latency
+    model and the cheapest one is chosen. The requested point order is kept
+    in ``ScanPlan.points`` so results can be restored with
+    :func:`restore_requested_order`.
+    """
+    if strategy != "auto" and strategy not in STRATEGIES:
+        raise ValueError(f"Unknown scan strategy '{strategy}', expected one of {STRATEGIES}")
+    if repeats < 1:
+        raise ValueError("repeats must be at least 1")
+
+    points = [float(p) for p in points]
+    qcls = [qcl_lookup(p) for p in points]
+    candidates = STRATEGIES if strategy == "auto" else (strategy,)
+
+    costs: Dict[str, float] = {}
+    orders: Dict[str, List[PlanStep]] = {}
+    for name in candidates:
+        orders[name] = _ORDERINGS[name](points, qcls, repeats, start_wavenumber)
+        costs[name] = predict_tune_time(points, qcls, orders[name], latency_model,
+                                        start_wavenumber, start_qcl)
+
+    # Ties keep the earlier (simpler) strategy
+    best = min(candidates, key=lambda name: costs[name])
+    logger.info(f"Scan plan: {len(points)} points x {repeats} using '{best}' "
+                f"(predicted tuning {costs[best]:.1f} s)")
+
+    return ScanPlan(
+        points=points,
+        repeats=repeats,
+        strategy=best,
+        order=orders[best],
+        predicted_tune_time=costs[best],
+        strategy_costs=costs
+    )
+
+
+def restore_requested_order(plan: ScanPlan, results: List[Any]) -> List[List[Any]]:
+    """
+    Map results collected in execution order back to the requested order
+
+    Returns one list per repeat, indexed like ``plan.points``.
+    """
+    if len(results) != len(plan.order):
+        raise ValueError(f"Expected {len(plan.order)} results, got {len(results)}")
+
+    ordered: List[List[Any]] = [[None] * len(plan.points) for _ in range(plan.repeats)]
+    for (repeat, index), result in zip(plan.order, results):
+        ordered[repeat][index] = result
+    return ordered
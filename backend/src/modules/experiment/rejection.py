@@ -0,0 +1,86 @@
+"""
+Outlier Shot Rejection
+Robust (median/MAD) screening of probe shots and device validity flags before averaging
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+# 1.4826 * MAD estimates the standard deviation of normally distributed values
+MAD_SCALE = 1.4826
+
+COUNTS = ("invalid", "outliers")
+
+
+@dataclass
+class RejectionSettings:
+    """
+    Which shots are dropped before they are averaged
+
+    A shot is an outlier when it lies more than ``threshold`` robust
+    standard deviations (1.4826 * MAD) from the median of its group:
+    pumped and unpumped shots are judged separately, since they differ by
+    the signal itself. Nd:YAG misfires (a pumped shot that looks unpumped)
+    and MIRcat dropouts (probe intensity collapses) both show up this way.
+    Shots are also dropped as invalid when the PicoScope segment overflowed
+    (``reject_overflow``) or the MIRcat reports no valid light after the
+    block (``check_light``: the whole block).
+    """
+    enabled: bool = True
+    threshold: float = 5.0
+    check_light: bool = True
+    reject_overflow: bool = True
+
+    def validate(self) -> None:
+        if not self.threshold > 0:
+            raise ValueError("Require threshold > 0")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+def robust_outliers(values: np.ndarray, valid: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Mask of ``valid`` values further than ``threshold`` robust standard
+    deviations from the median of the valid values
+
+    Needs at least three valid values; a zero MAD (e.g. identical
+    quantized readings) flags nothing.
+    """
+    outliers = np.zeros(values.shape, dtype=bool)
+    if np.count_nonzero(valid) < 3:
+        return outliers
+    sample = values[valid]
+    median = np.median(sample)
+    deviation = np.abs(values - median)
+    scale = MAD_SCALE * np.median(deviation[valid])
+    if scale > 0:
+        outliers = valid & (deviation > threshold * scale)
+    return outliers
+
+
+def reject_shots(shots: np.ndarray, mask: np.ndarray, settings: RejectionSettings,
+                 valid: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    Which shots to keep, and how many were rejected for each reason
+
+    ``shots`` are the per-shot intensities of one block, ``mask`` marks
+    the pumped ones and ``valid`` the shots the devices vouch for.
+    Non-finite shots are always invalid.
+    """
+    valid = np.isfinite(shots) if valid is None else np.asarray(valid, dtype=bool) & np.isfinite(shots)
+    outliers = robust_outliers(shots, valid & mask, settings.threshold)
+    outliers |= robust_outliers(shots, valid & ~mask, settings.threshold)
+    keep = valid & ~outliers
+    return keep, {"invalid": int(shots.size - np.count_nonzero(valid)),
+                  "outliers": int(np.count_nonzero(outliers))}
+
+
+def merge_counts(total: Optional[Dict[str, int]], counts: Dict[str, int]) -> Dict[str, int]:
+    """Rejection counts of several blocks of one point"""
+    if total is None:
+        return dict(counts)
+    return {key: total.get(key, 0) + counts.get(key, 0) for key in COUNTS}
+
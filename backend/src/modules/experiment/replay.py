@@ -0,0 +1,179 @@
+"""
+Session Replay
+Re-executes the runs of a recorded device session against replayed transports, for regression and throughput checks
+
+From ``backend``: ``python -m src.modules.experiment.replay <session> [--speed max|1|10] [--json]``
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+from typing import Dict, Any, List, Optional
+
+import toml
+
+from ..arduino_uno_r4.controller import ArduinoController
+from ..continuum_ndyag.controller import NdYAGController
+from ..daylight_mircat.controller import MIRcatController
+from ..picoscope_5244d.controller import PicoScopeController
+from ..quantum_composers_9524.controller import QC9524Controller
+from ..zurich_hf2li.controller import HF2LIController
+from ...services import ReplayMismatch, device_session
+from .engine import ExperimentDevices, ExperimentEngine, RunSettings, point_summary
+
+logger = logging.getLogger(__name__)
+
+# Relative difference below which replayed and recorded values count as equal
+TOLERANCE = 1e-9
+
+
+def _recorded_runs(notes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """(settings, recorded end) of every run of the session, in order"""
+    ends = {note["data"]["run_id"]: note["data"] for note in notes if note["name"] == "run_end"}
+    return [{"run_id": note["data"]["run_id"], "settings": note["data"]["settings"],
+             "devices": note["data"].get("devices"), "resumed": note["data"].get("resumed", False),
+             "recorded": ends.get(note["data"]["run_id"])}
+            for note in notes if note["name"] == "run"]
+
+
+def _differs(recorded: Any, replayed: Any) -> bool:
+    if isinstance(recorded, float) and isinstance(replayed, float):
+        if math.isnan(recorded) or math.isnan(replayed):
+            return math.isnan(recorded) != math.isnan(replayed)
+        return abs(recorded - replayed) > TOLERANCE * max(abs(recorded), abs(replayed), 1e-300)
+    return recorded != replayed
+
+
+def compare_points(recorded: List[Dict[str, Any]], replayed: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Points and fields where a replayed run differs from the recorded one"""
+    mismatches = []
+    for index, (before, after) in enumerate(zip(recorded, replayed)):
+        fields = [key for key in before if _differs(before[key], after.get(key))]
+        if fields and len(mismatches) < 20:
+            mismatches.append({"index": index, "fields": fields,
+                               "recorded": {key: before[key] for key in fields},
+                               "replayed": {key: after.get(key) for key in fields}})
+    differing = sum(1 for before, after in zip(recorded, replayed)
+                    if any(_differs(before[key], after.get(key)) for key in before))
+    return {"recorded_points": len(recorded), "replayed_points": len(replayed),
+            "differing_points": differing, "mismatches": mismatches}
+
+
+def _controllers(config_path: str) -> ExperimentDevices:
+    """Every controller, connected to its replayed transport when the session has one"""
+    qc = QC9524Controller(config_path)
+    devices = ExperimentDevices(
+        mircat=MIRcatController(config_path),
+        arduino=ArduinoController(config_path),
+        qc=qc,
+        scope=PicoScopeController(config_path),
+        lockin=HF2LIController(config_path),
+        ndyag=NdYAGController(qc, config_path)
+    )
+    for name in ("mircat", "arduino", "qc", "scope", "lockin"):
+        if name in device_session.channels:
+            if not getattr(devices, name).connect():
+                raise ReplayMismatch(f"{name} did not connect from the recorded session")
+    # Warmup is not device I/O; a recorded run had a warm laser
+    devices.ndyag.warmup_started = time.monotonic() - devices.ndyag.warmup_time
+    return devices
+
+
+async def replay_runs(path: str, speed="max", runs_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Replay the session at ``path`` and re-execute every run recorded in it
+
+    Controllers are built from the configuration stored in the session and
+    answered from its recorded exchanges at ``speed`` (``"max"``: no device
+    waiting). Each run's points are compared with the recorded ones, and
+    its duration with the recorded duration. Resumed runs are left out.
+    Runs whose accumulation stopped on a time limit only replay faithfully
+    at 1x.
+    """
+    device_session.replay(path, speed)
+    report: Dict[str, Any] = {"session": path, "speed": device_session.speed or "max", "runs": []}
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            config = dict(device_session.header.get("config", {}))
+            mircat = dict(config.get('daylight_mircat', {}))
+            mircat['tuning'] = dict(mircat.get('tuning', {}),
+                                    latency_model_file=os.path.join(scratch, "tune_latency.json"))
+            config['daylight_mircat'] = mircat
+            config_path = os.path.join(scratch, "hardware_configuration.toml")
+            with open(config_path, 'w') as f:
+                toml.dump(config, f)
+
+            controllers = _controllers(config_path)
+            for run in _recorded_runs(device_session.notes):
+                if run["resumed"] or run["recorded"] is None:
+                    report["runs"].append({"run_id": run["run_id"], "skipped": "resumed or unfinished"})
+                    continue
+                # The same devices as the recorded run (the pump mask depends on whether there is a Nd:YAG)
+                used = run["devices"] or list(vars(controllers))
+                devices = ExperimentDevices(**{name: controller if name in used else None
+                                               for name, controller in vars(controllers).items()})
+                engine = ExperimentEngine(devices, config_path, runs_dir=runs_dir or scratch)
+                start = time.perf_counter()
+                status = await engine.run(RunSettings.from_dict(run["settings"]))
+                elapsed = time.perf_counter() - start
+                recorded = run["recorded"]
+                comparison = compare_points(recorded["points"], [point_summary(r) for r in engine.results])
+                report["runs"].append({
+                    "run_id": run["run_id"],
+                    "replay_run_id": status["run_id"],
+                    "recorded_state": recorded["state"],
+                    "state": status["state"],
+                    "error": engine.error,
+                    "recorded_elapsed": recorded["elapsed"],
+                    "elapsed": elapsed,
+                    "speedup": recorded["elapsed"] / elapsed if elapsed > 0 else None,
+                    "recorded_points_per_second": len(recorded["points"]) / recorded["elapsed"]
+                    if recorded["elapsed"] > 0 else None,
+                    "points_per_second": len(engine.results) / elapsed if elapsed > 0 else None,
+                    **comparison
+                })
+        report["devices"] = device_session.get_status()["devices"]
+    finally:
+        device_session.stop()
+
+    runs = [run for run in report["runs"] if "skipped" not in run]
+    report["passed"] = bool(runs) and all(
+        run["state"] == run["recorded_state"] and run["recorded_points"] == run["replayed_points"]
+        and not run["differing_points"] for run in runs)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-execute the runs of a recorded device session")
+    parser.add_argument("session")
+    parser.add_argument("--speed", default="max", help="device time factor: 1 (as recorded), 10, ... or max")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(replay_runs(args.session, args.speed))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for run in report["runs"]:
+            if "skipped" in run:
+                print(f"{run['run_id']}: skipped ({run['skipped']})")
+                continue
+            print(f"{run['run_id']}: {run['state']} (recorded {run['recorded_state']}), "
+                  f"{run['replayed_points']}/{run['recorded_points']} points, {run['differing_points']} differing, "
+                  f"{run['elapsed']:.3f} s vs {run['recorded_elapsed']:.3f} s recorded "
+                  f"({run['speedup']:.1f}x)")
+        for device, stats in report.get("devices", {}).items():
+            print(f"  {device}: {stats['replayed']} replayed, {stats['skipped']} skipped, "
+                  f"{stats['diverged']} diverged, {stats['remaining']} left")
+        print("PASSED" if report["passed"] else "FAILED")
+    return 0 if report["passed"] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,810 @@
+"""
+Experiment API Routes
+Defines REST API endpoints for experiment planning and execution
+"""
+
+import os
+import numpy as np
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel
+from typing import Dict, Any, List, Optional
+from ..arduino_uno_r4.routes import arduino_controller
+from ..continuum_ndyag.routes import ndyag_controller
+from ..daylight_mircat.routes import mircat_controller
+from ..picoscope_5244d.routes import picoscope_controller
+from ..quantum_composers_9524.routes import qc9524_controller
+from ..zurich_hf2li.routes import hf2li_controller
+from ..daylight_mircat.utils import get_tuning_range
+from ...analysis import BatchFitter, FitSettings, GlobalFitter, NoiseAnalyzer, SpectralAxis, grid_matrix, truncated_svd
+from ...services import (DEVICES, CalibrationSet, LeaseUnavailable, SafetyWatchdog, device_leases, health_monitor,
+                         status_check)
+from ...simulators import create_signal_source
+from .adaptive import AdaptiveSettings, benchmark_adaptive
+from .catalog import RunCatalog
+from .checkpoint import list_checkpoints
+from .hdf5 import benchmark_writer, hdf5_path, read_hdf5_points, read_hdf5_raw
+from .integration import IntegrationTarget
+from .engine import ExperimentDevices, ExperimentEngine
+from .job_queue import JobQueue
+from .planner import plan_scan
+from .rejection import RejectionSettings
+from .storage import RUNS_DIR, read_run
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Create router for experiment routes
+experiment_router = APIRouter(prefix="/api/experiment", tags=["Experiment"])
+
+# Catalog of every run, searched by the /catalog endpoints
+run_catalog = RunCatalog()
+
+# Wavenumber, power and detector calibrations from [calibration]
+system_calibration = CalibrationSet()
+
+# Baseline/peak fitting of measured spectra, warm-started across calls
+spectrum_fitter = BatchFitter()
+
+# SVD and global multi-exponential fits of delay x wavenumber matrices
+kinetic_fitter = GlobalFitter()
+
+# Live noise spectra of every PicoScope block, computed off the acquisition path
+noise_analyzer = NoiseAnalyzer.from_config(picoscope_controller.config)
+picoscope_controller.add_block_listener(noise_analyzer.submit)
+
+# Global engine driving the shared device controllers
+experiment_engine = ExperimentEngine(ExperimentDevices(
+    mircat=mircat_controller,
+    arduino=arduino_controller,
+    qc=qc9524_controller,
+    scope=picoscope_controller,
+    lockin=hf2li_controller,
+    ndyag=ndyag_controller
+), catalog=run_catalog, leases=device_leases, calibration=system_calibration)
+
+# Queue of runs started one after another as their devices free up
+job_queue = JobQueue(experiment_engine, device_leases)
+
+# Every device's status query as a health check (skipped while the device is leased)
+for device_name in DEVICES:
+    health_monitor.register(device_name, status_check(getattr(experiment_engine.devices, device_name).get_status),
+                            device=device_name)
+
+# Laser exposure and temperature limits, enforced from the controllers' cached state
+safety_watchdog = SafetyWatchdog(mircat_controller, ndyag_controller, leases=device_leases)
+safety_watchdog.watch_errors(lambda: experiment_engine.error if experiment_engine.state == "failed" else None)
+
+async def _safety_trip(event: Dict[str, Any]) -> None:
+    """After a safety shutdown: hold the queue and stop the run"""
+    job_queue.pause()
+    await experiment_engine.stop()
+
+safety_watchdog.on_trip(_safety_trip)
+
+@experiment_router.on_event("startup")
+async def start_job_queue():
+    job_queue.start()
+    safety_watchdog.start()
+
+# Pydantic models for request/response
+class PlanRequest(BaseModel):
+    points: List[float]  # wavenumbers (cm-1) in the order results should be reported
+    units: str = "cm1"  # unit of ``points``: "cm1" or "microns"
+    repeats: int = 1
+    strategy: str = "auto"
+
+class AdaptiveRequest(BaseModel):
+    coarse_points: int = 33
+    threshold: float = 0.01  # acceptable interpolation error, fraction of peak-to-peak
+    max_points: int = 100
+    time_budget: Optional[float] = None  # seconds
+    batch_size: int = 8
+    min_spacing: float = 0.5  # cm-1
+
+class IntegrationTargetRequest(BaseModel):
+    target_stderr: Optional[float] = None  # signal units (dOD or volts)
+    target_snr: Optional[float] = None
+    min_time: float = 0.1  # seconds
+    max_time: float = 5.0  # seconds
+    chunk_time: float = 0.1  # seconds
+
+class RejectionRequest(BaseModel):
+    enabled: bool = True
+    threshold: float = 5.0  # robust standard deviations (1.4826 MAD) from the median
+    check_light: bool = True  # drop blocks taken while the MIRcat reports no valid light
+    reject_overflow: bool = True  # drop PicoScope segments that went over range
+
+class RunRequest(BaseModel):
+    points: Optional[List[float]] = None  # wavenumbers (cm-1); default grid from [experiment] when omitted
+    units: str = "cm1"  # unit of ``points``: "cm1" or "microns"
+    sample: Optional[str] = None  # sample name recorded in the run catalog
+    repeats: int = 1
+    strategy: str = "auto"
+    detector: str = "picoscope"  # "picoscope" or "lockin"
+    integration_time: Optional[float] = None  # seconds per point
+    mux_position: Optional[int] = None
+    mux_positions: Optional[List[int]] = None  # several samples, scheduled interleaved or sequentially
+    mux_order: str = "auto"  # "auto", "interleaved" or "sequential"
+    delay_index: Optional[int] = None  # point of the loaded QC9524 delay scan
+    adaptive: Optional[AdaptiveRequest] = None  # refine a coarse grid over the range of ``points``
+    integration_target: Optional[IntegrationTargetRequest] = None  # replaces integration_time per point
+    rejection: Optional[RejectionRequest] = None  # outlier shot rejection; [experiment.outlier_rejection] when omitted
+
+class JobRequest(RunRequest):
+    priority: int = 0  # higher runs first
+    name: Optional[str] = None
+    devices: Optional[List[str]] = None  # extra devices to hold, e.g. "ndyag"
+
+class PriorityRequest(BaseModel):
+    priority: int
+
+class BenchmarkRequest(AdaptiveRequest):
+    uniform_points: int = 100
+
+class BackfillRequest(BaseModel):
+    directory: Optional[str] = None  # defaults to the engine's run directory
+
+class HDF5BenchmarkRequest(BaseModel):
+    num_points: int = 200
+    segments: int = 1000  # probe shots per point
+    samples: int = 100  # samples per shot
+
+class CalibrationRequest(BaseModel):
+    wavenumbers: List[float]  # nominal (MIRcat set) wavenumbers, cm-1
+    spectra: List[List[float]] = []  # one row per spectrum, one value per wavenumber
+    normalize_power: bool = True
+
+class FitRequest(BaseModel):
+    x: Optional[List[float]] = None  # wavenumbers (cm-1); fits the current run's live spectra when omitted
+    spectra: Optional[List[List[Optional[float]]]] = None  # one row per spectrum, null for missing points
+    keys: Optional[List[str]] = None  # warm-start key per spectrum (e.g. sample name)
+    warm_start: bool = True
+    baseline: str = "als"  # "none", "polynomial" or "als"
+    poly_order: int = 3
+    poly_iterations: int = 0
+    als_lambda: float = 1e5
+    als_p: float = 0.01
+    als_iterations: int = 10
+    num_peaks: int = 1
+    shape: str = "lorentzian"  # or "gaussian"
+    max_iterations: int = 100
+    tolerance: float = 1e-8
+
+class NoiseConfigRequest(BaseModel):
+    enabled: Optional[bool] = None
+    segment_length: Optional[int] = None  # shots per FFT frame (frequency resolution = trigger_rate / length)
+    window: Optional[str] = None  # "hann", "hamming", "blackman" or "boxcar"
+    overlap: Optional[float] = None
+    averages: Optional[int] = None
+    publish_interval: Optional[float] = None  # seconds
+    max_points: Optional[int] = None  # bins per published spectrum
+
+class KineticsRequest(BaseModel):
+    # One source: run files, an inline matrix, or a .npy file in the runs directory (memory-mapped)
+    run_ids: Optional[List[str]] = None  # points of these runs, gridded by (delay, wavenumber)
+    mux_position: Optional[int] = None  # only this sample's points of the runs
+    matrix: Optional[List[List[Optional[float]]]] = None  # rows: delays, columns: wavenumbers
+    file: Optional[str] = None  # .npy matrix (delays x wavenumbers), read in row chunks
+    delays: Optional[List[float]] = None  # seconds, one per row (with matrix or file)
+    wavenumbers: Optional[List[float]] = None  # cm-1, one per column (with matrix or file)
+    rank: Optional[int] = None  # singular components kept; default: those above the noise floor
+    max_vectors: int = 10  # singular vectors returned by /svd
+
+class GlobalFitRequest(KineticsRequest):
+    num_exponentials: int = 2
+    offset: bool = False  # add a component that outlives the delay range
+    initial_taus: Optional[List[float]] = None  # seconds; otherwise ``starts`` spread over the delays
+    starts: int = 8
+    t0: float = 0.0  # time zero, seconds
+    max_iterations: int = 100
+
+class MultiSampleRequest(BaseModel):
+    points: Optional[List[float]] = None
+    units: str = "cm1"
+    mux_positions: List[int]
+    repeats: int = 1
+    mux_order: str = "auto"
+    integration_time: Optional[float] = None
+
+def _wavenumbers(points: Optional[List[float]], units: str) -> Optional[List[float]]:
+    """Requested points in cm-1, checked against the MIRcat chips; raises ValueError"""
+    if not points:
+        return None
+    axis = SpectralAxis(points, units)
+    mircat_controller.check_axis(axis)
+    return axis.wavenumbers.tolist()
+
+def _error(message: str, status_code: int = 500) -> HTTPException:
+    return HTTPException(
+        status_code=status_code,
+        detail={
+            "status": "error",
+            "message": message
+        }
+    )
+
+@experiment_router.post("/plan")
+async def plan(request: PlanRequest) -> Dict[str, Any]:
+    """Order scan points to minimize tuning time using the MIRcat latency model"""
+    try:
+        scan_plan = plan_scan(
+            _wavenumbers(request.points, request.units),
+            mircat_controller.latency_model,
+            mircat_controller.qcl_for_wavenumber,
+            repeats=request.repeats,
+            strategy=request.strategy,
+            start_wavenumber=mircat_controller.current_wavenumber,
+            start_qcl=mircat_controller.current_qcl
+        )
+        return {
+            "status": "success",
+            "data": scan_plan.to_dict()
+        }
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "status": "error",
+                "message": str(e)
+            }
+        )
+    except Exception as e:
+        logger.error(f"Plan error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": str(e)
+            }
+        )
+
+@experiment_router.post("/multisample/plan")
+async def multisample_plan(request: MultiSampleRequest) -> Dict[str, Any]:
+    """Estimate interleaved and sequential run times for several MUX positions"""
+    try:
+        settings = experiment_engine.build_settings(
+            _wavenumbers(request.points, request.units),
+            repeats=request.repeats,
+            integration_time=request.integration_time,
+            mux_positions=request.mux_positions,
+            mux_order=request.mux_order
+        )
+        _, _, schedule = experiment_engine.plan_run(settings)
+    except ValueError as e:
+        raise _error(str(e), status_code=400)
+    return {
+        "status": "success",
+        "data": schedule.to_dict()
+    }
+
+@experiment_router.post("/adaptive/benchmark")
+def adaptive_benchmark(request: BenchmarkRequest) -> Dict[str, Any]:
+    """Compare adaptive and uniform sampling on the simulator's synthetic spectrum"""
+    settings = AdaptiveSettings(**request.dict(exclude={"uniform_points"}))
+    source = create_signal_source(picoscope_controller.config)
+    low, high = get_tuning_range(mircat_controller.config)
+    return {
+        "status": "success",
+        "data": benchmark_adaptive(source.delta_od, low, high, settings, request.uniform_points)
+    }
+
+def _run_settings(request: RunRequest):
+    return experiment_engine.build_settings(
+        _wavenumbers(request.points, request.units),
+        sample=request.sample,
+        repeats=request.repeats,
+        strategy=request.strategy,
+        detector=request.detector,
+        integration_time=request.integration_time,
+        mux_position=request.mux_position,
+        mux_positions=request.mux_positions,
+        mux_order=request.mux_order,
+        delay_index=request.delay_index,
+        adaptive=AdaptiveSettings(**request.adaptive.dict()) if request.adaptive else None,
+        integration_target=IntegrationTarget(**request.integration_target.dict())
+        if request.integration_target else None,
+        rejection=RejectionSettings(**request.rejection.dict()) if request.rejection else None
+    )
+
+@experiment_router.post("/dryrun")
+async def dry_run(request: RunRequest, timeline: bool = False) -> Dict[str, Any]:
+    """Predict duration, per-stage timeline and bottleneck of a run without touching hardware"""
+    try:
+        data = experiment_engine.dry_run(_run_settings(request), include_timeline=timeline)
+    except ValueError as e:
+        raise _error(str(e), status_code=400)
+    message = f"Predicted {data['total_time']:.1f} s, bottleneck: {data['bottleneck']}"
+    if not data["fits"]:
+        message += f" (exceeds max_scan_time {data['max_scan_time']} s)"
+    return {
+        "status": "success",
+        "message": message,
+        "data": data
+    }
+
+@experiment_router.post("/run")
+async def start_run(request: RunRequest) -> Dict[str, Any]:
+    """Start a pipelined scan in the background"""
+    try:
+        settings = _run_settings(request)
+        run_id = experiment_engine.start(settings)
+    except LeaseUnavailable as e:
+        raise _error(str(e), status_code=409)
+    except ValueError as e:
+        raise _error(str(e), status_code=400)
+    return {
+        "status": "success",
+        "message": f"Experiment {run_id} started",
+        "data": {"run_id": run_id}
+    }
+
+@experiment_router.get("/runs/checkpoints")
+async def get_checkpoints() -> Dict[str, Any]:
+    """List checkpointed runs and whether they can be resumed"""
+    return {
+        "status": "success",
+        "data": list_checkpoints(experiment_engine.runs_dir)
+    }
+
+@experiment_router.post("/run/{run_id}/resume")
+async def resume_run(run_id: str) -> Dict[str, Any]:
+    """Resume a stopped, failed or interrupted run from its last checkpoint"""
+    try:
+        experiment_engine.resume(run_id)
+    except LeaseUnavailable as e:
+        raise _error(str(e), status_code=409)
+    except ValueError as e:
+        raise _error(str(e), status_code=400)
+    return {
+        "status": "success",
+        "message": f"Experiment {run_id} resumed",
+        "data": experiment_engine.get_status()
+    }
+
+@experiment_router.post("/jobs")
+async def submit_job(request: JobRequest) -> Dict[str, Any]:
+    """Queue a run; it starts as soon as the engine and its devices are free"""
+    try:
+        job = job_queue.submit(_run_settings(request), request.priority, request.name, request.devices)
+    except ValueError as e:
+        raise _error(str(e), status_code=400)
+    return {
+        "status": "success",
+        "message": f"Job {job.job_id} queued",
+        "data": job.to_dict()
+    }
+
+@experiment_router.get("/jobs")
+async def get_jobs(state: Optional[str] = None) -> Dict[str, Any]:
+    """List jobs, optionally only those in ``state``, with the queue status"""
+    jobs = [job.to_dict() for job in job_queue.jobs.values() if state is None or job.state == state]
+    return {
+        "status": "success",
+        "data": {"jobs": jobs, "queue": job_queue.get_status()}
+    }
+
+@experiment_router.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    """Get one job"""
+    try:
+        job = job_queue.get(job_id)
+    except ValueError as e:
+        raise _error(str(e), status_code=404)
+    return {
+        "status": "success",
+        "data": job.to_dict()
+    }
+
+@experiment_router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str) -> Dict[str, Any]:
+    """Remove a queued job, or stop it if it is running"""
+    try:
+        job = await job_queue.cancel(job_id)
+    except ValueError as e:
+        raise _error(str(e), status_code=400)
+    return {
+        "status": "success",
+        "message": f"Job {job_id} {job.state}",
+        "data": job.to_dict()
+    }
+
+@experiment_router.post("/jobs/{job_id}/priority")
+async def set_job_priority(job_id: str, request: PriorityRequest) -> Dict[str, Any]:
+    """Change the priority of a queued job"""
+    try:
+        job = job_queue.set_priority(job_id, request.priority)
+    except ValueError as e:
+        raise _error(str(e), status_code=400)
+    return {
+        "status": "success",
+        "data": job.to_dict()
+    }
+
+@experiment_router.post("/jobs/pause")
+async def pause_jobs() -> Dict[str, Any]:
+    """Stop starting new jobs; the running one continues"""
+    job_queue.pause()
+    return {
+        "status": "success",
+        "message": "Job queue paused",
+        "data": job_queue.get_status()
+    }
+
+@experiment_router.post("/jobs/resume")
+async def resume_jobs() -> Dict[str, Any]:
+    """Start queued jobs again"""
+    job_queue.resume()
+    return {
+        "status": "success",
+        "message": "Job queue resumed",
+        "data": job_queue.get_status()
+    }
+
+@experiment_router.get("/safety")
+async def get_safety() -> Dict[str, Any]:
+    """Watchdog limits, laser on-times, cached temperatures and past trips with reaction times"""
+    return {
+        "status": "success",
+        "data": safety_watchdog.get_status()
+    }
+
+@experiment_router.post("/safety/shutdown")
+async def safety_shutdown() -> Dict[str, Any]:
+    """Switch both lasers off now through the priority lane, stop the run and pause the queue"""
+    event = await safety_watchdog.shutdown("Manual safety shutdown")
+    return {
+        "status": "success",
+        "message": "Lasers shut down, job queue paused",
+        "data": event
+    }
+
+@experiment_router.get("/leases")
+async def get_leases() -> Dict[str, Any]:
+    """Which devices are leased, and by whom"""
+    return {
+        "status": "success",
+        "data": device_leases.get_status()
+    }
+
+@experiment_router.get("/run")
+async def get_run_status() -> Dict[str, Any]:
+    """Get progress and per-stage timing of the current or last run"""
+    return {
+        "status": "success",
+        "data": experiment_engine.get_status()
+    }
+
+@experiment_router.post("/run/stop")
+async def stop_run() -> Dict[str, Any]:
+    """Stop the running experiment"""
+    await experiment_engine.stop()
+    return {
+        "status": "success",
+        "message": "Experiment stopped",
+        "data": experiment_engine.get_status()
+    }
+
+@experiment_router.get("/run/results")
+async def get_run_results() -> Dict[str, Any]:
+    """Get processed results of the current or last run"""
+    return {
+        "status": "success",
+        "data": experiment_engine.get_results()
+    }
+
+@experiment_router.get("/run/live")
+async def get_live_updates(after: Optional[int] = None) -> Dict[str, Any]:
+    """Spectrum updates after sequence number ``after`` (a snapshot first if those are no longer held)"""
+    live = experiment_engine.live
+    return {
+        "status": "success",
+        "data": {
+            "seq": live.seq,
+            "updates": live.since(after)
+        }
+    }
+
+@experiment_router.websocket("/run/live/ws")
+async def live_updates(websocket: WebSocket, after: Optional[int] = None):
+    """
+    Stream spectrum updates: the catch-up from ``after`` (or a snapshot),
+    then one message per persisted point
+    """
+    await websocket.accept()
+    live = experiment_engine.live
+    subscription = live.subscribe()
+    try:
+        for update in live.since(after):
+            await websocket.send_json(update)
+        sent = live.seq
+        while True:
+            if subscription.lagged:
+                live.unsubscribe(subscription)
+                subscription = live.subscribe()
+                await websocket.send_json(live.snapshot())
+                sent = live.seq
+            update = await subscription.queue.get()
+            if update["seq"] > sent:
+                await websocket.send_json(update)
+                sent = update["seq"]
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live.unsubscribe(subscription)
+
+@experiment_router.get("/run/timing")
+async def get_run_timing() -> Dict[str, Any]:
+    """Get per-stage busy/wait times and the critical path"""
+    return {
+        "status": "success",
+        "data": experiment_engine.get_timing()
+    }
+
+@experiment_router.get("/runs/{run_id}/hdf5")
+def get_run_hdf5(run_id: str, start: int = 0) -> Dict[str, Any]:
+    """Read a run's HDF5 point table from row ``start``, also while it is being written"""
+    try:
+        data = read_hdf5_points(hdf5_path(run_id, experiment_engine.runs_dir), start)
+    except (ValueError, OSError) as e:
+        raise _error(str(e), status_code=404)
+    return {
+        "status": "success",
+        "data": data
+    }
+
+@experiment_router.get("/runs/{run_id}/hdf5/raw/{step}")
+def get_run_hdf5_raw(run_id: str, step: int) -> Dict[str, Any]:
+    """Raw PicoScope block (or lock-in samples) and pump mask of one point"""
+    try:
+        raw = read_hdf5_raw(hdf5_path(run_id, experiment_engine.runs_dir), step)
+    except (ValueError, OSError) as e:
+        raise _error(str(e), status_code=404)
+    return {
+        "status": "success",
+        "data": {
+            "block": raw["block"].tolist(),
+            "mask": raw["mask"].tolist() if raw["mask"] is not None else None
+        }
+    }
+
+@experiment_router.post("/hdf5/benchmark")
+def hdf5_benchmark(request: HDF5BenchmarkRequest) -> Dict[str, Any]:
+    """Measure HDF5 writer throughput for each compression setting"""
+    return {
+        "status": "success",
+        "data": benchmark_writer(request.num_points, request.segments, request.samples)
+    }
+
+@experiment_router.get("/catalog")
+def search_catalog(date_from: Optional[str] = None, date_to: Optional[str] = None,
+                   sample: Optional[str] = None, mux_position: Optional[int] = None,
+                   wavenumber: Optional[float] = None, wn_min: Optional[float] = None,
+                   wn_max: Optional[float] = None, settings_hash: Optional[str] = None,
+                   state: Optional[str] = None, detector: Optional[str] = None,
+                   limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+    """Search recorded runs by date (YYYY-MM-DD), sample, MUX position, wavenumber range or settings hash"""
+    try:
+        data = run_catalog.search(date_from, date_to, sample, mux_position, wavenumber, wn_min, wn_max,
+                                  settings_hash, state, detector, limit, offset)
+    except ValueError as e:
+        raise _error(str(e), status_code=400)
+    return {
+        "status": "success",
+        "data": data
+    }
+
+@experiment_router.get("/catalog/{run_id}")
+def get_catalog_run(run_id: str) -> Dict[str, Any]:
+    """Catalog entry of one run"""
+    run = run_catalog.get(run_id)
+    if run is None:
+        raise _error(f"Run {run_id} not in catalog", status_code=404)
+    return {
+        "status": "success",
+        "data": run
+    }
+
+@experiment_router.post("/catalog/backfill")
+def backfill_catalog(request: BackfillRequest) -> Dict[str, Any]:
+    """Index existing run files (JSONL and HDF5) under a directory"""
+    directory = request.directory or experiment_engine.runs_dir
+    if directory is not None and not os.path.isdir(directory):
+        raise _error(f"No directory {directory}", status_code=400)
+    result = run_catalog.backfill(directory)
+    return {
+        "status": "success",
+        "message": f"Indexed {result['indexed']} runs",
+        "data": result
+    }
+
+@experiment_router.get("/calibration")
+def get_calibration() -> Dict[str, Any]:
+    """Loaded calibration files, their hashes and ranges"""
+    return {
+        "status": "success",
+        "data": system_calibration.get_status()
+    }
+
+@experiment_router.post("/calibration/reload")
+def reload_calibration() -> Dict[str, Any]:
+    """Re-read every calibration file now"""
+    system_calibration.refresh(force=True)
+    return {
+        "status": "success",
+        "message": "Calibration reloaded",
+        "data": system_calibration.get_status()
+    }
+
+@experiment_router.post("/calibration/apply")
+def apply_calibration(request: CalibrationRequest) -> Dict[str, Any]:
+    """Actual wavenumbers and power-normalized spectra for a batch of spectra"""
+    if any(len(row) != len(request.wavenumbers) for row in request.spectra):
+        raise _error("Every spectrum needs one value per wavenumber", status_code=400)
+    wavenumbers = system_calibration.wavenumbers(request.wavenumbers)
+    spectra = np.asarray(request.spectra, dtype=np.float64).reshape(len(request.spectra), len(request.wavenumbers))
+    if request.normalize_power:
+        spectra = system_calibration.normalize_power(wavenumbers, spectra)
+    return {
+        "status": "success",
+        "data": {
+            "wavenumbers": wavenumbers.tolist(),
+            "spectra": spectra.tolist()
+        }
+    }
+
+@experiment_router.post("/analysis/fit")
+def fit_spectra(request: FitRequest) -> Dict[str, Any]:
+    """Baseline-correct and peak-fit a batch of spectra (default: the running experiment's)"""
+    settings = FitSettings(**request.dict(exclude={"x", "spectra", "keys", "warm_start"}))
+    if request.spectra is None:
+        x, keys, spectra = experiment_engine.live.matrix()
+        keys = [f"{mux}/{repeat}" for mux, repeat in keys]  # warm start from the previous point
+        if not keys:
+            raise _error("No measured spectra to fit", status_code=400)
+    else:
+        if request.x is None:
+            raise _error("x is required with spectra", status_code=400)
+        x = request.x
+        spectra = [[np.nan if v is None else v for v in row] for row in request.spectra]
+        keys = request.keys
+        if keys is not None and len(keys) != len(spectra):
+            raise _error("keys needs one entry per spectrum", status_code=400)
+    try:
+        data = spectrum_fitter.fit(x, spectra, settings, keys, request.warm_start)
+    except ValueError as e:
+        raise _error(str(e), status_code=400)
+    data["x"] = list(map(float, x))
+    return {
+        "status": "success",
+        "message": f"Fitted {len(data['fits'])} spectra ({data['fits_per_second'] or 0:.0f} fits/s)",
+        "data": data
+    }
+
+def _kinetic_matrix(request: KineticsRequest):
+    """(delays, wavenumbers, matrix) of a kinetics request; raises ValueError"""
+    sources = [request.run_ids is not None, request.matrix is not None, request.file is not None]
+    if sum(sources) != 1:
+        raise ValueError("Give exactly one of run_ids, matrix or file")
+    if request.run_ids is not None:
+        directory = experiment_engine.runs_dir or RUNS_DIR
+        points = []
+        for run_id in request.run_ids:
+            path = os.path.join(directory, f"{os.path.basename(run_id)}.jsonl")
+            if not os.path.exists(path):
+                raise ValueError(f"No run file for {run_id}")
+            points.extend(r for r in read_run(path) if r.get("type") == "point" and r.get("delay") is not None
+                          and (request.mux_position is None or r.get("mux_position") == request.mux_position))
+        if not points:
+            raise ValueError("The runs have no points with a pump-probe delay")
+        delays, wavenumbers, matrix, _ = grid_matrix(
+            [p["delay"] for p in points], [p["wavenumber"] for p in points],
+            [np.nan if p["signal"] is None else p["signal"] for p in points])
+        return delays, wavenumbers, matrix
+    if request.delays is None:
+        raise ValueError("delays are required with matrix or file")
+    if request.matrix is not None:
+        matrix = np.array([[np.nan if v is None else v for v in row] for row in request.matrix], dtype=np.float64)
+    else:
+        path = os.path.join(experiment_engine.runs_dir or RUNS_DIR, os.path.basename(request.file))
+        if not path.endswith(".npy") or not os.path.exists(path):
+            raise ValueError(f"No .npy file {request.file} in the runs directory")
+        matrix = np.load(path, mmap_mode="r")
+    if matrix.ndim != 2 or matrix.shape[0] != len(request.delays):
+        raise ValueError("The matrix needs one row per delay")
+    wavenumbers = request.wavenumbers if request.wavenumbers is not None else list(range(matrix.shape[1]))
+    if len(wavenumbers) != matrix.shape[1]:
+        raise ValueError("wavenumbers needs one value per matrix column")
+    return np.asarray(request.delays, dtype=np.float64), np.asarray(wavenumbers, dtype=np.float64), matrix
+
+@experiment_router.post("/analysis/kinetics/svd")
+def kinetics_svd(request: KineticsRequest) -> Dict[str, Any]:
+    """Truncated SVD of a delay x wavenumber matrix: singular values, noise floor and component count"""
+    try:
+        delays, wavenumbers, matrix = _kinetic_matrix(request)
+        svd = truncated_svd(matrix, rank=request.rank or 20)
+    except (ValueError, OSError) as e:
+        raise _error(str(e), status_code=400)
+    return {
+        "status": "success",
+        "message": f"{svd.components()} components above the noise floor",
+        "data": {
+            "delays": delays.tolist(),
+            "wavenumbers": wavenumbers.tolist(),
+            **svd.to_dict(request.max_vectors)
+        }
+    }
+
+@experiment_router.post("/analysis/kinetics/fit")
+def kinetics_fit(request: GlobalFitRequest) -> Dict[str, Any]:
+    """Global multi-exponential fit with time constants shared by every wavenumber"""
+    try:
+        delays, wavenumbers, matrix = _kinetic_matrix(request)
+        data = kinetic_fitter.fit(delays, matrix, request.num_exponentials, rank=request.rank,
+                                  initial_taus=request.initial_taus, starts=request.starts,
+                                  offset=request.offset, t0=request.t0, max_iterations=request.max_iterations)
+    except (ValueError, OSError) as e:
+        raise _error(str(e), status_code=400)
+    taus = ", ".join(f"{tau * 1e9:.3g}" for tau in data["taus"])
+    return {
+        "status": "success",
+        "message": f"Time constants {taus} ns",
+        "data": {"delays": delays.tolist(), "wavenumbers": wavenumbers.tolist(), **data}
+    }
+
+@experiment_router.get("/analysis/stats")
+def get_fit_stats() -> Dict[str, Any]:
+    """Fitting throughput and warm-start state"""
+    return {
+        "status": "success",
+        "data": spectrum_fitter.get_stats()
+    }
+
+@experiment_router.get("/analysis/noise")
+def get_noise_spectrum() -> Dict[str, Any]:
+    """Current shot-to-shot and in-trace noise spectra of the PicoScope stream"""
+    return {
+        "status": "success",
+        "data": {**noise_analyzer.snapshot(), "stats": noise_analyzer.get_stats()}
+    }
+
+@experiment_router.post("/analysis/noise/config")
+def configure_noise(request: NoiseConfigRequest) -> Dict[str, Any]:
+    """Change the noise analysis settings; averaging restarts"""
+    if request.enabled is not None:
+        noise_analyzer.enabled = request.enabled
+    if request.publish_interval is not None:
+        noise_analyzer.publish_interval = request.publish_interval
+    if request.max_points is not None:
+        noise_analyzer.max_points = max(2, request.max_points)
+    try:
+        noise_analyzer.configure(segment_length=request.segment_length, window=request.window,
+                                 overlap=request.overlap, averages=request.averages)
+    except ValueError as e:
+        raise _error(str(e), status_code=400)
+    return {
+        "status": "success",
+        "data": {"settings": noise_analyzer.settings, "stats": noise_analyzer.get_stats()}
+    }
+
+@experiment_router.post("/analysis/noise/reset")
+def reset_noise() -> Dict[str, Any]:
+    """Restart spectrum averaging"""
+    noise_analyzer.reset()
+    return {
+        "status": "success",
+        "message": "Noise spectra reset"
+    }
+
+@experiment_router.websocket("/analysis/noise/ws")
+async def noise_updates(websocket: WebSocket):
+    """Stream the decimated noise spectra as they are published"""
+    await websocket.accept()
+    subscriber = noise_analyzer.subscribe()
+    try:
+        await websocket.send_json(noise_analyzer.snapshot())
+        while True:
+            await websocket.send_json(await subscriber.get())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        noise_analyzer.unsubscribe(subscriber)
@@ -0,0 +1,71 @@
+"""
+Experiment Run Storage
+Append-only per-run result files
+"""
+
+import json
+import os
+import logging
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Run data lives next to app.db
+RUNS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "database", "runs")
+
+
+class RunWriter:
+    """
+    Writes one JSON line per completed point to ``<run_id>.jsonl``
+
+    The file is opened once per run and flushed after every point, so a
+    crash loses at most the point being written.
+    """
+
+    def __init__(self, run_id: str, directory: Optional[str] = None):
+        self.run_id = run_id
+        self.directory = directory or RUNS_DIR
+        self.path = os.path.join(self.directory, f"{run_id}.jsonl")
+        self._file = None
+        self.records = 0
+
+    def open(self, header: Dict[str, Any], record_type: str = "header") -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self.write({"type": record_type, **header})
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        self.records += 1
+
+    @property
+    def offset(self) -> int:
+        """Byte length of the file after the last write"""
+        return self._file.tell() if self._file is not None else 0
+
+    def truncate(self, offset: int) -> None:
+        """Drop everything after ``offset`` (records written after the last checkpoint)"""
+        if os.path.exists(self.path) and os.path.getsize(self.path) > offset:
+            with open(self.path, 'r+b') as f:
+                f.truncate(offset)
+
+    def close(self, footer: Optional[Dict[str, Any]] = None) -> None:
+        if self._file is None:
+            return
+        if footer is not None:
+            self.write({"type": "footer", **footer})
+        self._file.close()
+        self._file = None
+
+
+def read_run(path: str) -> List[Dict[str, Any]]:
+    """Read every record of a run file, skipping a torn final line"""
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping incomplete record in {path}")
+    return records
@@ -0,0 +1,244 @@
+"""
+PicoScope 5244D Controller Module
+Handles triggered rapid-block acquisition through the ps5000a driver
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Callable, List, Optional, Dict, Any, Sequence, Tuple
+import numpy as np
+import toml
+
+from ...services.flight_recorder import flight_recorder
+from ...services.replay import device_session
+from ...simulators import create_signal_source, is_simulated
+from .utils import enabled_channels, parse_range, range_index, timebase_12bit
+
+logger = logging.getLogger(__name__)
+
+class PicoScopeController:
+    """
+    Controller for the PicoScope 5244D oscilloscope
+
+    Acquisitions are rapid-block captures: one segment per trigger (probe
+    shot) from the QC9524, returned as a ``(segments, samples)`` array in
+    volts. Every captured block is also passed to the block listeners
+    (e.g. the noise analyzer), which must return immediately.
+    """
+
+    def __init__(self, config_path: str = None):
+        """Initialize PicoScope controller with configuration"""
+        self.config = self._load_config(config_path)
+        self.is_connected = False
+        self.simulated = is_simulated(self.config)
+        self.driver = None
+        self.handle = None
+        self.source = None
+        self._lock = threading.RLock()
+
+        acquisition = self.config.get('acquisition', {})
+        self.sample_interval = acquisition.get('default_timebase', 1000) * 1e-9  # seconds
+        self.samples_per_segment = acquisition.get('samples_per_segment', 100)
+        self.max_segments = acquisition.get('max_segments', 10000)
+        self.trigger_rate = acquisition.get('trigger_rate', 1000)  # Hz
+        self.channels = enabled_channels(self.config)
+        self.blocks_acquired = 0
+        self.last_overflow: Optional[np.ndarray] = None  # per segment of the last block: input over range
+        self.block_listeners: List[Callable[[np.ndarray], None]] = []
+        self._capture = self._read_block  # recorded or replayed as the scope's data stream
+
+    def _load_config(self, config_path: str = None) -> Dict[str, Any]:
+        """Load configuration from TOML file"""
+        if config_path is None:
+            # Default to hardware_configuration.toml in project root
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+            config_path = os.path.join(project_root, "hardware_configuration.toml")
+
+        try:
+            with open(config_path, 'r') as f:
+                config = toml.load(f)
+            return config.get('picoscope_5244d', {})
+        except Exception as e:
+            logger.error(f"Failed to load configuration: {e}")
+            return {}
+
+    def connect(self) -> bool:
+        """Open the scope and configure channels and trigger"""
+        try:
+            with self._lock:
+                if device_session.replaying:
+                    pass  # blocks come from the recorded session
+                elif self.simulated:
+                    self.source = flight_recorder.wrap_calls(create_signal_source(self.config), "scope")
+                else:
+                    self._open_unit()
+                self._capture = device_session.function("scope", "block", self._read_block)
+                self.is_connected = True
+            logger.info("Successfully connected to PicoScope 5244D")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to connect to PicoScope: {e}")
+            self.driver = None
+            self.handle = None
+            return False
+
+    def _open_unit(self) -> None:
+        """Open the ps5000a driver in 12-bit mode and apply the configured settings"""
+        import ctypes
+        from picosdk.ps5000a import ps5000a
+        from picosdk.functions import assert_pico_ok
+
+        self.driver = ps = flight_recorder.wrap_calls(ps5000a, "scope", status_codes=True)
+        self.handle = ctypes.c_int16()
+        resolution = ps5000a.PS5000A_DEVICE_RESOLUTION["PS5000A_DR_12BIT"]
+        assert_pico_ok(ps.ps5000aOpenUnit(ctypes.byref(self.handle), None, resolution))
+
+        acquisition = self.config.get('acquisition', {})
+        channels = self.config.get('channels', {})
+        coupling = ps5000a.PS5000A_COUPLING[f"PS5000A_{acquisition.get('default_coupling', 'DC')}"]
+        for index, letter in enumerate("ABCD"[:self.config.get('parameters', {}).get('num_channels', 4)]):
+            name = channels.get(f'channel_{letter.lower()}_range', acquisition.get('default_range', '5V'))
+            assert_pico_ok(ps.ps5000aSetChannel(
+                self.handle, index, int(letter in self.channels), coupling, range_index(name), 0.0))
+
+        trigger = acquisition.get('trigger_channel', 'A')
+        threshold = acquisition.get('trigger_threshold', 0.1)
+        trigger_range = parse_range(channels.get(f'channel_{trigger.lower()}_range', '5V'))
+        max_adc = ctypes.c_int16()
+        ps.ps5000aMaximumValue(self.handle, ctypes.byref(max_adc))
+        direction = ps5000a.PS5000A_THRESHOLD_DIRECTION[f"PS5000A_{acquisition.get('trigger_direction', 'RISING')}"]
+        assert_pico_ok(ps.ps5000aSetSimpleTrigger(
+            self.handle, 1, "ABCD".index(trigger), int(threshold / trigger_range * max_adc.value),
+            direction, 0, 0))
+        self._max_adc = max_adc.value
+
+    def disconnect(self) -> None:
+        """Close the scope"""
+        with self._lock:
+            if self.driver is not None and self.handle is not None:
+                try:
+                    self.driver.ps5000aStop(self.handle)
+                    self.driver.ps5000aCloseUnit(self.handle)
+                except Exception as e:
+                    logger.error(f"Failed to close PicoScope: {e}")
+            self.driver = None
+            self.handle = None
+            self.source = None
+            self.is_connected = False
+        logger.info("Disconnected from PicoScope")
+
+    def acquire_block(self, num_segments: int, channel: str = "A",
+                      pump_mask: Optional[Sequence[bool]] = None,
+                      wavenumber: Optional[float] = None,
+                      delay: Optional[float] = None) -> Optional[np.ndarray]:
+        """
+        Capture ``num_segments`` triggered segments from ``channel``
+
+        ``pump_mask`` (one bool per segment), ``wavenumber`` and ``delay``
+        describe the optical conditions; only the simulator uses them to
+        synthesize the signal. Returns volts, shape ``(segments, samples)``;
+        which segments went over range is left in ``last_overflow``.
+        """
+        if not self.is_connected:
+            logger.error("PicoScope not connected")
+            return None
+
+        num_segments = max(1, min(int(num_segments), self.max_segments))
+        try:
+            with self._lock:
+                block, overflow = self._capture(num_segments, channel, pump_mask, wavenumber, delay)
+                self.last_overflow = overflow
+            self.blocks_acquired += 1
+            for listener in self.block_listeners:
+                try:
+                    listener(block)
+                except Exception as e:
+                    logger.error(f"PicoScope block listener failed: {e}")
+            return block
+
+        except Exception as e:
+            logger.error(f"PicoScope acquisition failed: {e}")
+            return None
+
+    def _read_block(self, num_segments: int, channel: str, pump_mask: Optional[Sequence[bool]],
+                    wavenumber: Optional[float], delay: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """(volts, overflow) of one block from the simulator or the driver"""
+        if self.simulated:
+            block = self.source.scope_block(
+                wavenumber if wavenumber is not None else 0.0,
+                self.samples_per_segment,
+                self.sample_interval,
+                delay=delay,
+                pump_on=pump_mask if pump_mask is not None else True,
+                num_segments=num_segments,
+                shot_interval=1.0 / self.trigger_rate
+            )
+            return block, np.zeros(num_segments, dtype=bool)
+        return self._run_rapid_block(num_segments, channel)
+
+    def _run_rapid_block(self, num_segments: int, channel: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Rapid-block capture: one segment per trigger, read back in bulk, with per-segment overflow"""
+        import ctypes
+        from picosdk.functions import assert_pico_ok
+
+        ps = self.driver
+        samples = self.samples_per_segment
+        timebase = timebase_12bit(self.sample_interval)
+        source = "ABCD".index(channel.upper())
+        volts = parse_range(self.config.get('channels', {}).get(
+            f'channel_{channel.lower()}_range', self.config.get('acquisition', {}).get('default_range', '5V')))
+
+        max_samples = ctypes.c_int32()
+        assert_pico_ok(ps.ps5000aMemorySegments(self.handle, num_segments, ctypes.byref(max_samples)))
+        assert_pico_ok(ps.ps5000aSetNoOfCaptures(self.handle, num_segments))
+        assert_pico_ok(ps.ps5000aRunBlock(self.handle, 0, samples, timebase, None, 0, None, None))
+
+        ready = ctypes.c_int16(0)
+        deadline = time.monotonic() + num_segments / self.trigger_rate + self.config.get('timeout', 5.0)
+        while not ready.value:
+            if time.monotonic() > deadline:
+                ps.ps5000aStop(self.handle)
+                raise TimeoutError("PicoScope trigger timeout")
+            time.sleep(0.001)
+            ps.ps5000aIsReady(self.handle, ctypes.byref(ready))
+
+        buffers = np.zeros((num_segments, samples), dtype=np.int16)
+        for segment in range(num_segments):
+            assert_pico_ok(ps.ps5000aSetDataBuffer(
+                self.handle, source, buffers[segment].ctypes.data_as(ctypes.POINTER(ctypes.c_int16)),
+                samples, segment, 0))
+        count = ctypes.c_uint32(samples)
+        overflow = (ctypes.c_int16 * num_segments)()
+        assert_pico_ok(ps.ps5000aGetValuesBulk(
+            self.handle, ctypes.byref(count), 0, num_segments - 1, 0, 0, ctypes.byref(overflow)))
+        # One overflow bit per channel and segment
+        overflowed = (np.frombuffer(overflow, dtype=np.int16) & (1 << source)) != 0
+        return buffers.astype(float) * (volts / self._max_adc), overflowed
+
+    def add_block_listener(self, listener: Callable[[np.ndarray], None]) -> None:
+        self.block_listeners.append(listener)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get PicoScope status information"""
+        return {
+            "connected": self.is_connected,
+            "simulated": self.simulated,
+            "device_type": self.config.get('device_type', 'PicoScope 5244D MSO'),
+            "channels": self.channels,
+            "sample_interval": self.sample_interval,
+            "samples_per_segment": self.samples_per_segment,
+            "trigger_rate": self.trigger_rate,
+            "blocks_acquired": self.blocks_acquired
+        }
+
+    def __enter__(self):
+        """Context manager entry"""
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit"""
+        self.disconnect()
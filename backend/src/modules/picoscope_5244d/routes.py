@@ -0,0 +1,91 @@
+"""
+PicoScope 5244D API Routes
+Defines REST API endpoints for oscilloscope acquisition
+"""
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import Dict, Any, Optional
+from .controller import PicoScopeController
+from ...services import lease_guard
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Create router for PicoScope routes
+picoscope_5244d_router = APIRouter(prefix="/api/picoscope", tags=["PicoScope 5244D"],
+                                   dependencies=[lease_guard("scope")])
+
+# Global controller instance
+picoscope_controller = PicoScopeController()
+
+# Pydantic models for request/response
+class AcquireRequest(BaseModel):
+    num_segments: int = 1
+    channel: str = "A"
+    wavenumber: Optional[float] = None  # simulator only
+
+def _error(message: str, status_code: int = 500) -> HTTPException:
+    return HTTPException(
+        status_code=status_code,
+        detail={
+            "status": "error",
+            "message": message
+        }
+    )
+
+@picoscope_5244d_router.post("/connect")
+async def connect() -> Dict[str, Any]:
+    """Connect to the oscilloscope"""
+    if not picoscope_controller.connect():
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": "Failed to connect to PicoScope",
+                "data": {"connected": False}
+            }
+        )
+    return {
+        "status": "success",
+        "message": "Connected to PicoScope",
+        "data": {"connected": True}
+    }
+
+@picoscope_5244d_router.post("/disconnect")
+async def disconnect() -> Dict[str, Any]:
+    """Disconnect from the oscilloscope"""
+    try:
+        picoscope_controller.disconnect()
+        return {
+            "status": "success",
+            "message": "Disconnected from PicoScope",
+            "data": {"connected": False}
+        }
+    except Exception as e:
+        logger.error(f"Disconnection error: {e}")
+        raise _error(str(e))
+
+@picoscope_5244d_router.get("/status")
+async def get_status() -> Dict[str, Any]:
+    """Get PicoScope connection and acquisition settings"""
+    return {
+        "status": "success",
+        "data": picoscope_controller.get_status()
+    }
+
+@picoscope_5244d_router.post("/acquire")
+def acquire(request: AcquireRequest) -> Dict[str, Any]:
+    """Capture a rapid block and return the segment-averaged trace"""
+    block = picoscope_controller.acquire_block(
+        request.num_segments, channel=request.channel, wavenumber=request.wavenumber)
+    if block is None:
+        raise _error("PicoScope acquisition failed")
+    return {
+        "status": "success",
+        "data": {
+            "num_segments": int(block.shape[0]),
+            "sample_interval": picoscope_controller.sample_interval,
+            "trace": block.mean(axis=0).tolist()
+        }
+    }
@@ -0,0 +1,50 @@
+"""
+PicoScope 5244D Utility Functions
+Input range, timebase and channel helpers
+"""
+
+from typing import Dict, Any, List
+
+CHANNEL_LETTERS = "ABCD"
+
+# Input ranges supported by the ps5000a driver, in volts (PS5000A_10MV .. PS5000A_20V)
+VOLTAGE_RANGES = {
+    "10MV": 0.01, "20MV": 0.02, "50MV": 0.05, "100MV": 0.1, "200MV": 0.2, "500MV": 0.5,
+    "1V": 1.0, "2V": 2.0, "5V": 5.0, "10V": 10.0, "20V": 20.0,
+}
+RANGE_NAMES = list(VOLTAGE_RANGES)
+
+
+def parse_range(name: str) -> float:
+    """Convert an input range such as '5V' or '200mV' to volts"""
+    key = name.strip().upper().replace(" ", "")
+    if key not in VOLTAGE_RANGES:
+        raise ValueError(f"Unknown input range '{name}', expected one of {RANGE_NAMES}")
+    return VOLTAGE_RANGES[key]
+
+
+def range_index(name: str) -> int:
+    """Driver enum value (PS5000A_RANGE) for an input range name"""
+    parse_range(name)
+    return RANGE_NAMES.index(name.strip().upper().replace(" ", ""))
+
+
+def timebase_12bit(sample_interval: float) -> int:
+    """
+    Timebase index for a sample interval in seconds (12-bit resolution)
+
+    ps5000a 12-bit mode: 2 ns * 2^(n-1) for n < 3, otherwise 16 ns * (n - 2).
+    """
+    if sample_interval <= 2e-9:
+        return 1
+    if sample_interval <= 4e-9:
+        return 2
+    return max(3, int(round(sample_interval / 16e-9)) + 2)
+
+
+def enabled_channels(config: Dict[str, Any]) -> List[str]:
+    """Letters of the channels enabled in ``[picoscope_5244d.channels]``"""
+    channels = config.get('channels', {})
+    num_channels = config.get('parameters', {}).get('num_channels', 4)
+    return [letter for letter in CHANNEL_LETTERS[:num_channels]
+            if channels.get(f'channel_{letter.lower()}_enabled', letter == "A")]
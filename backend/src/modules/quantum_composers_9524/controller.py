@@ -0,0 +1,312 @@
+"""
+Quantum Composers 9524 Controller Module
+Handles pulse generator programming with a mirrored model of device state
+"""
+
+import os
+import time
+import logging
+from typing import Optional, Dict, Any, List, Tuple
+import serial
+import toml
+
+from ...services.flight_recorder import flight_recorder
+from ...services.replay import device_session
+from ...services.safety import PriorityLock
+from ...simulators import create_qc9524_simulator, is_simulated
+from .timing import DelayScanSpec, TimingTable, compile_delay_scan, load_pump_limits
+from .utils import (
+    CHANNEL_FIELDS,
+    SYSTEM_CHANNEL,
+    SYSTEM_FIELDS,
+    ChannelKey,
+    channel_index,
+    channel_name,
+    config_to_state,
+    format_command,
+    normalize_value,
+    parse_reply,
+)
+
+logger = logging.getLogger(__name__)
+
+Command = Tuple[int, str, Any]
+
+class QC9524Controller:
+    """
+    Controller for the Quantum Composers 9524 pulse generator
+
+    The controller keeps a mirror of the last acknowledged value of every
+    channel field. Requested changes are diffed against the mirror and only
+    the differing fields are sent, as a single write followed by a single
+    read of all acknowledgements.
+    """
+
+    def __init__(self, config_path: str = None):
+        """Initialize QC9524 controller with configuration"""
+        self.connection: Optional[serial.Serial] = None
+        self.config = self._load_config(config_path)
+        self.is_connected = False
+        self.simulated = is_simulated(self.config)
+
+        params = self.config.get('parameters', {})
+        self.num_channels = params.get('num_channels', 8)
+        self.resolution = params.get('resolution', 0.25) * 1e-9  # seconds
+        self.terminator = self.config.get('communication', {}).get('command_terminator', '\r\n')
+
+        # Mirror of device state: None means unknown and is always re-sent
+        self.mirror: Dict[int, Dict[str, Any]] = {}
+        self.invalidate()
+        self._lock = PriorityLock()  # safety shutdowns jump queued syncs
+        self._short_reply = False  # last sync timed out waiting for acks
+
+        self.timing_table: Optional[TimingTable] = None
+        self.last_sync: Dict[str, Any] = {}
+        self.last_shutdown_wait: Optional[float] = None
+        self.stats = {
+            "syncs": 0,
+            "commands_sent": 0,
+            "commands_skipped": 0,
+            "bytes_sent": 0,
+            "errors": 0,
+            "total_time": 0.0
+        }
+
+    def _load_config(self, config_path: str = None) -> Dict[str, Any]:
+        """Load configuration from TOML file"""
+        if config_path is None:
+            # Default to hardware_configuration.toml in project root
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+            config_path = os.path.join(project_root, "hardware_configuration.toml")
+
+        try:
+            with open(config_path, 'r') as f:
+                config = toml.load(f)
+            return config.get('quantum_composers_9524', {})
+        except Exception as e:
+            logger.error(f"Failed to load configuration: {e}")
+            return {}
+
+    def connect(self) -> bool:
+        """Open the serial link and verify the generator responds"""
+        try:
+            if device_session.replaying:
+                self.connection = None  # answered from the recorded session
+            elif self.simulated:
+                self.connection = create_qc9524_simulator(self.config)
+            else:
+                comm = self.config.get('communication', {})
+                self.connection = serial.serial_for_url(
+                    self.config.get('port', 'COM4'),
+                    baudrate=self.config.get('baud_rate', 115200),
+                    bytesize=comm.get('data_bits', 8),
+                    parity={'none': serial.PARITY_NONE, 'even': serial.PARITY_EVEN,
+                            'odd': serial.PARITY_ODD}[comm.get('parity', 'none')],
+                    stopbits=comm.get('stop_bits', 1),
+                    timeout=self.config.get('timeout', 2.0)
+                )
+            self.connection = flight_recorder.wrap_serial(device_session.serial("qc", self.connection), "qc")
+
+            self.connection.reset_input_buffer()
+            self.connection.write(f"*IDN?{self.terminator}".encode())
+            identity = self.connection.readline().decode(errors='replace').strip()
+            if not identity:
+                logger.error("QC9524 did not respond to *IDN?")
+                self.disconnect()
+                return False
+
+            # Nothing is known about the device until it is programmed or read back
+            self.invalidate()
+            self.is_connected = True
+            logger.info(f"Successfully connected to QC9524: {identity}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to connect to QC9524: {e}")
+            return False
+
+    def disconnect(self) -> None:
+        """Close the serial link"""
+        if self.connection and self.connection.is_open:
+            self.connection.close()
+        self.is_connected = False
+        logger.info("Disconnected from QC9524")
+
+    def invalidate(self) -> None:
+        """Forget the mirrored state so the next sync re-sends every field"""
+        self.mirror = {SYSTEM_CHANNEL: {field: None for field in SYSTEM_FIELDS}}
+        for index in range(1, self.num_channels + 1):
+            self.mirror[index] = {field: None for field in CHANNEL_FIELDS}
+
+    def compute_delta(self, desired: Dict[ChannelKey, Dict[str, Any]]) -> List[Command]:
+        """Return the (channel, field, value) commands needed to reach ``desired``"""
+        commands: List[Command] = []
+        for channel, fields in desired.items():
+            index = channel_index(channel)
+            if index not in self.mirror:
+                raise ValueError(f"Channel {channel} not available on this generator")
+            for field, value in fields.items():
+                field = field.upper()
+                if field not in self.mirror[index]:
+                    raise ValueError(f"Unknown field '{field}' for channel {channel_name(index)}")
+                value = normalize_value(field, value, self.resolution)
+                if self.mirror[index][field] != value:
+                    commands.append((index, field, value))
+        return commands
+
+    def apply_state(self, desired: Dict[ChannelKey, Dict[str, Any]], priority: bool = False) -> bool:
+        """
+        Bring the device to ``desired`` by sending only the fields that differ
+
+        ``desired`` maps a channel ('A'..'H', 'T0' or index) to field values,
+        e.g. ``{"B": {"DELAY": 12e-6}}``. Times are in seconds. With
+        ``priority`` (safety shutdowns) the write goes ahead of every queued
+        sync and every field is sent, whatever the mirror says.
+        """
+        if not self.is_connected:
+            logger.error("QC9524 not connected")
+            return False
+
+        if priority:
+            with self._lock.priority() as wait:
+                self.last_shutdown_wait = wait
+                for channel, fields in desired.items():
+                    for field in fields:
+                        self.mirror[channel_index(channel)][field.upper()] = None
+                return self._send(self.compute_delta(desired))
+
+        with self._lock:
+            requested = sum(len(fields) for fields in desired.values())
+            commands = self.compute_delta(desired)
+            return self._send(commands, skipped=requested - len(commands))
+
+    def _send(self, commands: List[Command], skipped: int = 0) -> bool:
+        """Write all commands at once, then read one acknowledgement line per command"""
+        start = time.perf_counter()
+        errors: List[str] = []
+        payload = b""
+
+        try:
+            if commands:
+                lines = [format_command(index, field, value) for index, field, value in commands]
+                payload = "".join(line + self.terminator for line in lines).encode()
+                if self._short_reply:
+                    # Acks of the last sync may have arrived after its timeout
+                    self.connection.reset_input_buffer()
+                    self._short_reply = False
+                self.connection.write(payload)
+
+                replies: List[str] = []
+                while len(replies) < len(commands):
+                    line = self.connection.readline()
+                    if not line:
+                        # Timed out: drop late acks before the next write so they don't answer it
+                        self._short_reply = True
+                        break
+                    reply = line.decode(errors='replace').strip()
+                    if reply:
+                        replies.append(reply)
+
+                for i, (index, field, value) in enumerate(commands):
+                    error = parse_reply(replies[i]) if i < len(replies) else "no reply"
+                    if error is None:
+                        self.mirror[index][field] = value
+                    else:
+                        # The device may or may not have applied it: resend next time
+                        self.mirror[index][field] = None
+                        errors.append(f"{lines[i]} -> {error}")
+
+        except Exception as e:
+            logger.error(f"Failed to program QC9524: {e}")
+            for index, field, _ in commands:
+                self.mirror[index][field] = None
+            errors.append(str(e))
+
+        duration = time.perf_counter() - start
+        self.last_sync = {
+            "commands": len(commands),
+            "skipped": skipped,
+            "bytes": len(payload),
+            "duration": duration,
+            "errors": errors
+        }
+        self.stats["syncs"] += 1
+        self.stats["commands_sent"] += len(commands)
+        self.stats["commands_skipped"] += skipped
+        self.stats["bytes_sent"] += len(payload)
+        self.stats["errors"] += len(errors)
+        self.stats["total_time"] += duration
+
+        if errors:
+            logger.error(f"QC9524 rejected {len(errors)} command(s): {errors}")
+            flight_recorder.fault("qc", "; ".join(errors))
+            return False
+        if commands:
+            logger.debug(f"QC9524: {len(commands)} command(s), {skipped} unchanged, {duration * 1000:.1f} ms")
+        return True
+
+    def apply_configuration(self) -> bool:
+        """Program the timing defaults from ``[quantum_composers_9524.timing]``"""
+        return self.apply_state(config_to_state(self.config))
+
+    def set_channel(self, channel: ChannelKey, **fields: Any) -> bool:
+        """Convenience wrapper: ``set_channel('B', delay=12e-6, state='ON')``"""
+        return self.apply_state({channel: {key.upper(): value for key, value in fields.items()}})
+
+    def load_delay_scan(self, spec: DelayScanSpec) -> TimingTable:
+        """
+        Compile and validate a pump-probe delay scan before the run starts
+
+        Raises :class:`TimingError` listing every invalid point; nothing is sent.
+        """
+        limits = load_pump_limits()
+        self.timing_table = compile_delay_scan(spec, self.config, limits["min_pulse_interval"])
+        return self.timing_table
+
+    def step_delay_scan(self, index: int) -> bool:
+        """Program point ``index`` of the loaded delay scan"""
+        if self.timing_table is None:
+            logger.error("No delay scan loaded")
+            return False
+
+        point = self.timing_table.points[index]
+        # Always the full base state (pump gate, widths, period) with the point's delays on top:
+        # a scan may start at any index, and the delta sync only sends what actually changed
+        desired = {channel: dict(fields) for channel, fields in self.timing_table.base_state.items()}
+        for channel, fields in point.state.items():
+            desired.setdefault(channel, {}).update(fields)
+        return self.apply_state(desired)
+
+    def get_state(self) -> Dict[str, Dict[str, Any]]:
+        """Return the mirrored device state keyed by channel name"""
+        return {channel_name(index): dict(fields) for index, fields in self.mirror.items()}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return reprogramming statistics"""
+        syncs = self.stats["syncs"]
+        return {
+            **self.stats,
+            "commands_per_sync": self.stats["commands_sent"] / syncs if syncs else 0.0,
+            "mean_sync_time": self.stats["total_time"] / syncs if syncs else 0.0,
+            "last_sync": self.last_sync
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get QC9524 status information"""
+        return {
+            "connected": self.is_connected,
+            "simulated": self.simulated,
+            "port": self.config.get('port', 'Unknown'),
+            "device_type": self.config.get('device_type', 'Quantum Composers 9524'),
+            "num_channels": self.num_channels,
+            "state": self.get_state()
+        }
+
+    def __enter__(self):
+        """Context manager entry"""
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit"""
+        self.disconnect()
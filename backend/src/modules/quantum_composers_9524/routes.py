@@ -0,0 +1,164 @@
+"""
+Quantum Composers 9524 API Routes
+Defines REST API endpoints for pulse generator programming
+"""
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import Dict, Any, List
+from .controller import QC9524Controller
+from .timing import DelayScanSpec, TimingError
+from ...services import lease_guard
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Create router for QC9524 routes
+quantum_composers_9524_router = APIRouter(prefix="/api/qc9524", tags=["Quantum Composers 9524"],
+                                          dependencies=[lease_guard("qc")])
+
+# Global controller instance
+qc9524_controller = QC9524Controller()
+
+# Pydantic models for request/response
+class StateRequest(BaseModel):
+    # e.g. {"B": {"DELAY": 1.2e-5, "STATE": "ON"}, "T0": {"PERIOD": 0.001}}; times in seconds
+    channels: Dict[str, Dict[str, Any]]
+
+class DelayScanRequest(BaseModel):
+    delays_ns: List[float]  # probe-minus-pump delays in nanoseconds
+    pump_channel: str = "A"
+    probe_channel: str = "B"
+    followers: List[str] = ["C"]
+
+class StepRequest(BaseModel):
+    index: int
+
+def _error(message: str, status_code: int = 500) -> HTTPException:
+    return HTTPException(
+        status_code=status_code,
+        detail={
+            "status": "error",
+            "message": message
+        }
+    )
+
+@quantum_composers_9524_router.post("/connect")
+async def connect() -> Dict[str, Any]:
+    """Connect to the pulse generator"""
+    if not qc9524_controller.connect():
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": "Failed to connect to QC9524",
+                "data": {"connected": False}
+            }
+        )
+    return {
+        "status": "success",
+        "message": "Connected to QC9524",
+        "data": {"connected": True}
+    }
+
+@quantum_composers_9524_router.post("/disconnect")
+async def disconnect() -> Dict[str, Any]:
+    """Disconnect from the pulse generator"""
+    try:
+        qc9524_controller.disconnect()
+        return {
+            "status": "success",
+            "message": "Disconnected from QC9524",
+            "data": {"connected": False}
+        }
+    except Exception as e:
+        logger.error(f"Disconnection error: {e}")
+        raise _error(str(e))
+
+@quantum_composers_9524_router.get("/status")
+async def get_status() -> Dict[str, Any]:
+    """Get connection status and mirrored channel state"""
+    return {
+        "status": "success",
+        "data": qc9524_controller.get_status()
+    }
+
+@quantum_composers_9524_router.post("/state")
+def apply_state(request: StateRequest) -> Dict[str, Any]:
+    """Apply channel settings, sending only fields that differ from the device"""
+    try:
+        success = qc9524_controller.apply_state(request.channels)
+    except ValueError as e:
+        raise _error(str(e), status_code=400)
+    if not success:
+        raise _error("Failed to program QC9524")
+    return {
+        "status": "success",
+        "data": qc9524_controller.last_sync
+    }
+
+@quantum_composers_9524_router.post("/configuration")
+def apply_configuration() -> Dict[str, Any]:
+    """Program the timing defaults from hardware_configuration.toml"""
+    if not qc9524_controller.apply_configuration():
+        raise _error("Failed to apply QC9524 configuration")
+    return {
+        "status": "success",
+        "data": qc9524_controller.last_sync
+    }
+
+@quantum_composers_9524_router.post("/resync")
+def resync() -> Dict[str, Any]:
+    """Forget the mirrored state and re-send the configured timing in full"""
+    qc9524_controller.invalidate()
+    return apply_configuration()
+
+@quantum_composers_9524_router.get("/stats")
+async def get_stats() -> Dict[str, Any]:
+    """Get commands-per-change and reprogramming time statistics"""
+    return {
+        "status": "success",
+        "data": qc9524_controller.get_stats()
+    }
+
+@quantum_composers_9524_router.post("/delay-scan")
+async def load_delay_scan(request: DelayScanRequest) -> Dict[str, Any]:
+    """Compile and validate a pump-probe delay scan; invalid scans are rejected as a whole"""
+    spec = DelayScanSpec(
+        delays=[d * 1e-9 for d in request.delays_ns],
+        pump_channel=request.pump_channel,
+        probe_channel=request.probe_channel,
+        followers=request.followers
+    )
+    try:
+        table = qc9524_controller.load_delay_scan(spec)
+    except TimingError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "status": "error",
+                "message": str(e),
+                "data": {"problems": e.problems}
+            }
+        )
+    return {
+        "status": "success",
+        "data": table.to_dict()
+    }
+
+@quantum_composers_9524_router.post("/delay-scan/step")
+def step_delay_scan(request: StepRequest) -> Dict[str, Any]:
+    """Program one point of the loaded delay scan"""
+    table = qc9524_controller.timing_table
+    if table is None or not 0 <= request.index < len(table.points):
+        raise _error("No delay scan loaded or index out of range", status_code=400)
+    if not qc9524_controller.step_delay_scan(request.index):
+        raise _error(f"Failed to program delay scan point {request.index}")
+    return {
+        "status": "success",
+        "data": {
+            "index": request.index,
+            "actual_delay": table.points[request.index].actual_delay,
+            **qc9524_controller.last_sync
+        }
+    }
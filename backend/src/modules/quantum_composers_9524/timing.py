@@ -0,0 +1,229 @@
+"""
+Pump-Probe Timing Compiler
+Turns a delay-scan specification into a validated, quantized table of QC9524 channel states
+"""
+
+import math
+import os
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Sequence
+import toml
+
+from .utils import (
+    SYSTEM_CHANNEL,
+    channel_index,
+    channel_name,
+    config_to_state,
+    quantize,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TimingError(ValueError):
+    """Raised when a delay scan contains points the hardware cannot produce"""
+
+    def __init__(self, problems: List[str]):
+        self.problems = problems
+        preview = "; ".join(problems[:5])
+        more = f" (+{len(problems) - 5} more)" if len(problems) > 5 else ""
+        super().__init__(f"{len(problems)} invalid timing point(s): {preview}{more}")
+
+
+@dataclass
+class DelayScanSpec:
+    """
+    Pump-probe delay scan request
+
+    ``delays`` are probe-minus-pump delays in seconds, relative to the
+    configured channel delays (which define time zero, e.g. the Nd:YAG
+    Q-switch lag). ``followers`` are channels (e.g. the scope trigger) that
+    keep their configured offset from the probe channel.
+    """
+    delays: Sequence[float]
+    pump_channel: str = "A"
+    probe_channel: str = "B"
+    followers: Sequence[str] = ("C",)
+
+
+@dataclass
+class TimingPoint:
+    """One compiled scan point"""
+    index: int
+    requested_delay: float
+    actual_delay: float
+    state: Dict[int, Dict[str, Any]]
+    changes: Dict[int, Dict[str, Any]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "requested_delay": self.requested_delay,
+            "actual_delay": self.actual_delay,
+            "changes": {channel_name(c): fields for c, fields in self.changes.items()}
+        }
+
+
+@dataclass
+class TimingTable:
+    """Compiled delay scan: the base state plus per-point changes"""
+    spec: DelayScanSpec
+    base_state: Dict[int, Dict[str, Any]]
+    points: List[TimingPoint]
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def max_quantization_error(self) -> float:
+        return max((abs(p.actual_delay - p.requested_delay) for p in self.points), default=0.0)
+
+    @property
+    def commands_per_point(self) -> float:
+        if len(self.points) < 2:
+            return 0.0
+        changed = sum(len(f) for p in self.points[1:] for f in p.changes.values())
+        return changed / (len(self.points) - 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "num_points": len(self.points),
+            "pump_channel": self.spec.pump_channel,
+            "probe_channel": self.spec.probe_channel,
+            "followers": list(self.spec.followers),
+            "max_quantization_error": self.max_quantization_error,
+            "commands_per_point": self.commands_per_point,
+            "warnings": self.warnings,
+            "points": [p.to_dict() for p in self.points]
+        }
+
+
+def load_pump_limits(config_path: str = None) -> Dict[str, float]:
+    """Read Nd:YAG pulse-interval limits (seconds) from ``[continuum_ndyag]``"""
+    if config_path is None:
+        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+        config_path = os.path.join(project_root, "hardware_configuration.toml")
+
+    try:
+        with open(config_path, 'r') as f:
+            ndyag = toml.load(f).get('continuum_ndyag', {})
+    except Exception as e:
+        logger.error(f"Failed to load Nd:YAG limits: {e}")
+        ndyag = {}
+
+    min_interval = ndyag.get('safety', {}).get('min_pulse_interval', 100) * 1e-3
+    max_rate = ndyag.get('parameters', {}).get('repetition_rate_max', 10)
+    return {"min_pulse_interval": max(min_interval, 1.0 / max_rate if max_rate else 0.0)}
+
+
+def pump_gate(period: float, min_pulse_interval: float) -> Dict[str, Any]:
+    """Duty-cycle settings that keep the pump channel at or below its maximum rate"""
+    if period >= min_pulse_interval:
+        return {"CMODE": "NORM"}
+    off_count = math.ceil(round(min_pulse_interval / period, 9)) - 1
+    return {"CMODE": "DCYC", "PCOUNTER": 1, "OCOUNTER": off_count}
+
+
+def compile_delay_scan(spec: DelayScanSpec, qc_config: Dict[str, Any],
+                       min_pulse_interval: float) -> TimingTable:
+    """
+    Compile and validate a delay scan up front
+
+    Every point is quantized to the generator resolution and checked against
+    ``min_pulse_width``, ``max_delay``, the T0 period and the pump's minimum
+    pulse interval. All problems are collected and raised together as a
+    :class:`TimingError` so nothing is sent for an invalid scan.
+    """
+    params = qc_config.get('parameters', {})
+    resolution = params.get('resolution', 0.25) * 1e-9
+    min_width = params.get('min_pulse_width', 5) * 1e-9
+    max_delay = params.get('max_delay', 1000)
+
+    base_state = config_to_state(qc_config)
+    pump = channel_index(spec.pump_channel)
+    probe = channel_index(spec.probe_channel)
+    followers = [channel_index(c) for c in spec.followers]
+    problems: List[str] = []
+    warnings: List[str] = []
+
+    period = base_state.get(SYSTEM_CHANNEL, {}).get("PERIOD")
+    if period is None:
+        raise TimingError(["master_frequency is not configured"])
+
+    for index in [pump, probe] + followers:
+        if index not in base_state or "DELAY" not in base_state[index]:
+            problems.append(f"channel {channel_name(index)} has no configured delay")
+    if problems:
+        raise TimingError(problems)
+
+    # Pump gating is fixed for the whole scan
+    base_state[pump].update(pump_gate(period, min_pulse_interval))
+    if period * (1 + base_state[pump].get("OCOUNTER", 0)) < min_pulse_interval - resolution:
+        problems.append("pump channel cannot be gated below its maximum repetition rate")
+
+    pump_delay = base_state[pump]["DELAY"]
+    probe_offset = base_state[probe]["DELAY"] - pump_delay
+    follower_offsets = {f: base_state[f]["DELAY"] - base_state[probe]["DELAY"] for f in followers}
+
+    for index, fields in base_state.items():
+        width = fields.get("WIDTH")
+        if width is not None and width < min_width:
+            problems.append(f"channel {channel_name(index)} width {width * 1e9:.2f} ns < {min_width * 1e9:g} ns")
+
+    points: List[TimingPoint] = []
+    previous: Optional[Dict[int, Dict[str, Any]]] = None
+    seen: Dict[float, int] = {}
+    for i, requested in enumerate(spec.delays):
+        requested = float(requested)
+        # Move the probe (and its followers); if anything would precede T0, delay the pump instead
+        pump_at = pump_delay
+        probe_at = pump_delay + probe_offset + requested
+        earliest = min([probe_at] + [probe_at + offset for offset in follower_offsets.values()])
+        if earliest < 0:
+            pump_at -= earliest
+            probe_at -= earliest
+        pump_at = quantize(pump_at, resolution)
+        probe_at = quantize(probe_at, resolution)
+
+        state = {pump: {"DELAY": pump_at}, probe: {"DELAY": probe_at}}
+        for f, offset in follower_offsets.items():
+            state[f] = {"DELAY": quantize(probe_at + offset, resolution)}
+
+        for index, fields in state.items():
+            delay = fields["DELAY"]
+            width = base_state[index].get("WIDTH", 0.0)
+            name = channel_name(index)
+            if delay < 0:
+                problems.append(f"point {i}: channel {name} delay {delay * 1e9:.2f} ns is negative")
+            elif delay > max_delay:
+                problems.append(f"point {i}: channel {name} delay exceeds max_delay {max_delay} s")
+            elif delay + width > period:
+                problems.append(f"point {i}: channel {name} pulse ends after the T0 period "
+                                f"({(delay + width) * 1e6:.3f} us > {period * 1e6:.3f} us)")
+
+        actual = probe_at - pump_at - probe_offset
+        key = round(actual / resolution)
+        if key in seen:
+            warnings.append(f"point {i} quantizes to the same delay as point {seen[key]}")
+        seen.setdefault(key, i)
+
+        if previous is None:
+            changes = {index: dict(fields) for index, fields in base_state.items()}
+            for index, fields in state.items():
+                changes.setdefault(index, {}).update(fields)
+        else:
+            changes = {}
+            for index, fields in state.items():
+                diff = {k: v for k, v in fields.items() if previous.get(index, {}).get(k) != v}
+                if diff:
+                    changes[index] = diff
+
+        points.append(TimingPoint(i, requested, actual, state, changes))
+        previous = state
+
+    if problems:
+        raise TimingError(problems)
+
+    table = TimingTable(spec, base_state, points, warnings)
+    logger.info(f"Compiled delay scan: {len(points)} points, "
+                f"{table.commands_per_point:.2f} commands/point")
+    return table
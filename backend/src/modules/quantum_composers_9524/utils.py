@@ -0,0 +1,103 @@
+"""
+Quantum Composers 9524 Utility Functions
+Channel naming, value quantization and SCPI command formatting
+"""
+
+from typing import Dict, Any, Optional, Union
+
+CHANNEL_LETTERS = "ABCDEFGH"
+SYSTEM_CHANNEL = 0  # :PULSE0 is the system timer (T0)
+
+# Fields stored as numbers (seconds) or pulse counts; everything else is an upper-case keyword
+NUMERIC_FIELDS = ("DELAY", "WIDTH", "PERIOD")
+COUNTER_FIELDS = ("PCOUNTER", "OCOUNTER")  # duty-cycle mode: pulses on, pulses off
+CHANNEL_FIELDS = ("STATE", "DELAY", "WIDTH", "SYNC", "POLARITY", "CMODE", "PCOUNTER", "OCOUNTER")
+SYSTEM_FIELDS = ("STATE", "PERIOD", "MODE")
+
+ChannelKey = Union[int, str]
+
+
+def channel_index(channel: ChannelKey) -> int:
+    """Convert 'A'..'H', 'T0'/'system' or an index to the :PULSEn number"""
+    if isinstance(channel, int):
+        return channel
+    name = channel.strip().upper()
+    if name in ("T0", "SYSTEM", "SYS"):
+        return SYSTEM_CHANNEL
+    if len(name) == 1 and name in CHANNEL_LETTERS:
+        return CHANNEL_LETTERS.index(name) + 1
+    if name.isdigit():
+        return int(name)
+    raise ValueError(f"Unknown QC9524 channel '{channel}'")
+
+
+def channel_name(index: int) -> str:
+    """Convert a :PULSEn number back to 'T0' or a channel letter"""
+    return "T0" if index == SYSTEM_CHANNEL else CHANNEL_LETTERS[index - 1]
+
+
+def quantize(value: float, resolution: float) -> float:
+    """Round a time in seconds to the generator's resolution (also in seconds)"""
+    if resolution <= 0:
+        return value
+    return round(round(value / resolution) * resolution, 12)
+
+
+def normalize_value(field: str, value: Any, resolution: float) -> Any:
+    """Canonical representation used both for the mirror and for comparisons"""
+    field = field.upper()
+    if field in NUMERIC_FIELDS:
+        return quantize(float(value), resolution)
+    if field in COUNTER_FIELDS:
+        return int(value)
+    if field == "STATE" and isinstance(value, bool):
+        return "ON" if value else "OFF"
+    return str(value).upper()
+
+
+def format_command(index: int, field: str, value: Any) -> str:
+    """Format one set command, using the shortest exact number representation"""
+    if isinstance(value, float):
+        text = f"{value:.12f}".rstrip('0').rstrip('.') or "0"
+    else:
+        text = str(value)
+    return f":PULSE{index}:{field.upper()} {text}"
+
+
+def config_to_state(config: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+    """
+    Build the desired device state from ``[quantum_composers_9524.timing]``
+
+    Config delays and widths are in microseconds; the state uses seconds.
+    """
+    timing = config.get('timing', {})
+    params = config.get('parameters', {})
+    resolution = params.get('resolution', 0.25) * 1e-9
+    num_channels = params.get('num_channels', 8)
+
+    state: Dict[int, Dict[str, Any]] = {}
+    if 'master_frequency' in timing:
+        state[SYSTEM_CHANNEL] = {
+            "PERIOD": quantize(1.0 / timing['master_frequency'], resolution)
+        }
+
+    default_width = timing.get('pulse_width')
+    for index in range(1, num_channels + 1):
+        letter = CHANNEL_LETTERS[index - 1].lower()
+        channel: Dict[str, Any] = {}
+        delay = timing.get(f'channel_{letter}_delay')
+        if delay is not None:
+            channel["DELAY"] = quantize(delay * 1e-6, resolution)
+            channel["STATE"] = "ON"
+        width = timing.get(f'channel_{letter}_width', default_width if delay is not None else None)
+        if width is not None:
+            channel["WIDTH"] = quantize(width * 1e-6, resolution)
+        if channel:
+            state[index] = channel
+    return state
+
+
+def parse_reply(reply: str) -> Optional[str]:
+    """Return None for an ``ok`` acknowledgement, otherwise the error text"""
+    reply = reply.strip()
+    return None if reply.lower() == "ok" else (reply or "no reply")
@@ -0,0 +1,169 @@
+"""
+Zurich HF2LI Controller Module
+Handles demodulator configuration and sample streaming through the LabOne API
+"""
+
+import os
+import logging
+import threading
+from typing import Optional, Dict, Any
+import numpy as np
+import toml
+
+from ...services.flight_recorder import flight_recorder
+from ...services.replay import device_session
+from ...simulators import create_signal_source, is_simulated
+from .utils import demod_path, oscillator_path, poll_to_samples
+
+logger = logging.getLogger(__name__)
+
+class HF2LIController:
+    """Controller for the Zurich Instruments HF2LI lock-in amplifier"""
+
+    def __init__(self, config_path: str = None):
+        """Initialize HF2LI controller with configuration"""
+        self.config = self._load_config(config_path)
+        self.is_connected = False
+        self.simulated = is_simulated(self.config)
+        self.daq = None
+        self.source = None
+        self._lock = threading.RLock()
+
+        demodulator = self.config.get('demodulator', {})
+        self.device_id = self.config.get('device_id', 'dev0')
+        self.demod_index = demodulator.get('demod_index', 0)
+        self.time_constant = demodulator.get('time_constant', 0.001)
+        self.sample_rate = demodulator.get('rate', 1800)  # Sa/s streamed per demodulator
+        self.reads = 0
+        self._capture = self._read_samples  # recorded or replayed as the lock-in's data stream
+
+    def _load_config(self, config_path: str = None) -> Dict[str, Any]:
+        """Load configuration from TOML file"""
+        if config_path is None:
+            # Default to hardware_configuration.toml in project root
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+            config_path = os.path.join(project_root, "hardware_configuration.toml")
+
+        try:
+            with open(config_path, 'r') as f:
+                config = toml.load(f)
+            return config.get('zurich_hf2li', {})
+        except Exception as e:
+            logger.error(f"Failed to load configuration: {e}")
+            return {}
+
+    def connect(self) -> bool:
+        """Connect to the LabOne data server and apply the demodulator settings"""
+        try:
+            with self._lock:
+                if device_session.replaying:
+                    pass  # samples come from the recorded session
+                elif self.simulated:
+                    self.source = flight_recorder.wrap_calls(create_signal_source(self.config), "lockin")
+                else:
+                    import zhinst.core
+
+                    comm = self.config.get('communication', {})
+                    self.daq = flight_recorder.wrap_calls(zhinst.core.ziDAQServer(
+                        comm.get('server_host', 'localhost'),
+                        comm.get('server_port', 8004),
+                        comm.get('api_level', 6)
+                    ), "lockin")
+                    self._configure()
+                self._capture = device_session.function("lockin", "samples", self._read_samples)
+                self.is_connected = True
+            logger.info(f"Successfully connected to HF2LI {self.device_id}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to connect to HF2LI: {e}")
+            self.daq = None
+            return False
+
+    def _configure(self) -> None:
+        """Apply ``[zurich_hf2li.demodulator]`` and ``[zurich_hf2li.oscillator]``"""
+        demodulator = self.config.get('demodulator', {})
+        oscillator = self.config.get('oscillator', {})
+        demod = lambda node: demod_path(self.device_id, self.demod_index, node)
+        self.daq.set([
+            (demod("enable"), 1),
+            (demod("timeconstant"), self.time_constant),
+            (demod("order"), demodulator.get('filter_order', 4)),
+            (demod("rate"), self.sample_rate),
+            (oscillator_path(self.device_id, oscillator.get('osc_index', 0)), oscillator.get('frequency', 1000)),
+        ])
+        self.daq.sync()
+
+    def disconnect(self) -> None:
+        """Disconnect from the data server"""
+        with self._lock:
+            if self.daq is not None:
+                try:
+                    self.daq.unsubscribe('*')
+                    self.daq.disconnect()
+                except Exception as e:
+                    logger.error(f"Failed to disconnect from LabOne: {e}")
+            self.daq = None
+            self.source = None
+            self.is_connected = False
+        logger.info("Disconnected from HF2LI")
+
+    def read_samples(self, duration: float, wavenumber: Optional[float] = None,
+                     delay: Optional[float] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Record demodulator samples for ``duration`` seconds
+
+        Returns ``x``, ``y`` (volts) and ``timestamp`` (seconds) arrays.
+        ``wavenumber`` and ``delay`` are only used by the simulator.
+        """
+        if not self.is_connected:
+            logger.error("HF2LI not connected")
+            return None
+
+        try:
+            with self._lock:
+                samples = self._capture(duration, wavenumber, delay)
+            self.reads += 1
+            return samples
+
+        except Exception as e:
+            logger.error(f"HF2LI read failed: {e}")
+            return None
+
+    def _read_samples(self, duration: float, wavenumber: Optional[float],
+                      delay: Optional[float]) -> Dict[str, np.ndarray]:
+        """Demodulator samples from the simulator or the data server"""
+        if self.simulated:
+            num_samples = max(1, int(round(duration * self.sample_rate)))
+            return self.source.lockin_samples(
+                wavenumber if wavenumber is not None else 0.0,
+                num_samples, 1.0 / self.sample_rate, delay=delay)
+        path = demod_path(self.device_id, self.demod_index)
+        self.daq.subscribe(path)
+        self.daq.sync()
+        timeout_ms = int(self.config.get('communication', {}).get('timeout', 20.0) * 1000)
+        data = self.daq.poll(duration, timeout_ms, 0, True)
+        self.daq.unsubscribe(path)
+        return poll_to_samples(data, path)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get HF2LI status information"""
+        return {
+            "connected": self.is_connected,
+            "simulated": self.simulated,
+            "device_id": self.device_id,
+            "device_type": self.config.get('device_type', 'Zurich Instruments HF2LI'),
+            "demod_index": self.demod_index,
+            "time_constant": self.time_constant,
+            "sample_rate": self.sample_rate,
+            "reads": self.reads
+        }
+
+    def __enter__(self):
+        """Context manager entry"""
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit"""
+        self.disconnect()
@@ -0,0 +1,89 @@
+"""
+Zurich HF2LI API Routes
+Defines REST API endpoints for lock-in amplifier readout
+"""
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import Dict, Any, Optional
+from .controller import HF2LIController
+from ...services import lease_guard
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Create router for HF2LI routes
+zurich_hf2li_router = APIRouter(prefix="/api/hf2li", tags=["Zurich HF2LI"],
+                                dependencies=[lease_guard("lockin")])
+
+# Global controller instance
+hf2li_controller = HF2LIController()
+
+# Pydantic models for request/response
+class ReadRequest(BaseModel):
+    duration: float = 0.1  # seconds
+    wavenumber: Optional[float] = None  # simulator only
+
+def _error(message: str, status_code: int = 500) -> HTTPException:
+    return HTTPException(
+        status_code=status_code,
+        detail={
+            "status": "error",
+            "message": message
+        }
+    )
+
+@zurich_hf2li_router.post("/connect")
+async def connect() -> Dict[str, Any]:
+    """Connect to the lock-in amplifier"""
+    if not hf2li_controller.connect():
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": "Failed to connect to HF2LI",
+                "data": {"connected": False}
+            }
+        )
+    return {
+        "status": "success",
+        "message": "Connected to HF2LI",
+        "data": {"connected": True}
+    }
+
+@zurich_hf2li_router.post("/disconnect")
+async def disconnect() -> Dict[str, Any]:
+    """Disconnect from the lock-in amplifier"""
+    try:
+        hf2li_controller.disconnect()
+        return {
+            "status": "success",
+            "message": "Disconnected from HF2LI",
+            "data": {"connected": False}
+        }
+    except Exception as e:
+        logger.error(f"Disconnection error: {e}")
+        raise _error(str(e))
+
+@zurich_hf2li_router.get("/status")
+async def get_status() -> Dict[str, Any]:
+    """Get HF2LI connection and demodulator settings"""
+    return {
+        "status": "success",
+        "data": hf2li_controller.get_status()
+    }
+
+@zurich_hf2li_router.post("/read")
+def read(request: ReadRequest) -> Dict[str, Any]:
+    """Record demodulator samples and return their mean X/Y"""
+    samples = hf2li_controller.read_samples(request.duration, wavenumber=request.wavenumber)
+    if samples is None:
+        raise _error("HF2LI read failed")
+    return {
+        "status": "success",
+        "data": {
+            "num_samples": int(samples["x"].size),
+            "x": float(samples["x"].mean()) if samples["x"].size else None,
+            "y": float(samples["y"].mean()) if samples["y"].size else None
+        }
+    }
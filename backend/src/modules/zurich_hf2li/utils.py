@@ -0,0 +1,33 @@
+"""
+Zurich HF2LI Utility Functions
+LabOne node paths and demodulator sample helpers
+"""
+
+from typing import Dict, Any
+
+import numpy as np
+
+# HF2 timestamps count ticks of the 210 MHz clock
+CLOCKBASE = 210e6
+
+
+def demod_path(device_id: str, demod_index: int, node: str = "sample") -> str:
+    """LabOne node path of a demodulator setting or stream"""
+    return f"/{device_id}/demods/{demod_index}/{node}"
+
+
+def oscillator_path(device_id: str, osc_index: int, node: str = "freq") -> str:
+    """LabOne node path of an oscillator setting"""
+    return f"/{device_id}/oscs/{osc_index}/{node}"
+
+
+def poll_to_samples(data: Dict[str, Any], path: str) -> Dict[str, np.ndarray]:
+    """Extract x, y and timestamps (seconds) for one demodulator from a ``poll`` result"""
+    sample = data.get(path) or data.get(path.lower()) or {}
+    if not sample:
+        return {"x": np.empty(0), "y": np.empty(0), "timestamp": np.empty(0)}
+    return {
+        "x": np.asarray(sample["x"], dtype=float),
+        "y": np.asarray(sample["y"], dtype=float),
+        "timestamp": np.asarray(sample["timestamp"], dtype=float) / CLOCKBASE
+    }
@@ -0,0 +1,11 @@
+"""
+Backend Services
+Cross-module infrastructure shared by the hardware and experiment modules
+"""
+
+from .leases import DEVICES, DeviceLeaseManager, Lease, LeaseUnavailable, device_leases, lease_guard
+from .calibration import CalibrationSet, LookupTable
+from .flight_recorder import FlightRecorder, flight_recorder, read_dump
+from .replay import DeviceSession, ReplayMismatch, device_session, read_session
+from .health import HealthMonitor, health_monitor, status_check
+from .safety import PriorityLock, SafetyWatchdog
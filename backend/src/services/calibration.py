@@ -0,0 +1,267 @@
+"""
+System Calibration
+Wavenumber, probe power and detector linearity corrections from ``[calibration]``
+"""
+
+import hashlib
+import json
+import os
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+import toml
+
+logger = logging.getLogger(__name__)
+
+# Relative calibration file names are looked up next to app.db
+DATABASE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "database")
+
+# (x key, y key) of each calibration file
+CALIBRATIONS = {
+    "wavelength": ("nominal", "actual"),  # set wavenumber -> measured wavenumber (cm-1)
+    "power": ("wavenumber", "power"),  # probe power (mW) over wavenumber
+    "detector": ("measured", "actual"),  # detector reading -> linear response (V)
+}
+
+# Samples of the uniform grid each calibration curve is resampled onto
+TABLE_SIZE = 16384
+
+
+class LookupTable:
+    """
+    Piecewise-linear calibration curve resampled onto a uniform grid
+
+    Evaluation is one multiply, one gather and one blend per value (no
+    binary search), over arrays of any shape. Inputs outside the
+    calibrated range are extrapolated along the first/last calibration
+    segment and counted in ``out_of_range`` (logged once per table);
+    kinks between calibration points are rounded off within one grid step.
+    """
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, size: int = TABLE_SIZE):
+        order = np.argsort(x)
+        x, y = np.asarray(x, dtype=np.float64)[order], np.asarray(y, dtype=np.float64)[order]
+        self.x_min, self.x_max = float(x[0]), float(x[-1])
+        grid = np.linspace(self.x_min, self.x_max, size)
+        self.table = np.interp(grid, x, y)
+        self._scale = (size - 1) / (self.x_max - self.x_min)
+        self._last = size - 1
+        self._slope_low = float((y[1] - y[0]) / (x[1] - x[0]))
+        self._slope_high = float((y[-1] - y[-2]) / (x[-1] - x[-2]))
+        self.out_of_range = 0
+
+    def __call__(self, values) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        position = np.clip((values - self.x_min) * self._scale, 0, self._last)
+        index = np.minimum(position.astype(np.intp), self._last - 1)
+        position -= index
+        low = self.table[index]
+        result = low + (self.table[index + 1] - low) * position
+
+        below, above = values < self.x_min, values > self.x_max
+        if below.any() or above.any():
+            count = int(np.count_nonzero(below) + np.count_nonzero(above))
+            if not self.out_of_range:
+                logger.warning(f"{count} value(s) outside the calibrated range "
+                               f"[{self.x_min:g}, {self.x_max:g}]; extrapolating")
+            self.out_of_range += count
+            result = (result + np.minimum(values - self.x_min, 0) * self._slope_low
+                      + np.maximum(values - self.x_max, 0) * self._slope_high)
+        return result
+
+
+class _CalibrationFile:
+    """One calibration file, its hash and its table"""
+
+    def __init__(self, name: str, path: Optional[str]):
+        self.name = name
+        self.path = path
+        self.table: Optional[LookupTable] = None
+        self.extra: Dict[str, Any] = {}  # other values in the file, e.g. reference power
+        self.digest: Optional[str] = None
+        self.stat: Optional[Tuple[float, int]] = None  # (mtime, size) the table was built from
+        self.loaded_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        table = self.table
+        return {
+            "path": self.path,
+            "loaded": table is not None,
+            "sha256": self.digest,
+            "range": [table.x_min, table.x_max] if table is not None else None,
+            "out_of_range": table.out_of_range if table is not None else 0,
+            "loaded_at": self.loaded_at,
+            "error": self.error
+        }
+
+
+# Tables by file hash, shared by every CalibrationSet
+_TABLES: Dict[str, Tuple[LookupTable, Dict[str, Any]]] = {}
+_TABLES_LOCK = threading.Lock()
+
+
+def build_table(name: str, content: bytes) -> Tuple[LookupTable, Dict[str, Any]]:
+    """Parse a calibration file's JSON into a table; raises ValueError"""
+    x_key, y_key = CALIBRATIONS[name]
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(data, dict) or x_key not in data or y_key not in data:
+        raise ValueError(f"Expected '{x_key}' and '{y_key}' arrays")
+    x, y = np.asarray(data[x_key], dtype=np.float64), np.asarray(data[y_key], dtype=np.float64)
+    if x.ndim != 1 or x.shape != y.shape or x.size < 2:
+        raise ValueError(f"'{x_key}' and '{y_key}' must be equal-length arrays of at least 2 values")
+    if not (np.all(np.isfinite(x)) and np.all(np.isfinite(y))) or np.unique(x).size != x.size:
+        raise ValueError(f"'{x_key}' must be distinct finite values")
+    extra = {key: value for key, value in data.items() if key not in (x_key, y_key)}
+    return LookupTable(x, y), extra
+
+
+class CalibrationSet:
+    """
+    The system's wavenumber, power and detector calibrations
+
+    Files are parsed once into :class:`LookupTable` objects cached by
+    content hash. Before every use the files are checked (at most every
+    ``check_interval`` seconds, with one ``stat`` each) and rebuilt when
+    they changed. A missing or invalid file leaves its correction as the
+    identity.
+    """
+
+    def __init__(self, config_path: str = None, check_interval: float = 1.0):
+        self.config = self._load_config(config_path)
+        self.check_interval = check_interval
+        self.files = {
+            name: _CalibrationFile(name, self._resolve(self.config.get(f"{name}_calibration_file")))
+            for name in CALIBRATIONS
+        }
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    def _load_config(self, config_path: str = None) -> Dict[str, Any]:
+        """Load configuration from TOML file"""
+        if config_path is None:
+            # Default to hardware_configuration.toml in project root
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+            config_path = os.path.join(project_root, "hardware_configuration.toml")
+
+        try:
+            with open(config_path, 'r') as f:
+                config = toml.load(f)
+            return config.get('calibration', {})
+        except Exception as e:
+            logger.error(f"Failed to load configuration: {e}")
+            return {}
+
+    @staticmethod
+    def _resolve(path: Optional[str]) -> Optional[str]:
+        if path and not os.path.isabs(path):
+            return os.path.join(DATABASE_DIR, path)
+        return path
+
+    # --- loading ---------------------------------------------------------
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload changed files; returns True if any table changed"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        with self._lock:
+            self._checked_at = now
+            changed = False
+            for calibration in self.files.values():
+                changed |= self._refresh_file(calibration, force)
+            return changed
+
+    def _refresh_file(self, calibration: _CalibrationFile, force: bool) -> bool:
+        if calibration.path is None:
+            return False
+        try:
+            stat = os.stat(calibration.path)
+        except OSError:
+            if calibration.table is not None or force:
+                calibration.table, calibration.digest, calibration.stat = None, None, None
+                calibration.error = "File not found"
+                logger.warning(f"No {calibration.name} calibration at {calibration.path}")
+                return True
+            return False
+        key = (stat.st_mtime, stat.st_size)
+        if key == calibration.stat and not force:
+            return False
+
+        try:
+            with open(calibration.path, 'rb') as f:
+                content = f.read()
+        except OSError as e:
+            calibration.error = str(e)
+            return False
+        calibration.stat = key
+        digest = hashlib.sha256(content).hexdigest()
+        if digest == calibration.digest and not force:
+            return False  # touched but unchanged
+
+        with _TABLES_LOCK:
+            cached = _TABLES.get(digest)
+        if cached is None:
+            try:
+                cached = build_table(calibration.name, content)
+            except ValueError as e:
+                # Keep the previous table rather than switch to an invalid one
+                calibration.error = str(e)
+                logger.error(f"Invalid {calibration.name} calibration {calibration.path}: {e}")
+                return False
+            with _TABLES_LOCK:
+                _TABLES[digest] = cached
+        calibration.table, calibration.extra = cached
+        calibration.digest = digest
+        calibration.loaded_at = time.time()
+        calibration.error = None
+        logger.info(f"Loaded {calibration.name} calibration {calibration.path} ({digest[:12]})")
+        return True
+
+    def table(self, name: str) -> Optional[LookupTable]:
+        """Current table of one calibration, reloading it if its file changed"""
+        self.refresh()
+        return self.files[name].table
+
+    # --- corrections (vectorized over arrays of any shape) ---------------
+
+    def wavenumbers(self, nominal) -> np.ndarray:
+        """Actual probe wavenumbers for the MIRcat set points"""
+        table = self.table("wavelength")
+        nominal = np.asarray(nominal, dtype=np.float64)
+        return table(nominal) if table is not None else nominal.copy()
+
+    def relative_power(self, wavenumbers) -> np.ndarray:
+        """Probe power relative to the ``reference`` power (default: mean of the curve)"""
+        table = self.table("power")
+        wavenumbers = np.asarray(wavenumbers, dtype=np.float64)
+        if table is None:
+            return np.ones_like(wavenumbers)
+        reference = float(self.files["power"].extra.get("reference", table.table.mean()))
+        return table(wavenumbers) / reference
+
+    def normalize_power(self, wavenumbers, values) -> np.ndarray:
+        """Divide ``values`` (..., points) by the relative probe power at ``wavenumbers`` (points)"""
+        return np.asarray(values, dtype=np.float64) / self.relative_power(wavenumbers)
+
+    def linearize(self, readings) -> np.ndarray:
+        """Detector readings (e.g. a block of shots x samples) mapped to linear response"""
+        table = self.table("detector")
+        if table is None:
+            return np.asarray(readings)
+        return table(readings)
+
+    def get_status(self) -> Dict[str, Any]:
+        self.refresh()
+        return {
+            "last_calibration_date": self.config.get("last_calibration_date"),
+            "files": {name: calibration.to_dict() for name, calibration in self.files.items()},
+            "cached_tables": len(_TABLES)
+        }
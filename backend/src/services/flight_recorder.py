@@ -0,0 +1,425 @@
+"""
+Device I/O Flight Recorder
+Every device command and reply in a preallocated binary ring buffer, dumped to disk on errors or on request
+
+Decode a dump with ``python -m src.services.flight_recorder <file>`` (from ``backend``).
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import logging
+import argparse
+import itertools
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+import toml
+
+logger = logging.getLogger(__name__)
+
+DATABASE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "database")
+
+MAGIC = b"FLTREC1\0"
+# time (s since epoch), seq, latency (s), device, kind, result, code, full length; then the payload
+RECORD_HEADER = "<dQfBBBxiI"
+KINDS = ("write", "read", "call", "fault")
+# code: a call returned a non-zero status; error: it raised; timeout: short read; fault: reported by a controller
+RESULTS = ("ok", "code", "error", "timeout", "fault")
+DUMP_RESULTS = ("error", "timeout", "fault")
+
+_KIND = {name: index for index, name in enumerate(KINDS)}
+_RESULT = {name: index for index, name in enumerate(RESULTS)}
+
+
+class FlightRecorder:
+    """
+    Fixed-size ring of device I/O records
+
+    Records are packed into one ``bytearray`` allocated up front
+    (``capacity`` x (32 + ``payload_bytes``) bytes); payloads longer than
+    ``payload_bytes`` are truncated, their full length is kept. Writers
+    take a sequence number from an ``itertools.count`` (atomic under the
+    GIL) and pack into their own slot, so recording takes no lock. Readers
+    order slots by sequence number.
+
+    With ``dump_on_error`` the buffer is written to ``dump_dir`` when a
+    record has a result in :data:`DUMP_RESULTS`, at most every
+    ``min_dump_interval`` seconds: the recording thread only copies the
+    buffer, a background thread writes the file. Settings come from
+    ``[flight_recorder]``.
+    """
+
+    def __init__(self, config_path: str = None):
+        config = self._load_config(config_path)
+        self.enabled = bool(config.get('enabled', True))
+        self.capacity = int(config.get('capacity', 65536))
+        self.payload_bytes = int(config.get('payload_bytes', 64))
+        self.dump_on_error = bool(config.get('dump_on_error', True))
+        self.min_dump_interval = float(config.get('min_dump_interval', 60))
+        dump_dir = config.get('dump_dir', 'flight_recorder')
+        self.dump_dir = dump_dir if os.path.isabs(dump_dir) else os.path.join(DATABASE_DIR, dump_dir)
+
+        self._record = struct.Struct(f"{RECORD_HEADER}{self.payload_bytes}s")
+        self._buffer = bytearray(self._record.size * self.capacity) if self.enabled else bytearray()
+        self._seq = itertools.count(1)  # 0 marks an empty slot
+        self._newest = 0
+        self._devices: List[str] = []
+        self._dump_lock = threading.Lock()
+        self.last_dump: Optional[str] = None
+        self.last_dump_at: Optional[float] = None
+        self.dumps = 0
+
+    def _load_config(self, config_path: str = None) -> Dict[str, Any]:
+        """Load configuration from TOML file"""
+        if config_path is None:
+            # Default to hardware_configuration.toml in project root
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+            config_path = os.path.join(project_root, "hardware_configuration.toml")
+
+        try:
+            with open(config_path, 'r') as f:
+                config = toml.load(f)
+            return config.get('flight_recorder', {})
+        except Exception as e:
+            logger.error(f"Failed to load configuration: {e}")
+            return {}
+
+    def device_id(self, device: str) -> int:
+        if device not in self._devices:
+            self._devices.append(device)
+        return self._devices.index(device)
+
+    # --- recording -------------------------------------------------------
+
+    def record(self, device: int, kind: str, data: bytes = b"", latency: float = 0.0,
+               result: str = "ok", code: int = 0) -> None:
+        """Append one record; ``device`` is an id from :meth:`device_id`"""
+        if not self.enabled:
+            return
+        seq = self._newest = next(self._seq)
+        self._record.pack_into(self._buffer, (seq % self.capacity) * self._record.size,
+                               time.time(), seq, latency, device, _KIND[kind], _RESULT[result],
+                               code, len(data), data[:self.payload_bytes])
+        if result in DUMP_RESULTS and self.dump_on_error:
+            self._dump_on_error(f"{self._devices[device]} {kind}" + (f" {result}" if result != kind else ""))
+
+    def fault(self, device: str, message: str) -> None:
+        """Record a reply the controller did not expect (and dump)"""
+        self.record(self.device_id(device), "fault", message.encode(errors='replace'), result="fault")
+
+    def wrap_serial(self, connection, device: str):
+        """``connection`` with every write and read recorded (unchanged when disabled)"""
+        return RecordedSerial(connection, self, self.device_id(device)) if self.enabled else connection
+
+    def wrap_calls(self, target, device: str, status_codes: bool = False):
+        """
+        ``target`` (an SDK, driver or data source) with every method call recorded
+
+        With ``status_codes`` integer return values are status codes
+        (0 = success, as in the MIRcat and PicoScope SDKs).
+        """
+        if not self.enabled:
+            return target
+        return RecordedCalls(target, self, self.device_id(device), status_codes)
+
+    # --- reading ---------------------------------------------------------
+
+    def snapshot(self) -> bytes:
+        return bytes(self._buffer)
+
+    def records(self, last: Optional[int] = None, device: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The ``last`` (default: all) records, oldest first, walking back from the newest slot"""
+        header = self._header("snapshot")
+        records = []
+        seq = self._newest
+        while seq > 0 and seq > self._newest - self.capacity and (not last or len(records) < last):
+            fields = self._record.unpack_from(self._buffer, (seq % self.capacity) * self._record.size)
+            seq -= 1
+            if fields[1] != seq + 1:
+                continue  # being written, or already overwritten
+            record = _decode(fields, header)
+            if device is None or record["device"] == device:
+                records.append(record)
+        return records[::-1]
+
+    def _header(self, reason: str) -> Dict[str, Any]:
+        return {
+            "version": 1,
+            "record_header": RECORD_HEADER,
+            "payload_bytes": self.payload_bytes,
+            "capacity": self.capacity,
+            "devices": list(self._devices),
+            "kinds": list(KINDS),
+            "results": list(RESULTS),
+            "reason": reason,
+            "dumped_at": time.time(),
+            "pid": os.getpid()
+        }
+
+    # --- dumping ---------------------------------------------------------
+
+    def dump(self, reason: str = "request", path: Optional[str] = None) -> str:
+        """Write the whole ring to ``path`` (default: a new file in ``dump_dir``)"""
+        path, header, data = self._snapshot_dump(reason, path)
+        self._write_dump(path, header, data, reason)
+        return path
+
+    def _snapshot_dump(self, reason: str, path: Optional[str] = None) -> Tuple[str, bytes, bytes]:
+        """(path, header, buffer copy) of a dump; the only part done on the recording thread"""
+        data = self.snapshot()
+        header = json.dumps(self._header(reason)).encode()
+        if path is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(self.dump_dir, f"flight-{stamp}-{self.dumps:03d}.bin")
+        self.dumps += 1
+        self.last_dump_at = time.monotonic()
+        return path, header, data
+
+    def _write_dump(self, path: str, header: bytes, data: bytes, reason: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            f.write(data)
+        self.last_dump = path
+        logger.warning(f"Flight recorder dumped to {path} ({reason})")
+
+    def _dump_on_error(self, reason: str) -> None:
+        now = time.monotonic()
+        if self.last_dump_at is not None and now - self.last_dump_at < self.min_dump_interval:
+            return
+        if not self._dump_lock.acquire(blocking=False):
+            return
+        try:
+            # The caller may hold a device lock: copy the ring here, write it to disk elsewhere
+            path, header, data = self._snapshot_dump(reason)
+            threading.Thread(target=self._write_dump_in_background, args=(path, header, data, reason),
+                             name="flight-recorder-dump", daemon=True).start()
+        except Exception as e:
+            self._dump_lock.release()
+            logger.error(f"Flight recorder dump failed: {e}")
+
+    def _write_dump_in_background(self, path: str, header: bytes, data: bytes, reason: str) -> None:
+        try:
+            self._write_dump(path, header, data, reason)
+        except Exception as e:
+            logger.error(f"Flight recorder dump failed: {e}")
+        finally:
+            self._dump_lock.release()
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "capacity": self.capacity,
+            "record_size": self._record.size,
+            "buffer_bytes": len(self._buffer),
+            "devices": list(self._devices),
+            "dump_on_error": self.dump_on_error,
+            "dump_dir": self.dump_dir,
+            "dumps": self.dumps,
+            "last_dump": self.last_dump
+        }
+
+
+class RecordedSerial:
+    """Serial port (or emulator) whose writes and reads go to a :class:`FlightRecorder`"""
+
+    def __init__(self, connection, recorder: FlightRecorder, device: int):
+        self._connection = connection
+        self._recorder = recorder
+        self._device = device
+
+    def __getattr__(self, name: str):
+        return getattr(self._connection, name)
+
+    def write(self, data: bytes):
+        start = time.perf_counter()
+        try:
+            written = self._connection.write(data)
+        except Exception:
+            self._recorder.record(self._device, "write", bytes(data), time.perf_counter() - start, "error")
+            raise
+        self._recorder.record(self._device, "write", bytes(data), time.perf_counter() - start)
+        return written
+
+    def _read(self, method: str, complete, *args, **kwargs) -> bytes:
+        start = time.perf_counter()
+        try:
+            data = getattr(self._connection, method)(*args, **kwargs)
+        except Exception:
+            self._recorder.record(self._device, "read", b"", time.perf_counter() - start, "error")
+            raise
+        self._recorder.record(self._device, "read", data, time.perf_counter() - start,
+                              "ok" if complete(data) else "timeout")
+        return data
+
+    def read(self, size: int = 1) -> bytes:
+        return self._read("read", lambda data: len(data) >= size, size)
+
+    def readline(self, *args, **kwargs) -> bytes:
+        return self._read("readline", lambda data: data.endswith(b"\n"), *args, **kwargs)
+
+
+# Formatting of the common argument types, looked up by exact type (the per-call cost)
+_FORMATS = {float: "{:.7g}".format, int: str, bool: str, type(None): str, str: repr}
+
+
+def _compact(value: Any) -> str:
+    """Short text form of a call argument or result; ``byref()`` arguments show the value written through them"""
+    format_value = _FORMATS.get(type(value))
+    if format_value is not None:
+        return format_value(value)
+    if isinstance(value, (float, int, str)):
+        return _FORMATS[float](value) if isinstance(value, float) else repr(value)
+    if isinstance(value, (bytes, bytearray)):
+        return repr(bytes(value[:16])) + ("..." if len(value) > 16 else "")
+    if type(value).__name__ == "CArgObject":  # byref(): an output of the SDK
+        target = value._obj
+        return "&" + (_compact(target.value) if hasattr(target, "value") else type(target).__name__)
+    if hasattr(value, "shape") and hasattr(value, "dtype"):
+        return f"{value.dtype}{list(value.shape)}"
+    if isinstance(value, (list, tuple)):
+        return f"[{len(value)}]"
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{key}:{_compact(item)}" for key, item in list(value.items())[:4]) + "}"
+    if hasattr(value, "value"):  # ctypes scalar passed by value
+        return _compact(value.value)
+    return type(value).__name__
+
+
+def _call_payload(name: str, args: tuple, kwargs: Dict[str, Any], value: Any = None) -> bytes:
+    """``name(args) -> value``, formatted after the call so ``byref()`` outputs are filled in"""
+    arguments = ",".join(map(_compact, args))
+    if kwargs:
+        arguments = ",".join(filter(None, [arguments, *(f"{key}={_compact(item)}" for key, item in kwargs.items())]))
+    if value is None:
+        return f"{name}({arguments})".encode(errors='replace')
+    return f"{name}({arguments})->{_compact(value)}".encode(errors='replace')
+
+
+class RecordedCalls:
+    """
+    Proxy recording every method call of ``target``: name, arguments, the
+    values written through ``byref()`` arguments, return value, latency
+    and status
+
+    With ``status_codes`` integer return values are status codes (0 =
+    success); otherwise every call that returns counts as success.
+    """
+
+    def __init__(self, target, recorder: FlightRecorder, device: int, status_codes: bool = False):
+        self._target = target
+        self._recorder = recorder
+        self._device = device
+        self._status_codes = status_codes
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+        recorder, device, status_codes = self._recorder, self._device, self._status_codes
+
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                value = attribute(*args, **kwargs)
+            except Exception:
+                recorder.record(device, "call", _call_payload(name, args, kwargs), time.perf_counter() - start,
+                                "error")
+                raise
+            latency = time.perf_counter() - start
+            code = value if status_codes and type(value) is int else 0
+            recorder.record(device, "call", _call_payload(name, args, kwargs, value), latency,
+                            "code" if code else "ok", code)
+            return value
+
+        self.__dict__[name] = call  # later lookups skip __getattr__
+        return call
+
+
+# --- decoding ------------------------------------------------------------
+
+def decode_records(data: bytes, header: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Records of a ring buffer image, oldest first (empty slots dropped)"""
+    record = struct.Struct(f"{header['record_header']}{header['payload_bytes']}s")
+    records = [_decode(fields, header) for fields in record.iter_unpack(data) if fields[1]]
+    records.sort(key=lambda r: r["seq"])
+    return records
+
+
+def _decode(fields: tuple, header: Dict[str, Any]) -> Dict[str, Any]:
+    t, seq, latency, device, kind, result, code, length, payload = fields
+    devices = header["devices"]
+    return {
+        "seq": seq,
+        "time": t,
+        "device": devices[device] if device < len(devices) else str(device),
+        "kind": header["kinds"][kind],
+        "result": header["results"][result],
+        "latency": latency,
+        "code": code,
+        "length": length,
+        "data": payload[:min(length, len(payload))],
+        "truncated": length > len(payload)
+    }
+
+
+def read_dump(path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """(header, records) of a dump file"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a flight recorder dump")
+        (length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length))
+        data = f.read()
+    return header, decode_records(data, header)
+
+
+def format_record(record: Dict[str, Any]) -> str:
+    stamp = time.strftime("%H:%M:%S", time.localtime(record["time"])) + f"{record['time'] % 1:.6f}"[1:]
+    data = record["data"].decode(errors='replace').encode('unicode_escape').decode()
+    return (f"{record['seq']:>10} {stamp} {record['device']:<8} {record['kind']:<5} {record['result']:<7} "
+            f"{record['latency'] * 1000:9.3f} ms {record['code']:>6} {record['length']:>6} "
+            f"{data}{'...' if record['truncated'] else ''}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Decode a flight recorder dump")
+    parser.add_argument("path")
+    parser.add_argument("--device", help="only records of this device")
+    parser.add_argument("--errors", action="store_true", help="only records that did not succeed")
+    parser.add_argument("--last", type=int, help="only the last N records")
+    parser.add_argument("--json", action="store_true", help="one JSON object per record")
+    args = parser.parse_args(argv)
+
+    header, records = read_dump(args.path)
+    if args.device:
+        records = [r for r in records if r["device"] == args.device]
+    if args.errors:
+        records = [r for r in records if r["result"] != "ok"]
+    if args.last:
+        records = records[-args.last:]
+
+    if args.json:
+        for record in records:
+            print(json.dumps(dict(record, data=record["data"].decode(errors='replace'))))
+        return
+    print(f"# {args.path}: {header['reason']} at "
+          f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(header['dumped_at']))}, "
+          f"{len(records)} record(s), devices {header['devices']}")
+    print(f"{'seq':>10} {'time':<15} {'device':<8} {'kind':<5} {'result':<7} {'latency':>12} "
+          f"{'code':>6} {'length':>6} data")
+    for record in records:
+        print(format_record(record))
+
+
+# Controllers wrap their transports in it at connect time
+flight_recorder = FlightRecorder()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,196 @@
+"""
+Health Checks
+Concurrent, time-limited device checks on the ``[validation]`` schedule, served from a cache
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Callable, Dict, Any, Optional
+
+import toml
+
+from .leases import DeviceLeaseManager, device_leases
+
+logger = logging.getLogger(__name__)
+
+# Result of one check
+CHECK_STATES = ("ok", "disconnected", "error", "timeout", "skipped")
+
+
+def status_check(get_status: Callable[[], Dict[str, Any]]) -> Callable[[], Dict[str, Any]]:
+    """
+    Check built from a controller's ``get_status``: it talks to a connected
+    device (armed/tuned/temperature queries), so it fails or hangs when the
+    device does
+    """
+    def check() -> Dict[str, Any]:
+        details = get_status()
+        return {"state": "ok" if details.get("connected") else "disconnected", "details": details}
+    return check
+
+
+class HealthMonitor:
+    """
+    Runs every registered check concurrently and caches the report
+
+    Each check runs in a worker thread with its own ``health_check_timeout``;
+    a check that times out is reported as such, and is not started again
+    while its thread is still running. Checks of devices leased by a run
+    are skipped (the previous result is kept alongside), so acquisition is
+    never disturbed. With ``enable_startup_checks`` a round runs when the
+    monitor starts, with ``enable_periodic_checks`` every
+    ``check_interval`` seconds. :meth:`report` only reads the cache.
+    """
+
+    def __init__(self, config_path: str = None, leases: Optional[DeviceLeaseManager] = None):
+        self.config = self._load_config(config_path)
+        self.leases = leases
+        self.startup_checks = bool(self.config.get('enable_startup_checks', True))
+        self.periodic_checks = bool(self.config.get('enable_periodic_checks', True))
+        self.check_interval = float(self.config.get('check_interval', 300))
+        self.timeout = float(self.config.get('health_check_timeout', 30))
+        self._checks: Dict[str, Dict[str, Any]] = {}  # name -> {"check", "device", "timeout"}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}  # threads of checks that outlived their timeout
+        self._task: Optional[asyncio.Task] = None
+        self._round: Optional[asyncio.Task] = None
+        self.rounds = 0
+        self.last_round: Optional[float] = None
+        self.last_duration: Optional[float] = None
+
+    def _load_config(self, config_path: str = None) -> Dict[str, Any]:
+        """Load configuration from TOML file"""
+        if config_path is None:
+            # Default to hardware_configuration.toml in project root
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+            config_path = os.path.join(project_root, "hardware_configuration.toml")
+
+        try:
+            with open(config_path, 'r') as f:
+                config = toml.load(f)
+            return config.get('validation', {})
+        except Exception as e:
+            logger.error(f"Failed to load configuration: {e}")
+            return {}
+
+    def register(self, name: str, check: Callable[[], Dict[str, Any]], device: Optional[str] = None,
+                 timeout: Optional[float] = None) -> None:
+        """
+        Add a blocking check returning ``{"state": ..., "details": ...}``
+        (raising counts as "error"); ``device`` is the lease name it touches
+        """
+        self._checks[name] = {"check": check, "device": device, "timeout": timeout or self.timeout}
+
+    # --- scheduling ------------------------------------------------------
+
+    def start(self) -> None:
+        """Run the startup round and the periodic schedule in the background (call on the event loop)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._schedule())
+
+    async def stop(self) -> None:
+        for task in (self._task, self._round):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+
+    async def _schedule(self) -> None:
+        if self.startup_checks:
+            await self.run_checks()
+        while self.periodic_checks:
+            await asyncio.sleep(self.check_interval)
+            await self.run_checks()
+
+    async def run_checks(self) -> Dict[str, Any]:
+        """One round of every check, concurrently; joins a round already in progress"""
+        if self._round is None or self._round.done():
+            self._round = asyncio.get_running_loop().create_task(self._run_round())
+        await asyncio.shield(self._round)
+        return self.report()
+
+    async def _run_round(self) -> None:
+        start = time.perf_counter()
+        names = list(self._checks)
+        results = await asyncio.gather(*(self._run_one(name) for name in names))
+        for name, result in zip(names, results):
+            previous = self._results.get(name)
+            if result["state"] == "skipped" and previous is not None:
+                # Keep the last real result of a leased device
+                result["previous"] = previous.get("previous") if previous["state"] == "skipped" else previous
+            self._results[name] = result
+        self.rounds += 1
+        self.last_round = time.time()
+        self.last_duration = time.perf_counter() - start
+        failing = [name for name, r in self._results.items() if r["state"] in ("error", "timeout")]
+        if failing:
+            logger.warning(f"Health checks failing: {failing}")
+
+    async def _run_one(self, name: str) -> Dict[str, Any]:
+        entry = self._checks[name]
+        checked_at = time.time()
+        device = entry["device"]
+        lease = self.leases.holder(device) if self.leases is not None and device is not None else None
+        if lease is not None:
+            return {"state": "skipped", "checked_at": checked_at, "reason": f"{device} is leased by {lease.holder}"}
+
+        pending = self._inflight.get(name)
+        if pending is not None:
+            if not pending.done():
+                return {"state": "timeout", "checked_at": checked_at, "reason": "previous check still running"}
+            del self._inflight[name]
+
+        future = asyncio.ensure_future(asyncio.to_thread(entry["check"]))
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), entry["timeout"])
+        except asyncio.TimeoutError:
+            self._inflight[name] = future  # the thread cannot be interrupted; never run two at once
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())  # consume the late result quietly
+            return {"state": "timeout", "checked_at": checked_at, "duration": time.perf_counter() - start,
+                    "reason": f"no answer within {entry['timeout']:g} s"}
+        except Exception as e:
+            return {"state": "error", "checked_at": checked_at, "duration": time.perf_counter() - start,
+                    "reason": str(e)}
+        result = dict(result or {})
+        result.setdefault("state", "ok")
+        result.update(checked_at=checked_at, duration=time.perf_counter() - start)
+        return result
+
+    # --- reporting -------------------------------------------------------
+
+    def report(self) -> Dict[str, Any]:
+        """Cached results of the last round; never runs a check"""
+        states = [r["state"] for r in self._results.values()]
+        if not self.rounds:
+            overall = "unknown"
+        elif any(state in ("error", "timeout") for state in states):
+            overall = "error"
+        elif any(state == "disconnected" for state in states):
+            overall = "degraded"
+        else:
+            overall = "ok"
+        return {
+            "overall": overall,
+            "checks": dict(self._results),
+            "rounds": self.rounds,
+            "last_round": self.last_round,
+            "last_duration": self.last_duration,
+            "next_round": self.last_round + self.check_interval
+            if self.periodic_checks and self.last_round is not None else None,
+            "settings": {
+                "enable_startup_checks": self.startup_checks,
+                "enable_periodic_checks": self.periodic_checks,
+                "check_interval": self.check_interval,
+                "health_check_timeout": self.timeout
+            }
+        }
+
+
+# Checks are registered by the modules that own the controllers; /api/health serves the report
+health_monitor = HealthMonitor(leases=device_leases)
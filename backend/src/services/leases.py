@@ -0,0 +1,142 @@
+"""
+Device Leases
+Exclusive, non-blocking ownership of device controllers by runs and queued jobs
+"""
+
+import time
+import uuid
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, Iterable, List, Optional
+
+from fastapi import Depends, HTTPException, Request
+
+logger = logging.getLogger(__name__)
+
+# Device names, matching the fields of ExperimentDevices
+DEVICES = ("mircat", "arduino", "qc", "scope", "lockin", "ndyag")
+
+# Methods that only read state and never need a lease
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class LeaseUnavailable(Exception):
+    """Raised when a device is already leased"""
+
+
+@dataclass
+class Lease:
+    """Exclusive hold on a set of devices"""
+    holder: str
+    devices: List[str]
+    lease_id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    acquired_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "lease_id": self.lease_id,
+            "holder": self.holder,
+            "devices": self.devices,
+            "acquired_at": self.acquired_at
+        }
+
+
+class DeviceLeaseManager:
+    """
+    All-or-nothing leases on named devices
+
+    Leases are taken and released on the event loop and never wait: a
+    request for a busy device fails immediately with
+    :class:`LeaseUnavailable`. Release listeners (the job scheduler) are
+    called synchronously, so the next job can start in the same loop
+    iteration. Status reads take no lock at all.
+    """
+
+    def __init__(self):
+        self._leases: Dict[str, Lease] = {}  # device -> lease
+        self._listeners: List[Callable[[Lease], None]] = []
+
+    def acquire(self, holder: str, devices: Iterable[str]) -> Lease:
+        devices = sorted(set(devices))
+        unknown = [d for d in devices if d not in DEVICES]
+        if unknown:
+            raise ValueError(f"Unknown device(s) {unknown}, expected {DEVICES}")
+        busy = {d: self._leases[d].holder for d in devices if d in self._leases}
+        if busy:
+            raise LeaseUnavailable(", ".join(f"{d} is leased by {h}" for d, h in busy.items()))
+        lease = Lease(holder, devices)
+        for device in devices:
+            self._leases[device] = lease
+        logger.info(f"Lease {lease.lease_id}: {devices} -> {holder}")
+        return lease
+
+    def release(self, lease: Optional[Lease]) -> None:
+        if lease is None:
+            return
+        released = [d for d in lease.devices if self._leases.get(d) is lease]
+        for device in released:
+            del self._leases[device]
+        if released:
+            logger.info(f"Lease {lease.lease_id} released by {lease.holder}")
+            for listener in list(self._listeners):
+                try:
+                    listener(lease)
+                except Exception as e:
+                    logger.error(f"Lease release listener failed: {e}")
+
+    def available(self, devices: Iterable[str]) -> bool:
+        return not any(d in self._leases for d in devices)
+
+    def holder(self, device: str) -> Optional[Lease]:
+        return self._leases.get(device)
+
+    def add_listener(self, listener: Callable[[Lease], None]) -> None:
+        self._listeners.append(listener)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            device: self._leases[device].to_dict() if device in self._leases else None
+            for device in DEVICES
+        }
+
+
+# Shared by the experiment engine, the job queue and the device routers
+device_leases = DeviceLeaseManager()
+
+
+def lease_guard(*devices: str, safe: Optional[Dict[str, Optional[Callable[[Dict[str, Any]], bool]]]] = None):
+    """
+    Router dependency rejecting state-changing requests (409) while another
+    holder leases one of ``devices``; reads always pass
+
+    ``safe`` maps path suffixes of the commands that put a device in a safe
+    state (disarm, stop firing) to ``None``, always allowed, or to a
+    predicate on the JSON body (e.g. emission off only). The operator can
+    always use them, even during an unattended run.
+    """
+    safe = safe or {}
+
+    async def guard(request: Request) -> None:
+        if request.method in READ_METHODS:
+            return
+        for suffix, allowed in safe.items():
+            if request.url.path.endswith(suffix):
+                if allowed is None:
+                    return
+                try:
+                    body = await request.json()
+                except ValueError:
+                    body = None
+                if isinstance(body, dict) and allowed(body):
+                    return
+        for device in devices:
+            lease = device_leases.holder(device)
+            if lease is not None:
+                raise HTTPException(
+                    status_code=409,
+                    detail={
+                        "status": "error",
+                        "message": f"{device} is leased by {lease.holder}"
+                    }
+                )
+    return Depends(guard)
@@ -0,0 +1,562 @@
+"""
+Device Session Record and Replay
+Captures every transport exchange of a session with its timing, and feeds it back to the controllers without hardware
+"""
+
+import os
+import gzip
+import json
+import time
+import queue
+import base64
+import ctypes
+import logging
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Any, List, Optional
+
+import numpy as np
+import toml
+
+logger = logging.getLogger(__name__)
+
+DATABASE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "database")
+
+SESSION_FORMAT = "device-session"
+MODES = ("off", "record", "replay")
+
+# Stops the session writer thread
+_CLOSE = object()
+
+
+class ReplayMismatch(Exception):
+    """Raised when a controller asks for an exchange the recorded session does not contain"""
+
+
+def parse_speed(speed) -> float:
+    """Replay speed factor; ``"max"`` (or 0) replays without any waiting"""
+    if isinstance(speed, str):
+        speed = 0.0 if speed.strip().lower() == "max" else float(speed.rstrip("xX"))
+    if speed < 0:
+        raise ValueError("speed must be positive, or 0 / 'max' for maximum speed")
+    return float(speed)
+
+
+# --- value encoding --------------------------------------------------------
+
+def encode(value: Any) -> Any:
+    """JSON-safe form of a transport value (bytes, arrays, tuples and ctypes included)"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(bytes(value)).decode()}
+    if isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value)
+        return {"__array__": base64.b64encode(array.tobytes()).decode(), "dtype": array.dtype.str,
+                "shape": list(array.shape)}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, tuple):
+        return {"__tuple__": [encode(v) for v in value]}
+    if isinstance(value, list):
+        return [encode(v) for v in value]
+    if isinstance(value, dict):
+        return {"__dict__": [[encode(k), encode(v)] for k, v in value.items()]}
+    if hasattr(value, "value"):  # ctypes scalar passed by value
+        return encode(value.value)
+    return repr(value)
+
+
+def decode(value: Any) -> Any:
+    if isinstance(value, list):
+        return [decode(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if "__bytes__" in value:
+        return base64.b64decode(value["__bytes__"])
+    if "__array__" in value:
+        data = base64.b64decode(value["__array__"])
+        return np.frombuffer(data, dtype=np.dtype(value["dtype"])).reshape(value["shape"]).copy()
+    if "__tuple__" in value:
+        return tuple(decode(v) for v in value["__tuple__"])
+    if "__dict__" in value:
+        return {decode(k): decode(v) for k, v in value["__dict__"]}
+    return value
+
+
+def _is_pointer(arg: Any) -> bool:
+    """``byref()`` arguments: the SDK writes its outputs through them"""
+    return type(arg).__name__ == "CArgObject"
+
+
+def _read_output(arg: Any) -> Any:
+    target = arg._obj
+    return encode(target.value) if hasattr(target, "value") else encode(bytes(target))
+
+
+def _write_output(arg: Any, value: Any) -> None:
+    target = arg._obj
+    value = decode(value)
+    if hasattr(target, "value"):
+        target.value = value
+    else:
+        ctypes.memmove(ctypes.addressof(target), value, min(len(value), ctypes.sizeof(target)))
+
+
+def _inputs(args: tuple, kwargs: Dict[str, Any]) -> Any:
+    values = [None if _is_pointer(arg) else encode(arg) for arg in args]
+    if kwargs:
+        values.append({"__dict__": [[key, encode(value)] for key, value in kwargs.items()]})
+    return values
+
+
+# --- recording -------------------------------------------------------------
+
+class RecordingSerial:
+    """Serial port (or emulator) whose writes and reads are captured into a :class:`DeviceSession`"""
+
+    def __init__(self, connection, session: "DeviceSession", device: str):
+        self._connection = connection
+        self._session = session
+        self._device = device
+
+    def __getattr__(self, name: str):
+        return getattr(self._connection, name)
+
+    def write(self, data: bytes):
+        start = time.perf_counter()
+        written = self._connection.write(data)
+        self._session.capture(self._device, "write", "write", start, inputs=encode(bytes(data)), result=written)
+        return written
+
+    def read(self, size: int = 1) -> bytes:
+        start = time.perf_counter()
+        data = self._connection.read(size)
+        self._session.capture(self._device, "read", "read", start, result=encode(data))
+        return data
+
+    def readline(self, *args, **kwargs) -> bytes:
+        start = time.perf_counter()
+        data = self._connection.readline(*args, **kwargs)
+        self._session.capture(self._device, "read", "readline", start, result=encode(data))
+        return data
+
+
+class RecordingCalls:
+    """
+    Proxy capturing every method call of ``target``: inputs, return value,
+    the values written through ``byref()`` arguments and exceptions
+    """
+
+    def __init__(self, target, session: "DeviceSession", device: str):
+        self._target = target
+        self._session = session
+        self._device = device
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+        call = self._session.function(self._device, name, attribute)
+        self.__dict__[name] = call
+        return call
+
+
+# --- replay ----------------------------------------------------------------
+
+class ReplayChannel:
+    """
+    Recorded exchanges of one device, consumed in order
+
+    A request is matched to the next recorded exchange with the same
+    operation and name (and, for writes, the same bytes); recorded
+    exchanges passed over on the way (status polls by the health monitor,
+    manual commands) are counted as skipped. Each replayed exchange takes
+    its recorded latency divided by ``speed`` (no time at all with speed 0).
+    """
+
+    def __init__(self, device: str, events: List[Dict[str, Any]], speed: float):
+        self.device = device
+        self.events = events
+        self.speed = speed
+        self.position = 0
+        self._lock = threading.Lock()
+        self.stats = {"replayed": 0, "skipped": 0, "diverged": 0, "recorded_time": 0.0, "waited": 0.0}
+        self.divergences: List[Dict[str, Any]] = []
+
+    def take(self, op: str, name: str, inputs: Any = None) -> Dict[str, Any]:
+        with self._lock:
+            for index in range(self.position, len(self.events)):
+                event = self.events[index]
+                if event["op"] != op or event["name"] != name:
+                    continue
+                if op == "write" and event.get("inputs") != inputs:
+                    continue
+                self.stats["skipped"] += index - self.position
+                self.position = index + 1
+                break
+            else:
+                raise ReplayMismatch(f"{self.device}: no recorded {op} '{name}' left "
+                                     f"(at exchange {self.position} of {len(self.events)})")
+            self.stats["replayed"] += 1
+            self.stats["recorded_time"] += event["latency"]
+            if op == "call" and inputs is not None and event.get("inputs") != inputs:
+                self.stats["diverged"] += 1
+                if len(self.divergences) < 20:
+                    self.divergences.append({"name": name, "recorded": event.get("inputs"), "replayed": inputs})
+        if self.speed > 0 and event["latency"] > 0:
+            wait = event["latency"] / self.speed
+            time.sleep(wait)
+            self.stats["waited"] += wait
+        return event
+
+    def get_status(self) -> Dict[str, Any]:
+        return {**self.stats, "recorded": len(self.events), "remaining": len(self.events) - self.position,
+                "divergences": self.divergences}
+
+
+class ReplaySerial:
+    """``serial.Serial`` stand-in answering from a recorded session"""
+
+    def __init__(self, channel: ReplayChannel):
+        self._channel = channel
+        self.is_open = True
+        self.port = f"replay://{channel.device}"
+
+    def write(self, data: bytes) -> int:
+        event = self._channel.take("write", "write", encode(bytes(data)))
+        return event.get("result", len(data))
+
+    def read(self, size: int = 1) -> bytes:
+        return decode(self._channel.take("read", "read")["result"])
+
+    def readline(self, *args, **kwargs) -> bytes:
+        return decode(self._channel.take("read", "readline")["result"])
+
+    def reset_input_buffer(self) -> None:
+        pass
+
+    def reset_output_buffer(self) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    @property
+    def in_waiting(self) -> int:
+        return 0
+
+    def close(self) -> None:
+        self.is_open = False
+
+
+class ReplayCalls:
+    """SDK or data-source stand-in: every method returns its recorded result"""
+
+    def __init__(self, session: "DeviceSession", device: str):
+        self._session = session
+        self._device = device
+
+    def __getattr__(self, name: str):
+        call = self._session.function(self._device, name)
+        self.__dict__[name] = call
+        return call
+
+
+# --- session ---------------------------------------------------------------
+
+class DeviceSession:
+    """
+    Record or replay of every controller's transport (``[replay]``)
+
+    Controllers pass their transports through :meth:`serial` (serial
+    ports), :meth:`calls` (SDKs, drivers) and :meth:`function` (data
+    streams such as PicoScope blocks) when they connect. With ``mode =
+    "record"`` every exchange is captured with its start time and latency
+    and streamed to a new file in ``session_dir`` (gzipped JSON lines, with
+    the hardware configuration in the header) by a writer thread, flushed
+    every ``flush_interval`` seconds, so a crash loses at most that much of
+    the session and memory does not grow with it. With ``mode = "replay"`` the
+    controllers get stand-ins answering from ``session`` instead, at
+    ``speed`` times the recorded device latencies (``"max"``: no waiting);
+    ``replaying`` tells them not to open any hardware. Anything else goes
+    through unchanged.
+    """
+
+    def __init__(self, config_path: str = None):
+        self.config_path = config_path
+        config = self._load_config(config_path)
+        replay = config.get('replay', {})
+        self.hardware_config = config
+        session_dir = replay.get('session_dir', 'sessions')
+        self.session_dir = session_dir if os.path.isabs(session_dir) else os.path.join(DATABASE_DIR, session_dir)
+        self.flush_interval = float(replay.get('flush_interval', 5.0))
+        self.mode = "off"
+        self.speed = 1.0
+        self.header: Dict[str, Any] = {}
+        self.channels: Dict[str, ReplayChannel] = {}
+        self.notes: List[Dict[str, Any]] = []
+        self.started = 0.0
+        self.path: Optional[str] = None
+        self.exchanges = 0
+        self.error: Optional[str] = None
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+        mode = replay.get('mode', 'off')
+        if mode == "record":
+            self.record()
+        elif mode == "replay":
+            session = replay.get('session', '')
+            if not os.path.isabs(session):
+                session = os.path.join(self.session_dir, session)
+            self.replay(session, replay.get('speed', 1.0))
+        elif mode != "off":
+            logger.error(f"Unknown [replay] mode '{mode}', expected one of {MODES}")
+
+    def _load_config(self, config_path: str = None) -> Dict[str, Any]:
+        """Load configuration from TOML file"""
+        if config_path is None:
+            # Default to hardware_configuration.toml in project root
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+            config_path = os.path.join(project_root, "hardware_configuration.toml")
+
+        try:
+            with open(config_path, 'r') as f:
+                return toml.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load configuration: {e}")
+            return {}
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    # --- modes -----------------------------------------------------------
+
+    def record(self, path: Optional[str] = None) -> str:
+        """
+        Start capturing into ``path`` (default: a new file in ``session_dir``);
+        transports wrapped from now on are recorded
+        """
+        self.stop()
+        if path is None:
+            os.makedirs(self.session_dir, exist_ok=True)
+            path = os.path.join(self.session_dir, time.strftime("session-%Y%m%d-%H%M%S.jsonl.gz"))
+        self.header = {"format": SESSION_FORMAT, "version": 1, "recorded_at": time.time(),
+                       "config": self.hardware_config}
+        f = gzip.open(path, 'wt', encoding='utf-8')
+        f.write(json.dumps(self.header) + "\n")
+        f.flush()
+        self.path = path
+        self.notes = []
+        self.exchanges = 0
+        self.error = None
+        self.started = time.perf_counter()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write, args=(f, self._queue), name="device-session",
+                                        daemon=True)
+        self._writer.start()
+        self.mode = "record"
+        logger.info(f"Recording device session to {path}")
+        return path
+
+    def _write(self, f, events: "queue.Queue") -> None:
+        """Writer thread: encodes queued events into the session file, flushing every ``flush_interval`` s"""
+        flushed = time.monotonic()
+        while True:
+            try:
+                item = events.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            try:
+                if item is _CLOSE:
+                    f.write(json.dumps({"op": "end", "duration": time.perf_counter() - self.started,
+                                        "exchanges": self.exchanges}) + "\n")
+                    f.close()
+                    return
+                if isinstance(item, threading.Event):
+                    f.flush()
+                    flushed = time.monotonic()
+                    item.set()
+                    continue
+                if item is not None:
+                    f.write(json.dumps(item) + "\n")
+                    self.exchanges += 1
+                if time.monotonic() - flushed >= self.flush_interval:
+                    f.flush()
+                    flushed = time.monotonic()
+            except Exception as e:
+                if self.error is None:
+                    logger.error(f"Writing device session {self.path} failed: {e}")
+                self.error = str(e)
+                if isinstance(item, threading.Event):
+                    item.set()
+                if item is _CLOSE:
+                    return
+
+    def replay(self, path: str, speed=1.0) -> None:
+        """Answer every transport from the session at ``path``"""
+        self.header, events = read_session(path)
+        self.speed = parse_speed(speed)
+        per_device: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.notes = []
+        for event in events:
+            if event["op"] == "note":
+                self.notes.append(event)
+            else:
+                per_device[event["device"]].append(event)
+        self.channels = {device: ReplayChannel(device, device_events, self.speed)
+                         for device, device_events in per_device.items()}
+        self.mode = "replay"
+        self.started = time.perf_counter()
+        logger.info(f"Replaying device session {path} ({len(events)} exchanges, "
+                    f"speed {'max' if not self.speed else f'{self.speed:g}x'})")
+
+    def stop(self) -> None:
+        """End recording (finishing the session file) or replay"""
+        if self.recording:
+            self.mode = "off"
+            self._queue.put(_CLOSE)
+            self._writer.join()
+            self._writer = None
+            logger.info(f"Recorded device session {self.path} ({self.exchanges} exchanges)")
+        self.mode = "off"
+
+    def scaled(self, seconds: float) -> float:
+        """A wait for the hardware (polling, settling) in session time: shortened by ``speed`` in replay"""
+        if not self.replaying:
+            return seconds
+        return seconds / self.speed if self.speed > 0 else 0.0
+
+    def sleep(self, seconds: float) -> None:
+        seconds = self.scaled(seconds)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    # --- transports ------------------------------------------------------
+
+    def serial(self, device: str, connection=None):
+        """The serial transport of ``device`` for the current mode"""
+        if self.replaying:
+            return ReplaySerial(self._channel(device))
+        if self.recording and connection is not None:
+            return RecordingSerial(connection, self, device)
+        return connection
+
+    def calls(self, device: str, target=None):
+        """The SDK / driver object of ``device`` for the current mode"""
+        if self.replaying:
+            return ReplayCalls(self, device)
+        if self.recording and target is not None:
+            return RecordingCalls(target, self, device)
+        return target
+
+    def function(self, device: str, name: str, function: Optional[Callable] = None) -> Callable:
+        """A data-stream reader (or one SDK function) of ``device`` for the current mode"""
+        if self.replaying:
+            channel = self._channel(device)
+
+            def replayed(*args, **kwargs):
+                event = channel.take("call", name, _inputs(args, kwargs))
+                for arg, value in zip(args, event.get("outputs") or []):
+                    if value is not None and _is_pointer(arg):
+                        _write_output(arg, value)
+                if "error" in event:
+                    raise RuntimeError(f"{device} {name} (replayed): {event['error']}")
+                return decode(event.get("result"))
+            return replayed
+
+        if not self.recording or function is None:
+            return function
+
+        def recorded(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                value = function(*args, **kwargs)
+            except Exception as e:
+                self.capture(device, "call", name, start, inputs=_inputs(args, kwargs), error=str(e))
+                raise
+            outputs = [_read_output(arg) if _is_pointer(arg) else None for arg in args]
+            self.capture(device, "call", name, start, inputs=_inputs(args, kwargs), result=encode(value),
+                         outputs=outputs if any(v is not None for v in outputs) else None)
+            return value
+        return recorded
+
+    def _channel(self, device: str) -> ReplayChannel:
+        if device not in self.channels:
+            self.channels[device] = ReplayChannel(device, [], self.speed)
+        return self.channels[device]
+
+    # --- capture ---------------------------------------------------------
+
+    def capture(self, device: str, op: str, name: str, start: float, **fields: Any) -> None:
+        """Queue one exchange that began at ``start`` (``perf_counter``) and ends now for the writer"""
+        if not self.recording:
+            return
+        end = time.perf_counter()
+        event = {"device": device, "op": op, "name": name, "t": start - self.started, "latency": end - start}
+        event.update((key, value) for key, value in fields.items() if value is not None)
+        self._queue.put(event)
+
+    def note(self, name: str, data: Dict[str, Any]) -> None:
+        """Session metadata (e.g. run settings and results) in line with the exchanges"""
+        if self.recording:
+            self._queue.put({"device": None, "op": "note", "name": name,
+                             "t": time.perf_counter() - self.started, "latency": 0.0, "data": data})
+
+    def flush(self, timeout: float = 10.0) -> str:
+        """Make everything captured so far readable in the session file; recording continues"""
+        if not self.recording:
+            raise ValueError("No session is being recorded")
+        flushed = threading.Event()
+        self._queue.put(flushed)
+        if not flushed.wait(timeout):
+            raise TimeoutError(f"Device session writer did not catch up within {timeout} s")
+        if self.error is not None:
+            raise OSError(self.error)
+        return self.path
+
+    def get_status(self) -> Dict[str, Any]:
+        status: Dict[str, Any] = {"mode": self.mode, "session_dir": self.session_dir, "path": self.path}
+        if self.recording:
+            status.update(exchanges=self.exchanges, pending=self._queue.qsize(), error=self.error,
+                          duration=time.perf_counter() - self.started)
+        elif self.replaying:
+            status.update(speed=self.speed or "max", recorded_duration=self.header.get("duration"),
+                          elapsed=time.perf_counter() - self.started,
+                          devices={device: channel.get_status() for device, channel in self.channels.items()})
+        return status
+
+
+def read_session(path: str):
+    """
+    (header, events) of a recorded session; a session cut short by a crash
+    is read up to its last flush (a torn final line is dropped)
+    """
+    events = []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get("format") != SESSION_FORMAT:
+            raise ValueError(f"{path} is not a device session")
+        try:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if event.get("op") == "end":
+                    header.update(duration=event["duration"], exchanges=event["exchanges"])
+                else:
+                    events.append(event)
+        except EOFError:
+            logger.warning(f"{path} ends without a trailer (recording interrupted); read up to its last flush")
+    return header, events
+
+
+# Controllers route their transports through it when they connect
+device_session = DeviceSession()
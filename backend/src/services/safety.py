@@ -0,0 +1,329 @@
+"""
+Safety Watchdog
+Enforces laser exposure and temperature limits from cached controller state, shutting down through a priority lane
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, List, Optional
+
+import toml
+
+from .leases import DeviceLeaseManager
+
+logger = logging.getLogger(__name__)
+
+
+class PriorityLock:
+    """
+    Reentrant device lock with a priority lane
+
+    Used like ``threading.RLock``. :meth:`priority` acquires ahead of every
+    thread already waiting in :meth:`acquire`, so a shutdown command is the
+    next one sent to the device whatever is queued behind the current
+    holder. While a priority acquisition waits, :attr:`preempt_requested`
+    is true: holders that poll in a loop (the MIRcat tune) check it and
+    give up the lock early.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._owner: Optional[int] = None
+        self._depth = 0
+        self._priority_waiting = 0
+        self.stats = {"priority_acquisitions": 0, "max_priority_wait": 0.0}
+
+    @property
+    def preempt_requested(self) -> bool:
+        return self._priority_waiting > 0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        me = threading.get_ident()
+        with self._cond:
+            if self._owner == me:
+                self._depth += 1
+                return True
+            if not blocking:
+                if self._owner is not None or self._priority_waiting:
+                    return False
+            elif not self._cond.wait_for(lambda: self._owner is None and not self._priority_waiting,
+                                         None if timeout < 0 else timeout):
+                return False
+            self._owner, self._depth = me, 1
+            return True
+
+    def release(self) -> None:
+        with self._cond:
+            if self._owner != threading.get_ident():
+                raise RuntimeError("cannot release un-acquired lock")
+            self._depth -= 1
+            if not self._depth:
+                self._owner = None
+                self._cond.notify_all()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.release()
+
+    @contextmanager
+    def priority(self):
+        """Hold the lock, jumping every normal waiter"""
+        me = threading.get_ident()
+        start = time.perf_counter()
+        with self._cond:
+            if self._owner == me:
+                self._depth += 1
+            else:
+                self._priority_waiting += 1
+                try:
+                    self._cond.wait_for(lambda: self._owner is None)
+                finally:
+                    self._priority_waiting -= 1
+                self._owner, self._depth = me, 1
+            wait = time.perf_counter() - start
+            self.stats["priority_acquisitions"] += 1
+            self.stats["max_priority_wait"] = max(self.stats["max_priority_wait"], wait)
+        try:
+            yield wait
+        finally:
+            self.release()
+
+
+class SafetyWatchdog:
+    """
+    Background task enforcing the configured laser and temperature limits
+
+    Every ``tick`` seconds it checks, from state the controllers already
+    cache (no device is polled for it):
+
+    * MIRcat emission and Nd:YAG firing that lasted longer than
+      ``[experiment.safety] max_laser_on_time``,
+    * MIRcat emission left on for ``[daylight_mircat.safety]
+      emission_timeout`` while no run holds the laser,
+    * QCL temperatures above ``max_temperature``, read at most every
+      ``temperature_check_interval`` seconds and only when the MIRcat lock
+      is free (``temperature_monitoring``),
+    * a failed run, with ``auto_shutdown_on_error``.
+
+    A limit trips once when it is crossed. The lasers are then shut down
+    through their controllers' priority lanes and the trip callbacks (stop
+    the run, pause the job queue) run. Every trip records how long after
+    the limit it was detected, how long the priority lane waited for the
+    device and the total reaction time; the worst case is reported.
+    """
+
+    def __init__(self, mircat=None, ndyag=None, config_path: str = None,
+                 leases: Optional[DeviceLeaseManager] = None, tick: float = 0.1):
+        self.mircat = mircat
+        self.ndyag = ndyag
+        self.leases = leases
+        self.tick = tick
+        config = self._load_config(config_path)
+        limits = config.get('experiment', {}).get('safety', {})
+        mircat_limits = config.get('daylight_mircat', {}).get('safety', {})
+        self.max_laser_on_time = limits.get('max_laser_on_time')
+        self.temperature_check_interval = float(limits.get('temperature_check_interval', 60))
+        self.auto_shutdown_on_error = bool(limits.get('auto_shutdown_on_error', True))
+        self.emission_timeout = mircat_limits.get('emission_timeout')
+        self.temperature_monitoring = bool(mircat_limits.get('temperature_monitoring', False))
+        self.max_temperature = mircat_limits.get('max_temperature')
+
+        self._error_source: Optional[Callable[[], Optional[str]]] = None
+        self._last_error: Optional[str] = None
+        self._callbacks: List[Callable[[Dict[str, Any]], Any]] = []
+        self._active: Dict[str, str] = {}  # tripped conditions that have not cleared yet
+        self._task: Optional[asyncio.Task] = None
+        self._refresh: Optional[asyncio.Future] = None
+        self._shutdown: Optional[asyncio.Task] = None
+        self.events: List[Dict[str, Any]] = []
+        self.ticks = 0
+        self.max_tick_time = 0.0
+        self.worst_reaction: Optional[float] = None
+
+    def _load_config(self, config_path: str = None) -> Dict[str, Any]:
+        """Load configuration from TOML file"""
+        if config_path is None:
+            # Default to hardware_configuration.toml in project root
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+            config_path = os.path.join(project_root, "hardware_configuration.toml")
+
+        try:
+            with open(config_path, 'r') as f:
+                return toml.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load configuration: {e}")
+            return {}
+
+    def watch_errors(self, error_source: Callable[[], Optional[str]]) -> None:
+        """Trip (with ``auto_shutdown_on_error``) whenever ``error_source`` returns a new error"""
+        self._error_source = error_source
+        self._last_error = error_source()
+
+    def on_trip(self, callback: Callable[[Dict[str, Any]], Any]) -> None:
+        """Call ``callback(event)`` (plain or async) after the lasers are shut down"""
+        self._callbacks.append(callback)
+
+    # --- scheduling ------------------------------------------------------
+
+    def start(self) -> None:
+        """Start checking on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _watch(self) -> None:
+        while True:
+            start = time.perf_counter()
+            try:
+                for condition, reason, crossed_at in self.check():
+                    if self._shutdown is None or self._shutdown.done():
+                        self._shutdown = asyncio.ensure_future(self.shutdown(reason, condition, crossed_at))
+            except Exception as e:
+                logger.error(f"Safety check failed: {e}")
+            self.ticks += 1
+            self.max_tick_time = max(self.max_tick_time, time.perf_counter() - start)
+            await asyncio.sleep(self.tick)
+
+    # --- checks ----------------------------------------------------------
+
+    def check(self) -> List[tuple]:
+        """(condition, reason, crossed_at) of every limit crossed since the last check"""
+        now = time.monotonic()
+        crossed: Dict[str, tuple] = {}
+
+        mircat = self.mircat
+        if mircat is not None and mircat.emission_since is not None:
+            on_time = now - mircat.emission_since
+            leased = self.leases is not None and self.leases.holder("mircat") is not None
+            if self.max_laser_on_time is not None and on_time > self.max_laser_on_time:
+                crossed["mircat_on_time"] = (f"MIRcat emission on for {on_time:.0f} s "
+                                             f"(max_laser_on_time {self.max_laser_on_time} s)",
+                                             mircat.emission_since + self.max_laser_on_time)
+            elif not leased and self.emission_timeout is not None and on_time > self.emission_timeout:
+                crossed["mircat_emission_timeout"] = (f"MIRcat emission left on for {on_time:.0f} s without a run "
+                                                      f"(emission_timeout {self.emission_timeout} s)",
+                                                      mircat.emission_since + self.emission_timeout)
+
+        if mircat is not None and self.temperature_monitoring:
+            if self.max_temperature is not None and mircat.temperatures_at is not None:
+                hot = {qcl: t for qcl, t in mircat.temperatures.items() if t > self.max_temperature}
+                if hot:
+                    crossed["mircat_temperature"] = (f"QCL temperature {hot} above {self.max_temperature} C",
+                                                     mircat.temperatures_at)
+            self._refresh_temperatures(now)
+
+        ndyag = self.ndyag
+        if ndyag is not None and ndyag.firing_since is not None and self.max_laser_on_time is not None:
+            on_time = now - ndyag.firing_since
+            if on_time > self.max_laser_on_time:
+                crossed["ndyag_on_time"] = (f"Nd:YAG firing for {on_time:.0f} s "
+                                            f"(max_laser_on_time {self.max_laser_on_time} s)",
+                                            ndyag.firing_since + self.max_laser_on_time)
+
+        if self._error_source is not None:
+            error = self._error_source()
+            if error is not None and error != self._last_error and self.auto_shutdown_on_error:
+                crossed["run_error"] = (f"Run failed: {error}", now)
+            self._last_error = error
+
+        # Trip on the crossing only; a condition trips again once it has cleared
+        tripped = [(condition, reason, crossed_at) for condition, (reason, crossed_at) in crossed.items()
+                   if condition not in self._active]
+        self._active = {condition: reason for condition, (reason, _) in crossed.items()}
+        self._active.pop("run_error", None)
+        return tripped
+
+    def _refresh_temperatures(self, now: float) -> None:
+        """Re-read the QCL temperatures in a worker thread once the cache is older than the check interval"""
+        mircat = self.mircat
+        if not mircat.is_connected or (self._refresh is not None and not self._refresh.done()):
+            return
+        if mircat.temperatures_at is not None and now - mircat.temperatures_at < self.temperature_check_interval:
+            return
+        # Never queue behind device commands: the read is skipped while the MIRcat is busy
+        self._refresh = asyncio.ensure_future(asyncio.to_thread(mircat.read_temperatures, False))
+
+    # --- shutdown --------------------------------------------------------
+
+    async def shutdown(self, reason: str, condition: str = "manual",
+                       crossed_at: Optional[float] = None) -> Dict[str, Any]:
+        """Switch both lasers off through the priority lane, then run the trip callbacks"""
+        detected = time.monotonic()
+        start = time.perf_counter()
+        logger.critical(f"Safety shutdown: {reason}")
+
+        actions: Dict[str, Any] = {}
+        lasers = []
+        if self.mircat is not None:
+            lasers.append(("mircat", asyncio.to_thread(self.mircat.emergency_shutdown)))
+        if self.ndyag is not None:
+            lasers.append(("ndyag", self.ndyag.stop(priority=True)))
+        results = await asyncio.gather(*(action for _, action in lasers), return_exceptions=True)
+        for (name, _), result in zip(lasers, results):
+            actions[name] = result if not isinstance(result, BaseException) else f"failed: {result}"
+        lasers_off = time.perf_counter() - start
+
+        for callback in self._callbacks:
+            try:
+                result = callback({"reason": reason, "condition": condition})
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Safety trip callback failed: {e}")
+
+        detection = max(0.0, detected - crossed_at) if crossed_at is not None else 0.0
+        event = {
+            "time": time.time(),
+            "condition": condition,
+            "reason": reason,
+            "actions": actions,
+            "detection_latency": detection,
+            "lock_wait": {name: getattr(controller, "last_shutdown_wait", None)
+                          for name, controller in (("mircat", self.mircat), ("ndyag", self.ndyag))
+                          if controller is not None},
+            "lasers_off": lasers_off,
+            "total": time.perf_counter() - start,
+            "reaction_time": detection + lasers_off
+        }
+        self.events.append(event)
+        self.worst_reaction = max(self.worst_reaction or 0.0, event["reaction_time"])
+        return event
+
+    def get_status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        mircat, ndyag = self.mircat, self.ndyag
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "active": dict(self._active),
+            "mircat_on_time": now - mircat.emission_since
+            if mircat is not None and mircat.emission_since is not None else None,
+            "ndyag_on_time": now - ndyag.firing_since
+            if ndyag is not None and ndyag.firing_since is not None else None,
+            "temperatures": dict(mircat.temperatures) if mircat is not None else None,
+            "temperature_age": now - mircat.temperatures_at
+            if mircat is not None and mircat.temperatures_at is not None else None,
+            "events": self.events[-20:],
+            "trips": len(self.events),
+            "worst_reaction_time": self.worst_reaction,
+            "ticks": self.ticks,
+            "max_tick_time": self.max_tick_time,
+            "limits": {
+                "max_laser_on_time": self.max_laser_on_time,
+                "emission_timeout": self.emission_timeout,
+                "max_temperature": self.max_temperature if self.temperature_monitoring else None,
+                "temperature_check_interval": self.temperature_check_interval,
+                "auto_shutdown_on_error": self.auto_shutdown_on_error,
+                "tick": self.tick
+            }
+        }
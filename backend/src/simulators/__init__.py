@@ -0,0 +1,61 @@
+"""
+Device Simulators
+Hardware-free stand-ins for every device, selected per device with
+``[<device>.simulation] enabled = true`` in hardware_configuration.toml
+"""
+
+from typing import Dict, Any
+
+from .base import SimulationProfile, SimulatedDeviceError, is_simulated, get_profile
+from .serial_device import SimulatedSerial
+from .arduino import ArduinoFirmwareEmulator
+from .mircat import FakeMIRcatSDK
+from .qc9524 import QC9524Emulator
+
+
+def create_arduino_simulator(config: Dict[str, Any]) -> ArduinoFirmwareEmulator:
+    """Build the Arduino MUX firmware emulator from the ``arduino_uno_r4`` config"""
+    params = config.get('parameters', {})
+    sim = config.get('simulation', {})
+    return ArduinoFirmwareEmulator(
+        profile=get_profile(config),
+        timeout=config.get('timeout', 2.0),
+        num_positions=params.get('num_positions', 10),
+        default_position=params.get('default_position', 1),
+        move_time=sim.get('move_time', 0.0)
+    )
+
+
+def create_mircat_sdk(config: Dict[str, Any]) -> FakeMIRcatSDK:
+    """Build the fake MIRcat SDK from the ``daylight_mircat`` config"""
+    params = config.get('parameters', {})
+    sim = config.get('simulation', {})
+    return FakeMIRcatSDK(
+        profile=get_profile(config),
+        tuning_range=(params.get('wavelength_min', 1645), params.get('wavelength_max', 2075)),
+        num_qcls=params.get('num_qcls', 1),
+        tune_intercept=sim.get('tune_intercept', 0.05),
+        tune_slope=sim.get('tune_slope', 0.0005),
+        qcl_change_time=sim.get('qcl_change_time', 0.5)
+    )
+
+
+def create_qc9524_simulator(config: Dict[str, Any]) -> QC9524Emulator:
+    """Build the QC9524 SCPI emulator from the ``quantum_composers_9524`` config"""
+    params = config.get('parameters', {})
+    sim = config.get('simulation', {})
+    return QC9524Emulator(
+        profile=get_profile(config),
+        timeout=config.get('timeout', 2.0),
+        num_channels=params.get('num_channels', 8),
+        baud_rate=config.get('baud_rate', 115200),
+        command_time=sim.get('command_time', 0.001),
+        min_pulse_width=params.get('min_pulse_width', 5) * 1e-9,
+        max_delay=params.get('max_delay', 1000)
+    )
+
+
+def create_signal_source(config: Dict[str, Any]):
+    """Build the synthetic scope/lock-in signal source (requires numpy)"""
+    from .signals import SyntheticSignalSource
+    return SyntheticSignalSource.from_config(config)
@@ -0,0 +1,47 @@
+"""
+Arduino Uno R4 Firmware Emulator
+Emulates the MUX controller serial protocol (PING, MUX <n>, GET_MUX)
+"""
+
+import logging
+from typing import Optional
+
+from .base import SimulationProfile
+from .serial_device import SimulatedSerial
+
+logger = logging.getLogger(__name__)
+
+
+class ArduinoFirmwareEmulator(SimulatedSerial):
+    """Serial-compatible emulator of the MUX controller firmware"""
+
+    def __init__(self, profile: Optional[SimulationProfile] = None, timeout: float = 2.0,
+                 num_positions: int = 10, default_position: int = 1, move_time: float = 0.0):
+        super().__init__(profile, timeout, port="sim://arduino_uno_r4")
+        self.num_positions = num_positions
+        self.position = default_position
+        self.move_time = move_time  # seconds of relay settling per position change
+
+    def processing_time(self, line: str) -> float:
+        if line.startswith("MUX "):
+            return self.move_time
+        return 0.0
+
+    def handle_line(self, line: str) -> Optional[str]:
+        if line == "PING":
+            return "PONG"
+
+        if line == "GET_MUX":
+            return f"MUX_POS {self.position}"
+
+        if line.startswith("MUX "):
+            try:
+                position = int(line.split()[1])
+            except (IndexError, ValueError):
+                return "ERR BAD_ARGUMENT"
+            if not 1 <= position <= self.num_positions:
+                return "ERR OUT_OF_RANGE"
+            self.position = position
+            return f"MUX_SET {position}"
+
+        return "ERR UNKNOWN_COMMAND"
@@ -0,0 +1,101 @@
+"""
+Simulator Base Classes
+Latency, jitter and failure-injection profile shared by all device simulators
+"""
+
+import random
+import time
+import logging
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatedDeviceError(IOError):
+    """Raised by a simulator when a failure is injected"""
+
+
+class SimulationProfile:
+    """
+    Timing and failure behaviour of a simulated device
+
+    Loaded from a ``[<device>.simulation]`` table in hardware_configuration.toml:
+
+        enabled = true
+        latency = 0.002        # seconds added to every exchange
+        jitter = 0.0005        # standard deviation of latency, seconds
+        failure_rate = 0.0     # probability an exchange fails
+        failure_mode = "drop"  # "drop" (no reply), "garble" or "error"
+        time_scale = 1.0       # multiplier on all simulated delays
+        seed = 0               # optional, for reproducible runs
+    """
+
+    FAILURE_MODES = ("drop", "garble", "error")
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                 failure_mode: str = "drop", time_scale: float = 1.0, seed: Optional[int] = None):
+        if failure_mode not in self.FAILURE_MODES:
+            raise ValueError(f"Unknown failure_mode '{failure_mode}', expected one of {self.FAILURE_MODES}")
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_mode = failure_mode
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+        self.exchanges = 0
+        self.failures = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "SimulationProfile":
+        """Build a profile from a device's ``simulation`` config table"""
+        return cls(
+            latency=float(config.get('latency', 0.0)),
+            jitter=float(config.get('jitter', 0.0)),
+            failure_rate=float(config.get('failure_rate', 0.0)),
+            failure_mode=config.get('failure_mode', 'drop'),
+            time_scale=float(config.get('time_scale', 1.0)),
+            seed=config.get('seed')
+        )
+
+    def sample_latency(self, extra: float = 0.0) -> float:
+        """Return one exchange latency in seconds, including jitter and ``extra`` device time"""
+        value = self.latency + extra
+        if self.jitter:
+            value += self.rng.gauss(0.0, self.jitter)
+        return max(0.0, value) * self.time_scale
+
+    def wait(self, extra: float = 0.0) -> float:
+        """Sleep for one sampled latency and return it"""
+        delay = self.sample_latency(extra)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    def should_fail(self) -> bool:
+        """Decide whether the current exchange fails"""
+        self.exchanges += 1
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            self.failures += 1
+            return True
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency,
+            "jitter": self.jitter,
+            "failure_rate": self.failure_rate,
+            "failure_mode": self.failure_mode,
+            "time_scale": self.time_scale,
+            "exchanges": self.exchanges,
+            "failures": self.failures
+        }
+
+
+def is_simulated(config: Dict[str, Any]) -> bool:
+    """Return True when a device config selects its simulator"""
+    return bool(config.get('simulation', {}).get('enabled', False))
+
+
+def get_profile(config: Dict[str, Any]) -> SimulationProfile:
+    """Return the simulation profile for a device config"""
+    return SimulationProfile.from_config(config.get('simulation', {}))
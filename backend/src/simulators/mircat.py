@@ -0,0 +1,252 @@
+"""
+Fake MIRcat SDK
+Drop-in replacement for the ``MIRcatSDK.dll`` functions used by the MIRcat controller
+"""
+
+import time
+import logging
+from typing import Optional, Dict, Any, List, Tuple
+
+from .base import SimulationProfile
+
+logger = logging.getLogger(__name__)
+
+# Return codes mirrored from MIRcatSDKConstants (plain ints, as returned by a CDLL call)
+RET_SUCCESS = 0
+RET_WW_OUTOFTUNINGRANGE = 80
+RET_EMISSION_ALREADY_OFF = 83
+RET_EMISSION_ALREADY_ON = 85
+RET_QCL_NUM_OUTOFRANGE = 90
+RET_LASER_ALREADY_ARMED = 91
+RET_LASER_ALREADY_DISARMED = 92
+RET_LASER_NOT_ARMED = 93
+RET_LASER_NOT_TUNED = 94
+RET_COMM_ERROR = 100
+RET_NOT_INITIALIZED = 101
+
+UNITS_MICRONS = 1
+UNITS_CM1 = 2
+
+
+def _value(arg):
+    """Unwrap a ctypes scalar (c_float(1.0) -> 1.0); plain values pass through"""
+    return getattr(arg, 'value', arg)
+
+
+def _set(ref, value) -> None:
+    """Write through a ``byref()`` pointer (or a bare ctypes object)"""
+    getattr(ref, '_obj', ref).value = value
+
+
+class FakeMIRcatSDK:
+    """
+    Simulated MIRcat controller exposing ``MIRcatSDK_*`` functions
+
+    Tune duration follows ``tune_intercept + tune_slope * |step|`` plus
+    ``qcl_change_time`` when the move crosses chips, so the controller's
+    tune-latency model can be exercised without hardware.
+    """
+
+    def __init__(self, profile: Optional[SimulationProfile] = None,
+                 tuning_range: Tuple[float, float] = (1645.0, 2075.0), num_qcls: int = 1,
+                 tune_intercept: float = 0.05, tune_slope: float = 0.0005,
+                 qcl_change_time: float = 0.5, temperature: float = 19.0):
+        self.profile = profile or SimulationProfile()
+        self.tuning_range = (min(tuning_range), max(tuning_range))
+        self.num_qcls = num_qcls
+        self.tune_intercept = tune_intercept
+        self.tune_slope = tune_slope
+        self.qcl_change_time = qcl_change_time
+        self.temperature = temperature
+
+        self.initialized = False
+        self.armed = False
+        self.emitting = False
+        self.wavenumber: Optional[float] = None
+        self.qcl = 0
+        self.units = UNITS_CM1
+        self._tuned_at = 0.0
+        self.calls: Dict[str, int] = {}
+        self.tune_log: List[Dict[str, Any]] = []
+
+    def _call(self, name: str) -> Optional[int]:
+        """Common per-call latency, bookkeeping and failure injection"""
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.profile.wait()
+        if self.profile.should_fail():
+            return RET_COMM_ERROR
+        if not self.initialized and name != "Initialize":
+            return RET_NOT_INITIALIZED
+        return None
+
+    # --- connection ------------------------------------------------------
+
+    def MIRcatSDK_Initialize(self):
+        error = self._call("Initialize")
+        if error is not None:
+            return error
+        self.initialized = True
+        return RET_SUCCESS
+
+    def MIRcatSDK_DeInitialize(self):
+        self.initialized = False
+        self.armed = False
+        self.emitting = False
+        return RET_SUCCESS
+
+    def MIRcatSDK_GetAPIVersion(self, major, minor, patch):
+        _set(major, 2)
+        _set(minor, 5)
+        _set(patch, 0)
+        return RET_SUCCESS
+
+    def MIRcatSDK_GetNumInstalledQcls(self, num_qcls):
+        error = self._call("GetNumInstalledQcls")
+        if error is not None:
+            return error
+        _set(num_qcls, self.num_qcls)
+        return RET_SUCCESS
+
+    def MIRcatSDK_IsInterlockedStatusSet(self, is_set):
+        _set(is_set, True)
+        return RET_SUCCESS
+
+    def MIRcatSDK_IsKeySwitchStatusSet(self, is_set):
+        _set(is_set, True)
+        return RET_SUCCESS
+
+    # --- arming and emission ---------------------------------------------
+
+    def MIRcatSDK_IsLaserArmed(self, is_armed):
+        error = self._call("IsLaserArmed")
+        if error is not None:
+            return error
+        _set(is_armed, self.armed)
+        return RET_SUCCESS
+
+    def MIRcatSDK_ArmDisarmLaser(self):
+        error = self._call("ArmDisarmLaser")
+        if error is not None:
+            return error
+        self.armed = not self.armed
+        if not self.armed:
+            self.emitting = False
+        return RET_SUCCESS
+
+    def MIRcatSDK_DisarmLaser(self):
+        error = self._call("DisarmLaser")
+        if error is not None:
+            return error
+        if not self.armed:
+            return RET_LASER_ALREADY_DISARMED
+        self.armed = False
+        self.emitting = False
+        return RET_SUCCESS
+
+    def MIRcatSDK_AreTECsAtSetTemperature(self, at_temp):
+        _set(at_temp, True)
+        return RET_SUCCESS
+
+    def MIRcatSDK_GetQCLTemperature(self, qcl, temperature):
+        error = self._call("GetQCLTemperature")
+        if error is not None:
+            return error
+        if not 1 <= _value(qcl) <= self.num_qcls:
+            return RET_QCL_NUM_OUTOFRANGE
+        _set(temperature, self.temperature + self.profile.rng.gauss(0.0, 0.01))
+        return RET_SUCCESS
+
+    def MIRcatSDK_IsEmissionOn(self, is_emitting):
+        error = self._call("IsEmissionOn")
+        if error is not None:
+            return error
+        _set(is_emitting, self.emitting)
+        return RET_SUCCESS
+
+    def MIRcatSDK_TurnEmissionOn(self):
+        error = self._call("TurnEmissionOn")
+        if error is not None:
+            return error
+        if not self.armed:
+            return RET_LASER_NOT_ARMED
+        if self.wavenumber is None:
+            return RET_LASER_NOT_TUNED
+        if self.emitting:
+            return RET_EMISSION_ALREADY_ON
+        self.emitting = True
+        return RET_SUCCESS
+
+    def MIRcatSDK_TurnEmissionOff(self):
+        error = self._call("TurnEmissionOff")
+        if error is not None:
+            return error
+        if not self.emitting:
+            return RET_EMISSION_ALREADY_OFF
+        self.emitting = False
+        return RET_SUCCESS
+
+    # --- tuning ----------------------------------------------------------
+
+    def MIRcatSDK_TuneToWW(self, target, units, qcl):
+        error = self._call("TuneToWW")
+        if error is not None:
+            return error
+        if not self.armed:
+            return RET_LASER_NOT_ARMED
+
+        target = _value(target)
+        units = _value(units)
+        qcl = _value(qcl)
+        wavenumber = 10000.0 / target if units == UNITS_MICRONS else target
+        low, high = self.tuning_range
+        if not low <= wavenumber <= high:
+            return RET_WW_OUTOFTUNINGRANGE
+        if not 1 <= qcl <= self.num_qcls:
+            return RET_QCL_NUM_OUTOFRANGE
+
+        duration = self.tune_intercept
+        if self.wavenumber is not None:
+            duration += self.tune_slope * abs(wavenumber - self.wavenumber)
+        if qcl != self.qcl:
+            duration += self.qcl_change_time
+        duration *= self.profile.time_scale
+
+        self.tune_log.append({"start": self.wavenumber, "end": wavenumber,
+                              "start_qcl": self.qcl, "end_qcl": qcl, "duration": duration})
+        self.wavenumber = wavenumber
+        self.qcl = qcl
+        self.units = units
+        self._tuned_at = time.monotonic() + duration
+        return RET_SUCCESS
+
+    def MIRcatSDK_IsTuned(self, is_tuned):
+        error = self._call("IsTuned")
+        if error is not None:
+            return error
+        _set(is_tuned, self.wavenumber is not None and time.monotonic() >= self._tuned_at)
+        return RET_SUCCESS
+
+    def _in_units(self, wavenumber: float) -> float:
+        return 10000.0 / wavenumber if self.units == UNITS_MICRONS else wavenumber
+
+    def MIRcatSDK_GetTuneWW(self, tuned_ww, units, qcl):
+        error = self._call("GetTuneWW")
+        if error is not None:
+            return error
+        _set(tuned_ww, self._in_units(self.wavenumber) if self.wavenumber else 0.0)
+        _set(units, self.units)
+        _set(qcl, self.qcl)
+        return RET_SUCCESS
+
+    def MIRcatSDK_GetActualWW(self, actual_ww, units, light_valid):
+        error = self._call("GetActualWW")
+        if error is not None:
+            return error
+        tuned = self.wavenumber is not None and time.monotonic() >= self._tuned_at
+        if self.wavenumber is None:
+            _set(actual_ww, 0.0)
+        else:
+            _set(actual_ww, self._in_units(self.wavenumber + self.profile.rng.gauss(0.0, 0.005)))
+        _set(units, self.units)
+        _set(light_valid, bool(self.emitting and tuned))
+        return RET_SUCCESS
@@ -0,0 +1,137 @@
+"""
+Quantum Composers 9524 SCPI Emulator
+Emulates the pulse generator's serial command set (``:PULSEn:<FIELD>``)
+"""
+
+import logging
+from typing import Optional, Dict, Any
+
+from .base import SimulationProfile
+from .serial_device import SimulatedSerial
+
+logger = logging.getLogger(__name__)
+
+# Error replies as documented for the 9520 series serial interface
+ERR_INVALID_COMMAND = "?1"
+ERR_INVALID_PARAMETER = "?3"
+
+CHANNEL_FIELDS = {
+    "STATE": "OFF",
+    "WIDTH": 0.000010,
+    "DELAY": 0.0,
+    "SYNC": "T0",
+    "POLARITY": "NORM",
+    "CMODE": "NORM",
+    "PCOUNTER": 1,
+    "OCOUNTER": 0,
+}
+SYSTEM_FIELDS = {
+    "STATE": "OFF",
+    "PERIOD": 0.001,
+    "MODE": "NORM",
+}
+
+
+class QC9524Emulator(SimulatedSerial):
+    """
+    Serial-compatible emulator of the QC9524 pulse generator
+
+    Channel ``n`` (1-based, A=1) maps to ``:PULSEn``; ``:PULSE0`` is the
+    system timer (T0). Set commands reply ``ok``, queries reply the value.
+    Every line costs its transmission time at ``baud_rate`` plus
+    ``command_time`` of device processing.
+    """
+
+    terminator = b"\n"
+    reply_terminator = "\r\n"
+
+    def __init__(self, profile: Optional[SimulationProfile] = None, timeout: float = 2.0,
+                 num_channels: int = 8, baud_rate: int = 115200, command_time: float = 0.001,
+                 min_pulse_width: float = 5e-9, max_delay: float = 1000.0):
+        super().__init__(profile, timeout, port="sim://quantum_composers_9524")
+        self.num_channels = num_channels
+        self.baud_rate = baud_rate
+        self.command_time = command_time
+        self.min_pulse_width = min_pulse_width
+        self.max_delay = max_delay
+        self.state: Dict[int, Dict[str, Any]] = {}
+        self.reset_state()
+        self.commands_received = 0
+        self.bytes_received = 0
+
+    def reset_state(self) -> None:
+        """Return all channels to power-on defaults"""
+        self.state = {0: dict(SYSTEM_FIELDS)}
+        for channel in range(1, self.num_channels + 1):
+            self.state[channel] = dict(CHANNEL_FIELDS)
+
+    def processing_time(self, line: str) -> float:
+        # 10 bits per byte on the wire (8N1) plus the CR/LF terminator
+        return (len(line) + 2) * 10.0 / self.baud_rate + self.command_time
+
+    def handle_line(self, line: str) -> Optional[str]:
+        self.commands_received += 1
+        self.bytes_received += len(line) + 2
+
+        if line.upper() == "*IDN?":
+            return "QC,9524,SIMULATED,1.0"
+        if line.upper() == "*RST":
+            self.reset_state()
+            return "ok"
+
+        parts = line.split(None, 1)
+        path = parts[0].upper().lstrip(":").split(":")
+        argument = parts[1].strip() if len(parts) > 1 else None
+
+        if len(path) != 2 or not path[0].startswith("PULSE"):
+            return ERR_INVALID_COMMAND
+        try:
+            channel = int(path[0][5:])
+        except ValueError:
+            return ERR_INVALID_COMMAND
+        if channel not in self.state:
+            return ERR_INVALID_COMMAND
+
+        field = path[1]
+        query = field.endswith("?")
+        field = field.rstrip("?")
+        fields = self.state[channel]
+        if field not in fields:
+            return ERR_INVALID_COMMAND
+
+        if query:
+            value = fields[field]
+            return f"{value:.11f}" if isinstance(value, float) else str(value)
+        if argument is None:
+            return ERR_INVALID_PARAMETER
+
+        if isinstance(fields[field], int):
+            try:
+                value = int(argument)
+            except ValueError:
+                return ERR_INVALID_PARAMETER
+            if value < 0:
+                return ERR_INVALID_PARAMETER
+            fields[field] = value
+        elif isinstance(fields[field], float):
+            try:
+                value = float(argument)
+            except ValueError:
+                return ERR_INVALID_PARAMETER
+            if field == "WIDTH" and value < self.min_pulse_width:
+                return ERR_INVALID_PARAMETER
+            if field == "DELAY" and abs(value) > self.max_delay:
+                return ERR_INVALID_PARAMETER
+            if field == "PERIOD" and value <= 0:
+                return ERR_INVALID_PARAMETER
+            fields[field] = value
+        else:
+            value = argument.upper()
+            if field == "CMODE" and value not in ("NORM", "SING", "BURS", "DCYC"):
+                return ERR_INVALID_PARAMETER
+            if field == "STATE":
+                value = {"1": "ON", "0": "OFF"}.get(value, value)
+                if value not in ("ON", "OFF"):
+                    return ERR_INVALID_PARAMETER
+            fields[field] = value
+        return "ok"
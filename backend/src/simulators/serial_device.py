@@ -0,0 +1,180 @@
+"""
+Simulated Serial Devices
+In-process stand-in for ``serial.Serial`` and a pty bridge for line-based firmware emulators
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+from .base import SimulationProfile
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatedSerial:
+    """
+    Line-oriented serial device emulator
+
+    Implements the subset of the ``serial.Serial`` interface used by the
+    controllers (``write``, ``readline``, ``read``, ``in_waiting``,
+    ``reset_input_buffer``, ``close``, ``is_open``). Subclasses implement
+    :meth:`handle_line`, returning the reply text (without terminator) or
+    ``None`` for no reply, and optionally :meth:`processing_time` for
+    command-specific device time on top of the profile latency.
+    """
+
+    terminator = b"\n"
+    reply_terminator = "\n"
+
+    def __init__(self, profile: Optional[SimulationProfile] = None, timeout: float = 2.0,
+                 port: str = "sim://"):
+        self.profile = profile or SimulationProfile()
+        self.timeout = timeout
+        self.port = port
+        self.is_open = True
+        self._rx = b""
+        self._pending: List[Tuple[float, bytes]] = []
+        self._ready = b""
+        self._cond = threading.Condition()
+        self._pty_thread: Optional[threading.Thread] = None
+
+    # --- firmware hooks -------------------------------------------------
+
+    def handle_line(self, line: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def processing_time(self, line: str) -> float:
+        """Device time spent executing ``line`` (seconds, before time_scale)"""
+        return 0.0
+
+    # --- serial.Serial interface ---------------------------------------
+
+    def write(self, data: bytes) -> int:
+        if not self.is_open:
+            raise IOError("Simulated port is closed")
+
+        now = time.monotonic()
+        ready_at = now
+        with self._cond:
+            self._rx += data
+            if self._pending:
+                # Replies are produced in order: queue behind the previous one
+                ready_at = max(now, self._pending[-1][0])
+
+            while self.terminator in self._rx:
+                raw, self._rx = self._rx.split(self.terminator, 1)
+                line = raw.decode(errors="replace").strip()
+                if not line:
+                    continue
+
+                ready_at += self.profile.sample_latency(self.processing_time(line))
+                reply = self.handle_line(line)
+                if self.profile.should_fail():
+                    reply = self._inject_failure(reply)
+                if reply is not None:
+                    self._pending.append((ready_at, (reply + self.reply_terminator).encode()))
+            self._cond.notify_all()
+        return len(data)
+
+    def _inject_failure(self, reply: Optional[str]) -> Optional[str]:
+        mode = self.profile.failure_mode
+        if mode == "drop":
+            return None
+        if mode == "garble":
+            return "".join(chr(self.profile.rng.randint(33, 126)) for _ in range(len(reply or "") or 4))
+        return "ERR SIMULATED_FAILURE"
+
+    def _collect_ready(self) -> None:
+        now = time.monotonic()
+        while self._pending and self._pending[0][0] <= now:
+            self._ready += self._pending.pop(0)[1]
+
+    def _wait(self, predicate, timeout: Optional[float]) -> None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._collect_ready()
+                if predicate():
+                    return
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    return
+                wake = deadline
+                if self._pending:
+                    wake = self._pending[0][0] if wake is None else min(wake, self._pending[0][0])
+                self._cond.wait(None if wake is None else max(0.0, wake - now))
+
+    def readline(self) -> bytes:
+        self._wait(lambda: b"\n" in self._ready, self.timeout)
+        with self._cond:
+            if b"\n" in self._ready:
+                line, self._ready = self._ready.split(b"\n", 1)
+                return line + b"\n"
+            # Timeout: like pyserial, return whatever partial data arrived
+            data, self._ready = self._ready, b""
+            return data
+
+    def read(self, size: int = 1) -> bytes:
+        self._wait(lambda: len(self._ready) >= size, self.timeout)
+        with self._cond:
+            data, self._ready = self._ready[:size], self._ready[size:]
+            return data
+
+    @property
+    def in_waiting(self) -> int:
+        with self._cond:
+            self._collect_ready()
+            return len(self._ready)
+
+    def reset_input_buffer(self) -> None:
+        with self._cond:
+            self._pending.clear()
+            self._ready = b""
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.is_open = False
+        with self._cond:
+            self._cond.notify_all()
+
+    # --- pty bridge ----------------------------------------------------
+
+    def serve_pty(self) -> str:
+        """
+        Expose the emulator on a pseudo-terminal (POSIX only)
+
+        Returns the slave device path, which can be opened with
+        ``serial.Serial(path)`` exactly like real hardware.
+        """
+        import pty
+        import tty
+
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        path = os.ttyname(slave)
+
+        def pump():
+            while self.is_open:
+                try:
+                    data = os.read(master, 1024)
+                except OSError:
+                    break
+                self.write(data)
+                while True:
+                    line = self.readline()
+                    if not line:
+                        break
+                    os.write(master, line)
+                    if not self.in_waiting and not self._pending:
+                        break
+
+        self._pty_thread = threading.Thread(target=pump, name=f"sim-pty-{path}", daemon=True)
+        self._pty_thread.start()
+        self.port = path
+        logger.info(f"Simulated serial device available on {path}")
+        return path
@@ -0,0 +1,152 @@
+"""
+Synthetic Signal Source
+Generates pump-probe scope traces and lock-in samples for the PicoScope and HF2LI simulators
+"""
+
+import time
+import logging
+from typing import Optional, Dict, Any, Sequence
+
+import numpy as np
+
+from .base import SimulationProfile, SimulatedDeviceError
+
+logger = logging.getLogger(__name__)
+
+# (center cm-1, FWHM cm-1, peak dOD) of the default synthetic sample
+DEFAULT_BANDS = [
+    (1710.0, 12.0, 0.015),
+    (1785.0, 6.0, -0.008),
+    (1950.0, 20.0, 0.010),
+    (2040.0, 4.0, 0.020),
+]
+# (amplitude fraction, time constant in seconds) of the default kinetics
+DEFAULT_KINETICS = [
+    (0.7, 5e-9),
+    (0.3, 150e-9),
+]
+
+
+class SyntheticSignalSource:
+    """
+    Synthetic pump-probe sample and detector
+
+    The pump-induced change in optical density is a sum of Lorentzian bands
+    multiplied by multi-exponential kinetics in the pump-probe delay. Scope
+    traces and lock-in samples carry white noise and mains pickup, and every
+    acquisition costs its real capture time plus the profile latency. Scope
+    shots can suffer pump misfires (``misfire_rate``) and probe dropouts
+    (``dropout_rate``, the probe falls to 5 %).
+    """
+
+    def __init__(self, profile: Optional[SimulationProfile] = None,
+                 bands: Optional[Sequence[Sequence[float]]] = None,
+                 kinetics: Optional[Sequence[Sequence[float]]] = None,
+                 probe_level: float = 1.0, noise: float = 0.002,
+                 mains_frequency: float = 50.0, mains_amplitude: float = 0.001,
+                 misfire_rate: float = 0.0, dropout_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.profile = profile or SimulationProfile()
+        self.bands = np.asarray(bands if bands is not None else DEFAULT_BANDS, dtype=float)
+        self.kinetics = np.asarray(kinetics if kinetics is not None else DEFAULT_KINETICS, dtype=float)
+        self.probe_level = probe_level
+        self.noise = noise
+        self.mains_frequency = mains_frequency
+        self.mains_amplitude = mains_amplitude
+        self.misfire_rate = misfire_rate
+        self.dropout_rate = dropout_rate
+        self.rng = np.random.default_rng(seed)
+        self._t0 = time.monotonic()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "SyntheticSignalSource":
+        """Build a source from a device's ``simulation`` config table"""
+        sim = config.get('simulation', {})
+        return cls(
+            profile=SimulationProfile.from_config(sim),
+            bands=sim.get('bands'),
+            kinetics=sim.get('kinetics'),
+            noise=float(sim.get('noise', 0.002)),
+            mains_frequency=float(sim.get('mains_frequency', 50.0)),
+            mains_amplitude=float(sim.get('mains_amplitude', 0.001)),
+            misfire_rate=float(sim.get('misfire_rate', 0.0)),
+            dropout_rate=float(sim.get('dropout_rate', 0.0)),
+            seed=sim.get('seed')
+        )
+
+    def delta_od(self, wavenumbers, delay: Optional[float] = None) -> np.ndarray:
+        """Noise-free dOD at the given wavenumbers (and pump-probe delay in seconds)"""
+        wavenumbers = np.atleast_1d(np.asarray(wavenumbers, dtype=float))
+        centers, widths, amplitudes = self.bands[:, 0], self.bands[:, 1], self.bands[:, 2]
+        half = widths[None, :] / 2.0
+        lorentz = half ** 2 / ((wavenumbers[:, None] - centers[None, :]) ** 2 + half ** 2)
+        spectrum = lorentz @ amplitudes
+        if delay is not None:
+            spectrum = spectrum * self.kinetic_trace(delay)
+        return spectrum
+
+    def kinetic_trace(self, delays) -> np.ndarray:
+        """Normalized pump-probe kinetics (0 before time zero)"""
+        delays = np.asarray(delays, dtype=float)
+        amplitudes, taus = self.kinetics[:, 0], self.kinetics[:, 1]
+        decay = np.exp(-np.clip(delays, 0, None)[..., None] / taus) @ amplitudes
+        return np.where(delays >= 0, decay, 0.0)
+
+    def _acquire(self, duration: float) -> None:
+        self.profile.wait(duration)
+        if self.profile.should_fail():
+            raise SimulatedDeviceError("Simulated acquisition failure")
+
+    def _pickup(self, times: np.ndarray) -> np.ndarray:
+        return self.mains_amplitude * np.sin(2 * np.pi * self.mains_frequency * times)
+
+    def scope_block(self, wavenumber: float, num_samples: int, sample_interval: float,
+                    delay: Optional[float] = None, pump_on=True,
+                    num_segments: int = 1, shot_interval: Optional[float] = None) -> np.ndarray:
+        """
+        Simulated detector traces, shape ``(num_segments, num_samples)`` in volts
+
+        Each segment is one probe shot: a flat probe level attenuated by the
+        pump-induced absorption, plus noise and mains pickup. ``pump_on`` is a
+        bool or one bool per segment. When ``shot_interval`` is given the
+        capture lasts as long as the trigger train, not just the sampled traces.
+        """
+        capture = num_samples * num_segments * sample_interval
+        if shot_interval is not None:
+            capture = max(capture, num_segments * shot_interval)
+        self._acquire(capture)
+
+        pumped = np.broadcast_to(np.asarray(pump_on, dtype=bool), (num_segments,))
+        if self.misfire_rate > 0:
+            pumped = pumped & (self.rng.random(num_segments) >= self.misfire_rate)
+        d_od = float(self.delta_od(wavenumber, delay)[0])
+        levels = self.probe_level * np.where(pumped, 10.0 ** (-d_od), 1.0)
+        if self.dropout_rate > 0:
+            levels = np.where(self.rng.random(num_segments) < self.dropout_rate, 0.05 * levels, levels)
+        start = time.monotonic() - self._t0
+        shot_step = shot_interval if shot_interval is not None else num_samples * sample_interval
+        times = start + np.arange(num_segments)[:, None] * shot_step + np.arange(num_samples)[None, :] * sample_interval
+        traces = levels[:, None] + self.noise * self.rng.standard_normal((num_segments, num_samples))
+        return traces + self._pickup(times)
+
+    def lockin_samples(self, wavenumber: float, num_samples: int, sample_interval: float,
+                       delay: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Simulated demodulator output (x, y, timestamps) at the pump modulation frequency"""
+        self._acquire(num_samples * sample_interval)
+
+        signal = float(self.delta_od(wavenumber, delay)[0]) * self.probe_level
+        start = time.monotonic() - self._t0
+        times = start + np.arange(num_samples) * sample_interval
+        x = signal + self.noise * self.rng.standard_normal(num_samples) + self._pickup(times)
+        y = self.noise * self.rng.standard_normal(num_samples)
+        return {"x": x, "y": y, "timestamp": times}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "bands": self.bands.tolist(),
+            "kinetics": self.kinetics.tolist(),
+            "noise": self.noise,
+            "misfire_rate": self.misfire_rate,
+            "dropout_rate": self.dropout_rate,
+            "profile": self.profile.to_dict()
+        }